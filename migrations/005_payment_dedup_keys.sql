@@ -0,0 +1,30 @@
+-- Migration: Payment Duplicate-Detection Keys
+-- Description: Compact lookup table for pacs.008 duplicate checks (UETR, MsgId, EndToEndId)
+-- Date: 2026-10-18
+-- Migration: 005
+--
+-- payments is range-partitioned on initiated_at and has no unique UETR index,
+-- so "SELECT COUNT(*) FROM payments WHERE uetr = ..." probes every monthly
+-- partition. Duplicate detection uses this table instead: one primary-key
+-- probe per key, and INSERT ... ON CONFLICT to claim keys atomically.
+-- Reference: https://docs.nexusglobalpayments.org/payment-processing/validations-duplicates-and-fraud
+
+CREATE TABLE IF NOT EXISTS payment_dedup_keys (
+    key_type VARCHAR(8) NOT NULL,       -- UETR, MSGID, E2EID
+    key_value VARCHAR(160) NOT NULL,    -- UETR, or "<debtor agent BIC>:<id>"
+    uetr UUID NOT NULL,                 -- payment that claimed the key
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (key_type, key_value)
+);
+
+CREATE INDEX IF NOT EXISTS idx_payment_dedup_keys_uetr ON payment_dedup_keys(uetr);
+
+COMMENT ON TABLE payment_dedup_keys IS 'Duplicate-detection keys for accepted payments. UETR keys never expire; MSGID/E2EID keys apply within DEDUP_WINDOW_SECONDS.';
+
+-- Backfill UETR keys for existing non-rejected payments
+INSERT INTO payment_dedup_keys (key_type, key_value, uetr, first_seen_at)
+SELECT DISTINCT ON (p.uetr) 'UETR', p.uetr::text AS key_value, p.uetr, p.initiated_at
+FROM payments p
+WHERE p.status != 'RJCT'
+ORDER BY p.uetr, p.initiated_at
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,37 @@
+-- Migration: Quote Routing Snapshot
+-- Description: Capture SAP/IPS routing on the quote at creation time
+-- Date: 2026-10-18
+-- Migration: 006
+--
+-- pacs.008 validation needs the source SAP, destination SAP and destination
+-- IPS for the quoted FXP and corridor. These are fixed when the quote is
+-- generated, so they are stored on the quote and read with a primary-key
+-- lookup instead of joining fxp_sap_accounts, saps (twice each) and
+-- ips_operators for every payment.
+
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS source_sap_bic VARCHAR(11);
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS dest_sap_bic VARCHAR(11);
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS dest_ips_code VARCHAR(20);
+
+COMMENT ON COLUMN quotes.source_sap_bic IS 'FXP source-currency SAP at quote time (pacs.008 IntrmyAgt1)';
+COMMENT ON COLUMN quotes.dest_sap_bic IS 'FXP destination-currency SAP at quote time (pacs.008 IntrmyAgt2)';
+COMMENT ON COLUMN quotes.dest_ips_code IS 'Destination IPS clearing system at quote time';
+
+-- Backfill existing quotes
+UPDATE quotes q SET
+    source_sap_bic = (
+        SELECT s.bic FROM fxp_sap_accounts a JOIN saps s ON a.sap_id = s.sap_id
+        WHERE a.fxp_id = q.fxp_id AND a.currency_code = q.source_currency
+        ORDER BY a.created_at LIMIT 1
+    ),
+    dest_sap_bic = (
+        SELECT s.bic FROM fxp_sap_accounts a JOIN saps s ON a.sap_id = s.sap_id
+        WHERE a.fxp_id = q.fxp_id AND a.currency_code = q.destination_currency
+        ORDER BY a.created_at LIMIT 1
+    ),
+    dest_ips_code = (
+        SELECT ips.clearing_system_id FROM ips_operators ips
+        WHERE ips.country_code = q.destination_country
+        ORDER BY ips.created_at LIMIT 1
+    )
+WHERE q.source_sap_bic IS NULL AND q.dest_sap_bic IS NULL AND q.dest_ips_code IS NULL;
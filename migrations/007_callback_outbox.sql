@@ -0,0 +1,40 @@
+-- Migration: Callback Outbox
+-- Description: Transactional outbox for pacs.002 callbacks and lifecycle notifications
+-- Date: 2026-10-18
+-- Migration: 007
+--
+-- Callbacks are written here in the same transaction as the payment status
+-- change, then delivered by dispatcher workers (api/outbox.py). Dispatchers
+-- claim due rows with FOR UPDATE SKIP LOCKED and hold them with a lease
+-- (claimed_until), so several gateway replicas can share the table without
+-- delivering a row twice; a row held by a crashed worker is reclaimed when
+-- its lease expires.
+
+CREATE TABLE IF NOT EXISTS callback_outbox (
+    outbox_id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,               -- PACS002, FXP_TRADE
+    uetr UUID,
+    target_url TEXT NOT NULL,
+    payload JSONB NOT NULL,                  -- arguments for the callback builder
+    status VARCHAR(12) NOT NULL DEFAULT 'PENDING',  -- PENDING, DELIVERED, FAILED
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 8,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- next attempt due
+    claimed_by VARCHAR(80),
+    claimed_until TIMESTAMPTZ,
+    last_error TEXT,
+    last_status_code INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    delivered_at TIMESTAMPTZ,
+    CONSTRAINT chk_callback_outbox_status CHECK (status IN ('PENDING', 'DELIVERED', 'FAILED'))
+);
+
+-- Dispatcher claim scan: only pending rows, in due order
+CREATE INDEX IF NOT EXISTS idx_callback_outbox_due
+    ON callback_outbox(available_at)
+    WHERE status = 'PENDING';
+
+CREATE INDEX IF NOT EXISTS idx_callback_outbox_uetr ON callback_outbox(uetr);
+
+COMMENT ON TABLE callback_outbox IS 'Pending and delivered outbound callbacks (pacs.002 status reports, FXP trade notifications).';
+COMMENT ON COLUMN callback_outbox.claimed_until IS 'Dispatcher lease; the row may be reclaimed by another worker after this time.';
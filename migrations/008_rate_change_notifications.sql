@@ -0,0 +1,72 @@
+-- Migration: Rate Change Notifications
+-- Description: NOTIFY the gateway's in-memory rate book when quote inputs change
+-- Date: 2026-10-18
+-- Migration: 008
+--
+-- The gateway keeps fx_rates (with FXP spread and improvements, SAP accounts
+-- and IPS codes) in memory per corridor (api/rate_book.py) and LISTENs on
+-- nexus_rate_changes. Notifications are sent on commit, and identical
+-- payloads within a transaction are delivered once.
+--
+-- Payloads (JSON):
+--   {"scope": "corridor", "source": "SGD", "destination": "THB"}   fx_rates row changed
+--   {"scope": "all", "table": "<table>"}                           FXP / SAP / IPS reference data changed
+--
+-- fxp_sap_accounts.balance is deliberately excluded: balances move on every
+-- settlement and are not a quote input.
+
+CREATE OR REPLACE FUNCTION notify_rate_change() RETURNS trigger AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    IF TG_TABLE_NAME = 'fx_rates' THEN
+        IF TG_OP = 'DELETE' THEN
+            payload := json_build_object(
+                'scope', 'corridor', 'source', OLD.source_currency, 'destination', OLD.destination_currency
+            )::text;
+        ELSE
+            payload := json_build_object(
+                'scope', 'corridor', 'source', NEW.source_currency, 'destination', NEW.destination_currency
+            )::text;
+        END IF;
+    ELSE
+        payload := json_build_object('scope', 'all', 'table', TG_TABLE_NAME)::text;
+    END IF;
+    PERFORM pg_notify('nexus_rate_changes', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_fx_rates_notify ON fx_rates;
+CREATE TRIGGER trg_fx_rates_notify
+    AFTER INSERT OR UPDATE OR DELETE ON fx_rates
+    FOR EACH ROW EXECUTE FUNCTION notify_rate_change();
+
+DROP TRIGGER IF EXISTS trg_fxps_notify ON fxps;
+CREATE TRIGGER trg_fxps_notify
+    AFTER INSERT OR DELETE OR UPDATE OF
+        fxp_code, name, participant_status, base_spread_bps, tier_improvements, psp_improvements
+    ON fxps
+    FOR EACH ROW EXECUTE FUNCTION notify_rate_change();
+
+DROP TRIGGER IF EXISTS trg_fxp_sap_accounts_notify ON fxp_sap_accounts;
+CREATE TRIGGER trg_fxp_sap_accounts_notify
+    AFTER INSERT OR DELETE OR UPDATE OF fxp_id, sap_id, currency_code
+    ON fxp_sap_accounts
+    FOR EACH ROW EXECUTE FUNCTION notify_rate_change();
+
+DROP TRIGGER IF EXISTS trg_saps_notify ON saps;
+CREATE TRIGGER trg_saps_notify
+    AFTER UPDATE OF bic ON saps
+    FOR EACH ROW EXECUTE FUNCTION notify_rate_change();
+
+DROP TRIGGER IF EXISTS trg_ips_operators_notify ON ips_operators;
+CREATE TRIGGER trg_ips_operators_notify
+    AFTER INSERT OR DELETE OR UPDATE OF country_code, clearing_system_id
+    ON ips_operators
+    FOR EACH ROW EXECUTE FUNCTION notify_rate_change();
+
+-- Corridor reload: active rates for one currency pair
+CREATE INDEX IF NOT EXISTS idx_fx_rates_corridor_active
+    ON fx_rates(source_currency, destination_currency, valid_until)
+    WHERE status = 'ACTIVE';
@@ -0,0 +1,39 @@
+-- Migration: Reference Data Change Notifications
+-- Description: NOTIFY the gateway's reference data cache when reference tables change
+-- Date: 2026-10-18
+-- Migration: 009
+--
+-- The gateway keeps countries, currencies, PSPs, SAPs, FXPs, IPS operators
+-- and PDOs in memory (api/reference_data.py) and LISTENs on
+-- nexus_reference_changes. Any committed change bumps the cache version and
+-- the next read reloads the snapshot, so the payload only names the table.
+-- Statement-level triggers: a bulk write sends one notification, and
+-- identical payloads within a transaction are delivered once.
+--
+-- Payload: the changed table's name, e.g. "psps".
+
+CREATE OR REPLACE FUNCTION notify_reference_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('nexus_reference_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'countries', 'country_currencies', 'country_required_elements', 'currencies',
+        'psps', 'saps', 'fxps', 'ips_operators', 'pdos'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_reference_notify ON %I', t, t);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_reference_notify '
+            'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_change()',
+            t, t
+        );
+    END LOOP;
+END;
+$$;
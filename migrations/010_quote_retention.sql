@@ -0,0 +1,44 @@
+-- Migration: Quote Retention
+-- Description: Indexes for the quote expiry sweeper and retention purge
+-- Date: 2026-10-18
+-- Migration: 010
+--
+-- The gateway's quote maintenance job (api/quote_maintenance.py) moves
+-- quotes past expires_at out of ACTIVE in bounded batches and deletes
+-- expired quotes that no payment or trade notification references once
+-- they are older than the retention horizon:
+--
+--   ACTIVE --(expires_at passed, referenced)--> USED       kept
+--   ACTIVE --(expires_at passed, unreferenced)--> EXPIRED  deleted after QUOTE_RETENTION_HOURS
+--
+-- Both scans read a partial index on expires_at, so each index only holds
+-- the rows its phase still has to visit: live quotes, and expired quotes
+-- awaiting deletion. The full indexes on status (three distinct values)
+-- and expires_at are dropped; nothing else filters quotes on them.
+--
+-- quotes is not partitioned: payments.quote_id and trade_notifications.quote_id
+-- are foreign keys to quotes(quote_id), and a partitioned table's primary
+-- key must include the partition column. Retention is batched deletes.
+
+CREATE INDEX IF NOT EXISTS idx_quotes_active_expires
+    ON quotes(expires_at)
+    WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS idx_quotes_expired_expires
+    ON quotes(expires_at)
+    WHERE status = 'EXPIRED';
+
+DROP INDEX IF EXISTS idx_quotes_status;
+DROP INDEX IF EXISTS idx_quotes_expires;
+
+-- Reference checks made when a quote expires and before it is deleted
+CREATE INDEX IF NOT EXISTS idx_payments_quote ON payments(quote_id);
+
+-- Quotes that expired before this migration
+UPDATE quotes q SET status = CASE
+    WHEN EXISTS (SELECT 1 FROM payments p WHERE p.quote_id = q.quote_id)
+      OR EXISTS (SELECT 1 FROM trade_notifications t WHERE t.quote_id = q.quote_id)
+    THEN 'USED' ELSE 'EXPIRED' END
+WHERE q.status = 'ACTIVE' AND q.expires_at < NOW();
+
+COMMENT ON COLUMN quotes.status IS 'ACTIVE until expires_at; then USED (referenced by a payment, kept) or EXPIRED (deleted after the retention horizon)';
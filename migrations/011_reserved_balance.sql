@@ -0,0 +1,30 @@
+-- Migration: Reserved Balance Counter
+-- Description: Running total of ACTIVE reservations per FXP nostro account
+-- Date: 2026-10-18
+-- Migration: 011
+--
+-- fxp_sap_accounts.reserved is the sum of the account's ACTIVE
+-- sap_reservations. The gateway's reservation engine (api/reservations.py)
+-- changes it in the same statement as the reservation:
+--
+--   reserve           reserved + amount, only WHERE balance - reserved >= amount
+--   settle            balance - amount, reserved - amount
+--   cancel / expire   reserved - amount
+--
+-- so a reservation is one conditional write on the account row instead of
+-- a SUM over open reservations followed by an unlocked INSERT.
+--
+-- reserved is not in the nexus_rate_changes trigger column list (migration
+-- 008), so reservations do not reload the rate book.
+
+ALTER TABLE fxp_sap_accounts ADD COLUMN IF NOT EXISTS reserved DECIMAL(18, 2) NOT NULL DEFAULT 0;
+
+UPDATE fxp_sap_accounts a SET reserved = COALESCE((
+    SELECT SUM(r.amount) FROM sap_reservations r
+    WHERE r.account_id = a.account_id AND r.status = 'ACTIVE'
+), 0);
+
+ALTER TABLE fxp_sap_accounts DROP CONSTRAINT IF EXISTS chk_fxp_sap_accounts_reserved;
+ALTER TABLE fxp_sap_accounts ADD CONSTRAINT chk_fxp_sap_accounts_reserved CHECK (reserved >= 0);
+
+COMMENT ON COLUMN fxp_sap_accounts.reserved IS 'Sum of ACTIVE sap_reservations; available = balance - reserved';
@@ -0,0 +1,33 @@
+-- Migration: Account Shards
+-- Description: Optional sub-balances for hot FXP nostro accounts
+-- Date: 2026-10-18
+-- Migration: 012
+--
+-- With ACCOUNT_SHARD_COUNT > 1 the gateway splits each fxp_sap_accounts
+-- row into sub-balances (api/account_shards.py) so concurrent payments on
+-- one account update different rows:
+--
+--   liquidity = headline row + SUM(shards), for balance and reserved alike
+--
+-- Each row keeps balance - reserved >= 0 by itself. sap_reservations.shard
+-- records the row a reservation was taken from (NULL: the headline row) so
+-- settle, cancel and expiry return the amount to it. A consolidator rolls
+-- free funds into the headline row and deals them out to the shards again.
+--
+-- Shard rows are created by the consolidator; with sharding off this table
+-- stays empty and every read falls back to the headline row.
+
+CREATE TABLE IF NOT EXISTS fxp_sap_account_shards (
+    account_id UUID NOT NULL REFERENCES fxp_sap_accounts(account_id) ON DELETE CASCADE,
+    shard SMALLINT NOT NULL,
+    balance DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    reserved DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, shard),
+    CONSTRAINT chk_fxp_sap_account_shards_reserved CHECK (reserved >= 0)
+);
+
+COMMENT ON TABLE fxp_sap_account_shards IS 'Sub-balances of a sharded fxp_sap_accounts row; account liquidity = headline + SUM(shards)';
+
+ALTER TABLE sap_reservations ADD COLUMN IF NOT EXISTS shard SMALLINT;
+
+COMMENT ON COLUMN sap_reservations.shard IS 'fxp_sap_account_shards.shard the amount is reserved on; NULL for the headline row';
@@ -0,0 +1,138 @@
+-- Migration: SAP Daily Positions
+-- Description: Per-account daily rollup of sap_transactions for reconciliation reports
+-- Date: 2026-10-18
+-- Migration: 013
+--
+-- One row per FXP nostro account and UTC day with activity:
+--
+--   opening_balance + total_credits - total_debits = closing_balance
+--
+-- and each day's opening_balance is the closing_balance of the account's
+-- previous row. A day without a row had no activity: its opening and
+-- closing are the closing of the latest earlier row. The reconciliation
+-- report (api/sap.py) reads one row per account through the primary key
+-- instead of scanning the account's transaction history.
+--
+-- Maintained by triggers:
+--   fxp_sap_accounts INSERT   anchor row for the creation day (opening = closing = balance)
+--   sap_transactions INSERT   add to the day's row (created from the previous closing),
+--                             and shift later days when the transaction is back-dated
+--
+-- Balances are expected to move only with a sap_transactions record
+-- (reservations.SETTLE_SQL writes both in one statement); moving funds
+-- between an account's headline row and its shards (migration 012) does
+-- not change the account's balance.
+
+CREATE TABLE IF NOT EXISTS sap_daily_positions (
+    account_id UUID NOT NULL REFERENCES fxp_sap_accounts(account_id) ON DELETE CASCADE,
+    position_date DATE NOT NULL,
+    opening_balance DECIMAL(18, 2) NOT NULL,
+    total_credits DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    total_debits DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    closing_balance DECIMAL(18, 2) NOT NULL,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, position_date)
+);
+
+COMMENT ON TABLE sap_daily_positions IS 'Daily sap_transactions rollup per FXP nostro account (UTC days); closing = opening + credits - debits';
+
+-- Backfill: anchor each account at its current balance less all recorded
+-- movements, then accumulate day by day.
+INSERT INTO sap_daily_positions (
+    account_id, position_date, opening_balance, total_credits, total_debits,
+    closing_balance, transaction_count
+)
+WITH movements AS (
+    SELECT account_id, (created_at AT TIME ZONE 'UTC')::date AS position_date,
+           CASE WHEN type = 'CREDIT' THEN amount ELSE 0 END AS credit,
+           CASE WHEN type = 'DEBIT' THEN amount ELSE 0 END AS debit,
+           1 AS transactions
+    FROM sap_transactions
+    UNION ALL
+    SELECT account_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 0
+    FROM fxp_sap_accounts
+),
+days AS (
+    SELECT account_id, position_date, SUM(credit) AS credits, SUM(debit) AS debits,
+           SUM(transactions) AS transactions
+    FROM movements
+    GROUP BY account_id, position_date
+),
+running AS (
+    SELECT d.*,
+           SUM(d.credits - d.debits) OVER (
+               PARTITION BY d.account_id ORDER BY d.position_date
+           ) AS net_to_date,
+           SUM(d.credits - d.debits) OVER (PARTITION BY d.account_id) AS net_total
+    FROM days d
+),
+balances AS (
+    SELECT a.account_id,
+           a.balance + COALESCE((
+               SELECT SUM(sh.balance) FROM fxp_sap_account_shards sh
+               WHERE sh.account_id = a.account_id
+           ), 0) AS balance
+    FROM fxp_sap_accounts a
+)
+SELECT r.account_id, r.position_date,
+       b.balance - r.net_total + r.net_to_date - (r.credits - r.debits),
+       r.credits, r.debits,
+       b.balance - r.net_total + r.net_to_date,
+       r.transactions
+FROM running r
+JOIN balances b ON b.account_id = r.account_id
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION record_account_opening() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sap_daily_positions (account_id, position_date, opening_balance, closing_balance)
+    VALUES (NEW.account_id, (NEW.created_at AT TIME ZONE 'UTC')::date, NEW.balance, NEW.balance)
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_fxp_sap_accounts_position ON fxp_sap_accounts;
+CREATE TRIGGER trg_fxp_sap_accounts_position
+    AFTER INSERT ON fxp_sap_accounts
+    FOR EACH ROW EXECUTE FUNCTION record_account_opening();
+
+CREATE OR REPLACE FUNCTION record_daily_position() RETURNS trigger AS $$
+DECLARE
+    txn_day DATE := (NEW.created_at AT TIME ZONE 'UTC')::date;
+    txn_credit DECIMAL(18, 2) := CASE WHEN NEW.type = 'CREDIT' THEN NEW.amount ELSE 0 END;
+    txn_debit DECIMAL(18, 2) := CASE WHEN NEW.type = 'DEBIT' THEN NEW.amount ELSE 0 END;
+BEGIN
+    INSERT INTO sap_daily_positions AS p (
+        account_id, position_date, opening_balance, total_credits, total_debits,
+        closing_balance, transaction_count
+    )
+    SELECT NEW.account_id, txn_day, o.balance, txn_credit, txn_debit, o.balance + txn_credit - txn_debit, 1
+    FROM (
+        SELECT COALESCE((
+            SELECT closing_balance FROM sap_daily_positions
+            WHERE account_id = NEW.account_id AND position_date < txn_day
+            ORDER BY position_date DESC
+            LIMIT 1
+        ), 0) AS balance
+    ) o
+    ON CONFLICT (account_id, position_date) DO UPDATE
+    SET total_credits = p.total_credits + EXCLUDED.total_credits,
+        total_debits = p.total_debits + EXCLUDED.total_debits,
+        closing_balance = p.closing_balance + EXCLUDED.total_credits - EXCLUDED.total_debits,
+        transaction_count = p.transaction_count + 1;
+
+    -- Back-dated transaction (e.g. committed just after midnight UTC)
+    UPDATE sap_daily_positions
+    SET opening_balance = opening_balance + txn_credit - txn_debit,
+        closing_balance = closing_balance + txn_credit - txn_debit
+    WHERE account_id = NEW.account_id AND position_date > txn_day;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sap_transactions_position ON sap_transactions;
+CREATE TRIGGER trg_sap_transactions_position
+    AFTER INSERT ON sap_transactions
+    FOR EACH ROW EXECUTE FUNCTION record_daily_position();
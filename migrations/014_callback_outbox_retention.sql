@@ -0,0 +1,23 @@
+-- Migration: Callback Outbox Retention
+-- Description: Backlog and retention indexes for callback_outbox
+-- Date: 2026-10-18
+-- Migration: 014
+--
+-- Delivered callbacks are deleted by the gateway's outbox retention job
+-- (api/outbox.py) once they are older than OUTBOX_RETENTION_HOURS; FAILED
+-- rows are kept for inspection. The job pages through the oldest delivered
+-- rows in bounded batches using the delivered_at index below.
+--
+-- /health/outbox counts only PENDING and FAILED rows. Its scan reads a
+-- partial index holding just those rows, so its cost follows the backlog,
+-- not the number of callbacks ever delivered.
+
+CREATE INDEX IF NOT EXISTS idx_callback_outbox_backlog
+    ON callback_outbox(status, available_at) INCLUDE (claimed_until)
+    WHERE status IN ('PENDING', 'FAILED');
+
+CREATE INDEX IF NOT EXISTS idx_callback_outbox_delivered
+    ON callback_outbox(delivered_at)
+    WHERE status = 'DELIVERED';
+
+COMMENT ON TABLE callback_outbox IS 'Pending, failed and recently delivered outbound callbacks (pacs.002 status reports, FXP trade notifications).';
@@ -0,0 +1,50 @@
+-- Migration: SAP Daily Positions Closer
+-- Description: Close daily positions periodically instead of per-transaction triggers
+-- Date: 2026-10-18
+-- Migration: 015
+--
+-- The sap_transactions trigger from migration 013 upserted the account's
+-- row for the day in the settlement's transaction, so every payment on a
+-- hot account waited for the previous one's unit of work to commit, and
+-- its "shift later days" update missed later-day rows still uncommitted
+-- around midnight.
+--
+-- sap_daily_positions now holds closed days only, written once by the
+-- gateway's daily position closer (api/daily_positions.py) after the UTC
+-- day has ended and no transaction that started during it is still
+-- running. Reconciliation reads sum sap_transactions for the open days
+-- after an account's latest row, through the (account_id, created_at)
+-- index below.
+--
+-- Every account keeps at least one row: the anchor is now dated the day
+-- before creation (closing = initial balance), so creation-day activity
+-- belongs to an open day like any other.
+
+DROP TRIGGER IF EXISTS trg_sap_transactions_position ON sap_transactions;
+DROP FUNCTION IF EXISTS record_daily_position();
+
+CREATE INDEX IF NOT EXISTS idx_sap_transactions_account_created
+    ON sap_transactions(account_id, created_at);
+
+CREATE OR REPLACE FUNCTION record_account_opening() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sap_daily_positions (account_id, position_date, opening_balance, closing_balance)
+    VALUES (NEW.account_id, (NEW.created_at AT TIME ZONE 'UTC')::date - 1, NEW.balance, NEW.balance)
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Today's rows were maintained by the old trigger and the day is still
+-- open: keep only their opening, as the closing of the day before (a row
+-- already there has the same closing), and let the closer redo the day.
+INSERT INTO sap_daily_positions (account_id, position_date, opening_balance, closing_balance)
+SELECT account_id, position_date - 1, opening_balance, opening_balance
+FROM sap_daily_positions
+WHERE position_date >= (NOW() AT TIME ZONE 'UTC')::date
+ON CONFLICT DO NOTHING;
+
+DELETE FROM sap_daily_positions
+WHERE position_date >= (NOW() AT TIME ZONE 'UTC')::date;
+
+COMMENT ON TABLE sap_daily_positions IS 'Closed UTC days per FXP nostro account, written by the daily position closer; closing = opening + credits - debits';
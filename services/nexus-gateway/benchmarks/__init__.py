@@ -0,0 +1 @@
+"""Micro-benchmarks for Nexus Gateway hot paths."""
@@ -0,0 +1,196 @@
+"""
+Fee Engine Microbenchmarks
+
+Measures the fee paths on the quote and disclosure hot paths:
+
+- fee_config: per-call fee evaluation with the compiled currency tables
+  (single calls and the batch API) against the previous implementation
+  (linear scan of DESTINATION_FEE_STRUCTURES, [FEE-DEBUG] f-strings built
+  on every call).
+- quotes.get_quotes: one quote request across N FXPs, reference data, rate
+  book and quote store in memory, no database.
+- fees._calculate_fees_logic and fee_formulas.get_pre_transaction_disclosure:
+  one call each for a quote held in the in-memory quote store.
+
+DEBUG logging is off, as in production.
+
+Run from services/nexus-gateway:
+    python -m benchmarks.bench_fees [--iterations N]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+from src.api import fee_config, quote_store, rate_book, reference_data
+from src.api.fee_config import (
+    DEFAULT_DESTINATION_FEE,
+    DESTINATION_FEE_STRUCTURES,
+    calculate_destination_psp_fee,
+    calculate_destination_psp_fees,
+    calculate_scheme_fee,
+    calculate_source_psp_fee,
+    get_source_fee_structure,
+)
+from src.api.fee_formulas import get_pre_transaction_disclosure
+from src.api.fees import _calculate_fees_logic
+from src.api.quotes import get_quotes
+from src.api.rate_book import BookRate, CorridorRate
+
+
+FXP_COUNTS = (1, 4, 16, 64)
+AMOUNTS = [Decimal(f"{100 + 37 * i}.25") for i in range(64)]
+
+logger = logging.getLogger(fee_config.__name__)
+
+
+# =============================================================================
+# Legacy fee functions (pre-compilation), kept here for comparison only
+# =============================================================================
+
+def legacy_destination_psp_fee(amount: Decimal, currency: str) -> tuple[Decimal, str]:
+    logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee ENTRY: amount={amount}, currency={currency}")
+    for country, struct in DESTINATION_FEE_STRUCTURES.items():
+        if struct["currency"] == currency.upper():
+            calculated = struct["fixed"] + amount * struct["percent"]
+            fee = max(struct["min"], min(struct["max"], calculated))
+            result = fee.quantize(Decimal("0.01"))
+            logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee EXIT: fee={result}, currency={struct['currency']}")
+            return result, struct["currency"]
+    struct = DEFAULT_DESTINATION_FEE
+    calculated = struct["fixed"] + amount * struct["percent"]
+    fee = max(struct["min"], min(struct["max"], calculated))
+    result = fee.quantize(Decimal("0.01"))
+    logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee EXIT (default): fee={result}, currency={currency}")
+    return result, currency
+
+
+def legacy_source_psp_fee(amount: Decimal, currency: str) -> Decimal:
+    logger.debug(f"[FEE-DEBUG] calculate_source_psp_fee ENTRY: amount={amount}, currency={currency}")
+    struct = get_source_fee_structure(currency)
+    calculated = struct["fixed"] + amount * struct["percent"]
+    fee = max(struct["min"], min(struct["max"], calculated)).quantize(Decimal("0.01"))
+    logger.debug(f"[FEE-DEBUG] calculate_source_psp_fee EXIT: fee={fee}, structure={struct}")
+    return fee
+
+
+# =============================================================================
+# In-memory stand-ins for the database and rate book
+# =============================================================================
+
+class NoQuerySession:
+    """Session for handlers that only commit."""
+
+    async def execute(self, statement, params=None):
+        raise AssertionError(f"unexpected query: {statement}")
+
+    async def commit(self):
+        pass
+
+
+def _reference_data() -> reference_data.ReferenceDataCache:
+    countries = [
+        SimpleNamespace(country_id=1, country_code="SG", name="Singapore", currency_code="SGD", max_amount=Decimal("200000")),
+        SimpleNamespace(country_id=2, country_code="ID", name="Indonesia", currency_code="IDR", max_amount=Decimal("5000000000")),
+    ]
+    cache = reference_data.ReferenceDataCache(refresh_interval_seconds=3600)
+    cache.install(reference_data.ReferenceData(cache.version, countries=countries, country_currencies=countries))
+    return cache
+
+
+class StaticRateBook:
+    def __init__(self, fxps: int):
+        valid_until = datetime.now(timezone.utc) + timedelta(days=1)
+        self._rates = [
+            CorridorRate(
+                BookRate(f"r{i}", str(uuid4()), f"FXP-{i}", f"FXP {i}", Decimal("11700") + i, valid_until, 50,
+                         ((Decimal("10000"), 5), (Decimal("1000"), 2)), {"DBSSSGSG": 3}),
+                "SAPSGSGX", "SAPIDJKX", "IDBIFAST",
+            )
+            for i in range(fxps)
+        ]
+
+    async def ensure_loaded(self, db):
+        pass
+
+    def corridor_rates(self, source_currency, dest_currency, dest_country):
+        return self._rates
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def _per_call_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+async def _async_per_call_us(make_call, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await make_call()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def _bench_fee_functions(iterations: int) -> None:
+    amount = Decimal("1234.56")
+    print("fee_config (µs per fee)")
+    for label, legacy, compiled in (
+        ("destination IDR", lambda: legacy_destination_psp_fee(amount, "IDR"), lambda: calculate_destination_psp_fee(amount, "IDR")),
+        ("destination USD (default)", lambda: legacy_destination_psp_fee(amount, "USD"), lambda: calculate_destination_psp_fee(amount, "USD")),
+        ("source SGD", lambda: legacy_source_psp_fee(amount, "SGD"), lambda: calculate_source_psp_fee(amount, "SGD")),
+    ):
+        legacy_us = _per_call_us(legacy, iterations)
+        compiled_us = _per_call_us(compiled, iterations)
+        print(f"  {label:<28} legacy {legacy_us:6.2f}   compiled {compiled_us:6.2f}   {legacy_us / compiled_us:4.1f}x")
+    batch_us = _per_call_us(lambda: calculate_destination_psp_fees(AMOUNTS, "IDR"), iterations // 10) / len(AMOUNTS)
+    print(f"  {'destination IDR, batch of 64':<28} {batch_us:6.2f}")
+    print(f"  {'scheme':<28} {_per_call_us(lambda: calculate_scheme_fee(amount), iterations):6.2f}")
+
+
+async def _bench_endpoints(iterations: int) -> None:
+    quote_store._store = quote_store.MemoryQuoteStore()
+    reference_data._cache = _reference_data()
+    db = NoQuerySession()
+
+    print("quotes.get_quotes (µs per request)")
+    for fxps in FXP_COUNTS:
+        rate_book._book = StaticRateBook(fxps)
+        for amount_type in ("SOURCE", "DESTINATION"):
+            us = await _async_per_call_us(
+                lambda: get_quotes("SG", "ID", Decimal("1000"), amount_type, "DBSSSGSG", db),
+                max(iterations // (10 * fxps), 10),
+            )
+            print(f"  {fxps:>3} FXPs {amount_type:<12} {us:9.1f}   ({us / fxps:6.1f} per quote)")
+
+    rate_book._book = StaticRateBook(1)
+    quote_id = (await get_quotes("SG", "ID", Decimal("1000"), "SOURCE", "DBSSSGSG", db))["quotes"][0]["quoteId"]
+    print("disclosure (µs per call, quote from the memory quote store)")
+    us = await _async_per_call_us(lambda: _calculate_fees_logic(quote_id, None, None, db), iterations // 10)
+    print(f"  fees._calculate_fees_logic                 {us:7.1f}")
+    us = await _async_per_call_us(lambda: get_pre_transaction_disclosure(quote_id, "DEDUCTED", db), iterations // 10)
+    print(f"  fee_formulas.get_pre_transaction_disclosure {us:6.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Disclosure logs an invariant warning per call; keep output to results
+    logging.basicConfig(level=logging.ERROR)
+    _bench_fee_functions(args.iterations)
+    asyncio.run(_bench_endpoints(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
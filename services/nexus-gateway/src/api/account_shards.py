@@ -0,0 +1,278 @@
+"""
+Account Shards
+
+Optional sharded balances for FXP nostro accounts (fxp_sap_accounts), so
+settlements and reservations on a hot account stop queueing for one row
+lock.
+
+With account_shard_count = N > 1 every account gets N sub-balances in
+fxp_sap_account_shards (migration 012), each with its own balance and
+reserved columns. An account's liquidity is the headline row plus its
+shards:
+
+    balance   = fxp_sap_accounts.balance  + SUM(shards.balance)
+    reserved  = fxp_sap_accounts.reserved + SUM(shards.reserved)
+
+Every row keeps balance - reserved >= 0 on its own. Payments pick a shard
+by hashing the UETR (shard_for); reservations (api/reservations.py) fall
+back to the other shards when it runs dry, then to the headline row, and
+record the row they were taken from in sap_reservations.shard so settle,
+cancel and expiry return the amount to the same row.
+
+A consolidator in each gateway process (one at a time, via an advisory
+lock) periodically rolls an account's free funds (balance - reserved)
+into the headline row and deals them out evenly to shards 0..N-1 again,
+so a shard drained by one corridor's traffic is refilled. Funds held by
+ACTIVE reservations stay on their row.
+
+Only accounts that need it are rebalanced: a shard holding less than
+account_shard_skew_ratio of an even share (dry or skewed), more than that
+share parked on the headline row, or free funds on shards beyond N. The
+candidate scan takes no locks. The rebalance locks the headline and
+shard rows with SKIP LOCKED and does nothing unless it got all of them,
+so an account busy with payments is skipped until the next run instead
+of stalling them.
+
+Balance reads sum the shards (SHARD_TOTALS_JOIN). With sharding turned off
+the consolidator does not run; funds left on shards still count in every
+read and are pooled into the headline row by the first reservation that
+needs them.
+
+Configuration (Settings / environment):
+    ACCOUNT_SHARD_COUNT                          sub-balances per account (default 1: off)
+    ACCOUNT_SHARD_CONSOLIDATION_INTERVAL_SECONDS time between consolidations (default 10)
+    ACCOUNT_SHARD_SKEW_RATIO                     rebalance below this share of an even split (default 0.5)
+"""
+
+from sqlalchemy import text
+import zlib
+
+from ..config import settings
+from ..db import async_session_maker
+from .background import AdvisoryLock, PeriodicWorker, WorkerSingleton, try_advisory_lock
+
+# Balance reads: join after fxp_sap_accounts a, then select TOTAL_BALANCE / TOTAL_RESERVED
+SHARD_TOTALS_JOIN = """
+    LEFT JOIN LATERAL (
+        SELECT SUM(sh.balance) AS balance, SUM(sh.reserved) AS reserved
+        FROM fxp_sap_account_shards sh
+        WHERE sh.account_id = a.account_id
+    ) sh ON TRUE
+"""
+TOTAL_BALANCE = "(a.balance + COALESCE(sh.balance, 0))"
+TOTAL_RESERVED = "(a.reserved + COALESCE(sh.reserved, 0))"
+
+ENSURE_SHARDS_SQL = text("""
+    INSERT INTO fxp_sap_account_shards (account_id, shard)
+    SELECT a.account_id, g.shard
+    FROM fxp_sap_accounts a
+    CROSS JOIN generate_series(0, CAST(:shard_count AS integer) - 1) AS g(shard)
+    ON CONFLICT DO NOTHING
+""")
+
+# Accounts whose free funds are unevenly dealt (no row locks): a shard
+# below skew_ratio of an even share, the headline above it, or funds left
+# on shards beyond shard_count. Accounts with less than one unit per shard
+# are left alone: the rounding remainder would keep them skewed.
+SKEWED_ACCOUNTS_SQL = text("""
+    SELECT a.account_id
+    FROM fxp_sap_accounts a
+    JOIN LATERAL (
+        SELECT
+            MIN(sh.balance - sh.reserved) FILTER (WHERE sh.shard < CAST(:shard_count AS integer)) AS min_free,
+            COALESCE(SUM(sh.balance - sh.reserved), 0) AS free,
+            COALESCE(SUM(sh.balance - sh.reserved) FILTER (
+                WHERE sh.shard >= CAST(:shard_count AS integer)
+            ), 0) AS stranded
+        FROM fxp_sap_account_shards sh
+        WHERE sh.account_id = a.account_id
+    ) sh ON TRUE
+    CROSS JOIN LATERAL (
+        SELECT CAST(:skew_ratio AS numeric) * (a.balance - a.reserved + sh.free)
+               / CAST(:shard_count AS integer) AS floor
+    ) share
+    WHERE a.balance - a.reserved + sh.free >= CAST(:shard_count AS integer)
+      AND (sh.min_free < share.floor
+           OR a.balance - a.reserved > share.floor
+           OR sh.stranded > 0)
+    ORDER BY a.account_id
+""")
+
+# Headline row first, then shards in order (the shard scan needs the
+# headline's account_id), so concurrent rebalances and pooling never
+# lock in opposite orders. Rows held by payments are skipped rather than
+# waited for; the rebalance only happens when every row of the account
+# was locked (complete), otherwise it returns no row.
+REBALANCE_SQL = text("""
+    WITH headline AS (
+        SELECT account_id, balance - reserved AS free
+        FROM fxp_sap_accounts
+        WHERE account_id = CAST(:account_id AS uuid)
+        FOR UPDATE SKIP LOCKED
+    ),
+    shards AS (
+        SELECT shard, balance - reserved AS free
+        FROM fxp_sap_account_shards
+        WHERE account_id = (SELECT account_id FROM headline)
+        ORDER BY shard
+        FOR UPDATE SKIP LOCKED
+    ),
+    complete AS (
+        SELECT 1 FROM headline
+        WHERE (SELECT COUNT(*) FROM shards) = (
+            SELECT COUNT(*) FROM fxp_sap_account_shards
+            WHERE account_id = CAST(:account_id AS uuid)
+        )
+    ),
+    pool AS (
+        SELECT h.free + COALESCE((SELECT SUM(free) FROM shards), 0) AS free
+        FROM headline h
+        WHERE EXISTS (SELECT 1 FROM complete)
+    ),
+    dealt AS (
+        UPDATE fxp_sap_account_shards s
+        SET balance = s.reserved + CASE
+            WHEN s.shard < CAST(:shard_count AS integer)
+            THEN trunc(pool.free / CAST(:shard_count AS integer), 2) ELSE 0 END
+        FROM pool
+        WHERE s.account_id = CAST(:account_id AS uuid)
+        RETURNING s.balance - s.reserved AS free
+    )
+    UPDATE fxp_sap_accounts a
+    SET balance = a.reserved + pool.free - (SELECT COALESCE(SUM(free), 0) FROM dealt)
+    FROM pool
+    WHERE a.account_id = CAST(:account_id AS uuid)
+    RETURNING pool.free
+""")
+
+# Free shard funds back into the headline row (reservation fallback)
+POOL_SQL = text("""
+    WITH headline AS (
+        SELECT account_id FROM fxp_sap_accounts
+        WHERE account_id = CAST(:account_id AS uuid)
+        FOR UPDATE
+    ),
+    shards AS (
+        SELECT shard, balance - reserved AS free
+        FROM fxp_sap_account_shards
+        WHERE account_id = (SELECT account_id FROM headline) AND balance > reserved
+        ORDER BY shard
+        FOR UPDATE
+    ),
+    drained AS (
+        UPDATE fxp_sap_account_shards s
+        SET balance = s.reserved
+        FROM shards
+        WHERE s.account_id = CAST(:account_id AS uuid) AND s.shard = shards.shard
+        RETURNING shards.free
+    )
+    UPDATE fxp_sap_accounts
+    SET balance = balance + (SELECT SUM(free) FROM drained)
+    WHERE account_id = CAST(:account_id AS uuid) AND EXISTS (SELECT 1 FROM drained)
+    RETURNING balance - reserved AS free
+""")
+
+
+def shard_for(uetr: str, shard_count: int) -> int:
+    """Shard a payment reserves and settles on first (stable across processes)."""
+    return zlib.crc32(str(uetr).encode()) % shard_count
+
+
+class ShardConsolidator(PeriodicWorker):
+    """Periodic roll-up and redistribution of sharded account balances."""
+
+    name = "account-shards"
+    label = "Account shard consolidator"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        shard_count: int = 1,
+        interval_seconds: int = 10,
+        skew_ratio: float = 0.5,
+    ):
+        super().__init__(session_factory, interval_seconds)
+        self.shard_count = shard_count
+        self.skew_ratio = skew_ratio
+        self._stats.update({
+            "lockNotAcquired": 0,
+            "candidates": 0,
+            "accounts": 0,
+            "skippedBusy": 0,
+        })
+
+    def _describe(self) -> str:
+        return f"{self.shard_count} shards, interval={self.interval}s, skew={self.skew_ratio}"
+
+    # -------------------------------------------------------------------------
+    # Runs
+    # -------------------------------------------------------------------------
+
+    async def run(self) -> int:
+        """
+        Create missing shards, then rebalance each skewed or dry account in
+        its own transaction.
+
+        Returns the accounts rebalanced; 0 when another replica holds the
+        lock. Accounts whose rows are busy are skipped until the next run.
+        """
+        async with self.session_factory() as session:
+            if not await try_advisory_lock(session, AdvisoryLock.ACCOUNT_SHARDS):
+                await session.rollback()
+                self._stats["lockNotAcquired"] += 1
+                return 0
+            await session.execute(ENSURE_SHARDS_SQL, {"shard_count": self.shard_count})
+            accounts = [row.account_id for row in (await session.execute(SKEWED_ACCOUNTS_SQL, {
+                "shard_count": self.shard_count,
+                "skew_ratio": self.skew_ratio,
+            })).fetchall()]
+            await session.commit()
+
+        rebalanced = busy = 0
+        for account_id in accounts:
+            if self.stopping:
+                break
+            async with self.session_factory() as session:
+                if not await try_advisory_lock(session, AdvisoryLock.ACCOUNT_SHARDS):
+                    await session.rollback()
+                    self._stats["lockNotAcquired"] += 1
+                    break
+                result = await session.execute(REBALANCE_SQL, {
+                    "account_id": str(account_id),
+                    "shard_count": self.shard_count,
+                })
+                done = result.fetchone() is not None
+                await session.commit()
+            rebalanced += done
+            busy += not done
+
+        self._stats["candidates"] = len(accounts)
+        self._stats["accounts"] = rebalanced
+        self._stats["skippedBusy"] += busy
+        return rebalanced
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Consolidator counters for this process."""
+        return {
+            "shardCount": self.shard_count,
+            "skewRatio": self.skew_ratio,
+            **super().stats(),
+        }
+
+
+# Singleton consolidator, started when sharding is on
+_consolidator = WorkerSingleton(
+    lambda: ShardConsolidator(
+        shard_count=settings.account_shard_count,
+        interval_seconds=settings.account_shard_consolidation_interval_seconds,
+        skew_ratio=settings.account_shard_skew_ratio,
+    ),
+    enabled=lambda: settings.account_shard_count > 1,
+)
+get_shard_consolidator = _consolidator.get
+start_shard_consolidator = _consolidator.start
+stop_shard_consolidator = _consolidator.stop
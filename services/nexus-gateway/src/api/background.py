@@ -0,0 +1,216 @@
+"""
+Background Workers
+
+Shared lifecycle for the gateway's in-process background workers: quote
+maintenance, reservation expiry, the account shard consolidator, the
+daily position closer, the callback outbox dispatcher and the payment
+event writer.
+
+- BackgroundWorker: asyncio tasks started and stopped from main.lifespan,
+  a stop event the tasks wait on, and counters for /health/metrics.
+- PeriodicWorker: a BackgroundWorker calling run() every interval_seconds,
+  counting runs and failures and timing each run.
+- WorkerSingleton: the process-wide instance of a worker and the get /
+  start / stop functions its module exports.
+- AdvisoryLock: the Postgres advisory lock keys jobs use to coordinate
+  across replicas, kept in one place so two jobs never share a key.
+"""
+
+from enum import IntEnum, unique
+from typing import Callable, Generic, Optional, TypeVar
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import time
+
+
+# =============================================================================
+# Advisory locks
+# =============================================================================
+
+@unique
+class AdvisoryLock(IntEnum):
+    """Transaction-level advisory lock keys shared by all gateway replicas."""
+    OUTBOX_RETENTION = 7_302_011
+    QUOTE_MAINTENANCE = 7_302_019
+    RESERVATION_EXPIRY = 7_302_022
+    ACCOUNT_SHARDS = 7_302_023
+    DAILY_POSITIONS = 7_302_025
+
+
+TRY_LOCK_SQL = text("SELECT pg_try_advisory_xact_lock(:lock_id)")
+
+LOCK_SQL = text("SELECT pg_advisory_xact_lock(:lock_id)")
+
+
+async def try_advisory_lock(session: AsyncSession, lock: AdvisoryLock) -> bool:
+    """Take the lock for the session's transaction; False if another replica holds it."""
+    return bool((await session.execute(TRY_LOCK_SQL, {"lock_id": int(lock)})).scalar())
+
+
+async def advisory_lock(session: AsyncSession, lock: AdvisoryLock) -> None:
+    """Take the lock for the session's transaction, waiting for other replicas."""
+    await session.execute(LOCK_SQL, {"lock_id": int(lock)})
+
+
+# =============================================================================
+# Workers
+# =============================================================================
+
+class BackgroundWorker:
+    """
+    One or more asyncio tasks with a start/stop lifecycle.
+
+    Subclasses implement _run(index) (one call per task) and return from it
+    once stopping is set; stop() waits for every task to finish.
+    """
+
+    name = "background-worker"   # asyncio task name ("-<index>" added with several tasks)
+    label = "Background worker"  # log prefix
+
+    def __init__(self, tasks: int = 1):
+        self.task_count = tasks
+        self.logger = logging.getLogger(type(self).__module__)
+        self._tasks: list[asyncio.Task] = []
+        self._stopping: Optional[asyncio.Event] = None
+        self._stats: dict = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping is not None and self._stopping.is_set()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start the worker's tasks."""
+        if self._tasks:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(
+                self._run(i), name=self.name if self.task_count == 1 else f"{self.name}-{i}"
+            )
+            for i in range(self.task_count)
+        ]
+        self.logger.info(f"{self.label} started ({self._describe()})")
+
+    async def stop(self) -> None:
+        """Signal the tasks to stop and wait for them to finish their current work."""
+        if not self._tasks:
+            return
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.logger.info(f"{self.label} stopped: {self._summary()}")
+
+    async def wait_stopping(self, timeout: float) -> bool:
+        """Sleep for up to timeout seconds; True if stop() was called meanwhile."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self, index: int) -> None:
+        raise NotImplementedError
+
+    def _describe(self) -> str:
+        """Configuration logged on start."""
+        return f"{self.task_count} task(s)"
+
+    def _summary(self) -> str:
+        """Totals logged on stop."""
+        return ", ".join(f"{k}={v}" for k, v in self._stats.items() if isinstance(v, int))
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Worker counters for this process."""
+        return {"running": self.running, **self._stats}
+
+
+class PeriodicWorker(BackgroundWorker):
+    """
+    A single task calling run() every interval_seconds until stopped.
+
+    A failed run is counted and logged; the next one starts on schedule.
+    """
+
+    def __init__(self, session_factory, interval_seconds: float):
+        super().__init__()
+        self.session_factory = session_factory
+        self.interval = interval_seconds
+        self._stats = {
+            "runs": 0,
+            "failures": 0,
+            "lastRunMs": 0.0,
+            "totalMs": 0.0,
+        }
+
+    async def _run(self, index: int) -> None:
+        while not self.stopping:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self._stats["failures"] += 1
+                self.logger.warning(f"{self.label} run failed: {e}")
+            await self._wait()
+
+    async def _wait(self) -> None:
+        """Sleep until the next run is due (or stop())."""
+        await self.wait_stopping(self.interval)
+
+    async def run_once(self):
+        """One run, timed; returns what run() returns."""
+        started = time.perf_counter()
+        result = await self.run()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._stats["runs"] += 1
+        self._stats["lastRunMs"] = round(elapsed_ms, 3)
+        self._stats["totalMs"] = round(self._stats["totalMs"] + elapsed_ms, 3)
+        return result
+
+    async def run(self):
+        raise NotImplementedError
+
+    def _describe(self) -> str:
+        return f"interval={self.interval}s"
+
+
+W = TypeVar("W", bound=BackgroundWorker)
+
+
+class WorkerSingleton(Generic[W]):
+    """
+    Process-wide instance of a worker, created on first use.
+
+    get() is used by callers and /health/metrics; start() and stop() are
+    called from main.lifespan. start() does nothing when enabled() is false.
+    """
+
+    def __init__(self, factory: Callable[[], W], enabled: Callable[[], bool] = lambda: True):
+        self._factory = factory
+        self._enabled = enabled
+        self._worker: Optional[W] = None
+
+    def get(self) -> W:
+        if self._worker is None:
+            self._worker = self._factory()
+        return self._worker
+
+    async def start(self) -> None:
+        if self._enabled():
+            await self.get().start()
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            await self._worker.stop()
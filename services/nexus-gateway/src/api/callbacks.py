@@ -3,13 +3,12 @@ pacs.002 Callback Delivery Module
 
 Handles asynchronous delivery of ISO 20022 pacs.002 status reports
 to the callback endpoints registered by Source IPS during pacs.008 submission.
+HTTP delivery goes through the shared engine in delivery.py.
 
 Includes HMAC signature authentication for callback security.
 """
 
 import os
-import httpx
-import asyncio
 import hmac
 import hashlib
 import base64
@@ -19,14 +18,14 @@ from typing import Optional
 from uuid import uuid4
 import logging
 
+from .delivery import CallbackRequest, get_delivery_engine
+
 logger = logging.getLogger(__name__)
 
 # In production, this should be loaded from environment/secret management
 # For sandbox, we use a default shared secret (MUST be changed in production)
 _DEV_SHARED_SECRET = "nexus-sandbox-shared-secret-change-in-production"
 
-# Configurable callback timeout (seconds) - per audit recommendation
-CALLBACK_TIMEOUT_SECONDS = float(os.environ.get("NEXUS_CALLBACK_TIMEOUT_SECONDS", "10"))
 DEFAULT_SHARED_SECRET = os.environ.get("NEXUS_CALLBACK_SECRET", _DEV_SHARED_SECRET)
 
 # Warn if using dev secret
@@ -141,6 +140,50 @@ def generate_pacs002_xml(
     )
 
 
+def build_pacs002_callback_request(
+    callback_url: str,
+    uetr: str,
+    status: str,
+    reason_code: Optional[str] = None,
+    additional_info: Optional[str] = None,
+    currency: str = "USD",
+    amount: str = "0.00",
+    max_retries: int = 3,
+    shared_secret: Optional[str] = None
+) -> CallbackRequest:
+    """Build the signed pacs.002 callback for the delivery engine."""
+    secret = shared_secret or DEFAULT_SHARED_SECRET
+    
+    pacs002_xml = generate_pacs002_xml(
+        uetr=uetr,
+        status=status,
+        reason_code=reason_code,
+        additional_info=additional_info,
+        currency=currency,
+        amount=amount
+    )
+    
+    # Generate signature
+    timestamp = datetime.now(timezone.utc).isoformat()
+    signature = generate_callback_signature(pacs002_xml, uetr, timestamp, secret)
+    
+    return CallbackRequest(
+        url=callback_url,
+        content=pacs002_xml,
+        headers={
+            "Content-Type": "application/xml",
+            "X-UETR": uetr,
+            "X-Message-Type": "pacs.002",
+            "X-Transaction-Status": status,
+            "X-Callback-Timestamp": timestamp,
+            "X-Callback-Signature": signature,
+            "X-Callback-Version": "1",
+        },
+        max_attempts=max_retries,
+        label=f"pacs.002 {uetr} ({status})",
+    )
+
+
 async def deliver_pacs002_callback(
     callback_url: str,
     uetr: str,
@@ -156,6 +199,8 @@ async def deliver_pacs002_callback(
     Deliver pacs.002 status report to the registered callback endpoint.
     
     Includes HMAC-SHA256 signature for authentication and integrity.
+    Sent through the shared delivery engine (pooled connections,
+    scheduled retries, per-destination circuit breaker).
     
     Args:
         callback_url: The pacs002Endpoint registered during pacs.008 submission
@@ -174,52 +219,12 @@ async def deliver_pacs002_callback(
         logger.warning(f"No callback URL for UETR {uetr}, skipping pacs.002 delivery")
         return False
     
-    secret = shared_secret or DEFAULT_SHARED_SECRET
-    
-    pacs002_xml = generate_pacs002_xml(
-        uetr=uetr,
-        status=status,
-        reason_code=reason_code,
-        additional_info=additional_info,
-        currency=currency,
-        amount=amount
+    request = build_pacs002_callback_request(
+        callback_url, uetr, status, reason_code, additional_info,
+        currency, amount, max_retries, shared_secret
     )
-    
-    # Generate signature
-    timestamp = datetime.now(timezone.utc).isoformat()
-    signature = generate_callback_signature(pacs002_xml, uetr, timestamp, secret)
-    
-    for attempt in range(max_retries):
-        try:
-            async with httpx.AsyncClient(timeout=CALLBACK_TIMEOUT_SECONDS) as client:
-                response = await client.post(
-                    callback_url,
-                    content=pacs002_xml,
-                    headers={
-                        "Content-Type": "application/xml",
-                        "X-UETR": uetr,
-                        "X-Message-Type": "pacs.002",
-                        "X-Transaction-Status": status,
-                        "X-Callback-Timestamp": timestamp,
-                        "X-Callback-Signature": signature,
-                        "X-Callback-Version": "1",
-                    }
-                )
-                
-                if response.status_code in (200, 201, 202):
-                    logger.info(f"pacs.002 delivered for {uetr}: {status} -> {callback_url}")
-                    return True
-                else:
-                    logger.warning(f"pacs.002 delivery failed for {uetr}: HTTP {response.status_code}")
-                    
-        except Exception as e:
-            logger.error(f"pacs.002 delivery error for {uetr} (attempt {attempt + 1}): {e}")
-            
-        # Wait before retry
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)  # Exponential backoff
-    
-    return False
+    result = await get_delivery_engine().deliver(request)
+    return result.success
 
 
 async def schedule_pacs002_delivery(
@@ -233,25 +238,74 @@ async def schedule_pacs002_delivery(
     delay_seconds: float = 0.5
 ):
     """
-    Schedule pacs.002 delivery as background task with optional delay.
+    Schedule pacs.002 delivery on the delivery engine with optional delay.
     Simulates realistic async processing time.
+    
+    Returns immediately; the delay and any retries are timers on the
+    engine's scheduler, not sleeping tasks.
     """
-    await asyncio.sleep(delay_seconds)
-    await deliver_pacs002_callback(
-        callback_url=callback_url,
-        uetr=uetr,
-        status=status,
-        reason_code=reason_code,
-        additional_info=additional_info,
-        currency=currency,
-        amount=amount
+    if not callback_url:
+        logger.warning(f"No callback URL for UETR {uetr}, skipping pacs.002 delivery")
+        return
+    
+    request = build_pacs002_callback_request(
+        callback_url, uetr, status, reason_code, additional_info, currency, amount
     )
+    get_delivery_engine().submit(request, delay_seconds=delay_seconds)
 
 
 # =============================================================================
 # Quote Acceptance Notifications (FXP Trade Notifications)
 # =============================================================================
 
+def build_fxp_trade_request(
+    callback_url: str,
+    fxp_bic: str,
+    quote_id: str,
+    uetr: str,
+    source_currency: str,
+    destination_currency: str,
+    amount: str,
+    rate: str,
+    max_retries: int = 3,
+    shared_secret: Optional[str] = None
+) -> CallbackRequest:
+    """Build the signed FXP trade notification for the delivery engine."""
+    secret = shared_secret or DEFAULT_SHARED_SECRET
+    timestamp = datetime.now(timezone.utc).isoformat()
+    
+    # Build notification payload (JSON for trade notifications)
+    notification = {
+        "eventType": "TRADE_NOTIFICATION",
+        "timestamp": timestamp,
+        "fxpBic": fxp_bic,
+        "quoteId": quote_id,
+        "uetr": uetr,
+        "sourceCurrency": source_currency,
+        "destinationCurrency": destination_currency,
+        "amount": amount,
+        "rate": rate,
+    }
+    
+    payload = str(notification)  # Convert to string for signing
+    signature = generate_callback_signature(payload, uetr, timestamp, secret)
+    
+    return CallbackRequest(
+        url=callback_url,
+        json=notification,
+        headers={
+            "Content-Type": "application/json",
+            "X-UETR": uetr,
+            "X-Event-Type": "TRADE_NOTIFICATION",
+            "X-Callback-Timestamp": timestamp,
+            "X-Callback-Signature": signature,
+            "X-Callback-Version": "1",
+        },
+        max_attempts=max_retries,
+        label=f"Trade notification {quote_id} to FXP {fxp_bic}",
+    )
+
+
 async def notify_fxp_trade(
     callback_url: str,
     fxp_bic: str,
@@ -288,54 +342,12 @@ async def notify_fxp_trade(
         logger.warning(f"No trade callback URL for FXP {fxp_bic}, skipping notification")
         return False
     
-    secret = shared_secret or DEFAULT_SHARED_SECRET
-    timestamp = datetime.now(timezone.utc).isoformat()
-    
-    # Build notification payload (JSON for trade notifications)
-    notification = {
-        "eventType": "TRADE_NOTIFICATION",
-        "timestamp": timestamp,
-        "fxpBic": fxp_bic,
-        "quoteId": quote_id,
-        "uetr": uetr,
-        "sourceCurrency": source_currency,
-        "destinationCurrency": destination_currency,
-        "amount": amount,
-        "rate": rate,
-    }
-    
-    payload = str(notification)  # Convert to string for signing
-    signature = generate_callback_signature(payload, uetr, timestamp, secret)
-    
-    for attempt in range(max_retries):
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    callback_url,
-                    json=notification,
-                    headers={
-                        "Content-Type": "application/json",
-                        "X-UETR": uetr,
-                        "X-Event-Type": "TRADE_NOTIFICATION",
-                        "X-Callback-Timestamp": timestamp,
-                        "X-Callback-Signature": signature,
-                        "X-Callback-Version": "1",
-                    }
-                )
-                
-                if response.status_code in (200, 201, 202):
-                    logger.info(f"Trade notification delivered for {quote_id} to FXP {fxp_bic}")
-                    return True
-                else:
-                    logger.warning(f"Trade notification failed for {quote_id}: HTTP {response.status_code}")
-                    
-        except Exception as e:
-            logger.error(f"Trade notification error for {quote_id} (attempt {attempt + 1}): {e}")
-            
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)
-    
-    return False
+    request = build_fxp_trade_request(
+        callback_url, fxp_bic, quote_id, uetr, source_currency,
+        destination_currency, amount, rate, max_retries, shared_secret
+    )
+    result = await get_delivery_engine().deliver(request)
+    return result.success
 
 
 # =============================================================================
@@ -364,33 +376,33 @@ async def test_callback_endpoint(
     ping_payload = '{"eventType": "PING", "timestamp": "' + timestamp + '"}'
     signature = generate_callback_signature(ping_payload, uetr, timestamp, secret)
     
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                callback_url,
-                content=ping_payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "X-UETR": uetr,
-                    "X-Event-Type": "PING",
-                    "X-Callback-Timestamp": timestamp,
-                    "X-Callback-Signature": signature,
-                }
-            )
-            
-            return {
-                "success": response.status_code in (200, 201, 202),
-                "statusCode": response.status_code,
-                "responseBody": response.text[:500] if response.text else None,
-                "latencyMs": response.elapsed.total_seconds() * 1000 if hasattr(response, 'elapsed') else None
-            }
-            
-    except Exception as e:
+    # Single attempt: the caller wants to see this endpoint's response now
+    result = await get_delivery_engine().deliver(CallbackRequest(
+        url=callback_url,
+        content=ping_payload,
+        headers={
+            "Content-Type": "application/json",
+            "X-UETR": uetr,
+            "X-Event-Type": "PING",
+            "X-Callback-Timestamp": timestamp,
+            "X-Callback-Signature": signature,
+        },
+        max_attempts=1,
+        label=f"Callback test {callback_url}",
+    ))
+    
+    if result.status_code is not None:
         return {
-            "success": False,
-            "error": str(e),
-            "errorType": type(e).__name__
+            "success": result.success,
+            "statusCode": result.status_code,
+            "responseBody": result.response_body,
+            "latencyMs": result.latency_ms
         }
+    return {
+        "success": False,
+        "error": result.error,
+        "errorType": result.error_type
+    }
 
 
 # Error code descriptions for frontend display
@@ -0,0 +1,362 @@
+"""
+Corridor Pricing Simulation
+
+Evaluates quote pricing (quote_pricing.price_quote, as used by GET /quotes)
+for every FXP of a corridor across a grid of amounts in one vectorized
+NumPy computation: final rate with tier and PSP improvements, source and
+destination PSP fees, capping at country_currencies.max_amount and net to
+recipient.
+
+Amounts are integer minor units (hundredths, the quantum quotes are
+rounded to). Intermediate values stay exact as int64 rationals
+whole + num/den (0 <= num < den):
+
+    amount * rate   den = 10^12 (8-decimal base rate x bps adjustment)
+    amount / rate   den = the scaled rate itself
+
+so every comparison and ROUND_HALF_EVEN rounding gives the result the
+scalar Decimal path gives. Inputs whose intermediates would not fit in
+int64 are rejected with ValueError.
+"""
+
+from decimal import Decimal
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db import get_db
+from .fee_config import CompiledFee, CorridorFees, corridor_fees
+from .quotes import get_corridor_currencies
+from .rate_book import BookRate, get_rate_book
+
+router = APIRouter()
+
+MINOR_PLACES = 2
+BASE_RATE_PLACES = 8
+RATE_SCALE = 10 ** (BASE_RATE_PLACES + 4)  # base rate x (10000 + bps) / 10000
+MAX_POINTS = 10000
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+def _scaled(value: Decimal, places: int, what: str) -> int:
+    """value * 10^places as an int; ValueError if that is not exact."""
+    scaled = Decimal(value).scaleb(places)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"{what} {value} has more than {places} decimal places")
+    return int(scaled)
+
+
+def to_minor_units(value: Decimal) -> int:
+    return _scaled(value, MINOR_PLACES, "Amount")
+
+
+# =============================================================================
+# Exact int64 arithmetic
+# =============================================================================
+
+class _Exact(NamedTuple):
+    """whole + num / den minor units, elementwise."""
+    whole: np.ndarray
+    num: np.ndarray
+    den: np.ndarray
+
+
+def _minor(values) -> _Exact:
+    values = np.asarray(values, dtype=np.int64)
+    return _Exact(values, np.zeros_like(values), np.ones_like(values))
+
+
+def _mul_rate(minor, rate: np.ndarray) -> _Exact:
+    """minor * rate / RATE_SCALE, splitting the rate so products fit in int64."""
+    rate_whole, rate_frac = np.divmod(rate, RATE_SCALE)
+    frac_hi, frac_lo = np.divmod(rate_frac, 10 ** 6)
+    carry, rest = np.divmod(minor * frac_hi, 10 ** 6)
+    carry2, num = np.divmod(rest * 10 ** 6 + minor * frac_lo, RATE_SCALE)
+    whole = minor * rate_whole + carry + carry2
+    return _Exact(whole, num, np.full_like(whole, RATE_SCALE))
+
+
+def _div_rate(minor, rate: np.ndarray) -> _Exact:
+    """minor * RATE_SCALE / rate by long division, one decimal digit at a time."""
+    whole, rem = np.divmod(np.broadcast_to(minor, rate.shape), rate)
+    for _ in range(BASE_RATE_PLACES + 4):
+        digit, rem = np.divmod(rem * 10, rate)
+        whole = whole * 10 + digit
+    return _Exact(whole, rem, rate)
+
+
+def _round(x: _Exact) -> np.ndarray:
+    """ROUND_HALF_EVEN to whole minor units."""
+    twice = 2 * x.num
+    up = (twice > x.den) | ((twice == x.den) & (x.whole % 2 == 1))
+    return x.whole + up
+
+
+def _gt(x: _Exact, minor) -> np.ndarray:
+    return (x.whole > minor) | ((x.whole == minor) & (x.num > 0))
+
+
+def _where(mask: np.ndarray, a: _Exact, b: _Exact) -> _Exact:
+    return _Exact(*(np.where(mask, u, v) for u, v in zip(a, b)))
+
+
+class _Fee(NamedTuple):
+    """A CompiledFee in minor units: fixed + amount * pct / 10^places, clamped."""
+    fixed: int
+    pct: int
+    places: int
+    minimum: int
+    maximum: int
+
+    @classmethod
+    def compile(cls, fee: CompiledFee) -> "_Fee":
+        places = max(1, -fee.percent.normalize().as_tuple().exponent)
+        return cls(
+            to_minor_units(fee.fixed), _scaled(fee.percent, places, "Fee percent"), places,
+            to_minor_units(fee.minimum), to_minor_units(fee.maximum),
+        )
+
+    def evaluate(self, x: _Exact) -> np.ndarray:
+        """The fee, rounded as CompiledFee.fee rounds it."""
+        # fixed + x * pct / 10^places = floor_minor + (frac + rem / den) / 10^places
+        carry, rem = np.divmod(x.num * self.pct, x.den)
+        scaled_whole, frac = np.divmod(x.whole * self.pct + carry, 10 ** self.places)
+        floor_minor = self.fixed + scaled_whole
+        half = 10 ** self.places // 2
+        up = (frac > half) | ((frac == half) & ((rem > 0) | (floor_minor % 2 == 1)))
+        above_max = (floor_minor > self.maximum) | ((floor_minor == self.maximum) & ((frac > 0) | (rem > 0)))
+        return np.where(
+            floor_minor < self.minimum, self.minimum,
+            np.where(above_max, self.maximum, floor_minor + up),
+        )
+
+
+def _check_range(max_abs_minor: int, rates: np.ndarray, fees: Sequence[_Fee]) -> None:
+    """Reject inputs whose intermediates could overflow int64."""
+    max_rate, min_rate = int(rates.max()), int(rates.min())
+    if min_rate <= 0:
+        raise ValueError("Spread leaves a non-positive customer rate")
+    max_pct = max(fee.pct for fee in fees)
+    bounds = (
+        max_abs_minor * 10 ** 6,  # _mul_rate partial products
+        max_abs_minor * max_rate // RATE_SCALE + 1,  # amount * rate
+        max_abs_minor * RATE_SCALE // min_rate + 1,  # amount / rate
+        max_rate * 10,  # _div_rate remainder
+    )
+    largest = max(bounds[1], bounds[2])
+    if max(*bounds, largest * max(max_pct, 1), max(RATE_SCALE, max_rate) * max_pct) >= _INT64_MAX:
+        raise ValueError("Amounts or rates out of range for exact int64 simulation")
+
+
+# =============================================================================
+# Simulation
+# =============================================================================
+
+class CorridorSimulation(NamedTuple):
+    """Per-FXP (rows) x per-amount (columns) results; amounts in minor units."""
+    amounts: np.ndarray  # (points,)
+    tier_improvement_bps: np.ndarray
+    psp_improvement_bps: np.ndarray  # (fxps,)
+    customer_rate: np.ndarray  # scaled by RATE_SCALE, exact
+    source_interbank_amount: np.ndarray
+    destination_interbank_amount: np.ndarray
+    creditor_account_amount: np.ndarray
+    source_psp_fee: np.ndarray
+    destination_psp_fee: np.ndarray
+    capped_to_max_amount: np.ndarray
+    available: np.ndarray  # False where fees exceed the payment (no quote)
+
+
+def simulate_corridor(
+    rates: Sequence[BookRate],
+    amounts: np.ndarray,
+    amount_type: str,
+    fees: CorridorFees,
+    source_max: Decimal,
+    dest_max: Decimal,
+    source_psp_bic: Optional[str] = None,
+) -> CorridorSimulation:
+    """
+    Price every rate at every amount, as price_quote would.
+
+    amounts are requested amounts in minor units (int array); fee and
+    amount fields of the result are minor units, rounded as quotes are.
+    Raises ValueError for inputs outside exact int64 range.
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    source_max_minor = to_minor_units(source_max)
+    dest_max_minor = to_minor_units(dest_max)
+    source_fee, dest_fee = _Fee.compile(fees.source), _Fee.compile(fees.destination)
+    shape = (len(rates), len(amounts))
+
+    # Final rate = base * (10000 + improvements - spread) / 10000, per FXP and amount
+    tier_bps = np.zeros(shape, dtype=np.int64)
+    psp_bps = np.zeros(len(rates), dtype=np.int64)
+    base = np.zeros((len(rates), 1), dtype=np.int64)
+    spread = np.zeros((len(rates), 1), dtype=np.int64)
+    for i, rate in enumerate(rates):
+        base[i] = _scaled(rate.base_rate, BASE_RATE_PLACES, "Base rate")
+        spread[i] = rate.base_spread_bps
+        if source_psp_bic:
+            psp_bps[i] = rate.psp_improvements.get(source_psp_bic.upper(), 0)
+        # Tiers are sorted largest first; the first one reached applies
+        for min_amount, improvement_bps in reversed(rate.tier_improvements):
+            threshold = int((Decimal(min_amount).scaleb(MINOR_PLACES)).to_integral_value(rounding="ROUND_CEILING"))
+            tier_bps[i, amounts >= threshold] = improvement_bps
+    adjustment = 10000 + tier_bps + psp_bps[:, None] - spread
+    if len(rates) and int(base.max()) * int(adjustment.max(initial=0)) >= _INT64_MAX:
+        raise ValueError("Base rate out of range for exact int64 simulation")
+    customer_rate = base * adjustment
+
+    max_abs = int(np.abs(amounts).max(initial=0)) + max(source_fee.maximum, dest_fee.maximum, 0)
+    _check_range(max(max_abs, source_max_minor, dest_max_minor), customer_rate, (source_fee, dest_fee))
+
+    if amount_type == "DESTINATION":
+        requested_fee = dest_fee.evaluate(_minor(amounts))
+        dest_psp_fee = np.broadcast_to(requested_fee, shape)
+        dest_interbank = _minor(np.broadcast_to(amounts + requested_fee, shape))
+        source_interbank = _div_rate(amounts + requested_fee, customer_rate)
+        source_psp_fee = source_fee.evaluate(source_interbank)
+        creditor = _minor(np.broadcast_to(amounts, shape))
+    else:
+        requested_fee = source_fee.evaluate(_minor(amounts))
+        source_psp_fee = np.broadcast_to(requested_fee, shape)
+        source_interbank = _minor(np.broadcast_to(amounts - requested_fee, shape))
+        dest_interbank = _mul_rate(amounts - requested_fee, customer_rate)
+        dest_psp_fee = dest_fee.evaluate(dest_interbank)
+        creditor = dest_interbank._replace(whole=dest_interbank.whole - dest_psp_fee)
+
+    # Source capped at its max: destination side recomputed
+    cap_source = _gt(source_interbank, source_max_minor)
+    if cap_source.any():
+        capped_dest = _mul_rate(source_max_minor, customer_rate)
+        capped_fee = dest_fee.evaluate(capped_dest)
+        source_interbank = _where(cap_source, _minor(np.full(shape, source_max_minor)), source_interbank)
+        dest_interbank = _where(cap_source, capped_dest, dest_interbank)
+        dest_psp_fee = np.where(cap_source, capped_fee, dest_psp_fee)
+        creditor = _where(cap_source, capped_dest._replace(whole=capped_dest.whole - capped_fee), creditor)
+
+    # Destination capped at its max: source recomputed (source fee is not)
+    cap_dest = _gt(dest_interbank, dest_max_minor)
+    if cap_dest.any():
+        capped_fee = int(dest_fee.evaluate(_minor([dest_max_minor]))[0])
+        source_interbank = _where(cap_dest, _div_rate(dest_max_minor, customer_rate), source_interbank)
+        dest_interbank = _where(cap_dest, _minor(np.full(shape, dest_max_minor)), dest_interbank)
+        dest_psp_fee = np.where(cap_dest, capped_fee, dest_psp_fee)
+        creditor = _where(cap_dest, _minor(np.full(shape, dest_max_minor - capped_fee)), creditor)
+
+    available = (creditor.whole > 0) | ((creditor.whole == 0) & (creditor.num > 0))
+    return CorridorSimulation(
+        amounts=amounts,
+        tier_improvement_bps=tier_bps,
+        psp_improvement_bps=psp_bps,
+        customer_rate=customer_rate,
+        source_interbank_amount=_round(source_interbank),
+        destination_interbank_amount=_round(dest_interbank),
+        creditor_account_amount=_round(creditor),
+        source_psp_fee=np.array(source_psp_fee),
+        destination_psp_fee=np.array(dest_psp_fee),
+        capped_to_max_amount=cap_source | cap_dest,
+        available=available,
+    )
+
+
+def _amount_grid(min_amount: Decimal, max_amount: Decimal, points: int) -> np.ndarray:
+    """points evenly spaced minor-unit amounts from min to max (inclusive), deduplicated."""
+    low, high = to_minor_units(min_amount), to_minor_units(max_amount)
+    if points == 1 or low == high:
+        return np.array([low], dtype=np.int64)
+    steps = np.arange(points, dtype=np.int64)
+    return np.unique(low + (high - low) * steps // (points - 1))
+
+
+# =============================================================================
+# Endpoints
+# =============================================================================
+
+@router.get(
+    "/simulations/corridor-pricing",
+    summary="Simulate corridor pricing over an amount grid",
+    description="""
+    Price every FXP of a corridor across a grid of amounts, exactly as
+    GET /quotes would price each amount. No quotes are created.
+
+    Amounts and fees are returned as integer minor units (hundredths),
+    one array per FXP with one entry per amount; `null` where fees exceed
+    the payment and no quote would be offered. Exchange rates are strings
+    with 8 decimal places, as in quotes.
+    """,
+)
+async def simulate_corridor_pricing(
+    source_country: str = Query(..., alias="sourceCountry", min_length=2, max_length=2),
+    destination_country: str = Query(..., alias="destCountry", min_length=2, max_length=2),
+    amount_type: str = Query(..., alias="amountType", pattern="^(SOURCE|DESTINATION)$"),
+    min_amount: Decimal = Query(..., alias="minAmount", gt=0),
+    max_amount: Decimal = Query(..., alias="maxAmount", gt=0),
+    points: int = Query(1000, ge=1, le=MAX_POINTS, description="Number of amounts in the grid"),
+    source_psp_bic: str | None = Query(None, alias="sourcePspBic"),
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    if max_amount < min_amount:
+        raise HTTPException(status_code=400, detail="maxAmount must not be below minAmount")
+
+    source_currency, source_max, dest_currency, dest_max = await get_corridor_currencies(
+        db, source_country, destination_country
+    )
+    rate_book = get_rate_book()
+    await rate_book.ensure_loaded(db)
+    corridor = rate_book.corridor_rates(source_currency, dest_currency, destination_country.upper())
+    if not corridor:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No FX rates available for {source_currency}/{dest_currency}",
+        )
+
+    try:
+        amounts = _amount_grid(min_amount, max_amount, points)
+        sim = simulate_corridor(
+            [c.rate for c in corridor], amounts, amount_type,
+            corridor_fees(source_currency, dest_currency), source_max, dest_max, source_psp_bic,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def column(values: np.ndarray, i: int) -> list:
+        return np.where(sim.available[i], values[i], None).tolist()
+
+    # Final rates as returned by GET /quotes (8 places); few distinct values per FXP
+    rate_places = RATE_SCALE // 10 ** BASE_RATE_PLACES
+    rate_whole, rate_rem = np.divmod(sim.customer_rate, rate_places)
+    rate_e8 = rate_whole + ((2 * rate_rem > rate_places) | ((2 * rate_rem == rate_places) & (rate_whole % 2 == 1)))
+    distinct, index = np.unique(rate_e8, return_inverse=True)
+    rate_text = np.array([f"{v // 10 ** BASE_RATE_PLACES}.{v % 10 ** BASE_RATE_PLACES:08d}" for v in distinct.tolist()])
+    exchange_rates = rate_text[index.reshape(rate_e8.shape)]
+    rates = [c.rate for c in corridor]
+
+    return {
+        "sourceCurrency": source_currency,
+        "destinationCurrency": dest_currency,
+        "amountType": amount_type,
+        "minorUnitPlaces": MINOR_PLACES,
+        "amounts": amounts.tolist(),
+        "fxps": [
+            {
+                "fxpId": rate.fxp_code,
+                "fxpName": rate.fxp_name,
+                "baseRate": str(rate.base_rate),
+                "pspImprovementBps": int(sim.psp_improvement_bps[i]),
+                "tierImprovementBps": sim.tier_improvement_bps[i].tolist(),
+                "exchangeRate": exchange_rates[i].tolist(),
+                "sourceInterbankAmount": column(sim.source_interbank_amount, i),
+                "destinationInterbankAmount": column(sim.destination_interbank_amount, i),
+                "creditorAccountAmount": column(sim.creditor_account_amount, i),
+                "sourcePspFee": column(sim.source_psp_fee, i),
+                "destinationPspFee": column(sim.destination_psp_fee, i),
+                "cappedToMaxAmount": sim.capped_to_max_amount[i].tolist(),
+            }
+            for i, rate in enumerate(rates)
+        ],
+    }
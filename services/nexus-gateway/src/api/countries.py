@@ -16,6 +16,7 @@ from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import get_db
+from .reference_data import Country, get_reference_data, invalidate_reference_data
 
 
 router = APIRouter()
@@ -38,6 +39,21 @@ from .schemas import (
 )
 
 
+def _country_info(country: Country) -> dict[str, Any]:
+    """CountryInfo for a cached country."""
+    pacs008 = country.required_elements.get("pacs008")
+    return {
+        "countryId": country.country_id,
+        "countryCode": country.country_code,
+        "name": country.name,
+        "currencies": [
+            {"currencyCode": c.currency_code, "maxAmount": str(c.max_amount)}
+            for c in country.currencies
+        ],
+        "requiredMessageElements": {"pacs008": list(pacs008) if pacs008 else None},
+    }
+
+
 # =============================================================================
 # Endpoints
 # =============================================================================
@@ -66,47 +82,8 @@ async def retrieve_all_countries(
     This endpoint is typically called at the start of a payment flow to
     determine available corridors.
     """
-    # Query countries with currencies
-    query = text("""
-        SELECT 
-            c.country_id,
-            c.country_code,
-            c.name,
-            COALESCE(
-                json_agg(
-                    DISTINCT jsonb_build_object(
-                        'currencyCode', cc.currency_code,
-                        'maxAmount', cc.max_amount::text
-                    )
-                ) FILTER (WHERE cc.currency_code IS NOT NULL),
-                '[]'
-            ) as currencies,
-            COALESCE(
-                jsonb_build_object(
-                    'pacs008',
-                    array_agg(DISTINCT cre.element_name) FILTER (WHERE cre.message_type = 'pacs008')
-                ),
-                '{}'::jsonb
-            ) as required_message_elements
-        FROM countries c
-        LEFT JOIN country_currencies cc ON c.country_code = cc.country_code
-        LEFT JOIN country_required_elements cre ON c.country_code = cre.country_code
-        GROUP BY c.country_id, c.country_code, c.name
-        ORDER BY c.name
-    """)
-    
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
-    countries = []
-    for row in rows:
-        countries.append({
-            "countryId": row.country_id,
-            "countryCode": row.country_code,
-            "name": row.name,
-            "currencies": row.currencies,
-            "requiredMessageElements": row.required_message_elements,
-        })
+    reference = await get_reference_data().get(db)
+    countries = [_country_info(country) for country in reference.countries.values()]
     
     return {"countries": countries}
 
@@ -133,50 +110,15 @@ async def retrieve_single_country(
 ) -> dict[str, Any]:
     """Get details for a specific country."""
     
-    query = text("""
-        SELECT 
-            c.country_id,
-            c.country_code,
-            c.name,
-            COALESCE(
-                json_agg(
-                    DISTINCT jsonb_build_object(
-                        'currencyCode', cc.currency_code,
-                        'maxAmount', cc.max_amount::text
-                    )
-                ) FILTER (WHERE cc.currency_code IS NOT NULL),
-                '[]'
-            ) as currencies,
-            COALESCE(
-                jsonb_build_object(
-                    'pacs008',
-                    array_agg(DISTINCT cre.element_name) FILTER (WHERE cre.message_type = 'pacs008')
-                ),
-                '{}'::jsonb
-            ) as required_message_elements
-        FROM countries c
-        LEFT JOIN country_currencies cc ON c.country_code = cc.country_code
-        LEFT JOIN country_required_elements cre ON c.country_code = cre.country_code
-        WHERE c.country_code = :country_code
-        GROUP BY c.country_id, c.country_code, c.name
-    """)
-    
-    result = await db.execute(query, {"country_code": country_code.upper()})
-    row = result.fetchone()
+    country = (await get_reference_data().get(db)).country(country_code)
     
-    if not row:
+    if not country:
         raise HTTPException(
             status_code=404,
             detail=f"Country {country_code} not found in Nexus",
         )
     
-    return {
-        "countryId": row.country_id,
-        "countryCode": row.country_code,
-        "name": row.name,
-        "currencies": row.currencies,
-        "requiredMessageElements": row.required_message_elements,
-    }
+    return _country_info(country)
 
 
 @router.get(
@@ -205,29 +147,17 @@ async def retrieve_country_psps(
 ) -> dict[str, Any]:
     """Get PSPs for a specific country."""
     
-    query = text("""
-        SELECT 
-            psp_id::text,
-            bic,
-            name,
-            fee_percent
-        FROM psps
-        WHERE country_code = :country_code
-        AND participant_status = 'ACTIVE'
-        ORDER BY name
-    """)
-    
-    result = await db.execute(query, {"country_code": country_code.upper()})
-    rows = result.fetchall()
+    reference = await get_reference_data().get(db)
     
     psps = [
         {
-            "pspId": row.psp_id,
-            "bic": row.bic,
-            "name": row.name,
-            "feePercent": float(row.fee_percent),
+            "pspId": psp.psp_id,
+            "bic": psp.bic,
+            "name": psp.name,
+            "feePercent": float(psp.fee_percent or 0),
         }
-        for row in rows
+        for psp in reference.psps_in_country(country_code)
+        if psp.participant_status == "ACTIVE"
     ]
     
     return {"psps": psps}
@@ -333,20 +263,9 @@ async def retrieve_max_amounts(
 ) -> dict[str, Any]:
     """Get max amount for a currency in a country."""
     
-    query = text("""
-        SELECT max_amount
-        FROM country_currencies
-        WHERE country_code = :country_code
-        AND currency_code = :currency_code
-    """)
-    
-    result = await db.execute(query, {
-        "country_code": country_code.upper(),
-        "currency_code": currency_code.upper(),
-    })
-    row = result.fetchone()
+    max_amount = (await get_reference_data().get(db)).max_amount(country_code, currency_code)
     
-    if not row:
+    if max_amount is None:
         raise HTTPException(
             status_code=404,
             detail=f"Currency {currency_code} not found for country {country_code}",
@@ -354,7 +273,7 @@ async def retrieve_max_amounts(
     return {
         "countryCode": country_code.upper(),
         "currencyCode": currency_code.upper(),
-        "maxAmount": str(row.max_amount),
+        "maxAmount": str(max_amount),
     }
 
 
@@ -382,9 +301,7 @@ async def update_country(
     """Update country configuration."""
     
     # Check if country exists
-    check_query = text("SELECT country_id FROM countries WHERE country_code = :cc")
-    result = await db.execute(check_query, {"cc": country_code.upper()})
-    if not result.fetchone():
+    if not (await get_reference_data().get(db)).country(country_code):
         raise HTTPException(status_code=404, detail="Country not found")
 
     # Update logic (Stub implementation for Sandbox)
@@ -393,5 +310,8 @@ async def update_country(
         # Mock update
         pass
 
+    # Cached country data is stale after a write
+    invalidate_reference_data(f"countries.update_country {country_code.upper()}")
+
     # Return updated info (re-using existing retrieval logic)
     return await retrieve_single_country(country_code, db)
@@ -8,10 +8,10 @@ decimal places, associated countries, and currency metadata.
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from ..db import get_db
+from .reference_data import get_reference_data
 
 router = APIRouter(prefix="/v1", tags=["Reference Data"])
 
@@ -37,32 +37,17 @@ async def list_currencies(
     
     Used by Source PSP to display available currencies for payments.
     """
-    query = text("""
-        SELECT 
-            c.currency_code,
-            c.name,
-            c.decimal_places,
-            COALESCE(
-                array_agg(DISTINCT cc.country_code) FILTER (WHERE cc.country_code IS NOT NULL),
-                ARRAY[]::text[]
-            ) as countries
-        FROM currencies c
-        LEFT JOIN country_currencies cc ON c.currency_code = cc.currency_code
-        GROUP BY c.currency_code, c.name, c.decimal_places
-        ORDER BY c.currency_code
-    """)
+    reference = await get_reference_data().get(db)
     
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
-    currencies = []
-    for row in rows:
-        currencies.append(CurrencyResponse(
-            code=row.currency_code,
-            name=row.name,
-            fractional_digits=row.decimal_places,
+    currencies = [
+        CurrencyResponse(
+            code=currency.currency_code,
+            name=currency.name,
+            fractional_digits=currency.decimal_places,
             is_active=True
-        ))
+        )
+        for currency in reference.currencies.values()
+    ]
     
     return CurrenciesListResponse(currencies=currencies)
 
@@ -84,27 +69,17 @@ async def get_currency(
     """
     Get details for a single currency by its 3-letter code.
     """
-    query = text("""
-        SELECT 
-            c.currency_code,
-            c.name,
-            c.decimal_places
-        FROM currencies c
-        WHERE c.currency_code = :currency_code
-    """)
-    
-    result = await db.execute(query, {"currency_code": currency_code.upper()})
-    row = result.fetchone()
+    currency = (await get_reference_data().get(db)).currency(currency_code)
     
-    if not row:
+    if not currency:
         raise HTTPException(
             status_code=404,
             detail=f"Currency {currency_code} not found"
         )
     
     return CurrencyResponse(
-        code=row.currency_code,
-        name=row.name,
-        fractional_digits=row.decimal_places,
+        code=currency.currency_code,
+        name=currency.name,
+        fractional_digits=currency.decimal_places,
         is_active=True
     )
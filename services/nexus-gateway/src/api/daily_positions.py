@@ -0,0 +1,237 @@
+"""
+Daily Positions
+
+Per-account daily positions of FXP nostro accounts for reconciliation
+reports, without writing to a shared row on the settlement path.
+
+sap_daily_positions (migration 013) holds one row per account and closed
+UTC day with activity:
+
+    opening_balance + total_credits - total_debits = closing_balance
+
+Rows are written only by the closer and never change afterwards (plus an
+anchor row the day before an account is created, migration 015). Days
+after an account's latest row are open: their figures are summed from
+sap_transactions on read, starting at the latest row's closing balance.
+Settlements only insert their sap_transactions record, so hot accounts
+no longer queue on a position row held until the unit of work commits.
+
+The closer in each gateway process (one at a time, via an advisory lock)
+closes every finished UTC day of every account in one statement. A day
+is closed only once no transaction that started before its end is still
+running (pg_stat_activity): sap_transactions.created_at is the inserting
+transaction's start time, so a row committed late still lands in an
+open day and is counted when that day closes. While such a transaction
+is open the close is postponed to the next run and reads keep summing
+the open days.
+
+Configuration (Settings / environment):
+    DAILY_POSITION_CLOSER_ENABLED          run the closer in this process (default true)
+    DAILY_POSITION_CLOSE_INTERVAL_SECONDS  time between closer runs (default 300)
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import NamedTuple
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import async_session_maker
+from .background import AdvisoryLock, PeriodicWorker, WorkerSingleton, try_advisory_lock
+
+# Reconciliation reads: join after fxp_sap_accounts a and select
+# POSITION_COLUMNS; parameters from position_params(). p is the latest
+# closed row up to the report date, n the next closed row after it, and o
+# sums the open days after the latest closed row (empty when n exists).
+POSITION_JOIN = """
+    LEFT JOIN LATERAL (
+        SELECT * FROM sap_daily_positions
+        WHERE account_id = a.account_id AND position_date <= :report_date
+        ORDER BY position_date DESC
+        LIMIT 1
+    ) p ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT opening_balance FROM sap_daily_positions
+        WHERE account_id = a.account_id AND position_date > :report_date
+        ORDER BY position_date
+        LIMIT 1
+    ) n ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT
+            COALESCE(SUM(CASE t.type WHEN 'CREDIT' THEN t.amount WHEN 'DEBIT' THEN -t.amount ELSE 0 END)
+                     FILTER (WHERE t.created_at < :day_start), 0) AS net_before,
+            COALESCE(SUM(t.amount) FILTER (WHERE t.type = 'CREDIT' AND t.created_at >= :day_start), 0) AS credits,
+            COALESCE(SUM(t.amount) FILTER (WHERE t.type = 'DEBIT' AND t.created_at >= :day_start), 0) AS debits,
+            COUNT(*) FILTER (WHERE t.created_at >= :day_start) AS transactions
+        FROM sap_transactions t
+        WHERE n.opening_balance IS NULL
+          AND p.position_date < :report_date
+          AND t.account_id = a.account_id
+          AND t.created_at >= (p.position_date + 1)::timestamp AT TIME ZONE 'UTC'
+          AND t.created_at < :day_end
+    ) o ON TRUE
+"""
+
+POSITION_COLUMNS = """
+    p.position_date,
+    p.opening_balance,
+    p.total_credits,
+    p.total_debits,
+    p.closing_balance,
+    p.transaction_count,
+    n.opening_balance as next_opening_balance,
+    o.net_before as open_net_before,
+    o.credits as open_credits,
+    o.debits as open_debits,
+    o.transactions as open_transactions
+"""
+
+# Cut-off for closing: start of the current UTC day, and whether a client
+# transaction that started before it is still running
+CUTOFF_SQL = text("""
+    SELECT c.close_before,
+           EXISTS (
+               SELECT 1 FROM pg_stat_activity
+               WHERE datname = current_database()
+                 AND backend_type = 'client backend'
+                 AND pid <> pg_backend_pid()
+                 AND xact_start < c.close_before
+           ) AS in_flight
+    FROM (
+        SELECT date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS close_before
+    ) c
+""")
+
+# Close each account's days with activity between its latest row and the
+# cut-off. Every day is read through the (account_id, created_at) index.
+CLOSE_SQL = text("""
+    INSERT INTO sap_daily_positions (
+        account_id, position_date, opening_balance, total_credits, total_debits,
+        closing_balance, transaction_count
+    )
+    WITH latest AS (
+        SELECT a.account_id, l.position_date, l.closing_balance
+        FROM fxp_sap_accounts a
+        JOIN LATERAL (
+            SELECT position_date, closing_balance FROM sap_daily_positions
+            WHERE account_id = a.account_id
+            ORDER BY position_date DESC
+            LIMIT 1
+        ) l ON TRUE
+    ),
+    days AS (
+        SELECT t.account_id, (t.created_at AT TIME ZONE 'UTC')::date AS position_date,
+               SUM(CASE WHEN t.type = 'CREDIT' THEN t.amount ELSE 0 END) AS credits,
+               SUM(CASE WHEN t.type = 'DEBIT' THEN t.amount ELSE 0 END) AS debits,
+               COUNT(*) AS transactions
+        FROM latest l
+        JOIN sap_transactions t
+          ON t.account_id = l.account_id
+         AND t.created_at >= (l.position_date + 1)::timestamp AT TIME ZONE 'UTC'
+         AND t.created_at < CAST(:close_before AS timestamptz)
+        GROUP BY 1, 2
+    ),
+    running AS (
+        SELECT d.*,
+               l.closing_balance + SUM(d.credits - d.debits) OVER (
+                   PARTITION BY d.account_id ORDER BY d.position_date
+               ) AS closing
+        FROM days d
+        JOIN latest l ON l.account_id = d.account_id
+    )
+    SELECT account_id, position_date, closing - (credits - debits), credits, debits,
+           closing, transactions
+    FROM running
+    ON CONFLICT DO NOTHING
+    RETURNING account_id
+""")
+
+
+class DailyPosition(NamedTuple):
+    """An account's figures for one reconciliation day."""
+    opening: Decimal
+    credits: Decimal
+    debits: Decimal
+    closing: Decimal
+    transactions: int
+
+
+def position_params(report_date: date) -> dict:
+    """POSITION_JOIN parameters for a report date (UTC day bounds)."""
+    day_start = datetime.combine(report_date, time.min, tzinfo=timezone.utc)
+    return {
+        "report_date": report_date,
+        "day_start": day_start,
+        "day_end": day_start + timedelta(days=1),
+    }
+
+
+def report_position(row, report_date: date, current_balance: Decimal) -> DailyPosition:
+    """Figures for the report date from a row selecting POSITION_COLUMNS."""
+    if row.position_date == report_date:
+        return DailyPosition(
+            Decimal(row.opening_balance), Decimal(row.total_credits), Decimal(row.total_debits),
+            Decimal(row.closing_balance), row.transaction_count,
+        )
+    if row.next_opening_balance is not None:
+        # Closed day without activity
+        balance = Decimal(row.closing_balance if row.position_date is not None else row.next_opening_balance)
+        return DailyPosition(balance, Decimal("0"), Decimal("0"), balance, 0)
+    if row.position_date is not None:
+        # Open day: latest closing plus the open days' transactions
+        opening = Decimal(row.closing_balance) + Decimal(row.open_net_before)
+        credits, debits = Decimal(row.open_credits), Decimal(row.open_debits)
+        return DailyPosition(opening, credits, debits, opening + credits - debits, row.open_transactions)
+    return DailyPosition(current_balance, Decimal("0"), Decimal("0"), current_balance, 0)
+
+
+class DailyPositionCloser(PeriodicWorker):
+    """Periodic close of finished UTC days into sap_daily_positions."""
+
+    name = "daily-positions"
+    label = "Daily position closer"
+
+    def __init__(self, session_factory=async_session_maker, interval_seconds: int = 300):
+        super().__init__(session_factory, interval_seconds)
+        self._stats.update({
+            "lockNotAcquired": 0,
+            "postponed": 0,
+            "closed": 0,
+            "lastClosed": 0,
+        })
+
+    async def run(self) -> int:
+        """
+        Close every account's finished days up to the start of today (UTC).
+
+        Returns the position rows written; 0 when another replica holds the
+        lock or a transaction that started before the cut-off is running.
+        """
+        async with self.session_factory() as session:
+            if not await try_advisory_lock(session, AdvisoryLock.DAILY_POSITIONS):
+                await session.rollback()
+                self._stats["lockNotAcquired"] += 1
+                return 0
+            cutoff = (await session.execute(CUTOFF_SQL)).fetchone()
+            if cutoff.in_flight:
+                await session.rollback()
+                self._stats["postponed"] += 1
+                return 0
+            rows = (await session.execute(CLOSE_SQL, {"close_before": cutoff.close_before})).fetchall()
+            await session.commit()
+
+        self._stats["closed"] += len(rows)
+        self._stats["lastClosed"] = len(rows)
+        if rows:
+            self.logger.info(f"{self.label}: {len(rows)} account days closed before {cutoff.close_before}")
+        return len(rows)
+
+
+# Singleton closer
+_closer = WorkerSingleton(
+    lambda: DailyPositionCloser(interval_seconds=settings.daily_position_close_interval_seconds),
+    enabled=lambda: settings.daily_position_closer_enabled,
+)
+get_daily_position_closer = _closer.get
+start_daily_position_closer = _closer.start
+stop_daily_position_closer = _closer.stop
@@ -0,0 +1,413 @@
+"""
+Callback Delivery Engine
+
+Shared outbound HTTP delivery for pacs.002 status reports, FXP trade
+notifications and callback endpoint tests (see callbacks.py).
+
+- Connection reuse: one pooled keep-alive httpx.AsyncClient per destination
+  host (scheme + host + port), optionally HTTP/2 when the h2 package is
+  installed. Status reports to the same IPS no longer pay TCP + TLS setup
+  on every attempt.
+- Bounded in-flight: at most callback_max_in_flight_per_host concurrent
+  requests per destination; further deliveries queue for that host only.
+- Scheduled retries: a failed attempt is put on a single timer heap with
+  full-jitter exponential backoff. Nothing sleeps while waiting to retry;
+  the scheduler starts the next attempt when it is due.
+- Circuit breaker per destination: after callback_breaker_failure_threshold
+  consecutive failures the host is skipped for callback_breaker_reset_seconds,
+  then a single trial request decides whether to close the circuit again.
+  A slow or dead PSP therefore cannot tie up connections and in-flight
+  slots needed by healthy destinations.
+
+Usage:
+    engine = get_delivery_engine()
+    future = engine.submit(CallbackRequest(url, content=xml, headers=headers))
+    result = await future          # DeliveryResult, after retries
+"""
+
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from typing import Any, Optional
+from urllib.parse import urlsplit
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_CODES = (200, 201, 202)
+
+
+@dataclass
+class CallbackRequest:
+    """One outbound callback (POST)."""
+    url: str
+    content: Optional[str] = None
+    json: Optional[Any] = None
+    headers: dict[str, str] = field(default_factory=dict)
+    max_attempts: int = 3
+    label: str = "callback"  # used in logs, e.g. "pacs.002 <uetr>"
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of a delivery after all attempts."""
+    success: bool
+    attempts: int
+    status_code: Optional[int] = None
+    response_body: Optional[str] = None
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+
+
+# =============================================================================
+# Circuit Breaker
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one destination.
+
+    closed → open after failure_threshold consecutive failures;
+    open → half-open after reset_seconds (one trial request);
+    half-open → closed on success, open again on failure.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def allow(self, now: float) -> bool:
+        """May a request be sent now?"""
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def retry_at(self) -> float:
+        """Earliest time a blocked request could be let through."""
+        return self.opened_at + self.reset_seconds
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class _Destination:
+    """Pooled client, in-flight limit, breaker and counters for one host."""
+
+    def __init__(self, client: httpx.AsyncClient, max_in_flight: int, breaker: CircuitBreaker):
+        self.client = client
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.breaker = breaker
+        self.in_flight = 0
+        self.stats = {"delivered": 0, "failed": 0, "attempts": 0, "retries": 0, "shortCircuited": 0}
+
+
+@dataclass(order=True)
+class _Job:
+    due: float
+    seq: int
+    request: CallbackRequest = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+# =============================================================================
+# Delivery Engine
+# =============================================================================
+
+class DeliveryEngine:
+    """
+    Pooled, rate-bounded callback delivery with scheduled retries.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = 10.0,
+        max_connections_per_host: int = 20,
+        max_in_flight_per_host: int = 10,
+        http2: bool = False,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_connections_per_host = max_connections_per_host
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self.http2 = http2 and find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("CALLBACK_HTTP2 requested but the h2 package is not installed; using HTTP/1.1")
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.transport = transport
+        self._destinations: dict[str, _Destination] = {}
+        self._timers: list[_Job] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._attempts: set[asyncio.Task] = set()
+
+    # -------------------------------------------------------------------------
+    # Destinations
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def destination_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _destination(self, url: str) -> _Destination:
+        key = self.destination_key(url)
+        destination = self._destinations.get(key)
+        if destination is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                http2=self.http2,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_connections_per_host,
+                ),
+            )
+            destination = self._destinations[key] = _Destination(
+                client,
+                self.max_in_flight_per_host,
+                CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_seconds),
+            )
+        return destination
+
+    # -------------------------------------------------------------------------
+    # Submission and scheduling
+    # -------------------------------------------------------------------------
+
+    def submit(self, request: CallbackRequest, delay_seconds: float = 0.0) -> asyncio.Future:
+        """
+        Queue a delivery; returns a future resolving to a DeliveryResult.
+
+        The caller may await it or drop it (fire-and-forget).
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Clients, timers and the scheduler belong to one event loop
+            self._loop = loop
+            self._destinations.clear()
+            self._timers.clear()
+            self._scheduler = None
+        future = loop.create_future()
+        self._schedule(_Job(time.monotonic() + delay_seconds, next(self._seq), request, future))
+        return future
+
+    async def deliver(self, request: CallbackRequest) -> DeliveryResult:
+        """Submit and wait for the final result."""
+        return await self.submit(request)
+
+    def _schedule(self, job: _Job) -> None:
+        heapq.heappush(self._timers, job)
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.create_task(self._run_scheduler(), name="callback-scheduler")
+        self._wakeup.set()
+
+    def _backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff."""
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _run_scheduler(self) -> None:
+        """Start attempts as they fall due; idle on the wakeup event otherwise."""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._timers and self._timers[0].due <= now:
+                job = heapq.heappop(self._timers)
+                task = asyncio.create_task(self._attempt(job))
+                self._attempts.add(task)
+                task.add_done_callback(self._attempts.discard)
+            timeout = self._timers[0].due - now if self._timers else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # -------------------------------------------------------------------------
+    # Attempts
+    # -------------------------------------------------------------------------
+
+    async def _attempt(self, job: _Job) -> None:
+        if job.future.done():  # cancelled by the caller
+            return
+        request = job.request
+        destination = self._destination(request.url)
+        breaker = destination.breaker
+
+        if not breaker.allow(time.monotonic()):
+            destination.stats["shortCircuited"] += 1
+            job.attempts += 1
+            self._retry_or_fail(job, destination, DeliveryResult(
+                success=False, attempts=job.attempts,
+                error=f"circuit open for {self.destination_key(request.url)}",
+                error_type="CircuitOpen",
+            ), earliest=breaker.retry_at())
+            return
+
+        async with destination.slots:
+            job.attempts += 1
+            destination.stats["attempts"] += 1
+            destination.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await destination.client.post(
+                    request.url,
+                    content=request.content,
+                    json=request.json,
+                    headers=request.headers,
+                )
+                result = DeliveryResult(
+                    success=response.status_code in SUCCESS_CODES,
+                    attempts=job.attempts,
+                    status_code=response.status_code,
+                    response_body=response.text[:500] if response.text else None,
+                    latency_ms=round((time.perf_counter() - started) * 1000, 3),
+                )
+            except Exception as e:
+                result = DeliveryResult(
+                    success=False, attempts=job.attempts,
+                    error=str(e), error_type=type(e).__name__,
+                )
+            finally:
+                destination.in_flight -= 1
+
+        if result.success:
+            breaker.record_success()
+            destination.stats["delivered"] += 1
+            logger.info(f"{request.label} delivered -> {request.url} (attempt {job.attempts})")
+            if not job.future.done():
+                job.future.set_result(result)
+            return
+
+        breaker.record_failure(time.monotonic())
+        reason = f"HTTP {result.status_code}" if result.status_code else result.error
+        logger.warning(f"{request.label} delivery failed (attempt {job.attempts}/{request.max_attempts}): {reason}")
+        self._retry_or_fail(job, destination, result)
+
+    def _retry_or_fail(
+        self,
+        job: _Job,
+        destination: _Destination,
+        result: DeliveryResult,
+        earliest: float = 0.0,
+    ) -> None:
+        if job.attempts < job.request.max_attempts:
+            destination.stats["retries"] += 1
+            job.due = max(earliest, time.monotonic() + self._backoff(job.attempts))
+            job.seq = next(self._seq)
+            self._schedule(job)
+            return
+        destination.stats["failed"] += 1
+        logger.error(f"{job.request.label} undeliverable after {job.attempts} attempts -> {job.request.url}")
+        if not job.future.done():
+            job.future.set_result(result)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle and metrics
+    # -------------------------------------------------------------------------
+
+    async def close(self) -> None:
+        """Stop scheduling, fail pending deliveries and close pooled clients."""
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+        for task in list(self._attempts):
+            task.cancel()
+        await asyncio.gather(*self._attempts, return_exceptions=True)
+        for job in self._timers:
+            if not job.future.done():
+                job.future.set_result(DeliveryResult(
+                    success=False, attempts=job.attempts,
+                    error="delivery engine shut down", error_type="Shutdown",
+                ))
+        self._timers.clear()
+        for destination in self._destinations.values():
+            await destination.client.aclose()
+        self._destinations.clear()
+
+    def stats(self) -> dict:
+        """Pending retries and per-destination counters."""
+        return {
+            "http2": self.http2,
+            "scheduled": len(self._timers),
+            "destinations": {
+                key: {
+                    "inFlight": d.in_flight,
+                    "circuit": d.breaker.state,
+                    "circuitOpened": d.breaker.times_opened,
+                    **d.stats,
+                }
+                for key, d in sorted(self._destinations.items())
+            },
+        }
+
+
+# Singleton engine
+_engine: Optional[DeliveryEngine] = None
+
+
+def get_delivery_engine() -> DeliveryEngine:
+    """Get the process-wide callback delivery engine."""
+    global _engine
+    if _engine is None:
+        _engine = DeliveryEngine(
+            timeout_seconds=settings.callback_timeout_seconds,
+            max_connections_per_host=settings.callback_max_connections_per_host,
+            max_in_flight_per_host=settings.callback_max_in_flight_per_host,
+            http2=settings.callback_http2,
+            retry_base_seconds=settings.callback_retry_base_seconds,
+            retry_max_seconds=settings.callback_retry_max_seconds,
+            breaker_failure_threshold=settings.callback_breaker_failure_threshold,
+            breaker_reset_seconds=settings.callback_breaker_reset_seconds,
+        )
+    return _engine
+
+
+async def close_delivery_engine() -> None:
+    """Close the engine if it was created (called from main.lifespan)."""
+    global _engine
+    if _engine is not None:
+        await _engine.close()
+        _engine = None
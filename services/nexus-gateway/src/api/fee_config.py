@@ -5,11 +5,15 @@ Reference: https://docs.nexusglobalpayments.org/fees-and-pricing
 
 This module defines all fee structures to avoid duplication across
 quotes.py, fees.py, and fee_formulas.py (per ADR-012).
+
+The structures are compiled at import into currency-keyed tables
+(compile_fee_tables); the calculation functions evaluate against those.
+Call compile_fee_tables() again after changing a structure at runtime.
 """
 
 import logging
-from decimal import Decimal
-from typing import TypedDict, Optional, Literal
+from decimal import Context, Decimal, ROUND_HALF_EVEN
+from typing import Iterable, NamedTuple, TypedDict, Optional, Literal
 
 logger = logging.getLogger(__name__)
 
@@ -186,6 +190,95 @@ SCHEME_FEE_STRUCTURE: FeeStructure = {
 }
 
 
+# =============================================================================
+# Compiled Fee Tables
+# =============================================================================
+
+# Fee arithmetic runs in its own context, independent of the caller's
+# (fee_formulas raises the thread's precision for FX calculations)
+FEE_CONTEXT = Context(prec=40, rounding=ROUND_HALF_EVEN)
+CENT = Decimal("0.01")
+
+
+class CompiledFee(NamedTuple):
+    """A fee structure ready to evaluate: fixed + amount * percent, clamped, to the cent."""
+    fixed: Decimal
+    percent: Decimal
+    minimum: Decimal
+    maximum: Decimal
+    currency: Optional[str] = None
+
+    @classmethod
+    def from_structure(cls, struct: FeeStructure) -> "CompiledFee":
+        return cls(struct["fixed"], struct["percent"], struct["min"], struct["max"], struct.get("currency"))
+
+    def fee(self, amount: Decimal) -> Decimal:
+        calculated = FEE_CONTEXT.add(self.fixed, FEE_CONTEXT.multiply(amount, self.percent))
+        if calculated < self.minimum:
+            calculated = self.minimum
+        elif calculated > self.maximum:
+            calculated = self.maximum
+        return calculated.quantize(CENT, context=FEE_CONTEXT)
+
+    def fees(self, amounts: Iterable[Decimal]) -> list[Decimal]:
+        """fee() for many amounts."""
+        fee = self.fee
+        return [fee(amount) for amount in amounts]
+
+
+class FeeTables(NamedTuple):
+    """Fee structures keyed for lookup on the hot path."""
+    destination: dict[str, CompiledFee]  # by payout currency
+    default_destination: CompiledFee
+    source: dict[str, CompiledFee]  # by source currency
+    default_source: CompiledFee
+    scheme: CompiledFee
+
+
+class CorridorFees(NamedTuple):
+    """The three fees that apply to one currency pair."""
+    source: CompiledFee
+    destination: CompiledFee
+    scheme: CompiledFee
+    destination_currency: str
+
+
+def compile_fee_tables() -> FeeTables:
+    """(Re)build the fee tables from the structures above."""
+    global _tables
+    destination: dict[str, CompiledFee] = {}
+    for struct in DESTINATION_FEE_STRUCTURES.values():
+        # First country configured for a currency wins, as in a scan by currency
+        destination.setdefault(struct["currency"].upper(), CompiledFee.from_structure(struct))
+    _tables = FeeTables(
+        destination=destination,
+        default_destination=CompiledFee.from_structure(DEFAULT_DESTINATION_FEE),
+        source={currency.upper(): CompiledFee.from_structure(struct) for currency, struct in SOURCE_FEE_STRUCTURES.items()},
+        default_source=CompiledFee.from_structure(DEFAULT_SOURCE_FEE),
+        scheme=CompiledFee.from_structure(SCHEME_FEE_STRUCTURE),
+    )
+    return _tables
+
+
+_tables: FeeTables = compile_fee_tables()
+
+
+def corridor_fees(source_currency: str, dest_currency: str) -> CorridorFees:
+    """
+    Resolve the fees for a currency pair once, e.g. per quote request.
+
+    destination_currency is the fee currency reported by
+    calculate_destination_psp_fee (the requested currency if unconfigured).
+    """
+    destination = _tables.destination.get(dest_currency.upper())
+    return CorridorFees(
+        source=_tables.source.get(source_currency.upper(), _tables.default_source),
+        destination=destination or _tables.default_destination,
+        scheme=_tables.scheme,
+        destination_currency=destination.currency if destination else dest_currency,
+    )
+
+
 # =============================================================================
 # Fee Calculation Functions
 # =============================================================================
@@ -207,24 +300,15 @@ def calculate_destination_psp_fee(amount: Decimal, currency: str) -> tuple[Decim
     Returns:
         Tuple of (fee_amount, fee_currency)
     """
-    logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee ENTRY: amount={amount}, currency={currency}")
-    
-    # Lookup by currency to find country structure
-    for country, struct in DESTINATION_FEE_STRUCTURES.items():
-        if struct["currency"] == currency.upper():
-            calculated = struct["fixed"] + amount * struct["percent"]
-            fee = max(struct["min"], min(struct["max"], calculated))
-            result = fee.quantize(Decimal("0.01"))
-            logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee EXIT: fee={result}, currency={struct['currency']}")
-            return result, struct["currency"]
-    
-    # Use default
-    struct = DEFAULT_DESTINATION_FEE
-    calculated = struct["fixed"] + amount * struct["percent"]
-    fee = max(struct["min"], min(struct["max"], calculated))
-    result = fee.quantize(Decimal("0.01"))
-    logger.debug(f"[FEE-DEBUG] calculate_destination_psp_fee EXIT (default): fee={result}, currency={currency}")
-    return result, currency
+    compiled = _tables.destination.get(currency.upper())
+    fee_currency = compiled.currency if compiled else currency
+    result = (compiled or _tables.default_destination).fee(amount)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"[FEE-DEBUG] calculate_destination_psp_fee: amount={amount}, currency={currency}, "
+            f"fee={result}, fee_currency={fee_currency}{'' if compiled else ' (default)'}"
+        )
+    return result, fee_currency
 
 
 def calculate_source_psp_fee(amount: Decimal, currency: str) -> Decimal:
@@ -238,14 +322,25 @@ def calculate_source_psp_fee(amount: Decimal, currency: str) -> Decimal:
     Returns:
         Fee amount in source currency
     """
-    logger.debug(f"[FEE-DEBUG] calculate_source_psp_fee ENTRY: amount={amount}, currency={currency}")
-    struct = get_source_fee_structure(currency)
-    calculated = struct["fixed"] + amount * struct["percent"]
-    fee = max(struct["min"], min(struct["max"], calculated)).quantize(Decimal("0.01"))
-    logger.debug(f"[FEE-DEBUG] calculate_source_psp_fee EXIT: fee={fee}, structure={struct}")
+    compiled = _tables.source.get(currency.upper(), _tables.default_source)
+    fee = compiled.fee(amount)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[FEE-DEBUG] calculate_source_psp_fee: amount={amount}, currency={currency}, fee={fee}, structure={compiled}")
     return fee
 
 
+def calculate_destination_psp_fees(amounts: Iterable[Decimal], currency: str) -> tuple[list[Decimal], str]:
+    """calculate_destination_psp_fee for many amounts in one currency."""
+    compiled = _tables.destination.get(currency.upper())
+    fee_currency = compiled.currency if compiled else currency
+    return (compiled or _tables.default_destination).fees(amounts), fee_currency
+
+
+def calculate_source_psp_fees(amounts: Iterable[Decimal], currency: str) -> list[Decimal]:
+    """calculate_source_psp_fee for many amounts in one currency."""
+    return _tables.source.get(currency.upper(), _tables.default_source).fees(amounts)
+
+
 def get_source_fee_type(country_code: str) -> FeeType:
     """
     Get the fee type for a source country.
@@ -280,18 +375,18 @@ def calculate_total_cost_to_sender(
     Returns:
         Total amount debited from sender's account
     """
-    logger.debug(f"[FEE-DEBUG] calculate_total_cost_to_sender ENTRY: principal={principal}, source_psp_fee={source_psp_fee}, scheme_fee={scheme_fee}, fee_type={fee_type}")
-
     if fee_type == "INVOICED":
         # All fees charged separately - not deducted from principal
         total = principal + scheme_fee + source_psp_fee
-        logger.debug(f"[FEE-DEBUG] calculate_total_cost_to_sender EXIT (INVOICED): total={total}")
-        return total
     else:
         # DEDUCTED: PSP fee deducted from principal
         total = principal + scheme_fee
-        logger.debug(f"[FEE-DEBUG] calculate_total_cost_to_sender EXIT (DEDUCTED): total={total}")
-        return total
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"[FEE-DEBUG] calculate_total_cost_to_sender: principal={principal}, source_psp_fee={source_psp_fee}, "
+            f"scheme_fee={scheme_fee}, fee_type={fee_type}, total={total}"
+        )
+    return total
 
 
 def calculate_scheme_fee(amount: Decimal) -> Decimal:
@@ -300,6 +395,9 @@ def calculate_scheme_fee(amount: Decimal) -> Decimal:
     
     Scheme fee is always in source currency.
     """
-    struct = SCHEME_FEE_STRUCTURE
-    calculated = struct["fixed"] + amount * struct["percent"]
-    return max(struct["min"], min(struct["max"], calculated)).quantize(Decimal("0.01"))
+    return _tables.scheme.fee(amount)
+
+
+def calculate_scheme_fees(amounts: Iterable[Decimal]) -> list[Decimal]:
+    """calculate_scheme_fee for many amounts."""
+    return _tables.scheme.fees(amounts)
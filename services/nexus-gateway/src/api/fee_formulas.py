@@ -15,12 +15,11 @@ Key Design Principles:
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
 from decimal import Decimal, getcontext
 from datetime import datetime, timezone
 from ..db import get_db
+from .quote_store import get_quote
 
 # High precision for FX calculations
 getcontext().prec = 40
@@ -204,31 +203,9 @@ async def get_pre_transaction_disclosure(
     - pacs.008 message (what goes to destination)
     """
     # Get ALL quote details including pre-calculated fees
-    quote_query = text("""
-        SELECT 
-            q.quote_id,
-            q.source_currency,
-            q.destination_currency,
-            q.final_rate as customer_rate,
-            q.base_rate as market_rate,
-            q.requested_amount,
-            q.amount_type,
-            q.source_interbank_amount,
-            q.destination_interbank_amount,
-            q.creditor_account_amount,
-            q.destination_psp_fee,
-            q.tier_improvement_bps,
-            q.psp_improvement_bps,
-            q.expires_at as valid_until,
-            f.base_spread_bps
-        FROM quotes q
-        JOIN fxps f ON q.fxp_id = f.fxp_id
-        WHERE q.quote_id = :quote_id
-          AND q.expires_at > NOW()
-    """)
-    
-    result = await db.execute(quote_query, {"quote_id": quote_id})
-    quote = result.fetchone()
+    quote = await get_quote(db, quote_id)
+    if quote is not None and quote.expires_at <= datetime.now(timezone.utc):
+        quote = None
     
     if not quote:
         raise HTTPException(
@@ -241,8 +218,8 @@ async def get_pre_transaction_disclosure(
     # =================================================================
     
     # Rates (all in destination per source, e.g., IDR per SGD)
-    market_rate = Decimal(str(quote.market_rate))
-    customer_rate = Decimal(str(quote.customer_rate))
+    market_rate = Decimal(str(quote.base_rate))
+    customer_rate = Decimal(str(quote.final_rate))
     
     # Calculate applied spread
     base_spread_bps = Decimal(str(quote.base_spread_bps or 50))
@@ -341,6 +318,6 @@ async def get_pre_transaction_disclosure(
         effectiveRate=str(effective_rate.quantize(Decimal("0.0001"))),
         totalCostPercent=str(total_cost_pct.quantize(Decimal("0.01"))),
         
-        quoteValidUntil=quote.valid_until.isoformat(),
+        quoteValidUntil=quote.expires_at.isoformat(),
     )
 
@@ -16,6 +16,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import get_db
 from .fee_config import get_source_fee_type, FeeType
+from .quote_store import get_quote
 
 
 router = APIRouter()
@@ -278,15 +279,8 @@ async def confirm_sender_approval(
             message="Sender has not confirmed the transaction. Cannot proceed."
         )
     
-    # Validate quote exists and is still active
-    quote_query = text("""
-        SELECT quote_id, status, expires_at 
-        FROM quotes 
-        WHERE quote_id = CAST(:quote_id AS uuid)
-    """)
-    
-    result = await db.execute(quote_query, {"quote_id": request.quoteId})
-    quote = result.fetchone()
+    # Validate quote exists and is still active (quote store, then quotes table)
+    quote = await get_quote(db, request.quoteId)
     
     if not quote:
         raise HTTPException(status_code=404, detail="Quote not found")
@@ -357,26 +351,7 @@ async def _calculate_fees_logic(
     from datetime import datetime
     
     # Get quote details including FXP spread for market rate calculation
-    quote_query = text("""
-        SELECT 
-            q.quote_id,
-            q.source_currency,
-            q.destination_currency,
-            q.final_rate,
-            q.source_interbank_amount,
-            q.destination_interbank_amount,
-            q.creditor_account_amount,
-            q.destination_psp_fee as stored_dest_fee,
-            q.expires_at,
-            q.status,
-            f.base_spread_bps
-        FROM quotes q
-        JOIN fxps f ON q.fxp_id = f.fxp_id
-        WHERE q.quote_id = CAST(:quote_id AS uuid)
-    """)
-    
-    result = await db.execute(quote_query, {"quote_id": quote_id})
-    quote = result.fetchone()
+    quote = await get_quote(db, quote_id)
     
     if not quote:
         raise HTTPException(status_code=404, detail="Quote not found")
@@ -436,8 +411,8 @@ async def _calculate_fees_logic(
         sender_total = sender_principal + scheme_fee
     
     # Destination-side fees (use quote's stored value if available per ADR-012)
-    if quote.stored_dest_fee is not None:
-        dest_psp_fee = Decimal(str(quote.stored_dest_fee))
+    if quote.destination_psp_fee is not None:
+        dest_psp_fee = Decimal(str(quote.destination_psp_fee))
     else:
         dest_psp_fee = (payout_gross * dest_fee_percent).quantize(Decimal("0.01"))
     
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Literal
 from pydantic import BaseModel
 from ..db import get_db
+from .reference_data import Fxp, Psp, Sap, get_reference_data, invalidate_reference_data
 
 router = APIRouter(prefix="/v1", tags=["Reference Data"])
 
@@ -34,6 +35,18 @@ class FinInstListResponse(BaseModel):
     count: int
 
 
+def _institution(record: Psp | Fxp | Sap, role: str) -> FinancialInstitutionResponse:
+    """FinancialInstitutionResponse for a cached PSP, FXP or SAP (FXPs have no BIC or country)."""
+    return FinancialInstitutionResponse(
+        id=getattr(record, f"{role.lower()}_id"),
+        name=record.name,
+        bic=getattr(record, "bic", ""),
+        countryCode=getattr(record, "country_code", ""),
+        role=role,
+        isActive=record.participant_status == "ACTIVE",
+    )
+
+
 @router.get(
     "/fin-insts/{role}",
     response_model=FinInstListResponse,
@@ -58,46 +71,21 @@ async def list_fin_insts_by_role(
     
     Used to populate global selection lists.
     """
+    reference = await get_reference_data().get(db)
+    
     if role == "PSP":
-        query = text("""
-            SELECT 
-                psp_id::text as id, name, bic, country_code, 'PSP' as role,
-                (participant_status = 'ACTIVE') as is_active
-            FROM psps WHERE participant_status = 'ACTIVE'
-            ORDER BY country_code, name
-        """)
+        records = reference.psps
     elif role == "FXP":
-        query = text("""
-            SELECT 
-                fxp_id::text as id, name, '' as bic, '' as country_code, 'FXP' as role,
-                (participant_status = 'ACTIVE') as is_active
-            FROM fxps WHERE participant_status = 'ACTIVE'
-            ORDER BY name
-        """)
+        records = reference.fxps
     elif role == "SAP":
-        query = text("""
-            SELECT 
-                sap_id::text as id, name, bic, country_code, 'SAP' as role,
-                (participant_status = 'ACTIVE') as is_active
-            FROM saps WHERE participant_status = 'ACTIVE'
-            ORDER BY country_code, name
-        """)
+        records = reference.saps
     else:
         raise HTTPException(status_code=400, detail=f"Invalid role: {role}")
     
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
     institutions = [
-        FinancialInstitutionResponse(
-            id=row.id,
-            name=row.name,
-            bic=row.bic or "",
-            countryCode=row.country_code or "",
-            role=row.role,
-            isActive=row.is_active
-        )
-        for row in rows
+        _institution(record, role)
+        for record in records
+        if record.participant_status == "ACTIVE"
     ]
     
     return FinInstListResponse(
@@ -128,24 +116,12 @@ async def list_fin_insts_by_country(
     """
     Get institutions in a specific country.
     """
+    reference = await get_reference_data().get(db)
+    
     if role == "PSP":
-        query = text("""
-            SELECT 
-                psp_id::text as id, name, bic, country_code, 'PSP' as role,
-                (participant_status = 'ACTIVE') as is_active
-            FROM psps 
-            WHERE country_code = :country_code AND participant_status = 'ACTIVE'
-            ORDER BY name
-        """)
+        records = reference.psps_in_country(country_code)
     elif role == "SAP":
-        query = text("""
-            SELECT 
-                sap_id::text as id, name, bic, country_code, 'SAP' as role,
-                (participant_status = 'ACTIVE') as is_active
-            FROM saps 
-            WHERE country_code = :country_code AND participant_status = 'ACTIVE'
-            ORDER BY name
-        """)
+        records = reference.saps_in_country(country_code)
     else:
         # FXPs are not country-specific
         raise HTTPException(
@@ -153,19 +129,10 @@ async def list_fin_insts_by_country(
             detail="FXPs are not country-specific. Use /fin-insts/FXP instead."
         )
     
-    result = await db.execute(query, {"country_code": country_code.upper()})
-    rows = result.fetchall()
-    
     institutions = [
-        FinancialInstitutionResponse(
-            id=row.id,
-            name=row.name,
-            bic=row.bic,
-            countryCode=row.country_code,
-            role=row.role,
-            isActive=row.is_active
-        )
-        for row in rows
+        _institution(record, role)
+        for record in records
+        if record.participant_status == "ACTIVE"
     ]
     
     return FinInstListResponse(
@@ -197,65 +164,41 @@ async def lookup_fin_inst(
     """
     Find an institution by its identifier.
     """
-    results = []
+    reference = await get_reference_data().get(db)
+    matches = []
+    matched_value = id_value
     
     if id_type == "BICFI":
         # Search PSPs and SAPs by BIC
-        psp_query = text("""
-            SELECT psp_id as id, name, bic, country_code, 'PSP' as role
-            FROM psps WHERE UPPER(bic) = :id_value AND participant_status = 'ACTIVE'
-        """)
-        sap_query = text("""
-            SELECT sap_id as id, name, bic, country_code, 'SAP' as role
-            FROM saps WHERE UPPER(bic) = :id_value AND participant_status = 'ACTIVE'
-        """)
-        
-        psp_result = await db.execute(psp_query, {"id_value": id_value.upper()})
-        sap_result = await db.execute(sap_query, {"id_value": id_value.upper()})
-        
-        for row in psp_result.fetchall():
-            results.append({
-                "id": row.id,
-                "name": row.name,
-                "bic": row.bic,
-                "countryCode": row.country_code,
-                "role": row.role,
-                "idType": "BICFI",
-                "idValue": id_value.upper()
-            })
-        
-        for row in sap_result.fetchall():
-            results.append({
-                "id": row.id,
-                "name": row.name,
-                "bic": row.bic,
-                "countryCode": row.country_code,
-                "role": row.role,
-                "idType": "BICFI",
-                "idValue": id_value.upper()
-            })
+        psp = reference.psp_by_bic(id_value)
+        if psp is not None and psp.participant_status == "ACTIVE":
+            matches.append(_institution(psp, "PSP"))
+        for sap in reference.saps_with_bic(id_value):
+            if sap.participant_status == "ACTIVE":
+                matches.append(_institution(sap, "SAP"))
+        matched_value = id_value.upper()
     
     elif id_type == "ID":
         # Direct ID lookup
-        psp_query = text("SELECT psp_id as id, name, bic, country_code, 'PSP' as role FROM psps WHERE psp_id = :id_value")
-        fxp_query = text("SELECT fxp_id as id, name, '' as bic, '' as country_code, 'FXP' as role FROM fxps WHERE fxp_id = :id_value")
-        sap_query = text("SELECT sap_id as id, name, bic, country_code, 'SAP' as role FROM saps WHERE sap_id = :id_value")
-        
-        for query, role in [(psp_query, "PSP"), (fxp_query, "FXP"), (sap_query, "SAP")]:
-            result = await db.execute(query, {"id_value": id_value})
-            row = result.fetchone()
-            if row:
-                results.append({
-                    "id": row.id,
-                    "name": row.name,
-                    "bic": row.bic,
-                    "countryCode": row.country_code,
-                    "role": row.role,
-                    "idType": "ID",
-                    "idValue": id_value
-                })
+        for lookup, role in [(reference.psp_by_id, "PSP"), (reference.fxp_by_id, "FXP"), (reference.sap_by_id, "SAP")]:
+            record = lookup(id_value)
+            if record is not None:
+                matches.append(_institution(record, role))
                 break
     
+    results = [
+        {
+            "id": institution.id,
+            "name": institution.name,
+            "bic": institution.bic,
+            "countryCode": institution.countryCode,
+            "role": institution.role,
+            "idType": id_type,
+            "idValue": matched_value
+        }
+        for institution in matches
+    ]
+    
     if not results:
         raise HTTPException(
             status_code=404,
@@ -336,6 +279,7 @@ async def create_fin_inst(
         })
     
     await db.commit()
+    invalidate_reference_data(f"fin_insts.create_fin_inst {body.role} {new_id}")
     
     return {
         "status": "success",
@@ -390,6 +334,7 @@ async def update_fin_inst(
     
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail=f"{body.role} with ID {fin_inst_id} not found")
+    invalidate_reference_data(f"fin_insts.update_fin_inst {body.role} {fin_inst_id}")
 
     return {
         "status": "success",
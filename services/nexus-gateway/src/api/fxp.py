@@ -21,6 +21,8 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import get_db
+from .account_shards import SHARD_TOTALS_JOIN, TOTAL_BALANCE, TOTAL_RESERVED
+from .reference_data import get_reference_data
 
 router = APIRouter(prefix="/v1/fxp", tags=["FX Providers"])
 
@@ -132,9 +134,7 @@ async def submit_rate(
     Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id, name FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -197,9 +197,7 @@ async def withdraw_rate(
     Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -241,9 +239,7 @@ async def list_active_rates(
     Returns all rates that are currently active and being included in quotes.
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id, name FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -299,9 +295,7 @@ async def list_rate_history(
     List historical rates submitted by the FXP (including expired/withdrawn).
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id, name FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -352,17 +346,13 @@ async def create_psp_relationship(
     Reference: https://docs.nexusglobalpayments.org/fx-provision/rate-improvements
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
     
     # Verify PSP exists
-    psp_query = text("SELECT psp_id, name FROM psps WHERE bic = :bic")
-    result = await db.execute(psp_query, {"bic": request.psp_bic.upper()})
-    psp = result.fetchone()
+    psp = (await get_reference_data().get(db)).psp_by_bic(request.psp_bic)
     
     if not psp:
         raise HTTPException(status_code=404, detail=f"PSP with BIC {request.psp_bic} not found")
@@ -442,9 +432,7 @@ async def list_psp_relationships(
     List all PSP relationships for the FXP.
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -486,17 +474,13 @@ async def delete_psp_relationship(
     Delete a PSP relationship.
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
     
     # Get PSP ID
-    psp_query = text("SELECT psp_id FROM psps WHERE bic = :bic")
-    result = await db.execute(psp_query, {"bic": psp_bic.upper()})
-    psp = result.fetchone()
+    psp = (await get_reference_data().get(db)).psp_by_bic(psp_bic)
     
     if not psp:
         raise HTTPException(status_code=404, detail=f"PSP with BIC {psp_bic} not found")
@@ -539,9 +523,7 @@ async def list_trades(
     These are sent when the FXP's rate is selected for a payment.
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
@@ -593,24 +575,21 @@ async def get_liquidity_balances(
     Reference: https://docs.nexusglobalpayments.org/settlement-access-provision/liquidity
     """
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
     
     # Get balances from all SAP accounts
-    balances_query = text("""
+    balances_query = text(f"""
         SELECT 
             s.sap_id, s.name as sap_name, s.bic as sap_bic,
-            a.currency_code, a.balance as total_balance,
-            COALESCE(SUM(r.amount), 0) as reserved_balance
+            a.currency_code, {TOTAL_BALANCE} as total_balance,
+            {TOTAL_RESERVED} as reserved_balance
         FROM saps s
         JOIN fxp_sap_accounts a ON s.sap_id = a.sap_id
-        LEFT JOIN sap_reservations r ON a.account_id = r.account_id AND r.status = 'ACTIVE'
+        {SHARD_TOTALS_JOIN}
         WHERE a.fxp_id = :fxp_id
-        GROUP BY s.sap_id, s.name, s.bic, a.currency_code, a.balance
         ORDER BY s.name, a.currency_code
     """)
     
@@ -6,6 +6,22 @@ import time
 
 from ..db import get_db
 from ..config import settings
+from .account_shards import get_shard_consolidator
+from .daily_positions import get_daily_position_closer
+from .iso20022.event_writer import get_event_writer
+from .iso20022.dedup import get_duplicate_detector
+from .quote_routing import get_quote_routing_cache
+from .delivery import get_delivery_engine
+from .outbox import get_outbox_backlog, get_outbox_dispatcher, get_outbox_retention
+from .quote_store import get_quote_store
+from .quote_maintenance import get_quote_maintenance
+from .quote_stream import get_quote_stream_stats
+from .rate_book import get_rate_book
+from .reference_data import get_reference_data
+from .reservation_expiry import get_reservation_expiry
+from .xml_executor import get_xml_executor
+from .validation import get_registry, get_schema_readiness
+from .structural_validation import get_validation_policy
 
 router = APIRouter()
 
@@ -28,10 +44,13 @@ async def health_check():
 async def readiness_check(db: AsyncSession = Depends(get_db)):
     """
     Readiness check - verifies dependencies are available.
+    
+    Not ready until the Release 1 XSD schemas compiled at startup are loaded.
     """
     checks = {
         "database": "fail",
         "redis": "fail",
+        "schemas": "fail",
     }
     
     # Check Database
@@ -49,6 +68,9 @@ async def readiness_check(db: AsyncSession = Depends(get_db)):
         await r.close()
     except Exception:
         pass
+    
+    # Check XSD schemas (compiled by the startup warm-up)
+    checks["schemas"] = get_schema_readiness()["status"]
 
     status = "ready" if all(v == "ok" for v in checks.values()) else "not_ready"
     
@@ -56,3 +78,50 @@ async def readiness_check(db: AsyncSession = Depends(get_db)):
         "status": status,
         "checks": checks
     }
+
+
+@router.get("/health/metrics")
+async def metrics():
+    """
+    In-process runtime metrics for background subsystems.
+    
+    Counters are per gateway process and reset on restart.
+    """
+    registry = get_registry()
+    return {
+        "eventWriter": get_event_writer().stats(),
+        "xmlExecutor": get_xml_executor().stats(),
+        "schemas": {
+            "compileTimesMs": registry.get_compile_times(),
+            "warmUpComplete": registry.warm_up_complete,
+            "warmUpMs": registry.warm_up_ms,
+        },
+        "validationModes": get_validation_policy().stats(),
+        "duplicateDetection": get_duplicate_detector().stats(),
+        "quoteRoutingCache": get_quote_routing_cache().stats(),
+        "callbackDelivery": get_delivery_engine().stats(),
+        "outbox": get_outbox_dispatcher().stats(),
+        "outboxRetention": get_outbox_retention().stats(),
+        "rateBook": get_rate_book().stats(),
+        "quoteStore": get_quote_store().stats(),
+        "quoteMaintenance": get_quote_maintenance().stats(),
+        "quoteStreams": get_quote_stream_stats(),
+        "reservationExpiry": get_reservation_expiry().stats(),
+        "accountShards": get_shard_consolidator().stats(),
+        "dailyPositions": get_daily_position_closer().stats(),
+        "referenceData": get_reference_data().stats(),
+    }
+
+
+@router.get("/health/outbox")
+async def outbox_status(db: AsyncSession = Depends(get_db)):
+    """
+    Callback outbox depth (shared by all replicas) and this process's dispatcher.
+    
+    oldestDueSeconds is the delivery lag of the oldest due callback.
+    """
+    return {
+        "backlog": await get_outbox_backlog(db),
+        "dispatcher": get_outbox_dispatcher().stats(),
+        "retention": get_outbox_retention().stats(),
+    }
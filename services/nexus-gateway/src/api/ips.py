@@ -14,10 +14,10 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
+from .reference_data import get_reference_data
 
 router = APIRouter(prefix="/v1/ips", tags=["Instant Payment Systems"])
 
@@ -43,23 +43,9 @@ async def list_ips_operators(
     
     Reference: https://docs.nexusglobalpayments.org/payment-processing/role-of-the-ipso
     """
-    if country_code:
-        query = text("""
-            SELECT ips_id, name, country_code, clearing_system_id, max_amount, currency_code
-            FROM ips_operators
-            WHERE country_code = :country_code
-            ORDER BY name
-        """)
-        result = await db.execute(query, {"country_code": country_code.upper()})
-    else:
-        query = text("""
-            SELECT ips_id, name, country_code, clearing_system_id, max_amount, currency_code
-            FROM ips_operators
-            ORDER BY country_code, name
-        """)
-        result = await db.execute(query)
+    reference = await get_reference_data().get(db)
+    rows = reference.ips_in_country(country_code) if country_code else reference.ips_operators
     
-    rows = result.fetchall()
     operators = [
         IPSOperatorResponse(
             ips_id=row.ips_id,
@@ -83,13 +69,7 @@ async def get_ips_operator(clearing_system_id: str, db: AsyncSession = Depends(g
     The clearing system ID is used in ISO 20022 messages to identify
     the domestic payment system (e.g., SGFASG22 for FAST Singapore).
     """
-    query = text("""
-        SELECT ips_id, name, country_code, clearing_system_id, max_amount, currency_code
-        FROM ips_operators
-        WHERE clearing_system_id = :clearing_system_id
-    """)
-    result = await db.execute(query, {"clearing_system_id": clearing_system_id.upper()})
-    row = result.fetchone()
+    row = (await get_reference_data().get(db)).ips_by_clearing_id(clearing_system_id)
     
     if not row:
         raise HTTPException(status_code=404, detail=f"IPS with clearing system ID {clearing_system_id} not found")
@@ -112,25 +92,16 @@ async def get_ips_members(clearing_system_id: str, db: AsyncSession = Depends(ge
     Returns all Payment Service Providers that are members of this
     instant payment system and can send/receive domestic payments.
     """
+    reference = await get_reference_data().get(db)
+    
     # First verify the IPS exists
-    ips_query = text("""
-        SELECT country_code FROM ips_operators WHERE clearing_system_id = :clearing_system_id
-    """)
-    ips_result = await db.execute(ips_query, {"clearing_system_id": clearing_system_id.upper()})
-    ips_row = ips_result.fetchone()
+    ips_row = reference.ips_by_clearing_id(clearing_system_id)
     
     if not ips_row:
         raise HTTPException(status_code=404, detail=f"IPS with clearing system ID {clearing_system_id} not found")
     
     # Get PSPs in the same country as the IPS
-    psps_query = text("""
-        SELECT bic, name
-        FROM psps
-        WHERE country_code = :country_code
-        ORDER BY name
-    """)
-    result = await db.execute(psps_query, {"country_code": ips_row.country_code})
-    rows = result.fetchall()
+    rows = reference.psps_in_country(ips_row.country_code)
     
     members = [
         IPSMemberResponse(bic=row.bic, name=row.name, is_active=True)
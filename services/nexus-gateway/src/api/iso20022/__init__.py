@@ -12,6 +12,10 @@ Structure:
 - schemas.py: Pydantic response models
 - utils.py: Shared database operations
 - pacs008.py: pacs.008 payment instruction handler (EXTRACTED)
+- pipeline.py: Parse-once message pipeline (validate, extract, transform)
+- extraction.py: Declarative compiled field extraction shared by all parsers
+- event_writer.py: Write-behind batched payment_events writer
+- dedup.py: UETR/MsgId/EndToEndId duplicate detection
 - (Other message handlers to be extracted in future phases)
 """
 
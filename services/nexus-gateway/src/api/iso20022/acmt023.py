@@ -14,13 +14,28 @@ import logging
 
 from ...db import get_db
 from .. import validation as xsd_validation
+from ..xml_executor import run_xml
 from ..schemas import Acmt023Response
 from .utils import store_payment_event
+from .extraction import MessageExtractor
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ACMT023_EXTRACTOR = MessageExtractor("Acmt023Record", {
+    "messageId": ".//MsgId",
+    "creationDateTime": ".//CreDtTm",
+    # Proxy resolution fields (per documentation paths)
+    "proxyType": ".//Prxy/Tp/Cd",
+    "proxyValue": ".//Prxy/Id",
+    # Account resolution fields
+    "iban": ".//Acct/Id/IBAN",
+    "accountId": ".//Acct/Id/Othr/Id",
+    # Destination info
+    "destinationPspBic": ".//Agt/FinInstnId/BICFI",
+})
+
 @router.post(
     "/acmt023",
     response_model=Acmt023Response,
@@ -66,7 +81,7 @@ async def process_acmt023(
         )
     
     # Step 1: XSD Schema Validation
-    xsd_result = xsd_validation.validate_acmt023(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "acmt.023")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -100,32 +115,8 @@ async def process_acmt023(
     # XPath: /Document/IdVrfctnReq/Vrfctn/PtyAndAcctId/Acct/Id/Othr/Id for account number
     try:
         from lxml import etree
-        root = etree.fromstring(xml_content.encode())
-        ns = {"doc": "urn:iso:std:iso:20022:tech:xsd:acmt.023.001.04"}
-        
-        def get_text(xpath, default=None):
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            # Try without namespace
-            simple_xpath = xpath.replace('doc:', '')
-            elements = root.xpath(simple_xpath)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            return default
-        
-        parsed_fields = {
-            "messageId": get_text(".//doc:MsgId") or get_text(".//MsgId"),
-            "creationDateTime": get_text(".//doc:CreDtTm") or get_text(".//CreDtTm"),
-            # Proxy resolution fields (per documentation paths)
-            "proxyType": get_text(".//doc:Prxy/doc:Tp/doc:Cd") or get_text(".//Prxy/Tp/Cd"),
-            "proxyValue": get_text(".//doc:Prxy/doc:Id") or get_text(".//Prxy/Id"),
-            # Account resolution fields  
-            "iban": get_text(".//doc:Acct/doc:Id/doc:IBAN") or get_text(".//Acct/Id/IBAN"),
-            "accountId": get_text(".//doc:Acct/doc:Id/doc:Othr/doc:Id") or get_text(".//Acct/Id/Othr/Id"),
-            # Destination info
-            "destinationPspBic": get_text(".//doc:Agt/doc:FinInstnId/doc:BICFI") or get_text(".//Agt/FinInstnId/BICFI"),
-        }
+        root = await run_xml("acmt.023", etree.fromstring, xml_content.encode())
+        parsed_fields = ACMT023_EXTRACTOR.extract(root).to_dict()
         
         logger.info(f"Parsed acmt.023: {parsed_fields}")
         
@@ -14,13 +14,28 @@ import logging
 
 from ...db import get_db
 from .. import validation as xsd_validation
+from ..xml_executor import run_xml
 from ..schemas import Acmt024Response
 from .utils import store_payment_event
+from .extraction import MessageExtractor
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ACMT024_EXTRACTOR = MessageExtractor("Acmt024Record", {
+    "messageId": ".//MsgId",
+    "originalId": ".//OrgnlId",
+    "verificationResult": ".//Vrfctn",
+    "reasonCode": ".//Rsn/Cd",
+    # Party and account details
+    "partyName": ".//UpdtdPtyAndAcctId/Pty/Nm",
+    "accountName": ".//UpdtdPtyAndAcctId/Acct/Nm",
+    "accountId": ".//UpdtdPtyAndAcctId/Acct/Id/Othr/Id",
+    "iban": ".//UpdtdPtyAndAcctId/Acct/Id/IBAN",
+    "agentBic": ".//UpdtdPtyAndAcctId/Agt/FinInstnId/BICFI",
+})
+
 @router.post(
     "/acmt024",
     response_model=Acmt024Response,
@@ -48,7 +63,7 @@ async def process_acmt024(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_acmt024(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "acmt.024")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -75,32 +90,8 @@ async def process_acmt024(
     # XPath: /Document/IdVrfctnRpt/Rpt/Rsn/Cd for error code
     try:
         from lxml import etree
-        root = etree.fromstring(xml_content.encode())
-        ns = {"doc": "urn:iso:std:iso:20022:tech:xsd:acmt.024.001.04"}
-        
-        def get_text(xpath, default=None):
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            # Try without namespace  
-            simple_xpath = xpath.replace('doc:', '')
-            elements = root.xpath(simple_xpath)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            return default
-        
-        parsed_fields = {
-            "messageId": get_text(".//doc:MsgId") or get_text(".//MsgId"),
-            "originalId": get_text(".//doc:OrgnlId") or get_text(".//OrgnlId"),
-            "verificationResult": get_text(".//doc:Vrfctn") or get_text(".//Vrfctn"),
-            "reasonCode": get_text(".//doc:Rsn/doc:Cd") or get_text(".//Rsn/Cd"),
-            # Party and account details
-            "partyName": get_text(".//doc:UpdtdPtyAndAcctId/doc:Pty/doc:Nm") or get_text(".//UpdtdPtyAndAcctId/Pty/Nm"),
-            "accountName": get_text(".//doc:UpdtdPtyAndAcctId/doc:Acct/doc:Nm") or get_text(".//UpdtdPtyAndAcctId/Acct/Nm"),
-            "accountId": get_text(".//doc:UpdtdPtyAndAcctId/doc:Acct/doc:Id/doc:Othr/doc:Id") or get_text(".//UpdtdPtyAndAcctId/Acct/Id/Othr/Id"),
-            "iban": get_text(".//doc:UpdtdPtyAndAcctId/doc:Acct/doc:Id/doc:IBAN") or get_text(".//UpdtdPtyAndAcctId/Acct/Id/IBAN"),
-            "agentBic": get_text(".//doc:UpdtdPtyAndAcctId/doc:Agt/doc:FinInstnId/doc:BICFI") or get_text(".//UpdtdPtyAndAcctId/Agt/FinInstnId/BICFI"),
-        }
+        root = await run_xml("acmt.024", etree.fromstring, xml_content.encode())
+        parsed_fields = ACMT024_EXTRACTOR.extract(root).to_dict()
         
         logger.info(f"Parsed acmt.024: {parsed_fields}")
         
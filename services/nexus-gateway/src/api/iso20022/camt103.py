@@ -20,62 +20,39 @@ from lxml import etree
 
 from ...db import get_db
 from .. import validation as xsd_validation
+from ..xml_executor import run_xml
 from ..schemas import Camt103Response
 from .utils import store_payment_event
+from .extraction import MessageExtractor
 
 router = APIRouter()
 
 
+CAMT103_EXTRACTOR = MessageExtractor("Camt103Record", {
+    # Amount and Currency
+    "amount": (".//Amt", ".//IntrBkSttlmAmt"),
+    "currency": (".//Amt/@Ccy", ".//IntrBkSttlmAmt/@Ccy"),
+    # Account identification
+    "accountId": (".//AcctId/IBAN", ".//AcctId/Othr/Id"),
+    # Reservation type
+    "reservationType": (".//RsvatnTp", ".//Tp/Cd"),
+    # Message ID
+    "messageId": (".//MsgId", ".//GrpHdr/MsgId"),
+})
+
+
 def _extract_reservation_details(xml_content: str) -> dict:
     """Extract reservation details from camt.103 XML document.
     
     Searches for key elements: Amount, Currency, AccountId, 
-    ReservationType, and any reference IDs.
+    ReservationType, and any reference IDs. Only fields that were
+    found are returned.
     """
-    details = {}
     try:
         root = etree.fromstring(xml_content.encode())
-        ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:camt.103.001.02'}
-        
-        # Try namespaced first, then fallback without namespace
-        for ns_prefix, namespaces in [('doc:', ns), ('', {})]:
-            # Amount and Currency
-            for xpath in [f'.//{ns_prefix}Amt', f'.//{ns_prefix}IntrBkSttlmAmt']:
-                elements = root.xpath(xpath, namespaces=namespaces) if namespaces else root.xpath(xpath)
-                if elements and elements[0].text:
-                    details['amount'] = elements[0].text
-                    ccy = elements[0].get('Ccy')
-                    if ccy:
-                        details['currency'] = ccy
-                    break
-            
-            # Account identification
-            for xpath in [f'.//{ns_prefix}AcctId/{ns_prefix}IBAN', f'.//{ns_prefix}AcctId/{ns_prefix}Othr/{ns_prefix}Id']:
-                elements = root.xpath(xpath, namespaces=namespaces) if namespaces else root.xpath(xpath)
-                if elements and elements[0].text:
-                    details['accountId'] = elements[0].text
-                    break
-            
-            # Reservation type
-            for xpath in [f'.//{ns_prefix}RsvatnTp', f'.//{ns_prefix}Tp/{ns_prefix}Cd']:
-                elements = root.xpath(xpath, namespaces=namespaces) if namespaces else root.xpath(xpath)
-                if elements and elements[0].text:
-                    details['reservationType'] = elements[0].text
-                    break
-            
-            # Message ID
-            for xpath in [f'.//{ns_prefix}MsgId', f'.//{ns_prefix}GrpHdr/{ns_prefix}MsgId']:
-                elements = root.xpath(xpath, namespaces=namespaces) if namespaces else root.xpath(xpath)
-                if elements and elements[0].text:
-                    details['messageId'] = elements[0].text
-                    break
-            
-            if details:
-                break
+        return CAMT103_EXTRACTOR.extract(root).to_dict(drop_empty=True)
     except Exception:
-        pass  # XML parsing failed; use defaults
-    
-    return details
+        return {}  # XML parsing failed; use defaults
 
 
 @router.post(
@@ -110,7 +87,7 @@ async def process_camt103(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_camt103(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "camt.103")
     if not xsd_result.valid:
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
         await store_payment_event(
@@ -130,7 +107,7 @@ async def process_camt103(
         )
     
     # Extract reservation details from XML
-    reservation_details = _extract_reservation_details(xml_content)
+    reservation_details = await run_xml("camt.103", _extract_reservation_details, xml_content)
     
     # Store forensic event with extracted details
     await store_payment_event(
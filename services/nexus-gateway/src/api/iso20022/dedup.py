@@ -0,0 +1,291 @@
+"""
+Payment Duplicate Detection
+
+Nexus rejects a pacs.008 whose UETR has already been used, and a payment
+that repeats a MsgId or EndToEndId from the same Source PSP within the
+duplicate window.
+Reference: https://docs.nexusglobalpayments.org/payment-processing/validations-duplicates-and-fraud
+
+Two layers:
+
+    validate_pacs008 → RecentKeyFilter (in-process) → payment_dedup_keys (PK probe)
+
+- payment_dedup_keys (migration 005) is the source of truth: one row per
+  key, claimed with INSERT ... ON CONFLICT inside the payment's unit of
+  work, so two concurrent submissions of the same UETR cannot both win.
+  This replaces SELECT COUNT(*) over every payments partition.
+- RecentKeyFilter remembers keys accepted by this process in time buckets
+  covering the dedup window. An unseen key is always claimed against the
+  table. A seen key is confirmed with a read-only primary-key probe
+  (CHECK_KEYS_SQL) before the payment is rejected: a key released on
+  another replica is still in this process's filter. A resubmission (PSP
+  retry) therefore costs one index read instead of an INSERT ... ON
+  CONFLICT and its undo, and a stale hit is dropped from the filter.
+
+Keys are "<type>:<value>": UETR is global; MSGID and E2EID are scoped by
+the debtor agent BIC. Rejected payments release their keys (pacs.002 RJCT),
+matching the previous "status != 'RJCT'" rule.
+
+Configuration (Settings / environment):
+    DEDUP_WINDOW_SECONDS   MsgId/EndToEndId window and filter horizon (default 86400)
+    DEDUP_BUCKETS          filter time buckets across the window (default 24)
+    DEDUP_KEY_TYPES        checked key types (default ["UETR", "MSGID", "E2EID"])
+"""
+
+from collections import deque
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import time
+
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_TYPES = ("UETR", "MSGID", "E2EID")
+
+# Claims every key in one statement. A MSGID/E2EID row older than the window
+# is taken over; UETR rows never expire. Returned rows are the keys claimed.
+CLAIM_KEYS_SQL = text("""
+    INSERT INTO payment_dedup_keys (key_type, key_value, uetr, first_seen_at)
+    SELECT k.key_type, k.key_value, CAST(:uetr AS uuid), NOW()
+    FROM unnest(CAST(:key_types AS varchar[]), CAST(:key_values AS varchar[])) AS k(key_type, key_value)
+    ON CONFLICT (key_type, key_value) DO UPDATE SET
+        uetr = EXCLUDED.uetr,
+        first_seen_at = EXCLUDED.first_seen_at
+    WHERE payment_dedup_keys.key_type != 'UETR'
+      AND payment_dedup_keys.first_seen_at < NOW() - make_interval(secs => :window_seconds)
+    RETURNING key_type
+""")
+
+CHECK_KEYS_SQL = text("""
+    SELECT key_type
+    FROM payment_dedup_keys
+    WHERE (key_type, key_value) IN (
+        SELECT * FROM unnest(CAST(:key_types AS varchar[]), CAST(:key_values AS varchar[]))
+    )
+      AND (key_type = 'UETR' OR first_seen_at >= NOW() - make_interval(secs => :window_seconds))
+""")
+
+UNCLAIM_KEYS_SQL = text("""
+    DELETE FROM payment_dedup_keys
+    WHERE uetr = CAST(:uetr AS uuid)
+      AND (key_type, key_value) IN (
+          SELECT * FROM unnest(CAST(:key_types AS varchar[]), CAST(:key_values AS varchar[]))
+      )
+""")
+
+RELEASE_KEYS_SQL = text("DELETE FROM payment_dedup_keys WHERE uetr = CAST(:uetr AS uuid)")
+
+
+def payment_keys(parsed, uetr: str, key_types: tuple[str, ...] = KEY_TYPES) -> dict[str, str]:
+    """
+    Duplicate-detection keys for a parsed pacs.008.
+
+    Returns {key_type: key_value}; identifiers absent from the message are skipped.
+    """
+    scope = parsed.get("debtorAgentBic") or ""
+    keys = {}
+    if "UETR" in key_types and uetr:
+        keys["UETR"] = uetr.lower()
+    if "MSGID" in key_types and parsed.get("messageId"):
+        keys["MSGID"] = f"{scope}:{parsed['messageId']}"
+    if "E2EID" in key_types and parsed.get("endToEndId"):
+        keys["E2EID"] = f"{scope}:{parsed['endToEndId']}"
+    return keys
+
+
+# =============================================================================
+# In-process Filter
+# =============================================================================
+
+class RecentKeyFilter:
+    """
+    Keys accepted by this process, in time buckets covering the window.
+
+    Buckets rotate as time passes; a whole bucket is dropped once it falls
+    outside the window, so memory is bounded by the window's traffic.
+    """
+
+    def __init__(self, window_seconds: int = 86400, buckets: int = 24):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = max(window_seconds / buckets, 1.0)
+        # (bucket start, {key: uetr}), oldest first
+        self._buckets: deque[tuple[float, dict[str, str]]] = deque()
+
+    def _rotate(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= horizon:
+            self._buckets.popleft()
+
+    def add(self, keys: list[str], uetr: str, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._rotate(now)
+        if not self._buckets or now >= self._buckets[-1][0] + self.bucket_seconds:
+            self._buckets.append((now, {}))
+        current = self._buckets[-1][1]
+        for key in keys:
+            current[key] = uetr
+
+    def seen(self, keys: list[str], now: Optional[float] = None) -> list[str]:
+        """Keys present in a live bucket."""
+        self._rotate(time.monotonic() if now is None else now)
+        return [k for k in keys if any(k in bucket for _, bucket in self._buckets)]
+
+    def forget(self, keys: list[str]) -> None:
+        """Drop keys that are no longer claimed (released on another replica)."""
+        for _, bucket in self._buckets:
+            for key in keys:
+                bucket.pop(key, None)
+
+    def forget_uetr(self, uetr: str) -> None:
+        """Drop every key claimed by uetr (rare: payment rejected after acceptance)."""
+        for _, bucket in self._buckets:
+            for key in [k for k, v in bucket.items() if v == uetr]:
+                del bucket[key]
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for _, bucket in self._buckets)
+
+
+# =============================================================================
+# Duplicate Detector
+# =============================================================================
+
+class DuplicateDetector:
+    """
+    Filter-fronted duplicate checks against payment_dedup_keys.
+    """
+
+    def __init__(
+        self,
+        window_seconds: int = 86400,
+        buckets: int = 24,
+        key_types: tuple[str, ...] = KEY_TYPES,
+    ):
+        self.window_seconds = window_seconds
+        self.key_types = tuple(t for t in key_types if t in KEY_TYPES)
+        self.filter = RecentKeyFilter(window_seconds, buckets)
+        self._stats = {
+            "checks": 0,
+            "filterHits": 0,
+            "filterStale": 0,
+            "dbLookups": 0,
+            "duplicates": {t: 0 for t in KEY_TYPES},
+        }
+
+    def keys_for(self, parsed, uetr: str) -> dict[str, str]:
+        return payment_keys(parsed, uetr, self.key_types)
+
+    @staticmethod
+    def _qualified(keys: dict[str, str]) -> list[str]:
+        return [f"{t}:{v}" for t, v in keys.items()]
+
+    def _params(self, keys: dict[str, str]) -> dict:
+        return {
+            "key_types": list(keys),
+            "key_values": list(keys.values()),
+            "window_seconds": self.window_seconds,
+        }
+
+    def _filtered(self, keys: dict[str, str]) -> list[str]:
+        """Key types already accepted by this process."""
+        self._stats["checks"] += 1
+        seen = set(self.filter.seen(self._qualified(keys)))
+        duplicates = [t for t, v in keys.items() if f"{t}:{v}" in seen]
+        if duplicates:
+            self._stats["filterHits"] += 1
+        return duplicates
+
+    async def _confirm(self, db: AsyncSession, keys: dict[str, str], hits: list[str]) -> list[str]:
+        """Filter hits still claimed in payment_dedup_keys; stale hits are forgotten."""
+        self._stats["dbLookups"] += 1
+        hit_keys = {t: keys[t] for t in hits}
+        result = await db.execute(CHECK_KEYS_SQL, self._params(hit_keys))
+        confirmed = {row[0] for row in result.fetchall()}
+        stale = {t: v for t, v in hit_keys.items() if t not in confirmed}
+        if stale:
+            self._stats["filterStale"] += 1
+            self.filter.forget(self._qualified(stale))
+        return [t for t in hits if t in confirmed]
+
+    def _count(self, duplicates: list[str]) -> list[str]:
+        for key_type in duplicates:
+            self._stats["duplicates"][key_type] += 1
+        return duplicates
+
+    async def check(self, db: AsyncSession, keys: dict[str, str]) -> list[str]:
+        """Key types that are duplicates (read-only)."""
+        if not keys:
+            return []
+        duplicates = self._filtered(keys)
+        if duplicates:
+            duplicates = await self._confirm(db, keys, duplicates)
+        if not duplicates:
+            self._stats["dbLookups"] += 1
+            result = await db.execute(CHECK_KEYS_SQL, self._params(keys))
+            duplicates = [row[0] for row in result.fetchall()]
+        return self._count(duplicates)
+
+    async def claim(self, db: AsyncSession, uetr: str, keys: dict[str, str]) -> list[str]:
+        """
+        Claim keys for uetr in the caller's transaction.
+
+        Returns the key types that were already taken (duplicates). The claim
+        commits with the payment's unit of work; call remember() afterwards.
+        """
+        if not keys:
+            return []
+        duplicates = self._filtered(keys)
+        if duplicates:
+            duplicates = await self._confirm(db, keys, duplicates)
+        if not duplicates:
+            self._stats["dbLookups"] += 1
+            result = await db.execute(CLAIM_KEYS_SQL, {"uetr": uetr, **self._params(keys)})
+            claimed = {row[0] for row in result.fetchall()}
+            duplicates = [t for t in keys if t not in claimed]
+            if duplicates and claimed:
+                # The payment will be rejected: give back the keys it did get
+                taken = {t: v for t, v in keys.items() if t in claimed}
+                await db.execute(UNCLAIM_KEYS_SQL, {"uetr": uetr, **self._params(taken)})
+        return self._count(duplicates)
+
+    def remember(self, uetr: str, keys: dict[str, str]) -> None:
+        """Add committed keys to the in-process filter."""
+        self.filter.add(self._qualified(keys), uetr)
+
+    async def release(self, db: AsyncSession, uetr: str) -> None:
+        """
+        Free a rejected payment's keys (committed by the caller).
+
+        Other replicas may still hold the keys in their filters; they find
+        them gone when confirming the hit.
+        """
+        await db.execute(RELEASE_KEYS_SQL, {"uetr": uetr})
+        self.filter.forget_uetr(uetr)
+
+    def stats(self) -> dict:
+        return {
+            "windowSeconds": self.window_seconds,
+            "keyTypes": list(self.key_types),
+            "filterSize": len(self.filter),
+            **self._stats,
+            "duplicates": dict(self._stats["duplicates"]),
+        }
+
+
+# Singleton detector
+_detector: Optional[DuplicateDetector] = None
+
+
+def get_duplicate_detector() -> DuplicateDetector:
+    """Get the process-wide duplicate detector."""
+    global _detector
+    if _detector is None:
+        _detector = DuplicateDetector(
+            window_seconds=settings.dedup_window_seconds,
+            buckets=settings.dedup_buckets,
+            key_types=tuple(settings.dedup_key_types),
+        )
+    return _detector
@@ -0,0 +1,309 @@
+"""
+Write-behind Payment Event Writer
+
+Lifecycle events (payment_events) are an append-only forensic timeline.
+Instead of one INSERT + COMMIT per event inside the request, handlers
+enqueue events and a single background flusher writes them in batches:
+
+    handler → store_payment_event() → bounded queue → flusher → one INSERT per batch
+
+Batches are written as one multi-row INSERT ... SELECT FROM unnest(...),
+so the statement text is constant (prepared once) regardless of batch size.
+
+Guarantees:
+- Ordering: occurred_at is stamped at enqueue time by next_occurred_at(),
+  the same process clock that stamps unit-of-work events, and is strictly
+  increasing; a single flusher writes batches in FIFO order, so
+  GET /payments/{uetr}/events returns the same timeline as the previous
+  synchronous writes.
+- Bounded memory: the queue has a fixed capacity; enqueue waits when it is
+  full (backpressure on the producing request).
+- Shutdown: stop() flushes everything queued before returning and is
+  called from main.lifespan before the database pool is disposed.
+
+Only stand-alone events go through the writer. Events written as part of
+a UnitOfWork (store_payment_event(commit=False)) are inserted on the
+request session so they share its transaction; so is every event when the
+writer is not running (tests, scripts, event_writer_enabled=false).
+
+Configuration (Settings / environment):
+    EVENT_WRITER_ENABLED            default true
+    EVENT_WRITER_BATCH_SIZE         max events per INSERT (default 200)
+    EVENT_WRITER_FLUSH_INTERVAL_MS  max time an event waits for a batch (default 50)
+    EVENT_WRITER_QUEUE_SIZE         queue capacity before backpressure (default 10000)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import text
+import asyncio
+import time
+
+import orjson
+
+from ...config import settings
+from ...db import async_session_maker
+from ..background import BackgroundWorker, WorkerSingleton
+
+
+# ISO 20022 message columns carried on payment_events (see migration 002)
+MESSAGE_COLUMNS = (
+    "pacs008_message", "pacs002_message", "acmt023_message", "acmt024_message",
+    "camt054_message", "camt103_message", "pain001_message",
+    "pacs004_message", "pacs028_message", "camt056_message", "camt029_message",
+)
+
+BATCH_INSERT_SQL = text(f"""
+    INSERT INTO payment_events (
+        event_id, uetr, event_type, actor, data, version, occurred_at,
+        {", ".join(MESSAGE_COLUMNS)}
+    )
+    SELECT
+        gen_random_uuid(), e.uetr, e.event_type, e.actor, CAST(e.data AS jsonb), 1, e.occurred_at,
+        {", ".join(f"e.{c}" for c in MESSAGE_COLUMNS)}
+    FROM unnest(
+        CAST(:uetr AS uuid[]), CAST(:event_type AS varchar[]), CAST(:actor AS varchar[]),
+        CAST(:data AS text[]), CAST(:occurred_at AS timestamptz[]),
+        {", ".join(f"CAST(:{c} AS text[])" for c in MESSAGE_COLUMNS)}
+    ) AS e(
+        uetr, event_type, actor, data, occurred_at,
+        {", ".join(MESSAGE_COLUMNS)}
+    )
+""")
+
+_STOP = None  # queue sentinel
+
+_last_occurred_at = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def next_occurred_at() -> datetime:
+    """Strictly increasing occurred_at for every payment event this process writes."""
+    global _last_occurred_at
+    now = datetime.now(timezone.utc)
+    if now <= _last_occurred_at:
+        now = _last_occurred_at + timedelta(microseconds=1)
+    _last_occurred_at = now
+    return now
+
+
+def encode_event_data(data: dict) -> str:
+    """Serialize event data for the JSONB column (orjson, str output)."""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class PaymentEventWriter(BackgroundWorker):
+    """
+    Batched, write-behind writer for payment_events.
+
+    Queued events are tuples of
+    (uetr, event_type, actor, data_json, occurred_at, messages) where
+    messages is a tuple aligned with MESSAGE_COLUMNS.
+    """
+
+    name = "payment-event-writer"
+    label = "Payment event writer"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        batch_size: int = 200,
+        flush_interval_ms: int = 50,
+        queue_size: int = 10000,
+    ):
+        super().__init__()
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._accepting = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "batchFailures": 0,
+            "backpressureWaits": 0,
+            "maxBatchSize": 0,
+            "lastFlushMs": 0.0,
+        }
+
+    @property
+    def accepting(self) -> bool:
+        """True while the flusher is running and accepting events."""
+        return self._accepting
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start the background flusher."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        await super().start()
+        self._accepting = True
+
+    async def stop(self) -> None:
+        """Stop accepting events and flush everything already queued."""
+        if not self.running:
+            return
+        self._accepting = False
+        await self._queue.put(_STOP)
+        await super().stop()
+
+    def _describe(self) -> str:
+        return (
+            f"batch={self.batch_size}, interval={self.flush_interval * 1000:.0f}ms, "
+            f"queue={self.queue_size}"
+        )
+
+    def _summary(self) -> str:
+        return f"{self._stats['written']} written, {self._stats['dropped']} dropped"
+
+    # -------------------------------------------------------------------------
+    # Producer side
+    # -------------------------------------------------------------------------
+
+    async def enqueue(
+        self,
+        uetr: str,
+        event_type: str,
+        actor: str,
+        data: dict,
+        messages: dict[str, Optional[str]],
+    ) -> None:
+        """
+        Queue one event for the next batch.
+
+        Waits if the queue is full (backpressure).
+        """
+        event = (
+            uetr,
+            event_type,
+            actor,
+            encode_event_data(data),
+            next_occurred_at(),
+            tuple(messages.get(c) for c in MESSAGE_COLUMNS),
+        )
+        if self._queue.full():
+            self._stats["backpressureWaits"] += 1
+        await self._queue.put(event)
+        self._stats["enqueued"] += 1
+
+    # -------------------------------------------------------------------------
+    # Flusher
+    # -------------------------------------------------------------------------
+
+    async def _run(self, index: int) -> None:
+        """Collect events until the batch is full or the interval elapses, then write."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    @staticmethod
+    def _batch_params(batch: list[tuple]) -> dict:
+        """Column-wise parameters for BATCH_INSERT_SQL."""
+        params = {
+            "uetr": [e[0] for e in batch],
+            "event_type": [e[1] for e in batch],
+            "actor": [e[2] for e in batch],
+            "data": [e[3] for e in batch],
+            "occurred_at": [e[4] for e in batch],
+        }
+        for i, column in enumerate(MESSAGE_COLUMNS):
+            params[column] = [e[5][i] for e in batch]
+        return params
+
+    async def _write(self, batch: list[tuple]) -> None:
+        async with self.session_factory() as session:
+            await session.execute(BATCH_INSERT_SQL, self._batch_params(batch))
+            await session.commit()
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        """
+        Write a batch, retrying transient failures.
+
+        If the batch still fails, events are written one at a time so a single
+        bad row (e.g. a non-UUID UETR) only drops itself.
+        """
+        started = time.perf_counter()
+        for attempt in range(settings.max_retries):
+            try:
+                await self._write(batch)
+                self._record_flush(len(batch), started)
+                return
+            except Exception as e:
+                self._stats["batchFailures"] += 1
+                self.logger.warning(
+                    f"payment_events batch of {len(batch)} failed "
+                    f"(attempt {attempt + 1}/{settings.max_retries}): {e}"
+                )
+                await asyncio.sleep(0.05 * (2 ** attempt))
+
+        written = 0
+        for event in batch:
+            try:
+                await self._write([event])
+                written += 1
+            except Exception as e:
+                self._stats["dropped"] += 1
+                self.logger.error(f"Dropped {event[1]} event for UETR {event[0]}: {e}")
+        self._record_flush(written, started)
+
+    def _record_flush(self, written: int, started: float) -> None:
+        self._stats["written"] += written
+        self._stats["batches"] += 1
+        self._stats["maxBatchSize"] = max(self._stats["maxBatchSize"], written)
+        self._stats["lastFlushMs"] = round((time.perf_counter() - started) * 1000, 3)
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Writer counters and current queue depth."""
+        return {
+            "running": self._accepting,
+            "queueDepth": self._queue.qsize() if self._queue is not None else 0,
+            "queueCapacity": self.queue_size,
+            "batchSize": self.batch_size,
+            "flushIntervalMs": self.flush_interval * 1000,
+            **self._stats,
+        }
+
+
+# Singleton writer, started when EVENT_WRITER_ENABLED; stop() drains the queue
+_writer = WorkerSingleton(
+    lambda: PaymentEventWriter(
+        batch_size=settings.event_writer_batch_size,
+        flush_interval_ms=settings.event_writer_flush_interval_ms,
+        queue_size=settings.event_writer_queue_size,
+    ),
+    enabled=lambda: settings.event_writer_enabled,
+)
+get_event_writer = _writer.get
+start_event_writer = _writer.start
+stop_event_writer = _writer.stop
@@ -23,7 +23,11 @@ import json
 from ...db import get_db
 from ...config import settings
 from .. import validation as xsd_validation
+from ..structural_validation import validate_inbound_xml_async
+from ..xml_executor import run_xml
 from .utils import store_payment_event
+from .dedup import get_duplicate_detector
+from .extraction import MessageExtractor, ExtractedRecord
 
 router = APIRouter(tags=["ISO 20022 Messages"])
 
@@ -221,7 +225,7 @@ async def receive_pacs002_xml(
         )
     
     # Step 1: XSD Schema Validation
-    xsd_result = xsd_validation.validate_pacs002(xml_content)
+    xsd_result = await validate_inbound_xml_async(xml_content, "pacs.002")
     if not xsd_result.valid:
         # Forensic Logging: Store violation in Message Observatory 
         from .utils import store_payment_event
@@ -254,7 +258,7 @@ async def receive_pacs002_xml(
     
     # Step 2: Parse XML
     try:
-        parsed = parse_pacs002(xml_content)
+        parsed = await run_xml("pacs.002", parse_pacs002, xml_content)
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -346,41 +350,31 @@ async def get_payment_status(
 # Helper Functions
 # =============================================================================
 
-def parse_pacs002(xml_content: str) -> dict:
+PACS002_EXTRACTOR = MessageExtractor("Pacs002Record", {
+    "messageId": ".//MsgId",
+    "originalMessageId": ".//OrgnlMsgId",
+    "originalUetr": ".//OrgnlUETR",
+    "transactionStatus": ".//TxSts",
+    "statusReasonCode": ".//StsRsnInf/Rsn/Cd",
+    "statusReasonProprietary": ".//StsRsnInf/Rsn/Prtry",
+    "acceptanceDateTime": ".//AccptncDtTm",
+    # Added per ISO20022_PARITY_ANALYSIS_REPORT.md - OrgnlTxRef amount parsing
+    "originalInstrId": ".//OrgnlInstrId",
+    "originalEndToEndId": ".//OrgnlEndToEndId",
+    "originalTxId": ".//OrgnlTxId",
+    "originalTxRefAmount": ".//OrgnlTxRef//IntrBkSttlmAmt",
+    "originalTxRefCurrency": ".//OrgnlTxRef//IntrBkSttlmAmt/@Ccy",
+})
+
+
+def parse_pacs002(xml_content: str | etree._Element) -> ExtractedRecord:
     """Parse pacs.002 XML and extract key fields."""
     try:
-        root = etree.fromstring(xml_content.encode())
-        
-        # Define namespace map
-        ns = {
-            'doc': 'urn:iso:std:iso:20022:tech:xsd:pacs.002.001.15'
-        }
-        
-        def get_text(xpath, default=None):
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            simple_xpath = xpath.replace('doc:', '')
-            elements = root.xpath(simple_xpath)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            return default
-        
-        return {
-            "messageId": get_text(".//MsgId") or get_text(".//doc:MsgId"),
-            "originalMessageId": get_text(".//OrgnlMsgId") or get_text(".//doc:OrgnlMsgId"),
-            "originalUetr": get_text(".//OrgnlUETR") or get_text(".//doc:OrgnlUETR"),
-            "transactionStatus": get_text(".//TxSts") or get_text(".//doc:TxSts"),
-            "statusReasonCode": get_text(".//StsRsnInf/Rsn/Cd") or get_text(".//doc:StsRsnInf/doc:Rsn/doc:Cd"),
-            "statusReasonProprietary": get_text(".//StsRsnInf/Rsn/Prtry") or get_text(".//doc:StsRsnInf/doc:Rsn/doc:Prtry"),
-            "acceptanceDateTime": get_text(".//AccptncDtTm") or get_text(".//doc:AccptncDtTm"),
-            # Added per ISO20022_PARITY_ANALYSIS_REPORT.md - OrgnlTxRef amount parsing
-            "originalInstrId": get_text(".//OrgnlInstrId") or get_text(".//doc:OrgnlInstrId"),
-            "originalEndToEndId": get_text(".//OrgnlEndToEndId") or get_text(".//doc:OrgnlEndToEndId"),
-            "originalTxId": get_text(".//OrgnlTxId") or get_text(".//doc:OrgnlTxId"),
-            "originalTxRefAmount": get_text(".//OrgnlTxRef//IntrBkSttlmAmt") or get_text(".//doc:OrgnlTxRef//doc:IntrBkSttlmAmt"),
-            "originalTxRefCurrency": get_text(".//OrgnlTxRef//IntrBkSttlmAmt/@Ccy") or get_text(".//doc:OrgnlTxRef//doc:IntrBkSttlmAmt/@Ccy"),
-        }
+        if isinstance(xml_content, etree._Element):
+            root = xml_content
+        else:
+            root = etree.fromstring(xml_content.encode())
+        return PACS002_EXTRACTOR.extract(root)
     
     except Exception as e:
         raise ValueError(f"Failed to parse pacs.002: {str(e)}")
@@ -393,7 +387,12 @@ async def update_payment_status(
     reason_code: Optional[str],
     reason_text: Optional[str]
 ):
-    """Update payment status in database."""
+    """
+    Update payment status in database.
+    
+    A rejected payment releases its duplicate-detection keys so the
+    UETR/MsgId/EndToEndId can be resubmitted.
+    """
     query = text("""
         UPDATE payments SET
             status = :status,
@@ -409,6 +408,8 @@ async def update_payment_status(
         "reason_code": reason_code,
         "reason_text": reason_text,
     })
+    if status == "RJCT":
+        await get_duplicate_detector().release(db, uetr)
     await db.commit()
 
 
@@ -17,13 +17,20 @@ import logging
 
 from ...db import get_db
 from .. import validation as xsd_validation
+from ..xml_executor import run_xml
 from ..schemas import Pacs004Response
 from .utils import store_payment_event
+from .extraction import MessageExtractor
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+PACS004_EXTRACTOR = MessageExtractor("Pacs004Record", {
+    "originalUetr": (".//OrgnlUETR", ".//TxInf/OrgnlUETR", ".//RtrTxInf/OrgnlUETR"),
+})
+
+
 def _extract_original_uetr_from_pacs004(xml_content: str) -> str:
     """Extract OrgnlUETR from pacs.004 XML document.
     
@@ -32,21 +39,7 @@ def _extract_original_uetr_from_pacs004(xml_content: str) -> str:
     """
     try:
         root = etree.fromstring(xml_content.encode())
-        ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.14'}
-        
-        # Try namespaced first
-        for xpath in ['.//doc:OrgnlUETR', './/doc:TxInf/doc:OrgnlUETR', './/doc:RtrTxInf/doc:OrgnlUETR']:
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        # Fallback: try without namespace (for sandbox testing)
-        for xpath in ['.//OrgnlUETR', './/TxInf/OrgnlUETR', './/RtrTxInf/OrgnlUETR']:
-            elements = root.xpath(xpath)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        return f"UNKNOWN-{uuid4().hex[:8]}"
+        return PACS004_EXTRACTOR.extract(root).originalUetr or f"UNKNOWN-{uuid4().hex[:8]}"
     except Exception:
         return f"UNKNOWN-{uuid4().hex[:8]}"
 
@@ -82,7 +75,7 @@ async def process_pacs004(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_pacs004(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "pacs.004")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -103,7 +96,7 @@ async def process_pacs004(
         )
     
     # Extract original UETR from parsed XML
-    original_uetr = _extract_original_uetr_from_pacs004(xml_content)
+    original_uetr = await run_xml("pacs.004", _extract_original_uetr_from_pacs004, xml_content)
     logger.info(f"pacs.004 return received for original UETR: {original_uetr}")
     
     # Store return event for audit trail
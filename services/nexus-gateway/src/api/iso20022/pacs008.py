@@ -10,7 +10,6 @@ Extracted from monolithic iso20022.py as part of Phase 2 modular refactoring.
 
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 from datetime import datetime, timezone
 from decimal import Decimal
 from uuid import UUID, uuid4
@@ -45,9 +44,17 @@ from . import (
     Pacs008Response,
 )
 from .utils import (
+    UnitOfWork,
     store_payment,
     store_payment_event,
 )
+from .pipeline import MessagePipeline
+from ..quote_routing import get_quote_routing
+from ..quote_store import persist_quote
+from ..outbox import enqueue_pacs002_callback
+from .dedup import get_duplicate_detector
+from .constants import DU01
+from .extraction import MessageExtractor, ExtractedRecord
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -57,78 +64,69 @@ logger = logging.getLogger(__name__)
 # XML Parsing Functions
 # =============================================================================
 
-def parse_pacs008(xml_content: str) -> dict:
+# Field map for pacs.008 extraction. Alternatives are tried in order; paths
+# are written without namespace prefixes and qualified at compile time.
+PACS008_EXTRACTOR = MessageExtractor("Pacs008Record", {
+    "uetr": ".//UETR",
+    "messageId": ".//MsgId",
+    "endToEndId": ".//EndToEndId",
+    # Quote ID per docs: AgrdRate/QtId is the primary source, RgltryRptg/Dtls/Inf for Nexus custom
+    "quoteId": (".//AgrdRate/QtId", ".//XchgRateInf/CtrctId", ".//RgltryRptg/Dtls/Inf", ".//InstrId"),
+    "exchangeRate": (".//PreAgrdXchgRate", ".//XchgRate"),
+    "settlementAmount": ".//IntrBkSttlmAmt",
+    "settlementCurrency": ".//IntrBkSttlmAmt/@Ccy",
+    "instructedAmount": ".//InstdAmt",
+    "purposeCode": ".//Purp/Cd",
+    "acceptanceDateTime": ".//AccptncDtTm",
+    "debtorName": ".//Dbtr/Nm",
+    "debtorAccount": (".//DbtrAcct/Id/IBAN", ".//DbtrAcct/Id/Othr/Id"),
+    "debtorAgentBic": ".//DbtrAgt//BICFI",
+    "creditorName": ".//Cdtr/Nm",
+    "creditorAccount": (".//CdtrAcct/Id/IBAN", ".//CdtrAcct/Id/Othr/Id"),
+    "creditorAgentBic": ".//CdtrAgt//BICFI",
+    "instructedCurrency": ".//InstdAmt/@Ccy",
+    "intermediaryAgent1Bic": ".//IntrmyAgt1//BICFI",
+    "intermediaryAgent2Bic": ".//IntrmyAgt2//BICFI",
+    "chargeBearer": ".//ChrgBr",
+    # NbOfTxs for validation (must be 1 per Nexus spec)
+    "nbOfTxs": ".//NbOfTxs",
+    # Settlement and clearing info per documentation
+    "settlementMethod": ".//SttlmInf/SttlmMtd",
+    "clearingSystem": (".//SttlmInf/ClrSys/Prtry", ".//SttlmInf/ClrSys/Cd", ".//ClrSys/Cd"),
+    # Instruction Priority (NORM or HIGH) per documentation
+    "instructionPriority": ".//InstrPrty",
+    # Charges information per documentation
+    "chargesAmount": ".//ChrgsInf/Amt",
+    "chargesCurrency": ".//ChrgsInf/Amt/@Ccy",
+    "chargesAgentBic": ".//ChrgsInf/Agt//BICFI",
+    # Remittance Information for NexusOrgnlUETR extraction (return payments)
+    "remittanceInfo": (".//AddtlRmtInf", ".//RmtInf//Ustrd"),
+})
+
+
+def parse_pacs008(xml_content: str | etree._Element) -> ExtractedRecord:
     """
     Parse pacs.008 XML and extract key fields.
     
+    Accepts either raw XML or an already-parsed root element (see
+    MessagePipeline) so the request body is only parsed once.
+    
     Reference: https://docs.nexusglobalpayments.org/messaging-and-translation/specific-message-elements
     """
     try:
-        root = etree.fromstring(xml_content.encode())
-        
-        # Define namespace map for ISO 20022
-        ns = {
-            'doc': 'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13',
-            'head': 'urn:iso:std:iso:20022:tech:xsd:head.001.001.02'
-        }
-        
-        # Extract with fallback for namespace-less XML (simplified parsing)
-        def get_text(xpath, default=None):
-            # Try with namespace
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            # Try without namespace (for sandbox testing)
-            simple_xpath = xpath.replace('doc:', '').replace('head:', '')
-            elements = root.xpath(simple_xpath)
-            if elements:
-                return elements[0].text if hasattr(elements[0], 'text') else str(elements[0])
-            return default
-        
-        return {
-            "uetr": get_text(".//UETR") or get_text(".//doc:UETR"),
-            "messageId": get_text(".//MsgId") or get_text(".//doc:MsgId"),
-            "endToEndId": get_text(".//EndToEndId") or get_text(".//doc:EndToEndId"),
-            # Quote ID per docs: AgrdRate/QtId is the primary source, RgltryRptg/Dtls/Inf for Nexus custom
-            "quoteId": get_text(".//AgrdRate/QtId") or get_text(".//doc:AgrdRate/doc:QtId") or get_text(".//XchgRateInf/CtrctId") or get_text(".//doc:XchgRateInf/doc:CtrctId") or get_text(".//RgltryRptg/Dtls/Inf") or get_text(".//doc:RgltryRptg/doc:Dtls/doc:Inf") or get_text(".//InstrId") or get_text(".//doc:InstrId"),
-            "exchangeRate": get_text(".//PreAgrdXchgRate") or get_text(".//doc:PreAgrdXchgRate") or get_text(".//XchgRate") or get_text(".//doc:XchgRate"),
-            "settlementAmount": get_text(".//IntrBkSttlmAmt") or get_text(".//doc:IntrBkSttlmAmt"),
-            "settlementCurrency": get_text(".//IntrBkSttlmAmt/@Ccy"),
-            "instructedAmount": get_text(".//InstdAmt") or get_text(".//doc:InstdAmt"),
-            "purposeCode": get_text(".//Purp/Cd") or get_text(".//doc:Purp/doc:Cd"),
-            "acceptanceDateTime": get_text(".//AccptncDtTm") or get_text(".//doc:AccptncDtTm"),
-            "debtorName": get_text(".//Dbtr/Nm") or get_text(".//doc:Dbtr/doc:Nm"),
-            "debtorAccount": get_text(".//DbtrAcct/Id/IBAN") or get_text(".//doc:DbtrAcct/doc:Id/doc:IBAN") or get_text(".//DbtrAcct/Id/Othr/Id") or get_text(".//doc:DbtrAcct/doc:Id/doc:Othr/doc:Id"),
-            "debtorAgentBic": get_text(".//DbtrAgt//BICFI") or get_text(".//doc:DbtrAgt//doc:BICFI"),
-            "creditorName": get_text(".//Cdtr/Nm") or get_text(".//doc:Cdtr/doc:Nm"),
-            "creditorAccount": get_text(".//CdtrAcct/Id/IBAN") or get_text(".//doc:CdtrAcct/doc:Id/doc:IBAN") or get_text(".//CdtrAcct/Id/Othr/Id") or get_text(".//doc:CdtrAcct/doc:Id/doc:Othr/doc:Id"),
-            "creditorAgentBic": get_text(".//CdtrAgt//BICFI") or get_text(".//doc:CdtrAgt//doc:BICFI"),
-            "instructedCurrency": get_text(".//InstdAmt/@Ccy"),
-            "intermediaryAgent1Bic": get_text(".//IntrmyAgt1//BICFI") or get_text(".//doc:IntrmyAgt1//doc:BICFI"),
-            "intermediaryAgent2Bic": get_text(".//IntrmyAgt2//BICFI") or get_text(".//doc:IntrmyAgt2//doc:BICFI"),
-            "chargeBearer": get_text(".//ChrgBr") or get_text(".//doc:ChrgBr"),
-            # NbOfTxs for validation (must be 1 per Nexus spec)
-            "nbOfTxs": get_text(".//NbOfTxs") or get_text(".//doc:NbOfTxs"),
-            # Settlement and clearing info per documentation
-            "settlementMethod": get_text(".//SttlmInf/SttlmMtd") or get_text(".//doc:SttlmInf/doc:SttlmMtd"),
-            "clearingSystem": get_text(".//SttlmInf/ClrSys/Prtry") or get_text(".//doc:SttlmInf/doc:ClrSys/doc:Prtry") or get_text(".//SttlmInf/ClrSys/Cd") or get_text(".//doc:SttlmInf/doc:ClrSys/doc:Cd") or get_text(".//ClrSys/Cd") or get_text(".//doc:ClrSys/doc:Cd"),
-            # Instruction Priority (NORM or HIGH) per documentation
-            "instructionPriority": get_text(".//InstrPrty") or get_text(".//doc:InstrPrty"),
-            # Charges information per documentation
-            "chargesAmount": get_text(".//ChrgsInf/Amt") or get_text(".//doc:ChrgsInf/doc:Amt"),
-            "chargesCurrency": get_text(".//ChrgsInf/Amt/@Ccy") or get_text(".//doc:ChrgsInf/doc:Amt/@Ccy"),
-            "chargesAgentBic": get_text(".//ChrgsInf/Agt//BICFI") or get_text(".//doc:ChrgsInf/doc:Agt//doc:BICFI"),
-            # Remittance Information for NexusOrgnlUETR extraction (return payments)
-            "remittanceInfo": get_text(".//AddtlRmtInf") or get_text(".//doc:RmtInf//doc:Ustrd") or get_text(".//RmtInf//Ustrd"),
-        }
+        if isinstance(xml_content, etree._Element):
+            root = xml_content
+        else:
+            root = etree.fromstring(xml_content.encode())
+        return PACS008_EXTRACTOR.extract(root)
     
     except Exception as e:
         raise ValueError(f"Failed to parse pacs.008: {str(e)}")
 
 
-def transform_pacs008(xml_content: str, quote_data: dict) -> str:
+def apply_pacs008_transform(root: etree._Element, quote_data: dict) -> None:
     """
-    Transform pacs.008 for Destination IPS routing.
+    Transform a parsed pacs.008 tree in place for Destination IPS routing.
     
     Reference: NotebookLM 2026-02-03 - Agent Swapping and Amount Conversion
     
@@ -138,101 +136,110 @@ def transform_pacs008(xml_content: str, quote_data: dict) -> str:
     4. Update PrvsInstgAgt1 to Source SAP (audit trail)
     5. Update ClrSys code to Destination IPS
     """
-    try:
-        root = etree.fromstring(xml_content.encode())
-        ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13'}
-        
-        # Store Source SAP for audit trail
-        original_instg_agt_bic = None
-        instg_agt = root.xpath(".//doc:InstgAgt//doc:BICFI", namespaces=ns)
-        if instg_agt:
-            original_instg_agt_bic = instg_agt[0].text
-            # 1. Instructing Agent (InstgAgt) -> Dest SAP
-            instg_agt[0].text = quote_data["dest_sap_bic"]
-            
-        # 2. Instructed Agent (InstdAgt) -> Dest PSP
-        instd_agt = root.xpath(".//doc:InstdAgt//doc:BICFI", namespaces=ns)
-        if instd_agt:
-            instd_agt[0].text = quote_data["dest_psp_bic"]
-            
-        # 3. Interbank Settlement Amount (IntrBkSttlmAmt) -> Dest Amount
-        amt_elem = root.xpath(".//doc:IntrBkSttlmAmt", namespaces=ns)
-        if amt_elem:
-            amt_elem[0].text = str(quote_data["dest_amount"])
-            amt_elem[0].set("Ccy", quote_data["dest_currency"])
-        
-        # 3b. Update Agreed Rate section (if exists)
-        agrd_rate = root.xpath(".//doc:AgrdRate", namespaces=ns)
-        if agrd_rate:
-            unit_ccy = root.xpath(".//doc:AgrdRate/doc:UnitCcy", namespaces=ns)
-            if unit_ccy: unit_ccy[0].text = quote_data.get("source_currency", "XXX")
-            qtd_ccy = root.xpath(".//doc:AgrdRate/doc:QtdCcy", namespaces=ns)
-            if qtd_ccy: qtd_ccy[0].text = quote_data.get("dest_currency", "XXX")
-        
-        # 4. Previous Instructing Agent (PrvsInstgAgt1) -> Source SAP (Audit Trail)
-        if original_instg_agt_bic:
-            cdt_trf_tx_inf = root.xpath(".//doc:CdtTrfTxInf", namespaces=ns)
-            if cdt_trf_tx_inf:
-                prvs_instg_agt1 = root.xpath(".//doc:PrvsInstgAgt1", namespaces=ns)
-                if not prvs_instg_agt1:
-                    new_elem = etree.SubElement(cdt_trf_tx_inf[0], "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}PrvsInstgAgt1")
-                    fin_instn_id = etree.SubElement(new_elem, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}FinInstnId")
-                    bicfi = etree.SubElement(fin_instn_id, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}BICFI")
-                    bicfi.text = original_instg_agt_bic
-        
-        # 4b. Previous Instructing Agent Account
-        if quote_data.get("fxp_account_id"):
-            cdt_trf_tx_inf = root.xpath(".//doc:CdtTrfTxInf", namespaces=ns)
-            if cdt_trf_tx_inf:
-                prvs_acct = etree.SubElement(cdt_trf_tx_inf[0], "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}PrvsInstgAgt1Acct")
-                acct_id = etree.SubElement(prvs_acct, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Id")
-                othr = etree.SubElement(acct_id, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Othr")
-                othr_id = etree.SubElement(othr, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Id")
-                othr_id.text = quote_data["fxp_account_id"]
-        
-        # 5. Clear IntrmyAgt1
-        intmy_agt1 = root.xpath(".//doc:IntrmyAgt1", namespaces=ns)
-        if intmy_agt1:
-            intmy_agt1[0].getparent().remove(intmy_agt1[0])
+    ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13'}
+    
+    # Store Source SAP for audit trail
+    original_instg_agt_bic = None
+    instg_agt = root.xpath(".//doc:InstgAgt//doc:BICFI", namespaces=ns)
+    if instg_agt:
+        original_instg_agt_bic = instg_agt[0].text
+        # 1. Instructing Agent (InstgAgt) -> Dest SAP
+        instg_agt[0].text = quote_data["dest_sap_bic"]
         
-        # 6. Update Clearing System code
-        clr_sys = root.xpath(".//doc:ClrSys//doc:Cd", namespaces=ns)
-        if clr_sys and "dest_ips_code" in quote_data:
-            clr_sys[0].text = quote_data["dest_ips_code"]
+    # 2. Instructed Agent (InstdAgt) -> Dest PSP
+    instd_agt = root.xpath(".//doc:InstdAgt//doc:BICFI", namespaces=ns)
+    if instd_agt:
+        instd_agt[0].text = quote_data["dest_psp_bic"]
         
-        # 7. Add ChargesInformation block per Nexus spec (C4 fix)
-        # Reference: https://docs.nexusglobalpayments.org/messaging-and-translation/message-pacs.008-fi-to-fi-customer-credit-transfer#toc159257062
-        # "Source PSP must include the Source PSP Deducted Fee and Destination PSP Deducted Fee in the payment message"
+    # 3. Interbank Settlement Amount (IntrBkSttlmAmt) -> Dest Amount
+    amt_elem = root.xpath(".//doc:IntrBkSttlmAmt", namespaces=ns)
+    if amt_elem:
+        amt_elem[0].text = str(quote_data["dest_amount"])
+        amt_elem[0].set("Ccy", quote_data["dest_currency"])
+    
+    # 3b. Update Agreed Rate section (if exists)
+    agrd_rate = root.xpath(".//doc:AgrdRate", namespaces=ns)
+    if agrd_rate:
+        unit_ccy = root.xpath(".//doc:AgrdRate/doc:UnitCcy", namespaces=ns)
+        if unit_ccy: unit_ccy[0].text = quote_data.get("source_currency", "XXX")
+        qtd_ccy = root.xpath(".//doc:AgrdRate/doc:QtdCcy", namespaces=ns)
+        if qtd_ccy: qtd_ccy[0].text = quote_data.get("dest_currency", "XXX")
+    
+    # 4. Previous Instructing Agent (PrvsInstgAgt1) -> Source SAP (Audit Trail)
+    if original_instg_agt_bic:
         cdt_trf_tx_inf = root.xpath(".//doc:CdtTrfTxInf", namespaces=ns)
         if cdt_trf_tx_inf:
-            pacs008_ns = "urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13"
-            
-            # Add Destination PSP Deducted Fee (if available)
-            if quote_data.get("destination_psp_fee"):
-                chrgs_inf = etree.SubElement(cdt_trf_tx_inf[0], f"{{{pacs008_ns}}}ChrgsInf")
-                amt = etree.SubElement(chrgs_inf, f"{{{pacs008_ns}}}Amt")
-                amt.set("Ccy", quote_data.get("dest_currency", "USD"))
-                amt.text = str(quote_data["destination_psp_fee"])
-                
-                # Agent element - Destination PSP (Creditor Agent)
-                agt = etree.SubElement(chrgs_inf, f"{{{pacs008_ns}}}Agt")
-                fin_instn_id = etree.SubElement(agt, f"{{{pacs008_ns}}}FinInstnId")
-                bicfi = etree.SubElement(fin_instn_id, f"{{{pacs008_ns}}}BICFI")
-                bicfi.text = quote_data.get("dest_psp_bic", "UNKNOWN")
+            prvs_instg_agt1 = root.xpath(".//doc:PrvsInstgAgt1", namespaces=ns)
+            if not prvs_instg_agt1:
+                new_elem = etree.SubElement(cdt_trf_tx_inf[0], "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}PrvsInstgAgt1")
+                fin_instn_id = etree.SubElement(new_elem, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}FinInstnId")
+                bicfi = etree.SubElement(fin_instn_id, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}BICFI")
+                bicfi.text = original_instg_agt_bic
+    
+    # 4b. Previous Instructing Agent Account
+    if quote_data.get("fxp_account_id"):
+        cdt_trf_tx_inf = root.xpath(".//doc:CdtTrfTxInf", namespaces=ns)
+        if cdt_trf_tx_inf:
+            prvs_acct = etree.SubElement(cdt_trf_tx_inf[0], "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}PrvsInstgAgt1Acct")
+            acct_id = etree.SubElement(prvs_acct, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Id")
+            othr = etree.SubElement(acct_id, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Othr")
+            othr_id = etree.SubElement(othr, "{urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13}Id")
+            othr_id.text = quote_data["fxp_account_id"]
+    
+    # 5. Clear IntrmyAgt1
+    intmy_agt1 = root.xpath(".//doc:IntrmyAgt1", namespaces=ns)
+    if intmy_agt1:
+        intmy_agt1[0].getparent().remove(intmy_agt1[0])
+    
+    # 6. Update Clearing System code
+    clr_sys = root.xpath(".//doc:ClrSys//doc:Cd", namespaces=ns)
+    if clr_sys and "dest_ips_code" in quote_data:
+        clr_sys[0].text = quote_data["dest_ips_code"]
+    
+    # 7. Add ChargesInformation block per Nexus spec (C4 fix)
+    # Reference: https://docs.nexusglobalpayments.org/messaging-and-translation/message-pacs.008-fi-to-fi-customer-credit-transfer#toc159257062
+    # "Source PSP must include the Source PSP Deducted Fee and Destination PSP Deducted Fee in the payment message"
+    cdt_trf_tx_inf = root.xpath(".//doc:CdtTrfTxInf", namespaces=ns)
+    if cdt_trf_tx_inf:
+        pacs008_ns = "urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13"
+        
+        # Add Destination PSP Deducted Fee (if available)
+        if quote_data.get("destination_psp_fee"):
+            chrgs_inf = etree.SubElement(cdt_trf_tx_inf[0], f"{{{pacs008_ns}}}ChrgsInf")
+            amt = etree.SubElement(chrgs_inf, f"{{{pacs008_ns}}}Amt")
+            amt.set("Ccy", quote_data.get("dest_currency", "USD"))
+            amt.text = str(quote_data["destination_psp_fee"])
             
-            # Add Source PSP Deducted Fee (if available)
-            if quote_data.get("source_psp_fee"):
-                chrgs_inf_src = etree.SubElement(cdt_trf_tx_inf[0], f"{{{pacs008_ns}}}ChrgsInf")
-                amt_src = etree.SubElement(chrgs_inf_src, f"{{{pacs008_ns}}}Amt")
-                amt_src.set("Ccy", quote_data.get("source_currency", "USD"))
-                amt_src.text = str(quote_data["source_psp_fee"])
-                
-                # Agent element - Source PSP (Debtor Agent)
-                agt_src = etree.SubElement(chrgs_inf_src, f"{{{pacs008_ns}}}Agt")
-                fin_instn_id_src = etree.SubElement(agt_src, f"{{{pacs008_ns}}}FinInstnId")
-                bicfi_src = etree.SubElement(fin_instn_id_src, f"{{{pacs008_ns}}}BICFI")
-                bicfi_src.text = quote_data.get("source_psp_bic", "UNKNOWN")
+            # Agent element - Destination PSP (Creditor Agent)
+            agt = etree.SubElement(chrgs_inf, f"{{{pacs008_ns}}}Agt")
+            fin_instn_id = etree.SubElement(agt, f"{{{pacs008_ns}}}FinInstnId")
+            bicfi = etree.SubElement(fin_instn_id, f"{{{pacs008_ns}}}BICFI")
+            bicfi.text = quote_data.get("dest_psp_bic", "UNKNOWN")
+        
+        # Add Source PSP Deducted Fee (if available)
+        if quote_data.get("source_psp_fee"):
+            chrgs_inf_src = etree.SubElement(cdt_trf_tx_inf[0], f"{{{pacs008_ns}}}ChrgsInf")
+            amt_src = etree.SubElement(chrgs_inf_src, f"{{{pacs008_ns}}}Amt")
+            amt_src.set("Ccy", quote_data.get("source_currency", "USD"))
+            amt_src.text = str(quote_data["source_psp_fee"])
             
+            # Agent element - Source PSP (Debtor Agent)
+            agt_src = etree.SubElement(chrgs_inf_src, f"{{{pacs008_ns}}}Agt")
+            fin_instn_id_src = etree.SubElement(agt_src, f"{{{pacs008_ns}}}FinInstnId")
+            bicfi_src = etree.SubElement(fin_instn_id_src, f"{{{pacs008_ns}}}BICFI")
+            bicfi_src.text = quote_data.get("source_psp_bic", "UNKNOWN")
+
+
+def transform_pacs008(xml_content: str, quote_data: dict) -> str:
+    """
+    Transform pacs.008 XML for Destination IPS routing.
+    
+    String-in/string-out wrapper around apply_pacs008_transform() for callers
+    that do not hold a parsed tree.
+    """
+    try:
+        root = etree.fromstring(xml_content.encode())
+        apply_pacs008_transform(root, quote_data)
         return etree.tostring(root, encoding='unicode', pretty_print=True)
     except Exception as e:
         return xml_content  # Fallback for simplified XML
@@ -242,12 +249,20 @@ def transform_pacs008(xml_content: str, quote_data: dict) -> str:
 # Validation Functions
 # =============================================================================
 
-async def validate_pacs008(parsed: dict, db: AsyncSession) -> PaymentValidationResult:
+async def validate_pacs008(
+    parsed: ExtractedRecord,
+    db: AsyncSession,
+    claim_keys: bool = True
+) -> PaymentValidationResult:
     """
     Validate pacs.008 against Nexus requirements.
     
     SANDBOX MODE: Validation is lenient - logs warnings but allows processing.
     
+    A valid payment claims its duplicate-detection keys on the session
+    (uncommitted); pass claim_keys=False for payments that will be rejected
+    regardless (demo scenarios).
+    
     Reference: https://docs.nexusglobalpayments.org/payment-processing/validations-duplicates-and-fraud
     """
     errors = []
@@ -286,25 +301,10 @@ async def validate_pacs008(parsed: dict, db: AsyncSession) -> PaymentValidationR
     quote = None  # Initialize to prevent UnboundLocalError when quote_id is not provided
     if quote_id:
         logger.info(f"Sandbox mode: accepting quote {quote_id} without strict validation")
-        quote_query = text("""
-            SELECT 
-                q.quote_id, q.final_rate as exchange_rate, q.expires_at,
-                q.fxp_id, q.source_currency, q.destination_currency,
-                source_sap.bic as source_sap_bic,
-                dest_sap.bic as dest_sap_bic,
-                ips.clearing_system_id as dest_ips_code
-            FROM quotes q
-            LEFT JOIN fxp_sap_accounts source_acc ON q.fxp_id = source_acc.fxp_id AND q.source_currency = source_acc.currency_code
-            LEFT JOIN saps source_sap ON source_acc.sap_id = source_sap.sap_id
-            LEFT JOIN fxp_sap_accounts dest_acc ON q.fxp_id = dest_acc.fxp_id AND q.destination_currency = dest_acc.currency_code
-            LEFT JOIN saps dest_sap ON dest_acc.sap_id = dest_sap.sap_id
-            LEFT JOIN ips_operators ips ON q.destination_country = ips.country_code
-            WHERE q.quote_id = :quote_id
-        """)
         
+        # Routing snapshot captured at quote creation (cached by quote_id)
         try:
-            result = await db.execute(quote_query, {"quote_id": quote_id})
-            quote = result.fetchone()
+            quote = await get_quote_routing(db, quote_id)
         except Exception as e:
             logger.warning(f"Quote lookup failed for {quote_id}: {e}")
             quote = None
@@ -396,14 +396,25 @@ async def validate_pacs008(parsed: dict, db: AsyncSession) -> PaymentValidationR
         except:
             pass
     
-    # 5. Duplicate check
-    if uetr:
-        dup_query = text("SELECT COUNT(*) FROM payments WHERE uetr = :uetr AND status != 'RJCT'")
-        dup_result = await db.execute(dup_query, {"uetr": uetr})
-        dup_count = dup_result.scalar()
-        if dup_count and dup_count > 0:
+    # 5. Duplicate check (UETR, MsgId, EndToEndId) - see dedup.py
+    # A payment that passes every other check claims its keys in the current
+    # transaction, so it commits with the payment's unit of work.
+    detector = get_duplicate_detector()
+    dedup_keys = detector.keys_for(parsed, uetr)
+    if claim_keys and not errors:
+        duplicates = await detector.claim(db, uetr, dedup_keys)
+    else:
+        duplicates = await detector.check(db, dedup_keys)
+    for key_type in duplicates:
+        if key_type == "UETR":
             errors.append(f"Duplicate UETR: {uetr} already exists")
             status_reason = "DUPL"
+        elif key_type == "MSGID":
+            errors.append(f"Duplicate MsgId: {parsed.get('messageId')} already used by this PSP")
+            status_reason = "DUPL"
+        else:
+            errors.append(f"Duplicate EndToEndId: {parsed.get('endToEndId')} already used by this PSP")
+            status_reason = DU01
     
     return PaymentValidationResult(
         valid=len(errors) == 0,
@@ -640,18 +651,19 @@ async def process_pacs008(
     """
     processed_at = datetime.now(timezone.utc)
     
-    # Get raw XML body
+    # Get raw XML body and parse it once for validation, extraction and transform
     try:
         body = await request.body()
-        xml_content = body.decode('utf-8')
+        message = await MessagePipeline.load(body, "pacs.008")
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Failed to read XML body: {str(e)}"
         )
+    xml_content = message.xml_content
     
     # Step 1: XSD Schema Validation
-    xsd_result = xsd_validation.validate_pacs008(xml_content)
+    xsd_result = await message.validate_async()
     if not xsd_result.valid:
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or str(uuid4())
         await store_payment_event(
@@ -671,13 +683,21 @@ async def process_pacs008(
     
     # Step 2: Parse XML
     try:
-        parsed = parse_pacs008(xml_content)
+        parsed = message.extract(parse_pacs008)
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid pacs.008 XML: {str(e)}"
         )
     
+    # A payment references its quote (payments.quote_id FK): write the quote
+    # from the quote store to the quotes table. Commits with the payment row.
+    # A quote with no row (unknown, or gone from the store unused) is not
+    # referenced; validation rejects the payment.
+    payment_quote_id = None
+    if parsed.get("quoteId") and await persist_quote(db, parsed["quoteId"]) is not None:
+        payment_quote_id = parsed["quoteId"]
+    
     # Demo Scenario Injection
     # Per Nexus spec: rejected payments still go through the reservation lifecycle.
     # The IPS creates a reservation at the SAP, then cancels it upon rejection.
@@ -698,11 +718,25 @@ async def process_pacs008(
         
         uetr = parsed.get("uetr") or str(uuid4())
         
+        # Queue the pacs.002 callback; it commits with the RJCT payment row
+        if pacs002_endpoint:
+            await enqueue_pacs002_callback(
+                db,
+                callback_url=pacs002_endpoint,
+                uetr=uetr,
+                status="RJCT",
+                reason_code=scenario_reason,
+                additional_info=reason_desc,
+                currency=parsed.get("settlementCurrency", "USD"),
+                amount=str(parsed.get("settlementAmount", "0.00")),
+                commit=False
+            )
+        
         # Step 1: Store payment as RJCT
         await store_payment(
             db=db,
             uetr=uetr,
-            quote_id=parsed.get("quoteId"),
+            quote_id=payment_quote_id,
             source_psp_bic=parsed.get("debtorAgentBic"),
             destination_psp_bic=parsed.get("creditorAgentBic"),
             debtor_name=parsed.get("debtorName", "Demo Sender"),
@@ -718,7 +752,7 @@ async def process_pacs008(
         
         # Step 2: Validate to get quote_data (SAP/FXP info) for reservation
         # Even though we're rejecting, we need this data to create the reservation
-        demo_validation = await validate_pacs008(parsed, db)
+        demo_validation = await validate_pacs008(parsed, db, claim_keys=False)
         
         # Step 3: Create reservation at SAP then immediately cancel it
         # Per Nexus spec: "In case of a reject, the IPS will release the reservation
@@ -821,25 +855,6 @@ async def process_pacs008(
             pacs002_xml=pacs002_xml
         )
 
-        # Trigger callback for demo scenario rejection
-        if pacs002_endpoint:
-            try:
-                from ..callbacks import schedule_pacs002_delivery
-                import asyncio
-
-                asyncio.create_task(schedule_pacs002_delivery(
-                    callback_url=pacs002_endpoint,
-                    uetr=uetr,
-                    status="RJCT",
-                    reason_code=scenario_reason,
-                    additional_info=reason_desc,
-                    currency=parsed.get("settlementCurrency", "USD"),
-                    amount=str(parsed.get("settlementAmount", "0.00"))
-                ))
-                logger.info(f"Scheduled demo rejection callback for UETR {uetr}")
-            except Exception as e:
-                logger.error(f"Failed to schedule demo callback for UETR {uetr}: {e}")
-
         raise HTTPException(
             status_code=422,
             detail={
@@ -857,10 +872,24 @@ async def process_pacs008(
     validation = await validate_pacs008(parsed, db)
     
     if not validation.valid:
+        # Queue the pacs.002 callback; it commits with the RJCT payment row
+        if pacs002_endpoint:
+            await enqueue_pacs002_callback(
+                db,
+                callback_url=pacs002_endpoint,
+                uetr=validation.uetr,
+                status="RJCT",
+                reason_code=validation.statusReasonCode,
+                additional_info=validation.errors[0] if validation.errors else "Validation failed",
+                currency=parsed.get("settlementCurrency", "USD"),
+                amount=str(parsed.get("settlementAmount", "0.00")),
+                commit=False
+            )
+        
         await store_payment(
             db=db,
             uetr=validation.uetr,
-            quote_id=parsed.get("quoteId"),
+            quote_id=payment_quote_id,
             source_psp_bic=parsed.get("debtorAgentBic"),
             destination_psp_bic=parsed.get("creditorAgentBic"),
             debtor_name=parsed.get("debtorName", "Unknown"),
@@ -894,25 +923,6 @@ async def process_pacs008(
             pacs002_xml=pacs002_xml
         )
 
-        # Trigger callback delivery for rejected payment
-        if pacs002_endpoint:
-            try:
-                from ..callbacks import schedule_pacs002_delivery
-                import asyncio
-
-                asyncio.create_task(schedule_pacs002_delivery(
-                    callback_url=pacs002_endpoint,
-                    uetr=validation.uetr,
-                    status="RJCT",
-                    reason_code=validation.statusReasonCode,
-                    additional_info=validation.errors[0] if validation.errors else "Validation failed",
-                    currency=parsed.get("settlementCurrency", "USD"),
-                    amount=str(parsed.get("settlementAmount", "0.00"))
-                ))
-                logger.info(f"Scheduled pacs.002 rejection callback for UETR {validation.uetr}")
-            except Exception as e:
-                logger.error(f"Failed to schedule rejection callback for UETR {validation.uetr}: {e}")
-
         raise HTTPException(
             status_code=422,
             detail={
@@ -924,11 +934,13 @@ async def process_pacs008(
             }
         )
     
-    # Store accepted payment
+    # Store accepted payment. The payment row, lifecycle events and SAP
+    # reservation/settlement writes form one unit of work with a single commit
+    uow = UnitOfWork(db, f"pacs.008 {validation.uetr}")
     await store_payment(
         db=db,
         uetr=validation.uetr,
-        quote_id=parsed.get("quoteId"),
+        quote_id=payment_quote_id,
         source_psp_bic=parsed.get("debtorAgentBic"),
         destination_psp_bic=parsed.get("creditorAgentBic"),
         debtor_name=parsed.get("debtorName", "Unknown"),
@@ -939,7 +951,8 @@ async def process_pacs008(
         destination_currency=parsed.get("instructedCurrency", "XXX"),
         source_amount=parsed.get("settlementAmount"),
         exchange_rate=parsed.get("exchangeRate"),
-        status="ACSC"
+        status="ACSC",
+        commit=False
     )
     
     # ==========================================================================
@@ -961,7 +974,8 @@ async def process_pacs008(
             "debtorName": parsed.get("debtorName", "Unknown"),
             "amount": str(parsed.get("settlementAmount", "0")),
             "currency": parsed.get("settlementCurrency", "USD"),
-        }
+        },
+        commit=False
     )
     
     # Event 2: Source IPS — ensures settlement certainty (reservation or prefund)
@@ -973,7 +987,8 @@ async def process_pacs008(
         data={
             "step": 2,
             "message": "Source IPS ensures settlement certainty (funds reservation on S-PSP prefund)",
-        }
+        },
+        commit=False
     )
     
     # Event 3–4: Source SAP + camt.103 CreateReservation — lock source-currency FXP nostro
@@ -1017,7 +1032,8 @@ async def process_pacs008(
                 "expiresInSeconds": 300,
                 "message": f"camt.103 CreateReservation → Source SAP ({source_sap_bic}) locks {source_currency_val} {source_amount_val} on FXP nostro"
             },
-            camt103_xml=source_camt103_xml
+            camt103_xml=source_camt103_xml,
+            commit=False
         )
         
         # Dest leg
@@ -1044,6 +1060,7 @@ async def process_pacs008(
             currency=dest_currency,
             amount=dest_amount,
             uetr=validation.uetr,
+            commit=False,
         )
         
         if reservation_id:
@@ -1065,7 +1082,8 @@ async def process_pacs008(
                     "expiresInSeconds": 300,
                     "message": f"camt.103 CreateReservation → Dest SAP ({dest_sap}) locks {dest_currency} {dest_amount} on FXP nostro"
                 },
-                camt103_xml=dest_camt103_xml
+                camt103_xml=dest_camt103_xml,
+                commit=False
             )
         else:
             await store_payment_event(
@@ -1077,7 +1095,8 @@ async def process_pacs008(
                     "reason": "No matching FXP nostro account at Dest SAP (sandbox graceful fallback)",
                     "sapBic": dest_sap,
                     "fxpId": validation.quote_data["fxp_id"]
-                }
+                },
+                commit=False
             )
     
     # Check for NexusOrgnlUETR
@@ -1097,7 +1116,8 @@ async def process_pacs008(
                     "returnUetr": validation.uetr,
                     "message": f"Return payment linked to original payment {original_uetr}",
                     "nexusOrgnlUetrFound": True
-                }
+                },
+                commit=False
             )
     
     # Transformation Logic
@@ -1113,7 +1133,9 @@ async def process_pacs008(
             "dest_ips_code": "FAST"
         }
     
-    transformed_xml = transform_pacs008(xml_content, quote_data)
+    # Agent swap is applied to the shared tree; the forwarded message is only
+    # serialized if message.forwarded_xml is read
+    message.transform(apply_pacs008_transform, quote_data)
     
     pacs002_xml = build_pacs002_acceptance(
         uetr=validation.uetr,
@@ -1146,7 +1168,8 @@ async def process_pacs008(
         },
         pacs008_xml=xml_content,
         pacs002_xml=pacs002_xml,
-        camt054_xml=camt054_xml
+        camt054_xml=camt054_xml,
+        commit=False
     )
     
     # Event 6: Dest IPS forwards to Dest PSP
@@ -1159,7 +1182,8 @@ async def process_pacs008(
             "step": 6,
             "message": f"Dest IPS forwards payment to Dest PSP ({creditor_bic}) for crediting",
             "destPspBic": creditor_bic,
-        }
+        },
+        commit=False
     )
     
     # Event 7: Dest PSP credits recipient
@@ -1172,7 +1196,8 @@ async def process_pacs008(
             "step": 7,
             "message": f"Dest PSP ({creditor_bic}) credits recipient account",
             "creditorName": parsed.get("creditorName", "Unknown"),
-        }
+        },
+        commit=False
     )
     
     # Event 8: pacs.002 ACCC — settlement confirmed
@@ -1187,7 +1212,8 @@ async def process_pacs008(
             "status": "ACCC",
             "message": "pacs.002 ACCC received — settlement confirmed",
         },
-        pacs002_xml=pacs002_xml
+        pacs002_xml=pacs002_xml,
+        commit=False
     )
 
     # Event 9-10: Settlement — reservations UTILIZED
@@ -1212,6 +1238,7 @@ async def process_pacs008(
         source_currency=source_currency_settle,
         source_amount=source_amount_settle,
         fxp_id=fxp_id_settle,
+        commit=False,
     )
     if settled:
         # Event 9: Source SAP reservation UTILIZED
@@ -1226,7 +1253,8 @@ async def process_pacs008(
                 "trigger": "pacs.002 ACCC",
                 "message": f"Source SAP reservation UTILIZED — FXP source-currency nostro debited (settlement finalized)",
                 "sourceLeg": f"{source_amount_settle} {source_currency_settle} at {source_sap_bic_settle}" if source_sap_bic_settle else None,
-            }
+            },
+            commit=False
         )
         # Event 10: Dest SAP reservation UTILIZED
         await store_payment_event(
@@ -1239,28 +1267,29 @@ async def process_pacs008(
                 "leg": "DESTINATION",
                 "trigger": "pacs.002 ACCC",
                 "message": "Dest SAP reservation UTILIZED — FXP dest-currency nostro debited (settlement finalized)",
-            }
+            },
+            commit=False
         )
-    # Trigger callback delivery for accepted payment
-    # This implements the callback mechanism per Nexus specification
+
+    # pacs.002 callback per Nexus specification: written to the outbox in the
+    # same unit of work, delivered by the outbox dispatchers once committed
     if pacs002_endpoint:
-        try:
-            from ..callbacks import schedule_pacs002_delivery
-            import asyncio
+        await enqueue_pacs002_callback(
+            db,
+            callback_url=pacs002_endpoint,
+            uetr=validation.uetr,
+            status="ACCC",
+            reason_code=None,
+            additional_info="Payment accepted and forwarded to destination IPS",
+            currency=parsed.get("settlementCurrency", "USD"),
+            amount=str(parsed.get("settlementAmount", "0.00")),
+            commit=False
+        )
 
-            # Schedule callback delivery asynchronously (don't wait for it)
-            asyncio.create_task(schedule_pacs002_delivery(
-                callback_url=pacs002_endpoint,
-                uetr=validation.uetr,
-                status="ACCC",
-                reason_code=None,
-                additional_info="Payment accepted and forwarded to destination IPS",
-                currency=parsed.get("settlementCurrency", "USD"),
-                amount=str(parsed.get("settlementAmount", "0.00"))
-            ))
-            logger.info(f"Scheduled pacs.002 callback for UETR {validation.uetr} to {pacs002_endpoint}")
-        except Exception as e:
-            logger.error(f"Failed to schedule callback for UETR {validation.uetr}: {e}")
+    # Single commit for the whole happy path, including the callback
+    await uow.commit()
+    detector = get_duplicate_detector()
+    detector.remember(validation.uetr, detector.keys_for(parsed, validation.uetr))
 
     return Pacs008Response(
         uetr=validation.uetr,
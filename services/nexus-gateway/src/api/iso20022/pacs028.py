@@ -38,7 +38,7 @@ async def process_pacs028(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_pacs028(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "pacs.028")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -41,7 +41,7 @@ async def process_pain001(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_pain001(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "pain.001")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
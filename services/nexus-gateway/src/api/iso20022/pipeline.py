@@ -0,0 +1,139 @@
+"""
+Parse-once ISO 20022 Message Pipeline
+
+Holds a single lxml tree for an inbound message so that XSD validation,
+field extraction and agent-swap transformation all operate on the same
+parse. The forwarded message is serialized lazily, at most once, and only
+when a caller actually asks for it.
+
+Used by the pacs.008 handler, which previously parsed the request body
+three times (validation, extraction, transformation) per payment. The
+handler uses load() and validate_async() so parsing and XSD validation
+run on the XML executor instead of the event loop.
+"""
+
+from typing import Callable, Optional
+from lxml import etree
+import logging
+
+from .. import validation as xsd_validation
+from ..structural_validation import validate_inbound_document
+from ..xml_executor import get_xml_executor
+
+logger = logging.getLogger(__name__)
+
+
+class MessagePipeline:
+    """
+    Single-parse processing pipeline for one ISO 20022 message.
+
+    Usage:
+        message = await MessagePipeline.load(body, "pacs.008")
+        xsd_result = await message.validate_async()
+        parsed = parse_pacs008(message.root)
+        message.transform(apply_pacs008_transform, quote_data)
+        forwarded = message.forwarded_xml  # serialized on first access only
+    """
+
+    def __init__(self, body: bytes, msg_type: str):
+        """
+        Decode and parse the raw message body once.
+
+        Args:
+            body: Raw request body
+            msg_type: Message type (e.g., "pacs.008")
+
+        Raises:
+            UnicodeDecodeError: If the body is not valid UTF-8
+        """
+        self.body = body
+        self.msg_type = msg_type
+        # Decoded text is kept for forensic event storage (payment_events)
+        self.xml_content = body.decode('utf-8')
+        self.root: Optional[etree._Element] = None
+        self.syntax_error: Optional[str] = None
+        self._validation: Optional[xsd_validation.ValidationResult] = None
+        self._transformed = False
+        self._forwarded_xml: Optional[str] = None
+
+        try:
+            self.root = xsd_validation.parse_secure(body)
+        except etree.XMLSyntaxError as e:
+            self.syntax_error = str(e)
+
+    @classmethod
+    async def load(cls, body: bytes, msg_type: str) -> "MessagePipeline":
+        """Decode and parse on the XML executor (see __init__)."""
+        return await get_xml_executor().run(msg_type, cls, body, msg_type)
+
+    @property
+    def is_well_formed(self) -> bool:
+        """True if the body parsed into an XML tree."""
+        return self.root is not None
+
+    def validate(self) -> xsd_validation.ValidationResult:
+        """
+        Validate the parsed tree (cached).
+        
+        Uses the configured inbound validation mode: full XSD, Nexus
+        structural fast path, or both on a sample (see structural_validation).
+        """
+        if self._validation is None:
+            if self.root is None:
+                self._validation = xsd_validation.ValidationResult(
+                    valid=False,
+                    message_type=self.msg_type,
+                    errors=[f"XML syntax error: {self.syntax_error}"]
+                )
+            else:
+                self._validation = validate_inbound_document(self.root, self.msg_type)
+        return self._validation
+
+    async def validate_async(self) -> xsd_validation.ValidationResult:
+        """validate() on the XML executor."""
+        if self._validation is not None:
+            return self._validation
+        return await get_xml_executor().run(self.msg_type, self.validate)
+
+    def extract(self, extractor: Callable[[etree._Element], dict]) -> dict:
+        """
+        Run a field extractor against the shared tree.
+
+        Raises:
+            ValueError: If the message is not well-formed XML
+        """
+        if self.root is None:
+            raise ValueError(f"Failed to parse {self.msg_type}: {self.syntax_error}")
+        return extractor(self.root)
+
+    def transform(self, transformer: Callable[..., None], *args) -> bool:
+        """
+        Apply an in-place transformation to the shared tree.
+
+        Must be called after extraction, since the tree is mutated. If the
+        transformer fails the original message is forwarded unchanged
+        (sandbox fallback for simplified XML).
+
+        Returns:
+            True if the transformation was applied
+        """
+        if self.root is None:
+            return False
+        try:
+            transformer(self.root, *args)
+        except Exception as e:
+            logger.warning(f"{self.msg_type} transformation skipped: {e}")
+            self._transformed = False
+            return False
+        self._transformed = True
+        self._forwarded_xml = None
+        return True
+
+    @property
+    def forwarded_xml(self) -> str:
+        """Message to forward downstream, serialized once on first access."""
+        if not self._transformed:
+            return self.xml_content
+        if self._forwarded_xml is None:
+            self._forwarded_xml = etree.tostring(self.root, encoding='unicode', pretty_print=True)
+        return self._forwarded_xml
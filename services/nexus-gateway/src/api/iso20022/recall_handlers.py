@@ -18,8 +18,10 @@ import logging
 
 from ...db import get_db
 from .. import validation as xsd_validation
+from ..xml_executor import run_xml
 from ..schemas import Camt056Response, Camt029Response
 from .utils import store_payment_event
+from .extraction import MessageExtractor
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -29,6 +31,16 @@ logger = logging.getLogger(__name__)
 # XML Extraction Helpers
 # =============================================================================
 
+CAMT056_EXTRACTOR = MessageExtractor("Camt056Record", {
+    # OrgnlUETR in the Undrlyg/TxInf section, original message ID as last resort
+    "originalUetr": (".//OrgnlUETR", ".//Undrlyg/TxInf/OrgnlUETR", ".//OrgnlGrpInf/OrgnlMsgId"),
+})
+
+CAMT029_EXTRACTOR = MessageExtractor("Camt029Record", {
+    "recallReference": (".//CxlStsId", ".//RslvdCase/Id", ".//Assgnmt/Id", ".//OrgnlGrpInf/OrgnlMsgId"),
+})
+
+
 def _extract_original_uetr_from_camt056(xml_content: str) -> str:
     """Extract OrgnlUETR from camt.056 XML document.
     
@@ -36,25 +48,7 @@ def _extract_original_uetr_from_camt056(xml_content: str) -> str:
     """
     try:
         root = etree.fromstring(xml_content.encode())
-        ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:camt.056.001.11'}
-        
-        # Try namespaced paths
-        for xpath in [
-            './/doc:OrgnlUETR',
-            './/doc:Undrlyg/doc:TxInf/doc:OrgnlUETR',
-            './/doc:OrgnlGrpInf/doc:OrgnlMsgId',
-        ]:
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        # Fallback without namespace
-        for xpath in ['.//OrgnlUETR', './/Undrlyg/TxInf/OrgnlUETR']:
-            elements = root.xpath(xpath)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        return f"UNKNOWN-{uuid4().hex[:8]}"
+        return CAMT056_EXTRACTOR.extract(root).originalUetr or f"UNKNOWN-{uuid4().hex[:8]}"
     except Exception:
         return f"UNKNOWN-{uuid4().hex[:8]}"
 
@@ -67,26 +61,7 @@ def _extract_recall_id_from_camt029(xml_content: str) -> str:
     """
     try:
         root = etree.fromstring(xml_content.encode())
-        ns = {'doc': 'urn:iso:std:iso:20022:tech:xsd:camt.029.001.13'}
-        
-        # Try namespaced paths for recall reference
-        for xpath in [
-            './/doc:CxlStsId',
-            './/doc:RslvdCase/doc:Id',
-            './/doc:Assgnmt/doc:Id',
-            './/doc:OrgnlGrpInf/doc:OrgnlMsgId',
-        ]:
-            elements = root.xpath(xpath, namespaces=ns)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        # Fallback without namespace
-        for xpath in ['.//CxlStsId', './/RslvdCase/Id', './/Assgnmt/Id']:
-            elements = root.xpath(xpath)
-            if elements and elements[0].text:
-                return elements[0].text
-        
-        return f"UNKNOWN-{uuid4().hex[:8]}"
+        return CAMT029_EXTRACTOR.extract(root).recallReference or f"UNKNOWN-{uuid4().hex[:8]}"
     except Exception:
         return f"UNKNOWN-{uuid4().hex[:8]}"
 
@@ -125,7 +100,7 @@ async def process_camt056(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_camt056(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "camt.056")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -146,7 +121,7 @@ async def process_camt056(
         )
     
     # Extract original UETR from parsed XML
-    original_uetr = _extract_original_uetr_from_camt056(xml_content)
+    original_uetr = await run_xml("camt.056", _extract_original_uetr_from_camt056, xml_content)
     logger.info(f"camt.056 recall request received for original UETR: {original_uetr}")
     
     # Store recall event for audit trail
@@ -201,7 +176,7 @@ async def process_camt029(
         raise HTTPException(status_code=400, detail=f"Failed to read XML: {str(e)}")
     
     # XSD Validation
-    xsd_result = xsd_validation.validate_camt029(xml_content)
+    xsd_result = await xsd_validation.validate_xml_async(xml_content, "camt.029")
     if not xsd_result.valid:
         # Forensic Logging
         failed_uetr = xsd_validation.safe_extract_uetr(xml_content) or f"UNKNOWN-{uuid4().hex[:8]}"
@@ -222,7 +197,7 @@ async def process_camt029(
         )
     
     # Extract recall reference from parsed XML
-    recall_ref = _extract_recall_id_from_camt029(xml_content)
+    recall_ref = await run_xml("camt.029", _extract_recall_id_from_camt029, xml_content)
     logger.info(f"camt.029 resolution received for recall: {recall_ref}")
     
     # Store resolution event for audit trail
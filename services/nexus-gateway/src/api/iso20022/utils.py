@@ -9,7 +9,43 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from decimal import Decimal
 from typing import Optional
-import json
+from opentelemetry import trace
+import logging
+
+from .event_writer import MESSAGE_COLUMNS, encode_event_data, get_event_writer, next_occurred_at
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Unit of Work
+# =============================================================================
+
+class UnitOfWork:
+    """
+    Single-commit transaction scope for a multi-step message flow.
+
+    Writers called with commit=False (store_payment, store_payment_event and
+    the SAP *_for_payment helpers) leave their writes in the session's open
+    transaction; the flow then calls commit() once. This replaces the
+    commit-per-write pattern, which cost one COMMIT (and WAL flush) for the
+    payment row, every lifecycle event and each reservation step.
+
+    The number of commits issued is recorded on the current trace span as
+    nexus.db.commits so the per-payment figure can be observed.
+    """
+
+    def __init__(self, db: AsyncSession, name: str):
+        self.db = db
+        self.name = name
+        self.commits = 0
+
+    async def commit(self) -> None:
+        """Commit everything written since the last commit."""
+        await self.db.commit()
+        self.commits += 1
+        trace.get_current_span().set_attribute("nexus.db.commits", self.commits)
+        logger.debug(f"{self.name}: commit {self.commits}")
 
 
 async def store_payment(
@@ -26,9 +62,14 @@ async def store_payment(
     destination_currency: str,
     source_amount: str,
     exchange_rate: Optional[str],
-    status: str
+    status: str,
+    commit: bool = True
 ):
-    """Store payment record matching schema."""
+    """
+    Store payment record matching schema.
+
+    Pass commit=False when the write is part of a UnitOfWork.
+    """
     query = text("""
         INSERT INTO payments (
             uetr, quote_id, source_psp_bic, destination_psp_bic,
@@ -61,7 +102,8 @@ async def store_payment(
         "exchange_rate": Decimal(exchange_rate) if exchange_rate else None,
         "status": status,
     })
-    await db.commit()
+    if commit:
+        await db.commit()
 
 
 async def store_payment_event(
@@ -80,9 +122,31 @@ async def store_payment_event(
     pacs004_xml: str = None,
     pacs028_xml: str = None,
     camt056_xml: str = None,
-    camt029_xml: str = None
+    camt029_xml: str = None,
+    commit: bool = True
 ):
-    """Store payment event with actor details and optional ISO 20022 messages."""
+    """
+    Store payment event with actor details and optional ISO 20022 messages.
+
+    Stand-alone events (commit=True) are handed to the write-behind
+    PaymentEventWriter when it is running; db is then unused. Events that
+    are part of a UnitOfWork (commit=False), or written while the writer is
+    stopped, are inserted on the given session, so they commit or roll back
+    with it. Both paths stamp occurred_at from next_occurred_at(), so
+    write-behind and unit-of-work events share one strictly increasing clock
+    (NOW() would tie every event written in one transaction).
+    """
+    messages = dict(zip(MESSAGE_COLUMNS, (
+        pacs008_xml, pacs002_xml, acmt023_xml, acmt024_xml, camt054_xml,
+        camt103_xml, pain001_xml, pacs004_xml, pacs028_xml, camt056_xml,
+        camt029_xml,
+    )))
+
+    writer = get_event_writer()
+    if commit and writer.accepting:
+        await writer.enqueue(uetr, event_type, actor, data, messages)
+        return
+
     query = text("""
         INSERT INTO payment_events (
             event_id, uetr, event_type, actor, data, version, occurred_at,
@@ -90,7 +154,7 @@ async def store_payment_event(
             camt054_message, camt103_message, pain001_message,
             pacs004_message, pacs028_message, camt056_message, camt029_message
         ) VALUES (
-            gen_random_uuid(), :uetr, :event_type, :actor, :data, 1, NOW(),
+            gen_random_uuid(), :uetr, :event_type, :actor, :data, 1, :occurred_at,
             :pacs008_message, :pacs002_message, :acmt023_message, :acmt024_message,
             :camt054_message, :camt103_message, :pain001_message,
             :pacs004_message, :pacs028_message, :camt056_message, :camt029_message
@@ -101,17 +165,9 @@ async def store_payment_event(
         "uetr": uetr,
         "event_type": event_type,
         "actor": actor,
-        "data": json.dumps(data),
-        "pacs008_message": pacs008_xml,
-        "pacs002_message": pacs002_xml,
-        "acmt023_message": acmt023_xml,
-        "acmt024_message": acmt024_xml,
-        "camt054_message": camt054_xml,
-        "camt103_message": camt103_xml,
-        "pain001_message": pain001_xml,
-        "pacs004_message": pacs004_xml,
-        "pacs028_message": pacs028_xml,
-        "camt056_message": camt056_xml,
-        "camt029_message": camt029_xml,
+        "data": encode_event_data(data),
+        "occurred_at": next_occurred_at(),
+        **messages,
     })
-    await db.commit()
+    if commit:
+        await db.commit()
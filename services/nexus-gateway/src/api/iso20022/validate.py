@@ -63,7 +63,7 @@ async def validate_message(
             )
     
     # Validate
-    result = xsd_validation.validate_xml(xml_content, message_type)
+    result = await xsd_validation.validate_xml_async(xml_content, message_type)
     
     return ValidationResponse(
         valid=result.valid,
@@ -0,0 +1,537 @@
+"""
+Callback Outbox
+
+Durable delivery of pacs.002 status reports and lifecycle notifications.
+Handlers no longer start fire-and-forget tasks; they write an outbox row in
+the same transaction as the payment status change, and dispatcher workers
+deliver it:
+
+    handler → enqueue_callback() (same commit as the payment)
+            → callback_outbox (migration 007)
+            → OutboxDispatcher workers → delivery engine (delivery.py)
+
+- Durability: a status report exists if and only if the status change
+  committed. A restart loses nothing; pending rows are picked up again.
+- Claiming: each worker claims up to outbox_batch_size due rows with
+  FOR UPDATE SKIP LOCKED and holds them with a lease (claimed_until).
+  Replicas sharing the table never claim the same row while its lease is
+  live, so a row is delivered once unless its worker dies mid-delivery
+  (then it is retried after outbox_lease_seconds: at-least-once).
+- Retries: a failed row is rescheduled with full-jitter exponential
+  backoff by moving available_at; after max_attempts it is marked FAILED
+  and kept for inspection. Retries survive restarts.
+- Retention: DELIVERED rows are deleted by OutboxRetention once older than
+  outbox_retention_hours, in bounded batches, one replica at a time
+  (advisory lock). The backlog query reads only PENDING and FAILED rows
+  (partial index, migration 014).
+- Bounded work: at most outbox_workers × outbox_batch_size deliveries are
+  in progress per process, however fast payments arrive.
+
+Payloads store the builder arguments, not the rendered message; the
+callback is built (and signed with a fresh timestamp) at delivery time.
+
+Configuration (Settings / environment):
+    OUTBOX_ENABLED               run dispatchers in this process (default true)
+    OUTBOX_WORKERS               dispatcher workers (default 2)
+    OUTBOX_BATCH_SIZE            rows claimed per batch (default 50)
+    OUTBOX_POLL_INTERVAL_MS      idle poll interval (default 250)
+    OUTBOX_LEASE_SECONDS         claim lease (default 60)
+    OUTBOX_MAX_ATTEMPTS          attempts before FAILED (default 8)
+    OUTBOX_RETRY_BASE_SECONDS    backoff base (default 2)
+    OUTBOX_RETRY_MAX_SECONDS     backoff cap (default 300)
+    OUTBOX_RETENTION_HOURS       keep DELIVERED rows this long (default 72)
+    OUTBOX_PURGE_INTERVAL_SECONDS time between retention runs (default 300)
+    OUTBOX_PURGE_BATCH_SIZE      rows deleted per batch transaction (default 1000)
+    OUTBOX_PURGE_MAX_BATCHES     batches per retention run (default 20)
+"""
+
+from collections import deque
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+
+import orjson
+
+from ..config import settings
+from ..db import async_session_maker
+from .background import (
+    AdvisoryLock, BackgroundWorker, PeriodicWorker, WorkerSingleton, try_advisory_lock,
+)
+from .callbacks import build_fxp_trade_request, build_pacs002_callback_request
+from .delivery import DeliveryEngine, DeliveryResult, get_delivery_engine
+
+logger = logging.getLogger(__name__)
+
+# Outbox kinds and the callback builder for each. Builders take
+# (target_url, payload) and return a single-attempt CallbackRequest; the
+# outbox owns retries.
+BUILDERS = {
+    "PACS002": lambda url, p: build_pacs002_callback_request(url, max_retries=1, **p),
+    "FXP_TRADE": lambda url, p: build_fxp_trade_request(url, max_retries=1, **p),
+}
+
+INSERT_SQL = text("""
+    INSERT INTO callback_outbox (kind, uetr, target_url, payload, max_attempts, available_at)
+    VALUES (
+        :kind, CAST(:uetr AS uuid), :target_url, CAST(:payload AS jsonb), :max_attempts,
+        NOW() + make_interval(secs => :delay_seconds)
+    )
+""")
+
+# Claims due rows for one worker. SKIP LOCKED lets concurrent workers (and
+# replicas) take disjoint batches; the lease keeps a claimed row from being
+# claimed again after this statement commits.
+CLAIM_SQL = text("""
+    UPDATE callback_outbox o
+    SET claimed_by = :worker,
+        claimed_until = NOW() + make_interval(secs => :lease_seconds),
+        attempts = o.attempts + 1
+    FROM (
+        SELECT outbox_id
+        FROM callback_outbox
+        WHERE status = 'PENDING'
+          AND available_at <= NOW()
+          AND (claimed_until IS NULL OR claimed_until < NOW())
+        ORDER BY available_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ) due
+    WHERE o.outbox_id = due.outbox_id
+    RETURNING
+        o.outbox_id, o.kind, o.target_url, o.payload, o.attempts, o.max_attempts,
+        EXTRACT(EPOCH FROM (clock_timestamp() - o.available_at)) * 1000 AS lag_ms
+""")
+
+DELIVERED_SQL = text("""
+    UPDATE callback_outbox
+    SET status = 'DELIVERED', delivered_at = NOW(),
+        claimed_by = NULL, claimed_until = NULL,
+        last_status_code = d.status_code, last_error = NULL
+    FROM unnest(CAST(:ids AS bigint[]), CAST(:status_codes AS integer[])) AS d(outbox_id, status_code)
+    WHERE callback_outbox.outbox_id = d.outbox_id
+      AND callback_outbox.claimed_by = :worker
+""")
+
+# Reschedules failed rows, or marks them FAILED once attempts are used up
+RETRY_SQL = text("""
+    UPDATE callback_outbox
+    SET status = CASE WHEN callback_outbox.attempts >= callback_outbox.max_attempts
+                      THEN 'FAILED' ELSE 'PENDING' END,
+        available_at = NOW() + make_interval(secs => f.delay_seconds),
+        claimed_by = NULL, claimed_until = NULL,
+        last_status_code = f.status_code, last_error = f.error
+    FROM unnest(
+        CAST(:ids AS bigint[]), CAST(:delays AS float8[]),
+        CAST(:status_codes AS integer[]), CAST(:errors AS text[])
+    ) AS f(outbox_id, delay_seconds, status_code, error)
+    WHERE callback_outbox.outbox_id = f.outbox_id
+      AND callback_outbox.claimed_by = :worker
+""")
+
+BACKLOG_SQL = text("""
+    SELECT
+        COUNT(*) FILTER (WHERE status = 'PENDING' AND available_at <= NOW()) AS due,
+        COUNT(*) FILTER (WHERE status = 'PENDING' AND available_at > NOW()) AS scheduled,
+        COUNT(*) FILTER (WHERE status = 'PENDING' AND claimed_until > NOW()) AS claimed,
+        COUNT(*) FILTER (WHERE status = 'FAILED') AS failed,
+        EXTRACT(EPOCH FROM (NOW() - MIN(available_at) FILTER (
+            WHERE status = 'PENDING' AND available_at <= NOW()
+        ))) AS oldest_due_seconds
+    FROM callback_outbox
+    WHERE status IN ('PENDING', 'FAILED')
+""")
+
+# Oldest delivered rows past the retention horizon; idx_callback_outbox_delivered
+PURGE_SQL = text("""
+    DELETE FROM callback_outbox o
+    USING (
+        SELECT outbox_id FROM callback_outbox
+        WHERE status = 'DELIVERED'
+          AND delivered_at < NOW() - make_interval(hours => :retention_hours)
+        ORDER BY delivered_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ) batch
+    WHERE o.outbox_id = batch.outbox_id
+    RETURNING o.outbox_id
+""")
+
+
+# =============================================================================
+# Producer side
+# =============================================================================
+
+async def enqueue_callback(
+    db: AsyncSession,
+    kind: str,
+    target_url: str,
+    payload: dict,
+    uetr: Optional[str] = None,
+    delay_seconds: float = 0.0,
+    max_attempts: Optional[int] = None,
+    commit: bool = True,
+) -> None:
+    """
+    Write an outbox row on the caller's session.
+
+    Pass commit=False to commit it with the status change (UnitOfWork or
+    the next store_* call that commits).
+    """
+    if kind not in BUILDERS:
+        raise ValueError(f"Unknown outbox kind: {kind}")
+    await db.execute(INSERT_SQL, {
+        "kind": kind,
+        "uetr": uetr,
+        "target_url": target_url,
+        "payload": orjson.dumps(payload).decode(),
+        "max_attempts": max_attempts or settings.outbox_max_attempts,
+        "delay_seconds": delay_seconds,
+    })
+    if commit:
+        await db.commit()
+
+
+async def enqueue_pacs002_callback(
+    db: AsyncSession,
+    callback_url: str,
+    uetr: str,
+    status: str,
+    reason_code: Optional[str] = None,
+    additional_info: Optional[str] = None,
+    currency: str = "USD",
+    amount: str = "0.00",
+    delay_seconds: float = 0.5,
+    commit: bool = True,
+) -> None:
+    """
+    Queue a pacs.002 status report for the payment's callback endpoint.
+
+    delay_seconds keeps the simulated processing delay of the previous
+    schedule_pacs002_delivery.
+    """
+    await enqueue_callback(
+        db,
+        "PACS002",
+        callback_url,
+        {
+            "uetr": uetr,
+            "status": status,
+            "reason_code": reason_code,
+            "additional_info": additional_info,
+            "currency": currency,
+            "amount": amount,
+        },
+        uetr=uetr,
+        delay_seconds=delay_seconds,
+        commit=commit,
+    )
+
+
+# =============================================================================
+# Dispatcher
+# =============================================================================
+
+class OutboxDispatcher(BackgroundWorker):
+    """
+    Pool of workers draining callback_outbox.
+    """
+
+    name = "outbox-dispatcher"
+    label = "Outbox dispatcher"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        engine: Optional[DeliveryEngine] = None,
+        workers: int = 2,
+        batch_size: int = 50,
+        poll_interval_ms: int = 250,
+        lease_seconds: int = 60,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 300.0,
+    ):
+        super().__init__(tasks=workers)
+        self.session_factory = session_factory
+        self._engine = engine
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self._delivered_at: deque[tuple[float, int]] = deque()  # (monotonic, count)
+        self._stats = {
+            "batches": 0,
+            "claimed": 0,
+            "delivered": 0,
+            "retried": 0,
+            "failed": 0,
+            "claimFailures": 0,
+            "completeFailures": 0,
+            "lastLagMs": 0.0,
+            "maxLagMs": 0.0,
+            "lastBatchMs": 0.0,
+        }
+
+    @property
+    def engine(self) -> DeliveryEngine:
+        return self._engine or get_delivery_engine()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+    #
+    # stop() lets the current batches complete. Rows claimed but not
+    # completed (e.g. on cancellation) keep their lease and are delivered by
+    # whichever worker claims them after it expires.
+
+    def _describe(self) -> str:
+        return (
+            f"{self.workers} workers, batch={self.batch_size}, "
+            f"poll={self.poll_interval * 1000:.0f}ms, lease={self.lease_seconds}s"
+        )
+
+    def _summary(self) -> str:
+        return f"{self._stats['delivered']} delivered, {self._stats['failed']} failed"
+
+    async def _run(self, index: int) -> None:
+        worker = f"{self.instance}:{index}"
+        while not self.stopping:
+            try:
+                processed = await self.run_once(worker)
+            except Exception as e:
+                self._stats["claimFailures"] += 1
+                logger.warning(f"Outbox worker {worker} claim failed: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                # Idle or partial batch: wait for the poll interval (or stop)
+                await self.wait_stopping(self.poll_interval)
+
+    # -------------------------------------------------------------------------
+    # Batches
+    # -------------------------------------------------------------------------
+
+    async def run_once(self, worker: str) -> int:
+        """Claim, deliver and complete one batch; returns rows claimed."""
+        async with self.session_factory() as session:
+            result = await session.execute(CLAIM_SQL, {
+                "worker": worker,
+                "lease_seconds": self.lease_seconds,
+                "batch_size": self.batch_size,
+            })
+            rows = result.fetchall()
+            await session.commit()
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        self._stats["claimed"] += len(rows)
+        lag_ms = max(float(row.lag_ms or 0) for row in rows)
+        self._stats["lastLagMs"] = round(lag_ms, 3)
+        self._stats["maxLagMs"] = max(self._stats["maxLagMs"], self._stats["lastLagMs"])
+
+        results = await asyncio.gather(*(self._deliver(row) for row in rows))
+        try:
+            await self._complete(worker, rows, results)
+        except Exception as e:
+            # Rows stay leased and are retried once the lease expires
+            self._stats["completeFailures"] += 1
+            logger.error(f"Outbox worker {worker} failed to record {len(rows)} results: {e}")
+
+        self._stats["batches"] += 1
+        self._stats["lastBatchMs"] = round((time.perf_counter() - started) * 1000, 3)
+        return len(rows)
+
+    async def _deliver(self, row) -> DeliveryResult:
+        try:
+            payload = row.payload if isinstance(row.payload, dict) else orjson.loads(row.payload)
+            request = BUILDERS[row.kind](row.target_url, payload)
+            return await self.engine.deliver(request)
+        except Exception as e:
+            return DeliveryResult(success=False, attempts=1, error=str(e), error_type=type(e).__name__)
+
+    def _backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff."""
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _complete(self, worker: str, rows, results: list[DeliveryResult]) -> None:
+        """Record a batch's outcomes: one UPDATE for deliveries, one for failures."""
+        delivered = [(row, r) for row, r in zip(rows, results) if r.success]
+        failed = [(row, r) for row, r in zip(rows, results) if not r.success]
+        async with self.session_factory() as session:
+            if delivered:
+                await session.execute(DELIVERED_SQL, {
+                    "worker": worker,
+                    "ids": [row.outbox_id for row, _ in delivered],
+                    "status_codes": [r.status_code for _, r in delivered],
+                })
+            if failed:
+                await session.execute(RETRY_SQL, {
+                    "worker": worker,
+                    "ids": [row.outbox_id for row, _ in failed],
+                    "delays": [self._backoff(row.attempts) for row, _ in failed],
+                    "status_codes": [r.status_code for _, r in failed],
+                    "errors": [
+                        f"HTTP {r.status_code}" if r.status_code else (r.error or "")[:500]
+                        for _, r in failed
+                    ],
+                })
+            await session.commit()
+
+        exhausted = sum(1 for row, _ in failed if row.attempts >= row.max_attempts)
+        self._stats["delivered"] += len(delivered)
+        self._stats["retried"] += len(failed) - exhausted
+        self._stats["failed"] += exhausted
+        self._delivered_at.append((time.monotonic(), len(delivered)))
+        for row, r in failed:
+            if row.attempts >= row.max_attempts:
+                logger.error(
+                    f"Outbox {row.kind} {row.outbox_id} -> {row.target_url} failed "
+                    f"after {row.attempts} attempts: {r.error or r.status_code}"
+                )
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def _throughput(self, window: float = 60.0) -> float:
+        """Deliveries per second over the last window."""
+        horizon = time.monotonic() - window
+        while self._delivered_at and self._delivered_at[0][0] < horizon:
+            self._delivered_at.popleft()
+        return round(sum(n for _, n in self._delivered_at) / window, 3)
+
+    def stats(self) -> dict:
+        """Dispatcher counters for this process."""
+        return {
+            "workers": self.workers,
+            "batchSize": self.batch_size,
+            "deliveredPerSecond": self._throughput(),
+            **super().stats(),
+        }
+
+
+# =============================================================================
+# Retention
+# =============================================================================
+
+class OutboxRetention(PeriodicWorker):
+    """Periodic deletion of delivered callback_outbox rows."""
+
+    name = "outbox-retention"
+    label = "Outbox retention"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        interval_seconds: int = 300,
+        batch_size: int = 1000,
+        max_batches: int = 20,
+        retention_hours: int = 72,
+    ):
+        super().__init__(session_factory, interval_seconds)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.retention_hours = retention_hours
+        self._stats.update({
+            "lockNotAcquired": 0,
+            "batches": 0,
+            "purged": 0,
+            "lastPurged": 0,
+        })
+
+    def _describe(self) -> str:
+        return (
+            f"interval={self.interval}s, batch={self.batch_size}, "
+            f"retention={self.retention_hours}h"
+        )
+
+    async def run(self) -> int:
+        """
+        Delete delivered rows past the retention horizon in bounded batches.
+
+        Returns the rows deleted; the run ends at the first batch that finds
+        the lock held by another replica.
+        """
+        purged = 0
+        for _ in range(self.max_batches):
+            async with self.session_factory() as session:
+                if not await try_advisory_lock(session, AdvisoryLock.OUTBOX_RETENTION):
+                    await session.rollback()
+                    self._stats["lockNotAcquired"] += 1
+                    break
+                rows = (await session.execute(PURGE_SQL, {
+                    "batch_size": self.batch_size,
+                    "retention_hours": self.retention_hours,
+                })).fetchall()
+                await session.commit()
+            self._stats["batches"] += 1
+            purged += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+        self._stats["purged"] += purged
+        self._stats["lastPurged"] = purged
+        if purged:
+            logger.info(f"Outbox retention: {purged} delivered callbacks purged")
+        return purged
+
+    def stats(self) -> dict:
+        """Retention counters for this process."""
+        return {
+            "batchSize": self.batch_size,
+            "retentionHours": self.retention_hours,
+            **super().stats(),
+        }
+
+
+async def get_outbox_backlog(db: AsyncSession) -> dict:
+    """Outbox depth across all replicas (one aggregate query)."""
+    row = (await db.execute(BACKLOG_SQL)).fetchone()
+    return {
+        "due": row.due,
+        "scheduled": row.scheduled,
+        "claimed": row.claimed,
+        "failed": row.failed,
+        "oldestDueSeconds": round(float(row.oldest_due_seconds), 3) if row.oldest_due_seconds is not None else 0.0,
+    }
+
+
+# Singleton dispatcher, started when OUTBOX_ENABLED
+_dispatcher = WorkerSingleton(
+    lambda: OutboxDispatcher(
+        workers=settings.outbox_workers,
+        batch_size=settings.outbox_batch_size,
+        poll_interval_ms=settings.outbox_poll_interval_ms,
+        lease_seconds=settings.outbox_lease_seconds,
+        retry_base_seconds=settings.outbox_retry_base_seconds,
+        retry_max_seconds=settings.outbox_retry_max_seconds,
+    ),
+    enabled=lambda: settings.outbox_enabled,
+)
+get_outbox_dispatcher = _dispatcher.get
+start_outbox_dispatcher = _dispatcher.start
+stop_outbox_dispatcher = _dispatcher.stop
+
+
+# Singleton retention job, started with the dispatcher (OUTBOX_ENABLED)
+_retention = WorkerSingleton(
+    lambda: OutboxRetention(
+        interval_seconds=settings.outbox_purge_interval_seconds,
+        batch_size=settings.outbox_purge_batch_size,
+        max_batches=settings.outbox_purge_max_batches,
+        retention_hours=settings.outbox_retention_hours,
+    ),
+    enabled=lambda: settings.outbox_enabled,
+)
+get_outbox_retention = _retention.get
+start_outbox_retention = _retention.start
+stop_outbox_retention = _retention.stop
@@ -18,6 +18,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
+from .reference_data import get_reference_data
 
 router = APIRouter(prefix="/v1/pdos", tags=["Proxy Directory Operators"])
 
@@ -45,23 +46,9 @@ async def list_pdos(
     
     Reference: https://docs.nexusglobalpayments.org/addressing/role-of-the-pdo
     """
-    if country_code:
-        query = text("""
-            SELECT pdo_id, name, country_code, supported_proxy_types
-            FROM pdos
-            WHERE country_code = :country_code
-            ORDER BY name
-        """)
-        result = await db.execute(query, {"country_code": country_code.upper()})
-    else:
-        query = text("""
-            SELECT pdo_id, name, country_code, supported_proxy_types
-            FROM pdos
-            ORDER BY country_code, name
-        """)
-        result = await db.execute(query)
+    reference = await get_reference_data().get(db)
+    rows = reference.pdos_in_country(country_code) if country_code else reference.pdos
     
-    rows = result.fetchall()
     pdos = [
         PDOResponse(
             pdo_id=row.pdo_id,
@@ -78,16 +65,11 @@ async def list_pdos(
 @router.get("/{pdo_id}", response_model=PDOResponse)
 async def get_pdo(pdo_id: str, db: AsyncSession = Depends(get_db)):
     """Get details of a specific PDO."""
-    query = text("""
-        SELECT pdo_id, name, country_code, supported_proxy_types
-        FROM pdos
-        WHERE pdo_id = CAST(:pdo_id AS uuid)
-    """)
     try:
-        result = await db.execute(query, {"pdo_id": pdo_id})
-        row = result.fetchone()
-    except Exception:
+        pdo_uuid = UUID(pdo_id)
+    except ValueError:
         raise HTTPException(status_code=400, detail="Invalid PDO ID format")
+    row = (await get_reference_data().get(db)).pdo_by_id(str(pdo_uuid))
     
     if not row:
         raise HTTPException(status_code=404, detail=f"PDO with ID {pdo_id} not found")
@@ -116,11 +98,8 @@ async def get_pdo_registrations(
     Reference: https://docs.nexusglobalpayments.org/addressing/masking-of-display-names
     """
     # Get PDO info
-    pdo_query = text("""
-        SELECT name FROM pdos WHERE country_code = :country_code
-    """)
-    pdo_result = await db.execute(pdo_query, {"country_code": country_code.upper()})
-    pdo_row = pdo_result.fetchone()
+    pdos = (await get_reference_data().get(db)).pdos_in_country(country_code)
+    pdo_row = pdos[0] if pdos else None
     
     if not pdo_row:
         raise HTTPException(status_code=404, detail=f"No PDO found for country {country_code}")
@@ -177,11 +156,8 @@ async def get_pdo_stats(country_code: str, db: AsyncSession = Depends(get_db)):
     Returns counts of registrations by proxy type and resolution metrics.
     """
     # Get PDO info
-    pdo_query = text("""
-        SELECT name FROM pdos WHERE country_code = :country_code
-    """)
-    pdo_result = await db.execute(pdo_query, {"country_code": country_code.upper()})
-    pdo_row = pdo_result.fetchone()
+    pdos = (await get_reference_data().get(db)).pdos_in_country(country_code)
+    pdo_row = pdos[0] if pdos else None
     
     if not pdo_row:
         raise HTTPException(status_code=404, detail=f"No PDO found for country {country_code}")
@@ -13,10 +13,10 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
+from .reference_data import get_reference_data
 
 router = APIRouter(prefix="/v1/psps", tags=["Payment Service Providers"])
 
@@ -38,32 +38,18 @@ async def list_psps(
     
     Reference: https://docs.nexusglobalpayments.org/apis/financial-institutions
     """
-    if country_code:
-        query = text("""
-            SELECT psp_id, bic, name, country_code, fee_percent
-            FROM psps
-            WHERE country_code = :country_code
-            ORDER BY name
-        """)
-        result = await db.execute(query, {"country_code": country_code.upper()})
-    else:
-        query = text("""
-            SELECT psp_id, bic, name, country_code, fee_percent
-            FROM psps
-            ORDER BY country_code, name
-        """)
-        result = await db.execute(query)
+    reference = await get_reference_data().get(db)
+    rows = reference.psps_in_country(country_code) if country_code else reference.psps
     
-    rows = result.fetchall()
     psps = [
         PSPResponse(
-            psp_id=row.psp_id,
-            bic=row.bic,
-            name=row.name,
-            country_code=row.country_code,
-            fee_percent=float(row.fee_percent) if row.fee_percent else 0.0
+            psp_id=psp.psp_id,
+            bic=psp.bic,
+            name=psp.name,
+            country_code=psp.country_code,
+            fee_percent=float(psp.fee_percent) if psp.fee_percent else 0.0
         )
-        for row in rows
+        for psp in rows
     ]
     
     return PSPListResponse(psps=psps, total=len(psps))
@@ -76,23 +62,17 @@ async def get_psp(bic: str, db: AsyncSession = Depends(get_db)):
     
     Reference: https://docs.nexusglobalpayments.org/messaging/financial-institution-identification
     """
-    query = text("""
-        SELECT psp_id, bic, name, country_code, fee_percent
-        FROM psps
-        WHERE bic = :bic
-    """)
-    result = await db.execute(query, {"bic": bic.upper()})
-    row = result.fetchone()
+    psp = (await get_reference_data().get(db)).psp_by_bic(bic)
     
-    if not row:
+    if not psp:
         raise HTTPException(status_code=404, detail=f"PSP with BIC {bic} not found")
     
     return PSPResponse(
-        psp_id=row.psp_id,
-        bic=row.bic,
-        name=row.name,
-        country_code=row.country_code,
-        fee_percent=float(row.fee_percent) if row.fee_percent else 0.0
+        psp_id=psp.psp_id,
+        bic=psp.bic,
+        name=psp.name,
+        country_code=psp.country_code,
+        fee_percent=float(psp.fee_percent) if psp.fee_percent else 0.0
     )
 
 
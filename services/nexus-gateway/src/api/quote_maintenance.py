@@ -0,0 +1,205 @@
+"""
+Quote Maintenance
+
+Keeps the quotes table from growing without bound. A background job in
+each gateway process periodically:
+
+1. Expires: quotes still ACTIVE after expires_at become USED (referenced
+   by a payment or trade notification) or EXPIRED.
+2. Purges: EXPIRED quotes whose expiry is older than the retention horizon
+   are deleted, unless a payment or trade notification has referenced
+   them since.
+
+Both phases work in bounded batches (quote_maintenance_batch_size rows per
+transaction, at most quote_maintenance_max_batches per phase and run), so
+a large backlog is worked off over several runs without long transactions
+or lock queues. Rows are picked with FOR UPDATE SKIP LOCKED and never wait
+for a quote a payment is using.
+
+Replicas coordinate through a transaction-level advisory lock: each batch
+first takes pg_try_advisory_xact_lock, and a run that cannot take it (the
+job is running on another replica) ends without touching the table.
+
+The scans read partial indexes on expires_at (migration 010). quotes stays
+unpartitioned because payments and trade_notifications reference it by
+foreign key.
+
+Configuration (Settings / environment):
+    QUOTE_MAINTENANCE_ENABLED           run the job in this process (default true)
+    QUOTE_MAINTENANCE_INTERVAL_SECONDS  time between runs (default 60)
+    QUOTE_MAINTENANCE_BATCH_SIZE        rows per batch transaction (default 1000)
+    QUOTE_MAINTENANCE_MAX_BATCHES       batches per phase per run (default 20)
+    QUOTE_RETENTION_HOURS               keep EXPIRED quotes this long (default 168)
+"""
+
+from typing import Optional
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import async_session_maker
+from .background import AdvisoryLock, PeriodicWorker, WorkerSingleton, try_advisory_lock
+
+# Oldest expired ACTIVE quotes first; idx_quotes_active_expires
+EXPIRE_SQL = text("""
+    WITH batch AS (
+        SELECT quote_id FROM quotes
+        WHERE status = 'ACTIVE' AND expires_at < NOW()
+        ORDER BY expires_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE quotes q SET status = CASE
+        WHEN EXISTS (SELECT 1 FROM payments p WHERE p.quote_id = q.quote_id)
+          OR EXISTS (SELECT 1 FROM trade_notifications t WHERE t.quote_id = q.quote_id)
+        THEN 'USED' ELSE 'EXPIRED' END
+    FROM batch
+    WHERE q.quote_id = batch.quote_id
+    RETURNING q.status
+""")
+
+# EXPIRED quotes past the retention horizon; idx_quotes_expired_expires.
+# A late reference (payment submitted on an expired quote) moves the quote
+# to USED instead of blocking the batch on the foreign key.
+PURGE_SQL = text("""
+    WITH batch AS (
+        SELECT quote_id FROM quotes
+        WHERE status = 'EXPIRED'
+          AND expires_at < NOW() - make_interval(hours => :retention_hours)
+        ORDER BY expires_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    referenced AS (
+        UPDATE quotes q SET status = 'USED'
+        FROM batch
+        WHERE q.quote_id = batch.quote_id
+          AND (EXISTS (SELECT 1 FROM payments p WHERE p.quote_id = q.quote_id)
+               OR EXISTS (SELECT 1 FROM trade_notifications t WHERE t.quote_id = q.quote_id))
+        RETURNING q.quote_id
+    )
+    DELETE FROM quotes q
+    USING batch
+    WHERE q.quote_id = batch.quote_id
+      AND q.quote_id NOT IN (SELECT quote_id FROM referenced)
+    RETURNING q.quote_id
+""")
+
+
+class QuoteMaintenance(PeriodicWorker):
+    """Periodic expiry and retention for the quotes table."""
+
+    name = "quote-maintenance"
+    label = "Quote maintenance"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        interval_seconds: int = 60,
+        batch_size: int = 1000,
+        max_batches: int = 20,
+        retention_hours: int = 168,
+    ):
+        super().__init__(session_factory, interval_seconds)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.retention_hours = retention_hours
+        self._stats.update({
+            "lockNotAcquired": 0,
+            "batches": 0,
+            "expired": 0,
+            "used": 0,
+            "purged": 0,
+            "lastExpired": 0,
+            "lastPurged": 0,
+        })
+
+    def _describe(self) -> str:
+        return (
+            f"interval={self.interval}s, batch={self.batch_size}, "
+            f"retention={self.retention_hours}h"
+        )
+
+    # -------------------------------------------------------------------------
+    # Runs
+    # -------------------------------------------------------------------------
+
+    async def run(self) -> dict:
+        """
+        Expire, then purge, in bounded batches.
+
+        Returns the rows processed by this run. The run ends early at the
+        first batch that finds the lock held by another replica.
+        """
+        expired = purged = 0
+        locked = False
+
+        for _ in range(self.max_batches):
+            statuses = await self._batch(EXPIRE_SQL, {"batch_size": self.batch_size})
+            if statuses is None:
+                locked = True
+                break
+            used = sum(1 for (status,) in statuses if status == "USED")
+            expired += len(statuses) - used
+            self._stats["used"] += used
+            if len(statuses) < self.batch_size:
+                break
+
+        if not locked:
+            for _ in range(self.max_batches):
+                rows = await self._batch(PURGE_SQL, {
+                    "batch_size": self.batch_size,
+                    "retention_hours": self.retention_hours,
+                })
+                if rows is None:
+                    locked = True
+                    break
+                purged += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+
+        self._stats["lockNotAcquired"] += int(locked)
+        self._stats["expired"] += expired
+        self._stats["purged"] += purged
+        self._stats["lastExpired"] = expired
+        self._stats["lastPurged"] = purged
+        if expired or purged:
+            self.logger.info(f"Quote maintenance: {expired} expired, {purged} purged")
+        return {"expired": expired, "purged": purged}
+
+    async def _batch(self, statement, params: dict) -> Optional[list]:
+        """One batch in its own transaction; None if the advisory lock is held elsewhere."""
+        async with self.session_factory() as session:
+            if not await try_advisory_lock(session, AdvisoryLock.QUOTE_MAINTENANCE):
+                await session.rollback()
+                return None
+            rows = (await session.execute(statement, params)).fetchall()
+            await session.commit()
+        self._stats["batches"] += 1
+        return rows
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Job counters for this process."""
+        return {
+            "batchSize": self.batch_size,
+            "retentionHours": self.retention_hours,
+            **super().stats(),
+        }
+
+
+# Singleton job, started when QUOTE_MAINTENANCE_ENABLED
+_maintenance = WorkerSingleton(
+    lambda: QuoteMaintenance(
+        interval_seconds=settings.quote_maintenance_interval_seconds,
+        batch_size=settings.quote_maintenance_batch_size,
+        max_batches=settings.quote_maintenance_max_batches,
+        retention_hours=settings.quote_retention_hours,
+    ),
+    enabled=lambda: settings.quote_maintenance_enabled,
+)
+get_quote_maintenance = _maintenance.get
+start_quote_maintenance = _maintenance.start
+stop_quote_maintenance = _maintenance.stop
@@ -0,0 +1,136 @@
+"""
+Quote Pricing
+
+Prices one FXP's quote for a requested amount: final rate with tier and
+PSP improvements, source/destination PSP fees, capping at the corridor's
+max amounts and net to recipient. quotes.get_quotes calls price_quote per
+FXP; corridor_simulation reproduces it over amount grids.
+
+Reference: https://docs.nexusglobalpayments.org/fees-and-pricing
+"""
+
+from decimal import Decimal, localcontext
+from typing import NamedTuple, Optional
+import logging
+
+from .fee_config import FEE_CONTEXT, CENT, CorridorFees
+from .rate_book import BookRate
+
+logger = logging.getLogger(__name__)
+
+
+class QuotePricing(NamedTuple):
+    """Amounts of one quote, rounded as stored and returned."""
+    tier_improvement_bps: int
+    psp_improvement_bps: int
+    customer_rate: Decimal  # unrounded
+    source_interbank_amount: Decimal
+    destination_interbank_amount: Decimal
+    creditor_account_amount: Decimal
+    source_psp_fee: Decimal
+    destination_psp_fee: Decimal
+    capped_to_max_amount: bool
+
+
+def tier_improvement_bps(rate: BookRate, amount: Decimal) -> int:
+    """Improvement of the largest tier the amount reaches (tiers sorted largest first)."""
+    for min_amount, improvement_bps in rate.tier_improvements:
+        if amount >= min_amount:
+            return improvement_bps
+    return 0
+
+
+def price_quote(
+    rate: BookRate,
+    amount: Decimal,
+    amount_type: str,
+    fees: CorridorFees,
+    source_max: Decimal,
+    dest_max: Decimal,
+    source_psp_bic: Optional[str] = None,
+    requested_amount_fee: Optional[Decimal] = None,
+) -> Optional[QuotePricing]:
+    """
+    Price a quote; None if fees exceed the payment.
+
+    requested_amount_fee is the fee on `amount` (destination fee for
+    DESTINATION quotes, source fee otherwise); pass it when pricing one
+    amount for several FXPs.
+
+    Arithmetic runs in fee_config.FEE_CONTEXT, so results do not depend on
+    the caller's Decimal context.
+    """
+    with localcontext(FEE_CONTEXT):
+        # Calculate final rate with improvements
+        # Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers/improving-rates-for-larger-transactions
+        tier_bps = tier_improvement_bps(rate, amount)
+        psp_bps = rate.psp_improvements.get(source_psp_bic.upper(), 0) if source_psp_bic else 0
+        net_adjustment_bps = tier_bps + psp_bps - rate.base_spread_bps
+        customer_rate = rate.base_rate * (1 + Decimal(net_adjustment_bps) / Decimal(10000))
+
+        if amount_type == "DESTINATION":
+            # User specifies NET amount recipient should receive
+            creditor_account_amount = amount
+
+            # Destination fee on the net amount, then gross up
+            if requested_amount_fee is None:
+                requested_amount_fee = fees.destination.fee(amount)
+            dest_psp_fee = requested_amount_fee
+            dest_interbank_amount = creditor_account_amount + dest_psp_fee
+
+            # Source principal from the gross payout
+            source_interbank_amount = dest_interbank_amount / customer_rate
+
+            # What the source fee WOULD be (for disclosure)
+            source_psp_fee = fees.source.fee(source_interbank_amount)
+        else:  # SOURCE
+            # User specifies DebtorAccountAmount (total to DEBIT from sender)
+            # Per Nexus spec: "Source PSP should request the quote amount after deducting its own fee"
+            if requested_amount_fee is None:
+                requested_amount_fee = fees.source.fee(amount)
+            source_psp_fee = requested_amount_fee
+            source_interbank_amount = amount - source_psp_fee
+
+            # Destination side from the net interbank amount
+            dest_interbank_amount = source_interbank_amount * customer_rate
+            dest_psp_fee = fees.destination.fee(dest_interbank_amount)
+            creditor_account_amount = dest_interbank_amount - dest_psp_fee
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"[FEE-DEBUG] {amount_type} calc: fxp={rate.fxp_code}, amount={amount}, "
+                f"source_psp_fee={source_psp_fee}, source_interbank_amount={source_interbank_amount}, "
+                f"dest_interbank_amount={dest_interbank_amount}, dest_psp_fee={dest_psp_fee}, "
+                f"creditor_account_amount={creditor_account_amount}"
+            )
+
+        # Check and apply capping
+        capped = False
+        if source_interbank_amount > source_max:
+            source_interbank_amount = source_max
+            dest_interbank_amount = source_interbank_amount * customer_rate
+            dest_psp_fee = fees.destination.fee(dest_interbank_amount)
+            creditor_account_amount = dest_interbank_amount - dest_psp_fee
+            capped = True
+        if dest_interbank_amount > dest_max:
+            dest_interbank_amount = dest_max
+            source_interbank_amount = dest_interbank_amount / customer_rate
+            dest_psp_fee = fees.destination.fee(dest_interbank_amount)
+            creditor_account_amount = dest_interbank_amount - dest_psp_fee
+            capped = True
+
+        # Skip this quote - fees exceed payment
+        if creditor_account_amount <= 0:
+            return None
+
+        return QuotePricing(
+            tier_improvement_bps=tier_bps,
+            psp_improvement_bps=psp_bps,
+            customer_rate=customer_rate,
+            source_interbank_amount=source_interbank_amount.quantize(CENT),
+            destination_interbank_amount=dest_interbank_amount.quantize(CENT),
+            creditor_account_amount=creditor_account_amount.quantize(CENT),
+            source_psp_fee=source_psp_fee.quantize(CENT),
+            destination_psp_fee=dest_psp_fee.quantize(CENT),
+            capped_to_max_amount=capped,
+        )
@@ -0,0 +1,171 @@
+"""
+Quote Routing Snapshot
+
+A quote fixes the FXP, corridor and rate, and with them the routing that
+pacs.008 validation checks the payment against: source SAP (IntrmyAgt1),
+destination SAP (IntrmyAgt2) and destination IPS. quotes.get_quotes stores
+that snapshot on the quote row (migration 006), and validation reads it
+here with a primary-key lookup.
+
+Snapshots are immutable, so they are cached in-process by quote_id until
+the quote expires (quote_validity_seconds). Quotes generated by this
+process are cached at creation; a pacs.008 for them needs no query at all.
+Quotes still in the ephemeral quote store (api/quote_store.py) are read
+from there. Missing quotes are not cached.
+"""
+
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import time
+
+from ..config import settings
+from .quote_store import get_quote_store
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteRouting(NamedTuple):
+    """Quote fields used by pacs.008 validation and routing."""
+    quote_id: str
+    exchange_rate: object  # Decimal
+    expires_at: datetime
+    fxp_id: str
+    source_currency: str
+    destination_currency: str
+    source_sap_bic: Optional[str]
+    dest_sap_bic: Optional[str]
+    dest_ips_code: Optional[str]
+
+
+QUOTE_ROUTING_SQL = text("""
+    SELECT
+        quote_id, final_rate AS exchange_rate, expires_at,
+        fxp_id, source_currency, destination_currency,
+        source_sap_bic, dest_sap_bic, dest_ips_code
+    FROM quotes
+    WHERE quote_id = :quote_id
+""")
+
+
+class QuoteRoutingCache:
+    """
+    TTL cache of QuoteRouting by quote_id.
+
+    Entries live until the quote's expires_at, capped at
+    quote_validity_seconds from insertion.
+    """
+
+    def __init__(self, ttl_seconds: int = 600, max_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # quote_id -> (monotonic deadline, snapshot); insertion ordered
+        self._entries: dict[str, tuple[float, QuoteRouting]] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, quote_id: str) -> Optional[QuoteRouting]:
+        entry = self._entries.get(quote_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        deadline, routing = entry
+        if deadline <= time.monotonic():
+            del self._entries[quote_id]
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return routing
+
+    def put(self, routing: QuoteRouting) -> None:
+        now = time.monotonic()
+        remaining = (routing.expires_at - datetime.now(timezone.utc)).total_seconds()
+        ttl = min(remaining, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._evict(now)
+        self._entries[routing.quote_id] = (now + ttl, routing)
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop the oldest entries while they are expired or the cache is full.
+
+        Quotes share one validity period, so insertion order is (close to)
+        expiry order and only the head needs to be looked at.
+        """
+        entries = self._entries
+        while entries:
+            quote_id = next(iter(entries))
+            if entries[quote_id][0] > now and len(entries) < self.max_entries:
+                break
+            del entries[quote_id]
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "ttlSeconds": self.ttl_seconds, **self._stats}
+
+
+# Singleton cache
+_cache: Optional[QuoteRoutingCache] = None
+
+
+def get_quote_routing_cache() -> QuoteRoutingCache:
+    """Get the process-wide quote routing cache."""
+    global _cache
+    if _cache is None:
+        _cache = QuoteRoutingCache(ttl_seconds=settings.quote_validity_seconds)
+    return _cache
+
+
+async def get_quote_routing(db: AsyncSession, quote_id: str | UUID) -> Optional[QuoteRouting]:
+    """
+    Routing snapshot for a quote: cache first, then the quote store, then a
+    primary-key lookup.
+
+    Returns None if the quote does not exist.
+    """
+    key = str(quote_id)
+    cache = get_quote_routing_cache()
+    routing = cache.get(key)
+    if routing is not None:
+        return routing
+
+    stored = await get_quote_store().get(key)
+    if stored is not None:
+        routing = QuoteRouting(
+            quote_id=stored.quote_id,
+            exchange_rate=stored.final_rate,
+            expires_at=stored.expires_at,
+            fxp_id=stored.fxp_id,
+            source_currency=stored.source_currency,
+            destination_currency=stored.destination_currency,
+            source_sap_bic=stored.source_sap_bic,
+            dest_sap_bic=stored.dest_sap_bic,
+            dest_ips_code=stored.dest_ips_code,
+        )
+        cache.put(routing)
+        return routing
+
+    result = await db.execute(QUOTE_ROUTING_SQL, {"quote_id": key})
+    row = result.fetchone()
+    if row is None:
+        return None
+    routing = QuoteRouting(
+        quote_id=str(row.quote_id),
+        exchange_rate=row.exchange_rate,
+        expires_at=row.expires_at,
+        fxp_id=str(row.fxp_id),
+        source_currency=row.source_currency,
+        destination_currency=row.destination_currency,
+        source_sap_bic=row.source_sap_bic,
+        dest_sap_bic=row.dest_sap_bic,
+        dest_ips_code=row.dest_ips_code,
+    )
+    cache.put(routing)
+    return routing
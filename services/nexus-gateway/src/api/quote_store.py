@@ -0,0 +1,360 @@
+"""
+Ephemeral Quote Store
+
+GET /quotes returns one quote per FXP, and most of them are never used.
+Instead of writing every quote to Postgres, quotes are kept in a TTL store
+for quote_validity_seconds and written to the quotes table only when one
+is used:
+
+    get_quotes → QuoteStore.save()            (Redis / in-process, TTL = expiry)
+    accept_quote (intermediary agents)  ┐
+    pacs.008 referencing the quote      ┘→ persist_quote() → INSERT ... ON CONFLICT DO NOTHING
+
+Readers (retrieve_single_quote, fee disclosure, pacs.008 routing) go
+through get_quote(): store first, then the quotes table (quotes that were
+persisted, or created with the postgres backend).
+
+Backends (QUOTE_STORE_BACKEND):
+    redis     shared by all gateway replicas (default; REDIS_URL)
+    memory    in-process TTL map; single replica only
+    postgres  previous behaviour: every quote is inserted at generation
+
+Ephemeral stores keep a quote for quote_store_expired_retention_seconds
+after it expires, so a payment arriving late still finds it and is
+rejected as expired rather than as an unknown quote.
+
+If Redis is unreachable, save() falls back to inserting into Postgres and
+get() to the table, so quoting keeps working with the previous behaviour.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import time
+
+import orjson
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Quote Records
+# =============================================================================
+
+# quotes columns written at quote generation, with their array types
+QUOTE_COLUMNS = (
+    ("quote_id", "uuid"),
+    ("requesting_psp_bic", "varchar"),
+    ("source_country", "varchar"),
+    ("destination_country", "varchar"),
+    ("source_currency", "varchar"),
+    ("destination_currency", "varchar"),
+    ("amount_type", "varchar"),
+    ("requested_amount", "numeric"),
+    ("fxp_id", "uuid"),
+    ("base_rate", "numeric"),
+    ("final_rate", "numeric"),
+    ("tier_improvement_bps", "integer"),
+    ("psp_improvement_bps", "integer"),
+    ("source_interbank_amount", "numeric"),
+    ("destination_interbank_amount", "numeric"),
+    ("creditor_account_amount", "numeric"),
+    ("destination_psp_fee", "numeric"),
+    ("capped_to_max_amount", "boolean"),
+    ("expires_at", "timestamptz"),
+    ("source_sap_bic", "varchar"),
+    ("dest_sap_bic", "varchar"),
+    ("dest_ips_code", "varchar"),
+)
+
+# Quotes in one statement (one array parameter per column); the statement
+# text does not depend on the number of FXPs. Persisting an already
+# persisted quote is a no-op.
+BATCH_INSERT_QUOTES_SQL = text(f"""
+    INSERT INTO quotes (
+        {", ".join(c for c, _ in QUOTE_COLUMNS)}, status
+    )
+    SELECT {", ".join(f"q.{c}" for c, _ in QUOTE_COLUMNS)}, 'ACTIVE'
+    FROM unnest(
+        {", ".join(f"CAST(:{c} AS {t}[])" for c, t in QUOTE_COLUMNS)}
+    ) AS q({", ".join(c for c, _ in QUOTE_COLUMNS)})
+    ON CONFLICT (quote_id) DO NOTHING
+""")
+
+QUOTE_SELECT_SQL = text(f"""
+    SELECT
+        {", ".join(f"q.{c}" for c, _ in QUOTE_COLUMNS)},
+        q.status, f.fxp_code, f.name AS fxp_name, f.base_spread_bps
+    FROM quotes q
+    JOIN fxps f ON q.fxp_id = f.fxp_id
+    WHERE q.quote_id = CAST(:quote_id AS uuid)
+""")
+
+
+def quote_batch_params(rows: list[dict]) -> dict:
+    """Column-wise parameters for BATCH_INSERT_QUOTES_SQL."""
+    return {column: [row[column] for row in rows] for column, _ in QUOTE_COLUMNS}
+
+
+class StoredQuote(NamedTuple):
+    """A quote as generated: the quotes columns plus the FXP fields readers need."""
+    quote_id: str
+    requesting_psp_bic: str
+    source_country: str
+    destination_country: str
+    source_currency: str
+    destination_currency: str
+    amount_type: str
+    requested_amount: Decimal
+    fxp_id: str
+    base_rate: Decimal
+    final_rate: Decimal
+    tier_improvement_bps: int
+    psp_improvement_bps: int
+    source_interbank_amount: Decimal
+    destination_interbank_amount: Decimal
+    creditor_account_amount: Optional[Decimal]
+    destination_psp_fee: Optional[Decimal]
+    capped_to_max_amount: bool
+    expires_at: datetime
+    source_sap_bic: Optional[str]
+    dest_sap_bic: Optional[str]
+    dest_ips_code: Optional[str]
+    status: str
+    fxp_code: str
+    fxp_name: str
+    base_spread_bps: int
+
+    @classmethod
+    def from_row(cls, row) -> "StoredQuote":
+        values = {f: getattr(row, f) for f in cls._fields}
+        values["quote_id"] = str(values["quote_id"])
+        values["fxp_id"] = str(values["fxp_id"])
+        return cls(**values)
+
+    def row(self) -> dict:
+        """Parameters for BATCH_INSERT_QUOTES_SQL."""
+        return {c: getattr(self, c) for c, _ in QUOTE_COLUMNS}
+
+
+_DECIMAL_FIELDS = {c for c, t in QUOTE_COLUMNS if t == "numeric"}
+
+
+def encode_quote(quote: StoredQuote) -> bytes:
+    return orjson.dumps(quote._asdict(), default=str)
+
+
+def decode_quote(data: bytes | str) -> StoredQuote:
+    values = orjson.loads(data)
+    for field in _DECIMAL_FIELDS:
+        if values[field] is not None:
+            values[field] = Decimal(values[field])
+    values["expires_at"] = datetime.fromisoformat(values["expires_at"])
+    return StoredQuote(**values)
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+class QuoteStore:
+    """Quote persistence for generated quotes. Base class: write to Postgres."""
+
+    backend = "postgres"
+    ephemeral = False
+
+    def __init__(self, expired_retention_seconds: float = 0):
+        self.expired_retention_seconds = expired_retention_seconds
+        self._stats = {"saved": 0, "hits": 0, "misses": 0, "persisted": 0, "errors": 0}
+
+    def _ttl(self, quote: StoredQuote) -> float:
+        """Seconds to keep a quote: until it expires, plus the retention."""
+        remaining = (quote.expires_at - datetime.now(timezone.utc)).total_seconds()
+        return remaining + self.expired_retention_seconds
+
+    async def save(self, db: AsyncSession, quotes: list[StoredQuote]) -> None:
+        """Store a request's quotes (the caller commits)."""
+        if quotes:
+            await db.execute(BATCH_INSERT_QUOTES_SQL, quote_batch_params([q.row() for q in quotes]))
+            self._stats["saved"] += len(quotes)
+
+    async def get(self, quote_id: str) -> Optional[StoredQuote]:
+        """Quote from the store only; None if absent (or not an ephemeral store)."""
+        return None
+
+    def record_persisted(self) -> None:
+        """Count a stored quote written to the quotes table on use."""
+        self._stats["persisted"] += 1
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._stats}
+
+
+class MemoryQuoteStore(QuoteStore):
+    """In-process TTL map. Quotes are only visible to this replica."""
+
+    backend = "memory"
+    ephemeral = True
+
+    def __init__(self, max_entries: int = 100000, expired_retention_seconds: float = 0):
+        super().__init__(expired_retention_seconds)
+        self.max_entries = max_entries
+        # quote_id -> (monotonic deadline, quote); insertion ordered
+        self._entries: dict[str, tuple[float, StoredQuote]] = {}
+
+    async def save(self, db: AsyncSession, quotes: list[StoredQuote]) -> None:
+        now = time.monotonic()
+        if len(self._entries) + len(quotes) > self.max_entries:
+            self._evict(now, len(quotes))
+        for quote in quotes:
+            ttl = self._ttl(quote)
+            if ttl > 0:
+                self._entries[quote.quote_id] = (now + ttl, quote)
+        self._stats["saved"] += len(quotes)
+
+    def _evict(self, now: float, needed: int) -> None:
+        """
+        Drop the oldest entries while they are expired or there is no room.
+
+        Quotes share one validity period (and retention), so insertion
+        order is expiry order and only the head of the map needs to be looked at.
+        """
+        entries = self._entries
+        while entries:
+            quote_id = next(iter(entries))
+            if entries[quote_id][0] > now and len(entries) + needed <= self.max_entries:
+                break
+            del entries[quote_id]
+
+    async def get(self, quote_id: str) -> Optional[StoredQuote]:
+        entry = self._entries.get(quote_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(quote_id, None)
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entry[1]
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._entries)}
+
+
+class RedisQuoteStore(QuoteStore):
+    """Quotes as Redis keys expiring with the quote; shared by all replicas."""
+
+    backend = "redis"
+    ephemeral = True
+    KEY_PREFIX = "nexus:quote:"
+
+    def __init__(self, redis_url: str, expired_retention_seconds: float = 0):
+        super().__init__(expired_retention_seconds)
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+
+    async def save(self, db: AsyncSession, quotes: list[StoredQuote]) -> None:
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for quote in quotes:
+                ttl_ms = int(self._ttl(quote) * 1000)
+                if ttl_ms > 0:
+                    pipe.set(self.KEY_PREFIX + quote.quote_id, encode_quote(quote), px=ttl_ms)
+            await pipe.execute()
+            self._stats["saved"] += len(quotes)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Quote store unavailable, writing {len(quotes)} quotes to Postgres: {e}")
+            await super().save(db, quotes)
+
+    async def get(self, quote_id: str) -> Optional[StoredQuote]:
+        try:
+            data = await self._redis.get(self.KEY_PREFIX + quote_id)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Quote store unavailable, reading quote {quote_id} from Postgres: {e}")
+            return None
+        if data is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return decode_quote(data)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+# Singleton store
+_store: Optional[QuoteStore] = None
+
+
+def get_quote_store() -> QuoteStore:
+    """Get the process-wide quote store for QUOTE_STORE_BACKEND."""
+    global _store
+    if _store is None:
+        backend = settings.quote_store_backend.lower()
+        retention = settings.quote_store_expired_retention_seconds
+        if backend == "redis":
+            _store = RedisQuoteStore(settings.redis_url, expired_retention_seconds=retention)
+        elif backend == "memory":
+            _store = MemoryQuoteStore(expired_retention_seconds=retention)
+        else:
+            _store = QuoteStore()
+    return _store
+
+
+async def close_quote_store() -> None:
+    """Close the store's connections if it was created (called from main.lifespan)."""
+    global _store
+    if isinstance(_store, RedisQuoteStore):
+        await _store.close()
+    _store = None
+
+
+# =============================================================================
+# Read-through and persist-on-use
+# =============================================================================
+
+async def get_quote(db: AsyncSession, quote_id: str | UUID) -> Optional[StoredQuote]:
+    """Quote by id: the store first, then the quotes table."""
+    key = str(quote_id)
+    quote = await get_quote_store().get(key)
+    if quote is not None:
+        return quote
+    return await _select_quote(db, key)
+
+
+async def _select_quote(db: AsyncSession, key: str) -> Optional[StoredQuote]:
+    """Quote from the quotes table; None if there is no row (or the id is not a UUID)."""
+    try:
+        UUID(key)
+    except ValueError:
+        return None
+    row = (await db.execute(QUOTE_SELECT_SQL, {"quote_id": key})).fetchone()
+    return StoredQuote.from_row(row) if row is not None else None
+
+
+async def persist_quote(db: AsyncSession, quote_id: str | UUID) -> Optional[StoredQuote]:
+    """
+    Make sure a quote being used has its row in the quotes table.
+
+    A quote still in the ephemeral store is inserted (left in the caller's
+    transaction); otherwise the table is checked. Returns the quote if its
+    row exists once the caller commits, None if it does not: the quote is
+    unknown or fell out of the store unused, and rows that would reference
+    it (payments.quote_id) must store NULL.
+    """
+    key = str(quote_id)
+    store = get_quote_store()
+    if store.ephemeral:
+        quote = await store.get(key)
+        if quote is not None:
+            await db.execute(BATCH_INSERT_QUOTES_SQL, quote_batch_params([quote.row()]))
+            store.record_persisted()
+            return quote
+    return await _select_quote(db, key)
@@ -0,0 +1,365 @@
+"""
+Live Quotes
+
+A PSP UI polling GET /quotes to keep the displayed rate fresh mints and
+stores one quote per FXP on every poll. Live quote streams push indicative
+prices instead, only when they change, and firm quotes are minted on
+request:
+
+    GET /quotes/stream   Server-Sent Events; mint firm quotes with GET /quotes
+    WS  /quotes/live     WebSocket; {"action": "firm"} mints them over the socket
+
+Indicative prices are priced exactly as GET /quotes prices its quotes
+(quote_pricing.price_quote over the rate book) but carry no quoteId or
+expiry and are never stored. A stream re-prices when the rate book changes
+(RateBook.wait_for_change: NOTIFY-driven corridor reloads and resyncs) and
+when one of its rates reaches valid_until, and sends an update only if the
+prices differ from the last ones sent. A change to another corridor, or to
+a tier the amount does not reach, sends nothing.
+
+WebSocket messages (client -> server):
+    {"action": "subscribe", "sourceCountry": "SG", "destCountry": "TH",
+     "amount": "1000", "amountType": "SOURCE", "sourcePspBic": "DBSSSGSG"}
+    {"action": "firm"}          mint and store quotes for the subscription
+    {"action": "unsubscribe"}
+
+Server -> client: {"type": "prices", ...}, {"type": "quotes", "quotes": [...]}
+and {"type": "error", "status": ..., "detail": ...}.
+
+Configuration (Settings / environment):
+    QUOTE_STREAM_KEEPALIVE_SECONDS   idle keep-alive / re-check interval (default 15)
+    QUOTE_STREAM_MAX_STREAMS         concurrent streams per process (default 1000)
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Optional
+import asyncio
+import logging
+
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from src.config import settings
+from src.db import async_session_maker
+from .fee_config import CorridorFees, corridor_fees
+from .quote_pricing import price_quote
+from .quotes import get_corridor_currencies, get_quotes, no_rates_error, price_fields
+from .rate_book import CorridorRate, get_rate_book
+from .schemas import QuoteSubscription
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_stats = {
+    "active": 0,
+    "opened": 0,
+    "rejected": 0,
+    "reprices": 0,
+    "updates": 0,
+    "keepAlives": 0,
+    "firmRequests": 0,
+}
+
+
+def get_quote_stream_stats() -> dict:
+    """Live quote stream counters for this process."""
+    return {"maxStreams": settings.quote_stream_max_streams, **_stats}
+
+
+# =============================================================================
+# Indicative Prices
+# =============================================================================
+
+def indicative_prices(
+    rate_rows: list[CorridorRate],
+    fees: CorridorFees,
+    amount: Decimal,
+    amount_type: str,
+    source_psp_bic: Optional[str],
+    source_max: Decimal,
+    dest_max: Decimal,
+) -> list[dict[str, Any]]:
+    """Price fields GET /quotes would return for each FXP, without minting quotes."""
+    if amount_type == "DESTINATION":
+        requested_amount_fee = fees.destination.fee(amount)
+    else:
+        requested_amount_fee = fees.source.fee(amount)
+    prices = []
+    for corridor_rate in rate_rows:
+        pricing = price_quote(
+            corridor_rate.rate, amount, amount_type, fees, source_max, dest_max,
+            source_psp_bic=source_psp_bic, requested_amount_fee=requested_amount_fee,
+        )
+        if pricing is not None:
+            prices.append(price_fields(corridor_rate.rate, pricing))
+    return prices
+
+
+class LiveQuoteStream:
+    """Indicative prices for one subscription, re-priced as the rate book changes."""
+
+    def __init__(self, subscription: QuoteSubscription, session_factory=async_session_maker):
+        self.subscription = subscription
+        self.session_factory = session_factory
+        self.sequence = 0
+        self.rate_count = 0
+        self._generation = -1
+        self._prices: Optional[list[dict[str, Any]]] = None
+        self._next_expiry: Optional[datetime] = None
+
+    async def update(self) -> Optional[dict[str, Any]]:
+        """
+        Re-price; the update to send, or None if the prices are unchanged.
+
+        The first call always returns an update. Raises HTTPException for a
+        corridor GET /quotes would reject (unknown country, same currency).
+        """
+        s = self.subscription
+        # Sessions only check out a connection on a reference data or rate book load
+        async with self.session_factory() as db:
+            source_currency, source_max, dest_currency, dest_max = await get_corridor_currencies(
+                db, s.source_country, s.destination_country
+            )
+            book = get_rate_book()
+            await book.ensure_loaded(db)
+        self._generation = book.generation
+        rate_rows = book.corridor_rates(source_currency, dest_currency, s.destination_country.upper())
+        _stats["reprices"] += 1
+
+        self.rate_count = len(rate_rows)
+        self._next_expiry = min((r.rate.valid_until for r in rate_rows), default=None)
+        prices = indicative_prices(
+            rate_rows, corridor_fees(source_currency, dest_currency), s.amount, s.amount_type,
+            s.source_psp_bic, source_max, dest_max,
+        )
+        if prices == self._prices:
+            return None
+        self._prices = prices
+        self.sequence += 1
+        return {
+            "sequence": self.sequence,
+            "sourceCountry": s.source_country.upper(),
+            "destCountry": s.destination_country.upper(),
+            "sourceCurrency": source_currency,
+            "destinationCurrency": dest_currency,
+            "amount": str(s.amount),
+            "amountType": s.amount_type,
+            "indicative": True,
+            "prices": prices,
+            "asOf": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+
+    async def next_update(self, timeout: float) -> Optional[dict[str, Any]]:
+        """Wait for the prices to change; None if they have not after `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            wait = deadline - loop.time()
+            if self._next_expiry is not None:
+                wait = min(wait, (self._next_expiry - datetime.now(timezone.utc)).total_seconds())
+            await get_rate_book().wait_for_change(self._generation, max(wait, 0))
+            update = await self.update()
+            if update is not None or loop.time() >= deadline:
+                return update
+
+    async def firm_quotes(self) -> list[dict[str, Any]]:
+        """Mint and store quotes for the subscription, as GET /quotes does."""
+        s = self.subscription
+        _stats["firmRequests"] += 1
+        async with self.session_factory() as db:
+            response = await get_quotes(
+                s.source_country, s.destination_country, s.amount, s.amount_type, s.source_psp_bic, db
+            )
+        return response["quotes"]
+
+
+def _admit() -> bool:
+    """False (and counted) if this process already serves quote_stream_max_streams streams."""
+    if _stats["active"] >= settings.quote_stream_max_streams:
+        _stats["rejected"] += 1
+        return False
+    return True
+
+
+async def open_stream(subscription: QuoteSubscription) -> tuple[LiveQuoteStream, dict[str, Any]]:
+    """A stream and its first update; raises HTTPException as GET /quotes would."""
+    stream = LiveQuoteStream(subscription)
+    first = await stream.update()
+    if stream.rate_count == 0:
+        raise no_rates_error(first["sourceCurrency"], first["destinationCurrency"])
+    return stream, first
+
+
+def _error(e: HTTPException) -> dict[str, Any]:
+    return {"status": e.status_code, "detail": e.detail}
+
+
+# =============================================================================
+# Endpoints
+# =============================================================================
+
+def _sse(event: str, data: dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    lines = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+    return lines.encode() + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.get(
+    "/quotes/stream",
+    summary="Stream Indicative Quotes (Server-Sent Events)",
+    response_class=StreamingResponse,
+    description="""
+    Subscribe to indicative prices for one corridor and amount.
+
+    Sends a `prices` event on connect and another whenever an FXP's price
+    for this amount changes (rate, tier or PSP improvement, rate expiry).
+    Prices are computed exactly as GET /quotes computes quotes, but no quote
+    is minted or stored: call GET /quotes (or use WS /quotes/live) for firm
+    quotes when the sender proceeds.
+
+    Errors GET /quotes would return are returned before the stream starts;
+    an `error` event ends the stream if the corridor becomes invalid.
+    """,
+)
+async def stream_quotes(
+    request: Request,
+    source_country: str = Query(..., alias="sourceCountry", min_length=2, max_length=2),
+    destination_country: str = Query(..., alias="destCountry", min_length=2, max_length=2),
+    amount: Decimal = Query(..., gt=0),
+    amount_type: str = Query(..., alias="amountType", pattern="^(SOURCE|DESTINATION)$"),
+    source_psp_bic: str | None = Query(None, alias="sourcePspBic"),
+) -> StreamingResponse:
+    """Server-Sent Events stream of indicative prices."""
+    if not _admit():
+        raise HTTPException(status_code=503, detail="Too many live quote streams, retry later")
+    stream, first = await open_stream(QuoteSubscription(
+        source_country=source_country,
+        destination_country=destination_country,
+        amount=amount,
+        amount_type=amount_type,
+        source_psp_bic=source_psp_bic,
+    ))
+
+    async def events():
+        _stats["active"] += 1
+        _stats["opened"] += 1
+        try:
+            yield _sse("prices", first, first["sequence"])
+            while not await request.is_disconnected():
+                try:
+                    update = await stream.next_update(settings.quote_stream_keepalive_seconds)
+                except HTTPException as e:
+                    yield _sse("error", _error(e))
+                    return
+                except Exception as e:
+                    logger.warning(f"Live quote stream failed: {e}")
+                    yield _sse("error", {"status": 503, "detail": "Live prices unavailable"})
+                    return
+                if update is None:
+                    _stats["keepAlives"] += 1
+                    yield b": keep-alive\n\n"
+                else:
+                    _stats["updates"] += 1
+                    yield _sse("prices", update, update["sequence"])
+        finally:
+            _stats["active"] -= 1
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _handle_message(websocket: WebSocket, message: str, stream: Optional[LiveQuoteStream]) -> Optional[LiveQuoteStream]:
+    """Act on one client message; returns the (possibly new) stream."""
+    try:
+        request = orjson.loads(message)
+        action = request.pop("action", None)
+    except (orjson.JSONDecodeError, AttributeError):
+        await websocket.send_json({"type": "error", "status": 400, "detail": "Messages must be JSON objects"})
+        return stream
+
+    if action == "subscribe":
+        try:
+            stream, first = await open_stream(QuoteSubscription.model_validate(request))
+        except ValidationError as e:
+            await websocket.send_json({"type": "error", "status": 422, "detail": str(e)})
+            return None
+        except HTTPException as e:
+            await websocket.send_json({"type": "error", **_error(e)})
+            return None
+        _stats["updates"] += 1
+        await websocket.send_json({"type": "prices", **first})
+    elif action == "unsubscribe":
+        stream = None
+    elif action == "firm":
+        if stream is None:
+            await websocket.send_json({"type": "error", "status": 409, "detail": "Subscribe before requesting firm quotes"})
+            return stream
+        try:
+            await websocket.send_json({"type": "quotes", "quotes": await stream.firm_quotes()})
+        except HTTPException as e:
+            await websocket.send_json({"type": "error", **_error(e)})
+    else:
+        await websocket.send_json({"type": "error", "status": 400, "detail": f"Unknown action: {action}"})
+    return stream
+
+
+@router.websocket("/quotes/live")
+async def live_quotes(websocket: WebSocket) -> None:
+    """
+    WebSocket stream of indicative prices, with firm quotes on request.
+
+    One subscription per socket; subscribing again replaces it.
+    """
+    if not _admit():
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    _stats["active"] += 1
+    _stats["opened"] += 1
+    stream: Optional[LiveQuoteStream] = None
+    receiving = asyncio.create_task(websocket.receive_text())
+    updating: Optional[asyncio.Task] = None
+    try:
+        while True:
+            if stream is not None and updating is None:
+                updating = asyncio.create_task(stream.next_update(settings.quote_stream_keepalive_seconds))
+            done, _ = await asyncio.wait(
+                [t for t in (receiving, updating) if t is not None], return_when=asyncio.FIRST_COMPLETED
+            )
+            if updating in done:
+                task, updating = updating, None
+                try:
+                    update = task.result()
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", **_error(e)})
+                    stream = None
+                except Exception as e:
+                    logger.warning(f"Live quote stream failed: {e}")
+                    await websocket.send_json({"type": "error", "status": 503, "detail": "Live prices unavailable"})
+                    stream = None
+                else:
+                    if update is not None:
+                        _stats["updates"] += 1
+                        await websocket.send_json({"type": "prices", **update})
+            if receiving in done:
+                message = receiving.result()
+                receiving = asyncio.create_task(websocket.receive_text())
+                new_stream = await _handle_message(websocket, message, stream)
+                if new_stream is not stream and updating is not None:
+                    updating.cancel()
+                    updating = None
+                stream = new_stream
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (receiving, updating):
+            if task is not None:
+                task.cancel()
+        _stats["active"] -= 1
@@ -22,6 +22,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import settings
 from src.db import get_db
+from .quote_routing import QuoteRouting, get_quote_routing_cache
+from .rate_book import BookRate, CorridorRate, get_rate_book
+from .reference_data import get_reference_data
+from .quote_store import StoredQuote, get_quote, get_quote_store, persist_quote
+from .quote_pricing import QuotePricing, price_quote
 
 logger = logging.getLogger(__name__)
 
@@ -30,56 +35,226 @@ router = APIRouter()
 
 
 # =============================================================================
-# Fee Calculation Functions (Import from Centralized fee_config.py)
+# Fee Calculation (fee_config.py, per-FXP pricing in quote_pricing.py)
 # =============================================================================
 
-from .fee_config import (
-    calculate_destination_psp_fee as _calc_dest_fee,
-    calculate_source_psp_fee as _calc_source_fee,
-    calculate_scheme_fee as _calc_scheme_fee,
+from .fee_config import CorridorFees, corridor_fees
+
+
+# =============================================================================
+# Response Models
+# =============================================================================
+
+from .schemas import (
+    QuoteInfo,
+    QuotesResponse,
+    BatchQuoteRequest,
+    BatchQuotesResponse,
+    IntermediaryAgentsResponse,
 )
 
 
-def _calculate_destination_psp_fee(amount: Decimal, currency: str) -> Decimal:
-    """
-    Calculate destination PSP fee based on scheme rules.
-    Fee is DEDUCTED from payout (beneficiary receives less).
-    
-    Reference: https://docs.nexusglobalpayments.org/fees-and-pricing
-    """
-    fee, _ = _calc_dest_fee(amount, currency)
-    return fee
+# =============================================================================
+# Corridor Lookup
+# =============================================================================
 
+async def load_country_currencies(
+    db: AsyncSession, country_codes: list[str]
+) -> dict[str, tuple[str, Decimal]]:
+    """Currency and max amount per country code (from the reference data cache)."""
+    reference = await get_reference_data().get(db)
+    currencies = {}
+    for code in {code.upper() for code in country_codes}:
+        country_currency = reference.country_currency(code)
+        if country_currency is not None:
+            currencies[code] = country_currency
+    return currencies
+
+
+def resolve_corridor(
+    currencies: dict[str, tuple[str, Decimal]], source_country: str, destination_country: str
+) -> tuple[str, Decimal, str, Decimal]:
+    """
+    Currencies and max amounts of a corridor's countries.
 
-def _calculate_source_psp_fee(principal: Decimal, currency: str = "SGD") -> Decimal:
+    Returns (source_currency, source_max, dest_currency, dest_max); raises
+    400 if a country has no currency or both use the same one.
     """
-    Calculate source PSP fee with currency context.
+    if source_country.upper() not in currencies:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Source country {source_country} not found or has no currency",
+        )
     
-    Args:
-        principal: Amount in source currency
-        currency: Source currency code (uses appropriate fee structure)
-    """
-    return _calc_source_fee(principal, currency)
+    if destination_country.upper() not in currencies:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Destination country {destination_country} not found or has no currency",
+        )
+    
+    source_currency, source_max = currencies[source_country.upper()]
+    dest_currency, dest_max = currencies[destination_country.upper()]
+    
+    if source_currency == dest_currency:
+        raise HTTPException(
+            status_code=400,
+            detail="Source and destination currencies are the same. No FX needed.",
+        )
+    
+    return source_currency, source_max, dest_currency, dest_max
 
 
-def _calculate_scheme_fee(principal: Decimal) -> Decimal:
-    """
-    Calculate Nexus scheme fee.
-    Fee structure: 0.10 SGD fixed + 0.05% of principal, min 0.10, max 5.00
-    """
-    return _calc_scheme_fee(principal)
+async def get_corridor_currencies(
+    db: AsyncSession, source_country: str, destination_country: str
+) -> tuple[str, Decimal, str, Decimal]:
+    """resolve_corridor for one corridor, loading its two countries."""
+    currencies = await load_country_currencies(db, [source_country, destination_country])
+    return resolve_corridor(currencies, source_country, destination_country)
+
+
+def no_rates_error(source_currency: str, dest_currency: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=f"No FX rates available for {source_currency}/{dest_currency}",
+    )
 
 
 # =============================================================================
-# Response Models
+# Quote Generation
 # =============================================================================
 
-from .schemas import (
-    QuoteInfo,
-    QuotesResponse,
-    IntermediaryAgentInfo,
-    IntermediaryAgentsResponse,
-)
+def price_fields(rate: BookRate, pricing: QuotePricing) -> dict[str, Any]:
+    """Rate, fee and amount fields of a quote as returned by GET /quotes."""
+    return {
+        "fxpId": rate.fxp_code,
+        "fxpName": rate.fxp_name,
+        "baseRate": str(rate.base_rate.quantize(Decimal("0.00000001"))),
+        "exchangeRate": str(pricing.customer_rate.quantize(Decimal("0.00000001"))),
+        "tierImprovementBps": int(pricing.tier_improvement_bps),
+        "pspImprovementBps": int(pricing.psp_improvement_bps),
+        "sourceInterbankAmount": str(pricing.source_interbank_amount),
+        "destinationInterbankAmount": str(pricing.destination_interbank_amount),
+        "creditorAccountAmount": str(pricing.creditor_account_amount),
+        "sourcePspFee": str(pricing.source_psp_fee),
+        "destinationPspFee": str(pricing.destination_psp_fee),
+        "cappedToMaxAmount": pricing.capped_to_max_amount,
+    }
+
+
+def build_quotes(
+    rate_rows: list[CorridorRate],
+    fees: CorridorFees,
+    amount: Decimal,
+    amount_type: str,
+    source_psp_bic: Optional[str],
+    source_country: str,
+    destination_country: str,
+    source_currency: str,
+    source_max: Decimal,
+    dest_currency: str,
+    dest_max: Decimal,
+    expires_at: datetime,
+    stored_quotes: list[StoredQuote],
+    routings: list[QuoteRouting],
+) -> list[dict[str, Any]]:
+    """
+    Price one amount with every FXP of a corridor.
+
+    Returns the response quotes; the quotes to store and their routing
+    snapshots are appended to stored_quotes and routings (see save_quotes).
+    """
+    quotes = []
+    
+    # The fee on the requested amount does not depend on the FXP's rate
+    if amount_type == "DESTINATION":
+        requested_amount_fee = fees.destination.fee(amount)
+    else:
+        requested_amount_fee = fees.source.fee(amount)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[FEE-DEBUG] quotes.py ENTRY: amount={amount}, amount_type={amount_type}, source_currency={source_currency}, dest_currency={dest_currency}")
+    
+    for corridor_rate in rate_rows:
+        row = corridor_rate.rate
+        
+        # =================================================================
+        # CALCULATE ALL FEES AT QUOTE TIME (Single Source of Truth)
+        # =================================================================
+        pricing = price_quote(
+            row, amount, amount_type, fees, source_max, dest_max,
+            source_psp_bic=source_psp_bic, requested_amount_fee=requested_amount_fee,
+        )
+        if pricing is None:
+            # Skip this quote - fees exceed payment
+            continue
+        
+        quote_id = uuid4()
+        
+        # Quote WITH ALL FEES; all candidates are saved to the quote store below
+        stored_quotes.append(StoredQuote(
+            quote_id=str(quote_id),
+            requesting_psp_bic=source_psp_bic or "UNKNOWN",
+            source_country=source_country.upper(),
+            destination_country=destination_country.upper(),
+            source_currency=source_currency,
+            destination_currency=dest_currency,
+            amount_type=amount_type,
+            requested_amount=amount,
+            fxp_id=str(row.fxp_id),
+            base_rate=row.base_rate,
+            final_rate=pricing.customer_rate,
+            tier_improvement_bps=pricing.tier_improvement_bps,
+            psp_improvement_bps=pricing.psp_improvement_bps,
+            source_interbank_amount=pricing.source_interbank_amount,
+            destination_interbank_amount=pricing.destination_interbank_amount,
+            creditor_account_amount=pricing.creditor_account_amount,
+            destination_psp_fee=pricing.destination_psp_fee,
+            capped_to_max_amount=pricing.capped_to_max_amount,
+            expires_at=expires_at,
+            source_sap_bic=corridor_rate.source_sap_bic,
+            dest_sap_bic=corridor_rate.dest_sap_bic,
+            dest_ips_code=corridor_rate.dest_ips_code,
+            status="ACTIVE",
+            fxp_code=row.fxp_code,
+            fxp_name=row.fxp_name,
+            base_spread_bps=row.base_spread_bps,
+        ))
+        routings.append(QuoteRouting(
+            quote_id=str(quote_id),
+            exchange_rate=pricing.customer_rate,
+            expires_at=expires_at,
+            fxp_id=str(row.fxp_id),
+            source_currency=source_currency,
+            destination_currency=dest_currency,
+            source_sap_bic=corridor_rate.source_sap_bic,
+            dest_sap_bic=corridor_rate.dest_sap_bic,
+            dest_ips_code=corridor_rate.dest_ips_code,
+        ))
+        
+        # Include ALL fee fields in response per Nexus spec
+        # Added baseRate and improvement fields per EXTENSIVE_PARITY_REVIEW_REPORT.md
+        # Added sourcePspFee per issue C1 fix
+        quotes.append({
+            "quoteId": str(quote_id),
+            **price_fields(row, pricing),
+            "expiresAt": expires_at.isoformat().replace("+00:00", "Z"),
+        })
+    
+    return quotes
+
+
+async def save_quotes(
+    db: AsyncSession, stored_quotes: list[StoredQuote], routings: list[QuoteRouting]
+) -> None:
+    """Save generated quotes in one write, commit, and cache their routing snapshots."""
+    # Quotes live in the quote store until used (postgres backend: one
+    # multi-row INSERT for all of them)
+    await get_quote_store().save(db, stored_quotes)
+    await db.commit()
+    
+    # pacs.008 validation on this process can skip the lookup
+    routing_cache = get_quote_routing_cache()
+    for routing in routings:
+        routing_cache.put(routing)
 
 
 # =============================================================================
@@ -205,237 +380,112 @@ async def get_quotes(
     - Creditor account amount (net to recipient)
     """
     
-    # Get currencies for countries
-    currency_query = text("""
-        SELECT country_code, currency_code, max_amount
-        FROM country_currencies
-        WHERE country_code IN (:source_country, :dest_country)
-    """)
+    source_currency, source_max, dest_currency, dest_max = await get_corridor_currencies(
+        db, source_country, destination_country
+    )
     
-    result = await db.execute(currency_query, {
-        "source_country": source_country.upper(),
-        "dest_country": destination_country.upper(),
-    })
-    rows = result.fetchall()
+    # Get available FX rates from the in-memory rate book
+    # Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers
+    # The FXP's SAPs and the destination IPS are fixed for the life of the
+    # quote: they are stored on it as a routing snapshot for pacs.008 validation.
+    rate_book = get_rate_book()
+    await rate_book.ensure_loaded(db)
+    rate_rows = rate_book.corridor_rates(source_currency, dest_currency, destination_country.upper())
     
-    currencies = {row.country_code: (row.currency_code, row.max_amount) for row in rows}
+    if not rate_rows:
+        raise no_rates_error(source_currency, dest_currency)
     
-    if source_country.upper() not in currencies:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Source country {source_country} not found or has no currency",
-        )
+    stored_quotes = []
+    routings = []
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.quote_validity_seconds)
     
-    if destination_country.upper() not in currencies:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Destination country {destination_country} not found or has no currency",
-        )
+    # Fee structures for the corridor, resolved once for all FXPs
+    fees = corridor_fees(source_currency, dest_currency)
+    quotes = build_quotes(
+        rate_rows, fees, amount, amount_type, source_psp_bic,
+        source_country, destination_country, source_currency, source_max, dest_currency, dest_max,
+        expires_at, stored_quotes, routings,
+    )
+    await save_quotes(db, stored_quotes, routings)
     
-    source_currency, source_max = currencies[source_country.upper()]
-    dest_currency, dest_max = currencies[destination_country.upper()]
+    return {"quotes": quotes}
+
+
+@router.post(
+    "/quotes/batch",
+    response_model=BatchQuotesResponse,
+    summary="Retrieve FX Quotes for Many Corridors",
+    description="""
+    Retrieve FX quotes for several corridors and amounts in one request,
+    e.g. for a "send to" screen listing many destination countries.
     
-    if source_currency == dest_currency:
-        raise HTTPException(
-            status_code=400,
-            detail="Source and destination currencies are the same. No FX needed.",
-        )
+    Each item is priced exactly as GET /quotes would price it. Countries are
+    resolved once, all items are priced from the same rate book snapshot and
+    all quotes are saved in one write.
     
-    # Get available FX rates
-    # Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers
-    rates_query = text("""
-        SELECT 
-            r.rate_id,
-            r.fxp_id,
-            f.fxp_code,
-            f.name as fxp_name,
-            r.base_rate,
-            f.base_spread_bps,
-            f.tier_improvements,
-            f.psp_improvements
-        FROM fx_rates r
-        JOIN fxps f ON r.fxp_id = f.fxp_id
-        WHERE r.source_currency = :source_currency
-        AND r.destination_currency = :dest_currency
-        AND r.status = 'ACTIVE'
-        AND r.valid_until > NOW()
-        AND f.participant_status = 'ACTIVE'
-        ORDER BY r.base_rate DESC
-    """)
+    Results are returned in request order. An item that GET /quotes would
+    reject (unknown country, same currency, no FX rates) gets an `error`
+    with the status and detail GET /quotes would return; the other items
+    are still quoted.
+    """,
+)
+async def get_quotes_batch(
+    request: BatchQuoteRequest,
+    db: AsyncSession = Depends(get_db),
+) -> dict[str, Any]:
+    """Generate FX quotes for many (corridor, amount) items."""
     
-    result = await db.execute(rates_query, {
-        "source_currency": source_currency,
-        "dest_currency": dest_currency,
-    })
-    rate_rows = result.fetchall()
+    currencies = await load_country_currencies(
+        db, [code for item in request.items for code in (item.source_country, item.destination_country)]
+    )
     
-    if not rate_rows:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No FX rates available for {source_currency}/{dest_currency}",
-        )
+    # No await between here and save_quotes: every item sees the same snapshot
+    rate_book = get_rate_book()
+    await rate_book.ensure_loaded(db)
     
-    quotes = []
+    results = []
+    stored_quotes = []
+    routings = []
+    corridors: dict[tuple[str, str, str], tuple[list[CorridorRate], CorridorFees]] = {}
     expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.quote_validity_seconds)
     
-    for row in rate_rows:
-        quote_id = uuid4()
-        
-        # Calculate final rate with improvements
-        # Reference: https://docs.nexusglobalpayments.org/fx-provision/rates-from-third-party-fx-providers/improving-rates-for-larger-transactions
-        base_rate = Decimal(str(row.base_rate))
-        spread_bps = row.base_spread_bps
-        
-        # Apply tier improvement (larger transactions get positive improvement)
-        tier_improvement_bps = 0
-        if row.tier_improvements:
-            for tier in sorted(row.tier_improvements, key=lambda x: x["minAmount"], reverse=True):
-                if amount >= tier["minAmount"]:
-                    tier_improvement_bps = tier["improvementBps"]
-                    break
-        
-        # Apply PSP-specific improvement
-        psp_improvement_bps = 0
-        if source_psp_bic and row.psp_improvements:
-            psp_improvement_bps = row.psp_improvements.get(source_psp_bic.upper(), 0)
-        
-        # Calculate final rate per Nexus spec
-        total_improvement_bps = tier_improvement_bps + psp_improvement_bps
-        net_adjustment_bps = total_improvement_bps - spread_bps
-        customer_rate = base_rate * (1 + Decimal(net_adjustment_bps) / Decimal(10000))
-        
-        # =================================================================
-        # CALCULATE ALL FEES AT QUOTE TIME (Single Source of Truth)
-        # =================================================================
-        logger.debug(f"[FEE-DEBUG] quotes.py ENTRY: amount={amount}, amount_type={amount_type}, source_currency={source_currency}, dest_currency={dest_currency}")
-
-        if amount_type == "DESTINATION":
-            # User specifies NET amount recipient should receive
-            creditor_account_amount = amount  # This is what recipient gets NET
-
-            # Calculate destination fee on net amount, then gross up
-            dest_psp_fee = _calculate_destination_psp_fee(creditor_account_amount, dest_currency)
-            dest_interbank_amount = creditor_account_amount + dest_psp_fee  # Gross
-
-            # Calculate source principal from gross payout
-            source_interbank_amount = dest_interbank_amount / customer_rate
-
-            # For DESTINATION quotes, calculate what the source fee WOULD be (for disclosure)
-            source_psp_fee = _calculate_source_psp_fee(source_interbank_amount, source_currency)
-
-            logger.debug(f"[FEE-DEBUG] DESTINATION calc: creditor_account_amount={creditor_account_amount}, dest_psp_fee={dest_psp_fee}, dest_interbank_amount={dest_interbank_amount}, source_interbank_amount={source_interbank_amount}, source_psp_fee={source_psp_fee}")
-
-        else:  # SOURCE
-            # User specifies DebtorAccountAmount (total to DEBIT from sender)
-            # Per Nexus spec: "Source PSP should request the quote amount after deducting its own fee"
-            # Reference: docs.nexusglobalpayments.org/fees-and-pricing
-            debtor_account_amount = amount
-
-            # Calculate and DEDUCT source PSP fee first
-            source_psp_fee = _calculate_source_psp_fee(debtor_account_amount, source_currency)
-            source_interbank_amount = debtor_account_amount - source_psp_fee
-
-            # Now calculate destination side from the net interbank amount
-            dest_interbank_amount = source_interbank_amount * customer_rate
-
-            # Calculate destination fee and net to recipient
-            dest_psp_fee = _calculate_destination_psp_fee(dest_interbank_amount, dest_currency)
-            creditor_account_amount = dest_interbank_amount - dest_psp_fee
-
-            logger.debug(f"[FEE-DEBUG] SOURCE calc: debtor_account_amount={debtor_account_amount}, source_psp_fee={source_psp_fee}, source_interbank_amount={source_interbank_amount}, dest_interbank_amount={dest_interbank_amount}, dest_psp_fee={dest_psp_fee}, creditor_account_amount={creditor_account_amount}")
-        scheme_fee_calc = _calculate_scheme_fee(source_interbank_amount)
-        
-        # Check and apply capping
-        capped = False
-        if source_interbank_amount > source_max:
-            source_interbank_amount = source_max
-            dest_interbank_amount = source_interbank_amount * customer_rate
-            dest_psp_fee = _calculate_destination_psp_fee(dest_interbank_amount, dest_currency)
-            creditor_account_amount = dest_interbank_amount - dest_psp_fee
-            capped = True
-        if dest_interbank_amount > dest_max:
-            dest_interbank_amount = dest_max
-            source_interbank_amount = dest_interbank_amount / customer_rate
-            dest_psp_fee = _calculate_destination_psp_fee(dest_interbank_amount, dest_currency)
-            creditor_account_amount = dest_interbank_amount - dest_psp_fee
-            capped = True
-        
-        # Ensure non-negative creditor amount
-        if creditor_account_amount <= 0:
-            # Skip this quote - fees exceed payment
-            continue
-        
-        # Round amounts
-        source_interbank_amount = source_interbank_amount.quantize(Decimal("0.01"))
-        dest_interbank_amount = dest_interbank_amount.quantize(Decimal("0.01"))
-        creditor_account_amount = creditor_account_amount.quantize(Decimal("0.01"))
-        dest_psp_fee = dest_psp_fee.quantize(Decimal("0.01"))
-        source_psp_fee = source_psp_fee.quantize(Decimal("0.01"))
-        
-        # Store quote in database WITH ALL FEES
-        insert_query = text("""
-            INSERT INTO quotes (
-                quote_id, requesting_psp_bic, source_country, destination_country,
-                source_currency, destination_currency, amount_type, requested_amount,
-                fxp_id, base_rate, final_rate, tier_improvement_bps, psp_improvement_bps,
-                source_interbank_amount, destination_interbank_amount,
-                creditor_account_amount, destination_psp_fee,
-                capped_to_max_amount, expires_at, status
-            ) VALUES (
-                :quote_id, :requesting_psp_bic, :source_country, :destination_country,
-                :source_currency, :destination_currency, :amount_type, :requested_amount,
-                :fxp_id, :base_rate, :final_rate, :tier_improvement_bps, :psp_improvement_bps,
-                :source_interbank_amount, :destination_interbank_amount,
-                :creditor_account_amount, :destination_psp_fee,
-                :capped_to_max_amount, :expires_at, 'ACTIVE'
+    for index, item in enumerate(request.items):
+        result = {
+            "index": index,
+            "sourceCountry": item.source_country.upper(),
+            "destCountry": item.destination_country.upper(),
+            "amount": str(item.amount),
+            "amountType": item.amount_type,
+        }
+        try:
+            source_currency, source_max, dest_currency, dest_max = resolve_corridor(
+                currencies, item.source_country, item.destination_country
             )
-        """)
-        
-        await db.execute(insert_query, {
-            "quote_id": quote_id,
-            "requesting_psp_bic": source_psp_bic or "UNKNOWN",
-            "source_country": source_country.upper(),
-            "destination_country": destination_country.upper(),
-            "source_currency": source_currency,
-            "destination_currency": dest_currency,
-            "amount_type": amount_type,
-            "requested_amount": amount,
-            "fxp_id": row.fxp_id,
-            "base_rate": base_rate,
-            "final_rate": customer_rate,
-            "tier_improvement_bps": tier_improvement_bps,
-            "psp_improvement_bps": psp_improvement_bps,
-            "source_interbank_amount": source_interbank_amount,
-            "destination_interbank_amount": dest_interbank_amount,
-            "creditor_account_amount": creditor_account_amount,
-            "destination_psp_fee": dest_psp_fee,
-            "capped_to_max_amount": capped,
-            "expires_at": expires_at,
-        })
-        
-        # Include ALL fee fields in response per Nexus spec
-        # Added baseRate and improvement fields per EXTENSIVE_PARITY_REVIEW_REPORT.md
-        # Added sourcePspFee per issue C1 fix
-        quotes.append({
-            "quoteId": str(quote_id),
-            "fxpId": row.fxp_code,
-            "fxpName": row.fxp_name,
-            "baseRate": str(base_rate.quantize(Decimal("0.00000001"))),
-            "exchangeRate": str(customer_rate.quantize(Decimal("0.00000001"))),
-            "tierImprovementBps": int(tier_improvement_bps),
-            "pspImprovementBps": int(psp_improvement_bps),
-            "sourceInterbankAmount": str(source_interbank_amount),
-            "destinationInterbankAmount": str(dest_interbank_amount),
-            "creditorAccountAmount": str(creditor_account_amount),
-            "sourcePspFee": str(source_psp_fee),
-            "destinationPspFee": str(dest_psp_fee),
-            "cappedToMaxAmount": capped,
-            "expiresAt": expires_at.isoformat().replace("+00:00", "Z"),
-        })
+            key = (source_currency, dest_currency, item.destination_country.upper())
+            if key not in corridors:
+                corridors[key] = (
+                    rate_book.corridor_rates(*key),
+                    corridor_fees(source_currency, dest_currency),
+                )
+            rate_rows, fees = corridors[key]
+            if not rate_rows:
+                raise no_rates_error(source_currency, dest_currency)
+        except HTTPException as e:
+            result["error"] = {"status": e.status_code, "detail": e.detail}
+        else:
+            result["quotes"] = build_quotes(
+                rate_rows, fees, item.amount, item.amount_type, request.source_psp_bic,
+                item.source_country, item.destination_country,
+                source_currency, source_max, dest_currency, dest_max,
+                expires_at, stored_quotes, routings,
+            )
+        results.append(result)
     
-    await db.commit()
+    await save_quotes(db, stored_quotes, routings)
     
-    return {"quotes": quotes}
+    logger.info(f"Batch quotes: {len(request.items)} items, {len(corridors)} corridors, {len(stored_quotes)} quotes")
+    
+    return {"results": results}
 
 
 @router.get(
@@ -452,26 +502,9 @@ async def retrieve_single_quote(
     quote_id: UUID = Path(..., description="Quote ID"),
     db: AsyncSession = Depends(get_db),
 ) -> dict[str, Any]:
-    """Get a specific quote by ID."""
-    
-    query = text("""
-        SELECT 
-            q.quote_id,
-            f.fxp_code,
-            f.name as fxp_name,
-            q.final_rate,
-            q.source_interbank_amount,
-            q.destination_interbank_amount,
-            q.capped_to_max_amount,
-            q.expires_at,
-            q.status
-        FROM quotes q
-        JOIN fxps f ON q.fxp_id = f.fxp_id
-        WHERE q.quote_id = :quote_id
-    """)
+    """Get a specific quote by ID (quote store first, then the quotes table)."""
     
-    result = await db.execute(query, {"quote_id": quote_id})
-    row = result.fetchone()
+    row = await get_quote(db, quote_id)
     
     if not row:
         raise HTTPException(status_code=404, detail="Quote not found")
@@ -516,23 +549,11 @@ async def accept_quote(
 ) -> dict[str, Any]:
     """Get intermediary agent details for a quote."""
     
-    # Get quote details
-    quote_query = text("""
-        SELECT 
-            q.quote_id,
-            q.fxp_id,
-            q.source_currency,
-            q.destination_currency,
-            q.source_country,
-            q.destination_country,
-            q.expires_at,
-            q.status
-        FROM quotes q
-        WHERE q.quote_id = :quote_id
-    """)
-    
-    result = await db.execute(quote_query, {"quote_id": quote_id})
-    quote = result.fetchone()
+    # Get quote details. Requesting intermediary agents locks in the quote,
+    # so it is written to Postgres here if it is still only in the quote store
+    quote = await persist_quote(db, quote_id)
+    if quote is not None:
+        await db.commit()
     
     # For sandbox: return mock SAP accounts if quote not found
     # This allows the demo dashboard to work without persisted quotes
@@ -600,16 +621,11 @@ async def accept_quote(
     source_account = accounts[quote.source_currency]
     dest_account = accounts[quote.destination_currency]
     
-    # Get FXP details
-    fxp_query = text("SELECT fxp_code, name FROM fxps WHERE fxp_id = :fxp_id")
-    fxp_result = await db.execute(fxp_query, {"fxp_id": quote.fxp_id})
-    fxp = fxp_result.fetchone()
-    
     return {
         "quoteId": str(quote_id),
         # Added per EXTENSIVE_PARITY_REVIEW_REPORT.md
-        "fxpId": fxp.fxp_code if fxp else "UNKNOWN",
-        "fxpName": fxp.name if fxp else "Unknown FXP",
+        "fxpId": quote.fxp_code,
+        "fxpName": quote.fxp_name,
         "intermediaryAgent1": {
             "agentRole": "SOURCE_SAP",
             "sapId": f"{source_account.country_code}SAP",
@@ -0,0 +1,410 @@
+"""
+Corridor Rate Book
+
+In-process copy of the quote inputs, keyed by (source_currency,
+destination_currency): active fx_rates joined with the FXP's spread and
+improvements, plus the FXP SAP accounts and destination IPS codes stored on
+quotes as the routing snapshot. GET /quotes reads the book instead of
+running the fx_rates JOIN fxps query and re-parsing the improvement JSON on
+every request.
+
+Freshness:
+- Startup: one full load (main.lifespan).
+- Changes: migration 008 triggers NOTIFY nexus_rate_changes on commit. A
+  fx_rates change reloads its corridor; FXP, SAP account or IPS changes
+  reload the whole book. Bursts of notifications are coalesced.
+- Expiry needs no notification: each entry carries valid_until and reads
+  skip expired rates.
+- Safety net: a full resync every rate_refresh_interval_seconds, and on
+  reconnect if the LISTEN connection drops.
+
+Every load and corridor reload bumps RateBook.generation and wakes
+wait_for_change() callers (the live quote streams in api/quote_stream.py).
+
+The listener connection also LISTENs on nexus_reference_changes (migration
+009) and invalidates the reference data cache (api/reference_data.py).
+
+When the listener is not running (tests, scripts, RATE_BOOK_ENABLED=false)
+the book is loaded on first use and refreshed by the same interval.
+
+Configuration (Settings / environment):
+    RATE_BOOK_ENABLED               LISTEN for changes (default true)
+    RATE_REFRESH_INTERVAL_SECONDS   full resync interval (default 60)
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import time
+
+import orjson
+
+from ..config import settings
+from ..db import async_session_maker, engine
+from .reference_data import REFERENCE_CHANGES_CHANNEL, invalidate_reference_data
+
+logger = logging.getLogger(__name__)
+
+RATE_CHANGES_CHANNEL = "nexus_rate_changes"
+
+_RATES_SELECT = """
+    SELECT
+        r.rate_id, r.fxp_id, f.fxp_code, f.name AS fxp_name,
+        r.source_currency, r.destination_currency,
+        r.base_rate, r.valid_until,
+        f.base_spread_bps, f.tier_improvements, f.psp_improvements
+    FROM fx_rates r
+    JOIN fxps f ON r.fxp_id = f.fxp_id
+    WHERE r.status = 'ACTIVE'
+      AND r.valid_until > NOW()
+      AND f.participant_status = 'ACTIVE'
+"""
+
+ALL_RATES_SQL = text(_RATES_SELECT)
+
+CORRIDOR_RATES_SQL = text(_RATES_SELECT + """
+      AND r.source_currency = :source_currency
+      AND r.destination_currency = :dest_currency
+""")
+
+# First account per FXP and currency (matches the previous LIMIT 1 subquery)
+FXP_SAPS_SQL = text("""
+    SELECT a.fxp_id, a.currency_code, s.bic
+    FROM fxp_sap_accounts a
+    JOIN saps s ON a.sap_id = s.sap_id
+    ORDER BY a.created_at
+""")
+
+IPS_CODES_SQL = text("""
+    SELECT country_code, clearing_system_id
+    FROM ips_operators
+    ORDER BY created_at
+""")
+
+
+class BookRate(NamedTuple):
+    """One FXP rate for a corridor, with improvements pre-parsed."""
+    rate_id: str
+    fxp_id: object  # UUID
+    fxp_code: str
+    fxp_name: str
+    base_rate: Decimal
+    valid_until: datetime
+    base_spread_bps: int
+    tier_improvements: tuple[tuple[Decimal, int], ...]  # (minAmount, bps), largest first
+    psp_improvements: dict[str, int]  # upper-case PSP BIC -> bps
+
+
+class CorridorRate(NamedTuple):
+    """A BookRate resolved for a quote request (routing snapshot attached)."""
+    rate: BookRate
+    source_sap_bic: Optional[str]
+    dest_sap_bic: Optional[str]
+    dest_ips_code: Optional[str]
+
+
+def _json(value):
+    """JSONB columns arrive decoded or as text depending on the driver codec."""
+    if isinstance(value, (str, bytes)):
+        return orjson.loads(value)
+    return value
+
+
+def book_rate(row) -> BookRate:
+    """Build a BookRate from a rates query row."""
+    tiers = sorted(
+        ((Decimal(str(t["minAmount"])), int(t["improvementBps"])) for t in _json(row.tier_improvements) or ()),
+        reverse=True,
+    )
+    psp = {bic.upper(): int(bps) for bic, bps in (_json(row.psp_improvements) or {}).items()}
+    return BookRate(
+        rate_id=str(row.rate_id),
+        fxp_id=row.fxp_id,
+        fxp_code=row.fxp_code,
+        fxp_name=row.fxp_name,
+        base_rate=Decimal(str(row.base_rate)),
+        valid_until=row.valid_until,
+        base_spread_bps=row.base_spread_bps,
+        tier_improvements=tuple(tiers),
+        psp_improvements=psp,
+    )
+
+
+class RateBook:
+    """
+    Corridor-keyed rates with FXP SAP accounts and IPS codes.
+
+    Updates replace whole corridor lists, so readers never see a partly
+    applied change.
+    """
+
+    def __init__(self, refresh_interval_seconds: int = 60):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._corridors: dict[tuple[str, str], list[BookRate]] = {}
+        self._fxp_saps: dict[tuple[str, str], str] = {}  # (fxp_id, currency) -> SAP BIC
+        self._ips_codes: dict[str, str] = {}  # country -> clearing system id
+        self._loaded_at: Optional[float] = None  # monotonic
+        self.listening = False  # set while RateBookListener holds LISTEN
+        self._lock = asyncio.Lock()
+        self.generation = 0  # bumped on every load and corridor reload
+        self._changed = asyncio.Event()
+        self._stats = {
+            "reads": 0,
+            "fullLoads": 0,
+            "corridorReloads": 0,
+            "notifications": 0,
+            "listenerErrors": 0,
+            "lastLoadMs": 0.0,
+        }
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._loaded_at is None or now - self._loaded_at >= self.refresh_interval_seconds
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    async def load(self, db: AsyncSession) -> None:
+        """Full reload of rates and routing reference data."""
+        started = time.perf_counter()
+        rates = (await db.execute(ALL_RATES_SQL)).fetchall()
+        saps = (await db.execute(FXP_SAPS_SQL)).fetchall()
+        ips = (await db.execute(IPS_CODES_SQL)).fetchall()
+
+        corridors: dict[tuple[str, str], list[BookRate]] = {}
+        for row in rates:
+            corridors.setdefault((row.source_currency, row.destination_currency), []).append(book_rate(row))
+        for entries in corridors.values():
+            entries.sort(key=lambda r: r.base_rate, reverse=True)
+        fxp_saps: dict[tuple[str, str], str] = {}
+        for row in saps:
+            fxp_saps.setdefault((str(row.fxp_id), row.currency_code), row.bic)
+        ips_codes: dict[str, str] = {}
+        for row in ips:
+            ips_codes.setdefault(row.country_code, row.clearing_system_id)
+
+        self._corridors, self._fxp_saps, self._ips_codes = corridors, fxp_saps, ips_codes
+        self._loaded_at = time.monotonic()
+        self._stats["fullLoads"] += 1
+        self._stats["lastLoadMs"] = round((time.perf_counter() - started) * 1000, 3)
+        self._publish()
+        logger.debug(f"Rate book loaded: {len(rates)} rates in {len(corridors)} corridors")
+
+    async def reload_corridor(self, db: AsyncSession, source_currency: str, dest_currency: str) -> None:
+        """Replace one corridor's rates."""
+        result = await db.execute(CORRIDOR_RATES_SQL, {
+            "source_currency": source_currency,
+            "dest_currency": dest_currency,
+        })
+        entries = sorted((book_rate(row) for row in result.fetchall()), key=lambda r: r.base_rate, reverse=True)
+        key = (source_currency, dest_currency)
+        if entries:
+            self._corridors[key] = entries
+        else:
+            self._corridors.pop(key, None)
+        self._stats["corridorReloads"] += 1
+        self._publish()
+
+    def _needs_load(self) -> bool:
+        # The listener keeps a listening book current and does its own resync
+        return not self.loaded or (not self.listening and self.is_stale())
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Load on first use; without a listener, also resync once the interval has passed."""
+        if not self._needs_load():
+            return
+        async with self._lock:
+            if self._needs_load():
+                await self.load(db)
+
+    def _publish(self) -> None:
+        """Wake everyone waiting for a change."""
+        self.generation += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, generation: int, timeout: float) -> int:
+        """
+        Wait until the book changes after `generation` (or timeout).
+
+        Returns the current generation; equal to `generation` on timeout.
+        """
+        if self.generation == generation:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.generation
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def rates(self, source_currency: str, dest_currency: str, now: Optional[datetime] = None) -> list[BookRate]:
+        """Unexpired rates for a corridor, best base rate first."""
+        self._stats["reads"] += 1
+        now = now or datetime.now(timezone.utc)
+        return [r for r in self._corridors.get((source_currency, dest_currency), ()) if r.valid_until > now]
+
+    def corridor_rates(self, source_currency: str, dest_currency: str, dest_country: str) -> list[CorridorRate]:
+        """Rates with the quote routing snapshot (SAP BICs, destination IPS) resolved."""
+        dest_ips_code = self._ips_codes.get(dest_country)
+        return [
+            CorridorRate(
+                rate=r,
+                source_sap_bic=self._fxp_saps.get((str(r.fxp_id), source_currency)),
+                dest_sap_bic=self._fxp_saps.get((str(r.fxp_id), dest_currency)),
+                dest_ips_code=dest_ips_code,
+            )
+            for r in self.rates(source_currency, dest_currency)
+        ]
+
+    # -------------------------------------------------------------------------
+    # Change notifications
+    # -------------------------------------------------------------------------
+
+    async def apply_changes(self, db: AsyncSession, payloads: list[str]) -> None:
+        """Apply a coalesced batch of nexus_rate_changes payloads."""
+        self._stats["notifications"] += len(payloads)
+        corridors = set()
+        for payload in payloads:
+            try:
+                change = orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                change = {"scope": "all"}
+            if change.get("scope") == "corridor":
+                corridors.add((change["source"], change["destination"]))
+            else:
+                await self.load(db)
+                return
+        for source_currency, dest_currency in sorted(corridors):
+            await self.reload_corridor(db, source_currency, dest_currency)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "listening": self.listening,
+            "corridors": len(self._corridors),
+            "rates": sum(len(v) for v in self._corridors.values()),
+            "ageSeconds": round(time.monotonic() - self._loaded_at, 3) if self.loaded else None,
+            **self._stats,
+        }
+
+
+# =============================================================================
+# Listener
+# =============================================================================
+
+class RateBookListener:
+    """
+    LISTEN nexus_rate_changes and keep the book current.
+
+    Uses a dedicated pooled connection (asyncpg add_listener). Queries for
+    reloads use ordinary sessions.
+    """
+
+    def __init__(self, book: RateBook, session_factory=async_session_maker, db_engine=engine):
+        self.book = book
+        self.session_factory = session_factory
+        self.engine = db_engine
+        self._changes: asyncio.Queue[str] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._changes.put_nowait(payload)
+
+    def _on_reference_notify(self, connection, pid, channel, payload) -> None:
+        invalidate_reference_data(f"{channel}: {payload}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="rate-book-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _resync(self) -> None:
+        async with self.session_factory() as session:
+            await self.book.load(session)
+
+    async def _drain(self) -> list[str]:
+        """Wait for a change (up to the resync deadline) and take everything queued."""
+        timeout = max(self.book.refresh_interval_seconds - (time.monotonic() - self.book._loaded_at), 0)
+        payloads = [await asyncio.wait_for(self._changes.get(), timeout)]
+        while not self._changes.empty():
+            payloads.append(self._changes.get_nowait())
+        return payloads
+
+    async def _run(self) -> None:
+        reconnecting = False
+        while True:
+            try:
+                async with self.engine.connect() as conn:
+                    listener = (await conn.get_raw_connection()).driver_connection
+                    await listener.add_listener(RATE_CHANGES_CHANNEL, self._on_notify)
+                    await listener.add_listener(REFERENCE_CHANGES_CHANNEL, self._on_reference_notify)
+                    # Load after LISTEN so no change between the two is missed
+                    await self._resync()
+                    if reconnecting:
+                        invalidate_reference_data("listener reconnected")
+                    self.book.listening = True
+                    logger.info(f"Rate book listening on {RATE_CHANGES_CHANNEL}")
+                    while not listener.is_closed():
+                        try:
+                            payloads = await self._drain()
+                        except asyncio.TimeoutError:
+                            await self._resync()
+                            continue
+                        async with self.session_factory() as session:
+                            await self.book.apply_changes(session, payloads)
+                    raise ConnectionError("LISTEN connection closed")
+            except asyncio.CancelledError:
+                self.book.listening = False
+                raise
+            except Exception as e:
+                self.book.listening = False
+                self.book._stats["listenerErrors"] += 1
+                reconnecting = True
+                logger.warning(f"Rate book listener error, retrying: {e}")
+                await asyncio.sleep(min(self.book.refresh_interval_seconds, 5))
+
+
+# Singletons
+_book: Optional[RateBook] = None
+_listener: Optional[RateBookListener] = None
+
+
+def get_rate_book() -> RateBook:
+    """Get the process-wide rate book."""
+    global _book
+    if _book is None:
+        _book = RateBook(refresh_interval_seconds=settings.rate_refresh_interval_seconds)
+    return _book
+
+
+async def start_rate_book() -> None:
+    """Start the change listener if enabled (called from main.lifespan)."""
+    global _listener
+    if settings.rate_book_enabled and _listener is None:
+        _listener = RateBookListener(get_rate_book())
+        await _listener.start()
+
+
+async def stop_rate_book() -> None:
+    """Stop the change listener (called from main.lifespan)."""
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
@@ -0,0 +1,460 @@
+"""
+Reference Data Cache
+
+In-process snapshot of the reference tables that change a few times a day:
+countries (currencies, max amounts, required message elements), currencies,
+PSPs, SAPs, FXPs, IPS operators and PDOs. Discovery handlers (countries,
+currencies, fin_insts, psp, ips, pdo), the quote country lookup and the
+SAP/FXP existence checks read typed indexes from the snapshot instead of
+querying Postgres on every request.
+
+Invalidation is by version: invalidate() bumps the cache version and the
+next read reloads the snapshot (one load per version, concurrent readers
+wait for it). The version is bumped by:
+- Write paths on this replica, after commit: countries.update_country,
+  fin_insts.create_fin_inst and fin_insts.update_fin_inst.
+- Other replicas and out-of-band changes: migration 009 triggers NOTIFY
+  nexus_reference_changes on commit; the rate book listener connection
+  (rate_book.RateBookListener) LISTENs on it.
+- Safety net: a snapshot older than reference_data_refresh_interval_seconds
+  is reloaded.
+
+Startup: one load from main.lifespan; if the database is not reachable yet
+the first request loads instead.
+
+Configuration (Settings / environment):
+    REFERENCE_DATA_REFRESH_INTERVAL_SECONDS   maximum snapshot age (default 300)
+"""
+
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import time
+
+import orjson
+
+from ..config import settings
+from ..db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CHANGES_CHANNEL = "nexus_reference_changes"
+
+# Orders match the handlers' previous ORDER BY clauses, so index lists can
+# be returned (or filtered) as they are
+COUNTRIES_SQL = text("""
+    SELECT country_id, country_code, name
+    FROM countries
+    ORDER BY name
+""")
+
+COUNTRY_CURRENCIES_SQL = text("""
+    SELECT country_code, currency_code, max_amount
+    FROM country_currencies
+    ORDER BY country_code, currency_code
+""")
+
+REQUIRED_ELEMENTS_SQL = text("""
+    SELECT country_code, message_type, element_name
+    FROM country_required_elements
+    ORDER BY country_code, message_type, element_name
+""")
+
+CURRENCIES_SQL = text("""
+    SELECT currency_code, name, decimal_places
+    FROM currencies
+    ORDER BY currency_code
+""")
+
+PSPS_SQL = text("""
+    SELECT psp_id::text, bic, name, country_code, fee_percent, participant_status
+    FROM psps
+    ORDER BY country_code, name
+""")
+
+SAPS_SQL = text("""
+    SELECT sap_id::text, bic, name, country_code, currency_code, participant_status
+    FROM saps
+    ORDER BY country_code, name
+""")
+
+FXPS_SQL = text("""
+    SELECT fxp_id::text, fxp_code, name, participant_status
+    FROM fxps
+    ORDER BY name
+""")
+
+IPS_OPERATORS_SQL = text("""
+    SELECT ips_id::text, name, country_code, clearing_system_id, max_amount, currency_code
+    FROM ips_operators
+    ORDER BY country_code, name
+""")
+
+PDOS_SQL = text("""
+    SELECT pdo_id::text, name, country_code, supported_proxy_types
+    FROM pdos
+    ORDER BY country_code, name
+""")
+
+
+# =============================================================================
+# Records
+# =============================================================================
+
+class CountryCurrency(NamedTuple):
+    currency_code: str
+    max_amount: Decimal
+
+
+class Country(NamedTuple):
+    country_id: int
+    country_code: str
+    name: str
+    currencies: tuple[CountryCurrency, ...]  # by currency code
+    required_elements: dict[str, tuple[str, ...]]  # message type -> element names
+
+
+class Currency(NamedTuple):
+    currency_code: str
+    name: str
+    decimal_places: int
+
+
+class Psp(NamedTuple):
+    psp_id: str
+    bic: str
+    name: str
+    country_code: str
+    fee_percent: Optional[Decimal]
+    participant_status: str
+
+
+class Sap(NamedTuple):
+    sap_id: str
+    bic: str
+    name: str
+    country_code: str
+    currency_code: str
+    participant_status: str
+
+
+class Fxp(NamedTuple):
+    fxp_id: str
+    fxp_code: str
+    name: str
+    participant_status: str
+
+
+class IpsOperator(NamedTuple):
+    ips_id: str
+    name: str
+    country_code: str
+    clearing_system_id: str
+    max_amount: Decimal
+    currency_code: str
+
+
+class Pdo(NamedTuple):
+    pdo_id: str
+    name: str
+    country_code: str
+    supported_proxy_types: list[str]
+
+
+def _json(value):
+    """JSONB columns arrive decoded or as text depending on the driver codec."""
+    if isinstance(value, (str, bytes)):
+        return orjson.loads(value)
+    return value
+
+
+def _group(records, key) -> dict:
+    groups: dict = {}
+    for record in records:
+        groups.setdefault(key(record), []).append(record)
+    return {k: tuple(v) for k, v in groups.items()}
+
+
+# =============================================================================
+# Snapshot
+# =============================================================================
+
+class ReferenceData:
+    """
+    One consistent snapshot of the reference tables, with lookup indexes.
+
+    Built from query rows (anything with the selected attributes) and never
+    modified afterwards. Codes and BICs are indexed upper-case.
+    """
+
+    def __init__(
+        self,
+        version: int = 0,
+        countries=(),
+        country_currencies=(),
+        required_elements=(),
+        currencies=(),
+        psps=(),
+        saps=(),
+        fxps=(),
+        ips_operators=(),
+        pdos=(),
+    ):
+        self.version = version
+
+        country_currency_rows: dict[str, list[CountryCurrency]] = {}
+        for row in country_currencies:
+            country_currency_rows.setdefault(row.country_code, []).append(
+                CountryCurrency(row.currency_code, row.max_amount)
+            )
+        elements: dict[str, dict[str, list[str]]] = {}
+        for row in required_elements:
+            elements.setdefault(row.country_code, {}).setdefault(row.message_type, []).append(row.element_name)
+
+        # country code -> Country, by name
+        self.countries: dict[str, Country] = {
+            row.country_code: Country(
+                country_id=row.country_id,
+                country_code=row.country_code,
+                name=row.name,
+                currencies=tuple(country_currency_rows.get(row.country_code, ())),
+                required_elements={m: tuple(e) for m, e in elements.get(row.country_code, {}).items()},
+            )
+            for row in countries
+        }
+        # currency code -> Currency, by code
+        self.currencies: dict[str, Currency] = {
+            row.currency_code: Currency(row.currency_code, row.name, row.decimal_places)
+            for row in currencies
+        }
+
+        # Participants, by country and name
+        self.psps: tuple[Psp, ...] = tuple(
+            Psp(row.psp_id, row.bic, row.name, row.country_code, row.fee_percent, row.participant_status)
+            for row in psps
+        )
+        self.saps: tuple[Sap, ...] = tuple(
+            Sap(row.sap_id, row.bic, row.name, row.country_code, row.currency_code, row.participant_status)
+            for row in saps
+        )
+        self.fxps: tuple[Fxp, ...] = tuple(
+            Fxp(row.fxp_id, row.fxp_code, row.name, row.participant_status)
+            for row in fxps
+        )
+        self.ips_operators: tuple[IpsOperator, ...] = tuple(
+            IpsOperator(row.ips_id, row.name, row.country_code, row.clearing_system_id, row.max_amount, row.currency_code)
+            for row in ips_operators
+        )
+        self.pdos: tuple[Pdo, ...] = tuple(
+            Pdo(row.pdo_id, row.name, row.country_code, _json(row.supported_proxy_types) or [])
+            for row in pdos
+        )
+
+        self._psps_by_bic = {p.bic.upper(): p for p in self.psps}
+        self._psps_by_id = {p.psp_id: p for p in self.psps}
+        self._psps_by_country = _group(self.psps, lambda p: p.country_code)
+        # A SAP BIC can have one row per country and currency
+        self._saps_by_bic = _group(self.saps, lambda s: s.bic.upper())
+        self._saps_by_id = {s.sap_id: s for s in self.saps}
+        self._saps_by_country = _group(self.saps, lambda s: s.country_code)
+        self._fxps_by_code = {f.fxp_code.upper(): f for f in self.fxps}
+        self._fxps_by_id = {f.fxp_id: f for f in self.fxps}
+        self._ips_by_clearing_id = {i.clearing_system_id.upper(): i for i in self.ips_operators}
+        self._ips_by_country = _group(self.ips_operators, lambda i: i.country_code)
+        self._pdos_by_id = {p.pdo_id: p for p in self.pdos}
+        self._pdos_by_country = _group(self.pdos, lambda p: p.country_code)
+
+    # Countries -----------------------------------------------------------------
+
+    def country(self, country_code: str) -> Optional[Country]:
+        return self.countries.get(country_code.upper())
+
+    def country_currency(self, country_code: str) -> Optional[CountryCurrency]:
+        """The country's quoting currency and max amount (first by currency code)."""
+        country = self.country(country_code)
+        return country.currencies[0] if country is not None and country.currencies else None
+
+    def max_amount(self, country_code: str, currency_code: str) -> Optional[Decimal]:
+        country = self.country(country_code)
+        for country_currency in country.currencies if country is not None else ():
+            if country_currency.currency_code == currency_code.upper():
+                return country_currency.max_amount
+        return None
+
+    def currency(self, currency_code: str) -> Optional[Currency]:
+        return self.currencies.get(currency_code.upper())
+
+    # Participants ----------------------------------------------------------------
+
+    def psp_by_bic(self, bic: str) -> Optional[Psp]:
+        return self._psps_by_bic.get(bic.upper())
+
+    def psp_by_id(self, psp_id: str) -> Optional[Psp]:
+        return self._psps_by_id.get(psp_id.lower())
+
+    def psps_in_country(self, country_code: str) -> tuple[Psp, ...]:
+        """All PSPs of a country (any status), by name."""
+        return self._psps_by_country.get(country_code.upper(), ())
+
+    def sap_by_bic(self, bic: str) -> Optional[Sap]:
+        """First SAP row (by country, name) with the BIC."""
+        saps = self._saps_by_bic.get(bic.upper())
+        return saps[0] if saps else None
+
+    def saps_with_bic(self, bic: str) -> tuple[Sap, ...]:
+        return self._saps_by_bic.get(bic.upper(), ())
+
+    def sap_by_id(self, sap_id: str) -> Optional[Sap]:
+        return self._saps_by_id.get(sap_id.lower())
+
+    def saps_in_country(self, country_code: str) -> tuple[Sap, ...]:
+        return self._saps_by_country.get(country_code.upper(), ())
+
+    def fxp_by_code(self, fxp_code: str) -> Optional[Fxp]:
+        return self._fxps_by_code.get(fxp_code.upper())
+
+    def fxp_by_id(self, fxp_id: str) -> Optional[Fxp]:
+        return self._fxps_by_id.get(fxp_id.lower())
+
+    def ips_by_clearing_id(self, clearing_system_id: str) -> Optional[IpsOperator]:
+        return self._ips_by_clearing_id.get(clearing_system_id.upper())
+
+    def ips_in_country(self, country_code: str) -> tuple[IpsOperator, ...]:
+        return self._ips_by_country.get(country_code.upper(), ())
+
+    def pdo_by_id(self, pdo_id: str) -> Optional[Pdo]:
+        return self._pdos_by_id.get(pdo_id.lower())
+
+    def pdos_in_country(self, country_code: str) -> tuple[Pdo, ...]:
+        return self._pdos_by_country.get(country_code.upper(), ())
+
+    def counts(self) -> dict:
+        return {
+            "countries": len(self.countries),
+            "currencies": len(self.currencies),
+            "psps": len(self.psps),
+            "saps": len(self.saps),
+            "fxps": len(self.fxps),
+            "ipsOperators": len(self.ips_operators),
+            "pdos": len(self.pdos),
+        }
+
+
+# =============================================================================
+# Cache
+# =============================================================================
+
+class ReferenceDataCache:
+    """Holds the current ReferenceData snapshot and reloads it when invalidated or stale."""
+
+    def __init__(self, refresh_interval_seconds: int = 300):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._data: Optional[ReferenceData] = None
+        self._version = 1
+        self._loaded_at: Optional[float] = None  # monotonic
+        self._lock = asyncio.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "invalidations": 0,
+            "lastLoadMs": 0.0,
+        }
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _is_current(self) -> bool:
+        return (
+            self._data is not None
+            and self._data.version == self._version
+            and time.monotonic() - self._loaded_at < self.refresh_interval_seconds
+        )
+
+    def invalidate(self, reason: str = "") -> None:
+        """Bump the version; the next read reloads."""
+        self._version += 1
+        self._stats["invalidations"] += 1
+        logger.debug(f"Reference data invalidated (version {self._version}): {reason}")
+
+    def install(self, data: ReferenceData) -> None:
+        """Make a snapshot current (it is tagged with the version it was loaded for)."""
+        self._data = data
+        self._loaded_at = time.monotonic()
+
+    async def load(self, db: AsyncSession) -> ReferenceData:
+        """Load a snapshot for the current version."""
+        started = time.perf_counter()
+        # An invalidation while the queries run leaves the snapshot one
+        # version behind, so the next read loads again
+        version = self._version
+        rows = {}
+        for name, query in (
+            ("countries", COUNTRIES_SQL),
+            ("country_currencies", COUNTRY_CURRENCIES_SQL),
+            ("required_elements", REQUIRED_ELEMENTS_SQL),
+            ("currencies", CURRENCIES_SQL),
+            ("psps", PSPS_SQL),
+            ("saps", SAPS_SQL),
+            ("fxps", FXPS_SQL),
+            ("ips_operators", IPS_OPERATORS_SQL),
+            ("pdos", PDOS_SQL),
+        ):
+            rows[name] = (await db.execute(query)).fetchall()
+        data = ReferenceData(version, **rows)
+        self.install(data)
+        self._stats["loads"] += 1
+        self._stats["lastLoadMs"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.debug(f"Reference data loaded (version {version}): {data.counts()}")
+        return data
+
+    async def get(self, db: AsyncSession) -> ReferenceData:
+        """The current snapshot, loading it first if invalidated, stale or not loaded."""
+        if self._is_current():
+            self._stats["hits"] += 1
+            return self._data
+        self._stats["misses"] += 1
+        async with self._lock:
+            if not self._is_current():
+                await self.load(db)
+            return self._data
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._data is not None,
+            "version": self._version,
+            "snapshotVersion": self._data.version if self._data is not None else None,
+            "ageSeconds": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+            **(self._data.counts() if self._data is not None else {}),
+            **self._stats,
+        }
+
+
+# Singleton cache
+_cache: Optional[ReferenceDataCache] = None
+
+
+def get_reference_data() -> ReferenceDataCache:
+    """Get the process-wide reference data cache."""
+    global _cache
+    if _cache is None:
+        _cache = ReferenceDataCache(refresh_interval_seconds=settings.reference_data_refresh_interval_seconds)
+    return _cache
+
+
+def invalidate_reference_data(reason: str = "") -> None:
+    """Bump the reference data version after a committed write (see module docstring)."""
+    get_reference_data().invalidate(reason)
+
+
+async def start_reference_data() -> None:
+    """Load the first snapshot (called from main.lifespan)."""
+    try:
+        async with async_session_maker() as session:
+            await get_reference_data().load(session)
+    except Exception as e:
+        logger.warning(f"Reference data not loaded at startup, loading on first use: {e}")
@@ -0,0 +1,203 @@
+"""
+Reservation Expiry
+
+Releases liquidity held by SAP reservations as soon as they lapse, instead
+of when someone next lists reservations. A background worker in each
+gateway process:
+
+1. Keeps a min-heap of the expires_at of reservations this process
+   committed and left ACTIVE (schedule(), called after the reserve's
+   commit), and wakes when the earliest one is due.
+2. Otherwise wakes every reservation_expiry_interval_seconds, which covers
+   reservations created by other replicas or before a restart, and ones a
+   pacs.008 unit of work committed without settling.
+
+Reservations made inside a pacs.008 unit of work are not scheduled: the
+same transaction settles them (or rolls them back), so almost none are
+still ACTIVE when it commits, and scheduling them would fill the heap with
+settled reservations.
+
+Each wake runs reservations.EXPIRE_DUE_SQL in bounded batches: lapsed
+ACTIVE reservations become EXPIRED, their amounts come off
+fxp_sap_accounts.reserved and a RESERVATION_EXPIRED payment event is
+written for each, all in the batch's statement. The scan reads the partial
+index on expires_at WHERE status = 'ACTIVE' (migration 004).
+
+Batches on different replicas are serialized by a transaction-level
+advisory lock, so two sweeps never update the same accounts in opposite
+orders. Batches are short; a replica waits for the lock rather than
+skipping, so its own due reservations are released promptly.
+
+The heap is bounded (reservation_expiry_max_scheduled); deadlines beyond
+it are left to the periodic scan.
+
+Configuration (Settings / environment):
+    RESERVATION_EXPIRY_ENABLED            run the worker in this process (default true)
+    RESERVATION_EXPIRY_INTERVAL_SECONDS   periodic scan interval (default 30)
+    RESERVATION_EXPIRY_BATCH_SIZE         reservations per batch transaction (default 500)
+    RESERVATION_EXPIRY_MAX_BATCHES        batches per wake (default 20)
+    RESERVATION_EXPIRY_MAX_SCHEDULED      heap capacity (default 100000)
+"""
+
+from datetime import datetime, timezone
+import asyncio
+import heapq
+
+from ..config import settings
+from ..db import async_session_maker
+from . import reservations
+from .background import AdvisoryLock, PeriodicWorker, WorkerSingleton, advisory_lock
+
+# Scheduled wakes trail expires_at slightly, so the sweep's NOW() (database
+# clock) has passed it too
+SCHEDULE_GRACE_SECONDS = 0.1
+
+
+class ReservationExpiry(PeriodicWorker):
+    """Scheduled release of lapsed SAP reservations."""
+
+    name = "reservation-expiry"
+    label = "Reservation expiry"
+
+    def __init__(
+        self,
+        session_factory=async_session_maker,
+        interval_seconds: float = 30,
+        batch_size: int = 500,
+        max_batches: int = 20,
+        max_scheduled: int = 100_000,
+    ):
+        super().__init__(session_factory, interval_seconds)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.max_scheduled = max_scheduled
+        self._deadlines: list[float] = []  # min-heap of loop.time() deadlines
+        self._rescheduled = asyncio.Event()
+        self._stats.update({
+            "scheduledWakes": 0,
+            "batches": 0,
+            "expired": 0,
+            "scheduled": 0,
+            "notScheduled": 0,
+            "lastExpired": 0,
+        })
+
+    def _describe(self) -> str:
+        return f"interval={self.interval}s, batch={self.batch_size}"
+
+    async def stop(self) -> None:
+        """Stop after the current batch completes."""
+        await super().stop()
+        self._deadlines.clear()
+
+    # -------------------------------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------------------------------
+
+    def schedule(self, expires_at: datetime) -> None:
+        """Wake the worker when a committed, still ACTIVE reservation lapses."""
+        if not self.running:
+            return
+        if len(self._deadlines) >= self.max_scheduled:
+            self._stats["notScheduled"] += 1
+            return
+        delay = (expires_at - datetime.now(timezone.utc)).total_seconds() + SCHEDULE_GRACE_SECONDS
+        deadline = asyncio.get_running_loop().time() + max(delay, 0)
+        earliest = not self._deadlines or deadline < self._deadlines[0]
+        heapq.heappush(self._deadlines, deadline)
+        self._stats["scheduled"] += 1
+        if earliest:
+            self._rescheduled.set()
+
+    def _next_wake(self, now: float) -> float:
+        """Seconds until the earliest scheduled deadline or the periodic scan."""
+        if self._deadlines:
+            return min(max(self._deadlines[0] - now, 0), self.interval)
+        return self.interval
+
+    async def _wait(self) -> None:
+        """
+        Sleep until the earliest deadline, the periodic scan, an earlier
+        deadline being scheduled, or stop().
+        """
+        loop = asyncio.get_running_loop()
+        while not self.stopping:
+            self._rescheduled.clear()
+            wait = asyncio.create_task(self._rescheduled.wait())
+            stop = asyncio.create_task(self._stopping.wait())
+            timeout = self._next_wake(loop.time())
+            done, pending = await asyncio.wait({wait, stop}, timeout=timeout,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if not done:
+                break  # timed out: a deadline or the periodic scan is due
+
+    # -------------------------------------------------------------------------
+    # Runs
+    # -------------------------------------------------------------------------
+
+    async def run(self) -> int:
+        """
+        Release lapsed reservations in bounded batches.
+
+        Returns the number released. Scheduled deadlines up to the start of
+        the run are dropped from the heap: the run covers them.
+        """
+        now = asyncio.get_running_loop().time()
+        if self._deadlines and self._deadlines[0] <= now:
+            self._stats["scheduledWakes"] += 1
+        while self._deadlines and self._deadlines[0] <= now:
+            heapq.heappop(self._deadlines)
+
+        expired = 0
+        for _ in range(self.max_batches):
+            released = await self._batch()
+            expired += released
+            if released < self.batch_size:
+                break
+
+        self._stats["expired"] += expired
+        self._stats["lastExpired"] = expired
+        if expired:
+            self.logger.info(f"Reservation expiry: {expired} released")
+        return expired
+
+    async def _batch(self) -> int:
+        """One batch in its own transaction."""
+        async with self.session_factory() as session:
+            await advisory_lock(session, AdvisoryLock.RESERVATION_EXPIRY)
+            released = await reservations.expire_due(session, self.batch_size)
+            await session.commit()
+        self._stats["batches"] += 1
+        for row in released:
+            self.logger.debug(f"Reservation {row.reservation_id} expired for UETR {row.uetr}")
+        return len(released)
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Worker counters for this process."""
+        return {
+            "batchSize": self.batch_size,
+            "intervalSeconds": self.interval,
+            "pendingDeadlines": len(self._deadlines),
+            **super().stats(),
+        }
+
+
+# Singleton worker, started when RESERVATION_EXPIRY_ENABLED
+_expiry = WorkerSingleton(
+    lambda: ReservationExpiry(
+        interval_seconds=settings.reservation_expiry_interval_seconds,
+        batch_size=settings.reservation_expiry_batch_size,
+        max_batches=settings.reservation_expiry_max_batches,
+        max_scheduled=settings.reservation_expiry_max_scheduled,
+    ),
+    enabled=lambda: settings.reservation_expiry_enabled,
+)
+get_reservation_expiry = _expiry.get
+start_reservation_expiry = _expiry.start
+stop_reservation_expiry = _expiry.stop
@@ -0,0 +1,409 @@
+"""
+Reservation Engine
+
+Liquidity reservations against FXP nostro accounts (fxp_sap_accounts),
+kept consistent with a running fxp_sap_accounts.reserved total (migration
+011): the sum of the account's ACTIVE sap_reservations.
+
+Every transition changes the reservation and the counter in one statement:
+
+    reserve           reserved + amount   only WHERE balance - reserved >= amount
+    settle            balance - amount, reserved - amount   ACTIVE -> UTILIZED
+                      (plus the source-currency credit and both
+                      sap_transactions records, see SETTLE_SQL)
+    cancel / expire   reserved - amount                     ACTIVE -> CANCELLED / EXPIRED
+
+A reservation is therefore a single conditional UPDATE of the account row.
+The availability check and the increment happen under that row's lock, so
+concurrent reservations on a hot account queue for the row for the length
+of one statement and can never overcommit it. The previous flow (read the
+account, SUM its open reservations, INSERT) took no lock and let two
+payments reserve the same funds.
+
+Release statements lock reservations before accounts; reserve only locks
+the account and inserts, so the two orders never wait on each other.
+
+With account sharding on (api/account_shards.py) the counters live on the
+account's shard rows as well as its headline row. A reservation is taken
+from one row, recorded in sap_reservations.shard, and settle / cancel /
+expire adjust that row.
+
+ACTIVE reservations past expires_at still count against the account until
+they are released. The expiry worker (api/reservation_expiry.py) releases
+them as they lapse; reserve() also releases the account's lapsed
+reservations when a reservation is refused, and retries once.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from uuid import uuid4
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from .account_shards import POOL_SQL, SHARD_TOTALS_JOIN, TOTAL_BALANCE, TOTAL_RESERVED, shard_for
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+RESERVE_SQL = text("""
+    WITH account AS (
+        UPDATE fxp_sap_accounts
+        SET reserved = reserved + CAST(:amount AS numeric)
+        WHERE sap_id = CAST(:sap_id AS uuid)
+          AND fxp_id = CAST(:fxp_id AS uuid)
+          AND currency_code = :currency
+          AND balance - reserved >= CAST(:amount AS numeric)
+        RETURNING account_id
+    )
+    INSERT INTO sap_reservations (
+        reservation_id, account_id, amount, uetr, status, reserved_at, expires_at
+    )
+    SELECT
+        CAST(:reservation_id AS uuid), account_id, CAST(:amount AS numeric),
+        CAST(:uetr AS uuid), 'ACTIVE', NOW(),
+        NOW() + CAST(:expires_in_seconds AS integer) * INTERVAL '1 second'
+    FROM account
+    RETURNING account_id, reserved_at, expires_at
+""")
+
+# The payment's own shard first, then the others in rotation. A shard that
+# no longer has the funds once its lock is granted is passed over.
+RESERVE_SHARD_SQL = text("""
+    WITH target AS (
+        SELECT s.account_id, s.shard
+        FROM fxp_sap_accounts a
+        JOIN fxp_sap_account_shards s ON s.account_id = a.account_id
+        WHERE a.sap_id = CAST(:sap_id AS uuid)
+          AND a.fxp_id = CAST(:fxp_id AS uuid)
+          AND a.currency_code = :currency
+          AND s.balance - s.reserved >= CAST(:amount AS numeric)
+        ORDER BY mod(s.shard - CAST(:shard AS integer) + CAST(:shard_count AS integer),
+                     CAST(:shard_count AS integer)), s.shard
+        LIMIT 1
+        FOR UPDATE OF s
+    ),
+    held AS (
+        UPDATE fxp_sap_account_shards s
+        SET reserved = s.reserved + CAST(:amount AS numeric)
+        FROM target
+        WHERE s.account_id = target.account_id AND s.shard = target.shard
+        RETURNING s.account_id, s.shard
+    )
+    INSERT INTO sap_reservations (
+        reservation_id, account_id, amount, uetr, status, reserved_at, expires_at, shard
+    )
+    SELECT
+        CAST(:reservation_id AS uuid), account_id, CAST(:amount AS numeric),
+        CAST(:uetr AS uuid), 'ACTIVE', NOW(),
+        NOW() + CAST(:expires_in_seconds AS integer) * INTERVAL '1 second', shard
+    FROM held
+    RETURNING account_id, reserved_at, expires_at
+""")
+
+# Read only after a refusal, to tell "no account" from "insufficient funds"
+ACCOUNT_SQL = text(f"""
+    SELECT a.account_id, {TOTAL_BALANCE} AS balance, {TOTAL_RESERVED} AS reserved,
+           sh.balance IS NOT NULL AS sharded
+    FROM fxp_sap_accounts a
+    {SHARD_TOTALS_JOIN}
+    WHERE a.sap_id = CAST(:sap_id AS uuid)
+      AND a.fxp_id = CAST(:fxp_id AS uuid)
+      AND a.currency_code = :currency
+""")
+
+def _unreserve(source: str, debit: bool = False) -> str:
+    """
+    CTEs taking the amounts of the reservations in `source` off the rows
+    they were reserved on (headline or shard); with debit, off balance too.
+    """
+    balance = "balance = {0}.balance - t.amount, " if debit else ""
+    return f"""
+        headline AS (
+            UPDATE fxp_sap_accounts a
+            SET {balance.format("a")}reserved = a.reserved - t.amount
+            FROM (
+                SELECT account_id, SUM(amount) AS amount FROM {source}
+                WHERE shard IS NULL GROUP BY account_id
+            ) t
+            WHERE a.account_id = t.account_id
+        ),
+        shards AS (
+            UPDATE fxp_sap_account_shards s
+            SET {balance.format("s")}reserved = s.reserved - t.amount
+            FROM (
+                SELECT account_id, shard, SUM(amount) AS amount FROM {source}
+                WHERE shard IS NOT NULL GROUP BY account_id, shard
+            ) t
+            WHERE s.account_id = t.account_id AND s.shard = t.shard
+        )"""
+
+
+def _release_sql(status: str, where: str):
+    """ACTIVE reservations matching `where` -> status, returning their amounts to the accounts."""
+    return text(f"""
+        WITH released AS (
+            UPDATE sap_reservations r
+            SET status = '{status}', cancelled_at = NOW()
+            WHERE r.status = 'ACTIVE' AND {where}
+            RETURNING r.reservation_id, r.account_id, r.amount, r.shard
+        ),
+        {_unreserve("released")}
+        SELECT reservation_id, account_id, amount FROM released
+    """)
+
+
+CANCEL_BY_UETR_SQL = _release_sql("CANCELLED", "r.uetr = CAST(:uetr AS uuid)")
+
+CANCEL_BY_ID_SQL = _release_sql(
+    "CANCELLED",
+    "r.reservation_id = CAST(:reservation_id AS uuid) AND r.account_id IN ("
+    "SELECT account_id FROM fxp_sap_accounts WHERE sap_id = CAST(:sap_id AS uuid))",
+)
+
+
+def _expire_sql(scope: str):
+    """
+    Lapsed ACTIVE reservations in scope -> EXPIRED, oldest first, in one statement.
+
+    Returns the amounts to the accounts and records a RESERVATION_EXPIRED
+    payment event per reservation. Rows another transaction is settling or
+    cancelling are skipped, not waited for.
+    """
+    return text(f"""
+        WITH due AS (
+            SELECT reservation_id FROM sap_reservations
+            WHERE status = 'ACTIVE' AND expires_at <= NOW() AND {scope}
+            ORDER BY expires_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        ),
+        released AS (
+            UPDATE sap_reservations r
+            SET status = 'EXPIRED', cancelled_at = NOW()
+            FROM due
+            WHERE r.reservation_id = due.reservation_id
+            RETURNING r.reservation_id, r.account_id, r.amount, r.shard, r.uetr, r.expires_at
+        ),
+        {_unreserve("released")},
+        events AS (
+            INSERT INTO payment_events (event_id, uetr, event_type, actor, data, version, occurred_at)
+            SELECT
+                gen_random_uuid(), r.uetr, 'RESERVATION_EXPIRED', 'D-SAP',
+                jsonb_build_object(
+                    'reservationId', r.reservation_id,
+                    'sapBic', s.bic,
+                    'fxpId', a.fxp_id,
+                    'currency', a.currency_code,
+                    'amount', CAST(r.amount AS text),
+                    'expiresAt', r.expires_at,
+                    'message', 'Reservation EXPIRED: funds released at SAP (' || s.bic || ')'
+                ),
+                1, clock_timestamp()
+            FROM released r
+            JOIN fxp_sap_accounts a ON a.account_id = r.account_id
+            JOIN saps s ON s.sap_id = a.sap_id
+        )
+        SELECT reservation_id, account_id, amount, uetr FROM released
+    """)
+
+
+# Scheduled sweep (api/reservation_expiry.py); idx_sap_reservations_expires
+EXPIRE_DUE_SQL = _expire_sql("TRUE")
+
+# On refusal, for the account being reserved against
+EXPIRE_ACCOUNT_SQL = _expire_sql("account_id = CAST(:account_id AS uuid)")
+
+# Bilateral settlement in one statement. Destination leg: the UETR's ACTIVE
+# reservations -> UTILIZED, debiting balance and reserved on their rows, one
+# DEBIT sap_transaction each. Source leg (when the source parameters are
+# given and a reservation settled): credit the FXP's source-currency account,
+# on the payment's shard if it has one, and one CREDIT sap_transaction.
+SETTLE_SQL = text(f"""
+    WITH settled AS (
+        UPDATE sap_reservations
+        SET status = 'UTILIZED', utilized_at = NOW()
+        WHERE uetr = CAST(:uetr AS uuid) AND status = 'ACTIVE'
+        RETURNING reservation_id, account_id, amount, shard
+    ),
+    {_unreserve("settled", debit=True)},
+    debits AS (
+        INSERT INTO sap_transactions (account_id, amount, type, reference, uetr, status)
+        SELECT account_id, amount, 'DEBIT', :debit_reference, CAST(:uetr AS uuid), 'COMPLETED'
+        FROM settled
+    ),
+    source AS (
+        SELECT a.account_id
+        FROM fxp_sap_accounts a
+        JOIN saps s ON a.sap_id = s.sap_id
+        WHERE s.bic = CAST(:source_sap_bic AS text)
+          AND a.fxp_id = CAST(:fxp_id AS uuid)
+          AND a.currency_code = CAST(:source_currency AS text)
+          AND EXISTS (SELECT 1 FROM settled)
+    ),
+    source_shard AS (
+        UPDATE fxp_sap_account_shards sh
+        SET balance = sh.balance + CAST(:source_amount AS numeric)
+        FROM source
+        WHERE sh.account_id = source.account_id AND sh.shard = CAST(:source_shard AS integer)
+        RETURNING sh.account_id
+    ),
+    source_headline AS (
+        UPDATE fxp_sap_accounts a
+        SET balance = a.balance + CAST(:source_amount AS numeric)
+        FROM source
+        WHERE a.account_id = source.account_id AND NOT EXISTS (SELECT 1 FROM source_shard)
+        RETURNING a.account_id
+    ),
+    credited AS (
+        SELECT account_id FROM source_shard
+        UNION ALL
+        SELECT account_id FROM source_headline
+    ),
+    credits AS (
+        INSERT INTO sap_transactions (account_id, amount, type, reference, uetr, status)
+        SELECT account_id, CAST(:source_amount AS numeric), 'CREDIT', :credit_reference,
+               CAST(:uetr AS uuid), 'COMPLETED'
+        FROM credited
+    )
+    SELECT reservation_id, account_id, amount,
+           (SELECT account_id FROM credited LIMIT 1) AS credited_account_id
+    FROM settled
+""")
+
+
+# =============================================================================
+# Operations
+# =============================================================================
+
+class ReserveResult(NamedTuple):
+    """Outcome of reserve(); reservation_id is None when refused."""
+    reservation_id: Optional[str]
+    account_id: Optional[str]  # None: no account for (SAP, FXP, currency)
+    available: Optional[Decimal] = None  # set when refused for insufficient funds
+    reserved_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+async def reserve(
+    db: AsyncSession,
+    sap_id,
+    fxp_id,
+    currency: str,
+    amount,
+    uetr: str,
+    expires_in_seconds: int = 300,
+) -> ReserveResult:
+    """
+    Reserve amount on the FXP's nostro account at the SAP.
+
+    One statement when funds are available (a shard with the funds when
+    sharding is on, else the headline row). The caller owns the
+    transaction (commit or enclosing savepoint).
+    """
+    shard_count = settings.account_shard_count
+    params = {
+        "reservation_id": str(uuid4()),
+        "sap_id": str(sap_id),
+        "fxp_id": str(fxp_id),
+        "currency": currency.upper(),
+        "amount": str(amount),
+        "uetr": str(uetr),
+        "expires_in_seconds": expires_in_seconds,
+        "shard": shard_for(uetr, shard_count),
+        "shard_count": shard_count,
+    }
+
+    row = None
+    if shard_count > 1:
+        row = (await db.execute(RESERVE_SHARD_SQL, params)).fetchone()
+    if row is None:
+        row = (await db.execute(RESERVE_SQL, params)).fetchone()
+    if row is None:
+        account = (await db.execute(ACCOUNT_SQL, params)).fetchone()
+        if account is None:
+            return ReserveResult(None, None)
+
+        # Funds may be held by reservations that have lapsed but not been
+        # released, or be spread over shards none of which has enough alone
+        released = await expire_account(db, account.account_id)
+        pooled = account.sharded and await pool(db, account.account_id)
+        if released or pooled:
+            row = (await db.execute(RESERVE_SQL, params)).fetchone()
+        if row is None:
+            if released or pooled:
+                account = (await db.execute(ACCOUNT_SQL, params)).fetchone()
+            available = Decimal(str(account.balance)) - Decimal(str(account.reserved))
+            return ReserveResult(None, str(account.account_id), available)
+
+    return ReserveResult(
+        params["reservation_id"], str(row.account_id), None, row.reserved_at, row.expires_at
+    )
+
+
+async def pool(db: AsyncSession, account_id) -> bool:
+    """Move the account's free shard funds to the headline row; True if any moved."""
+    return (await db.execute(POOL_SQL, {"account_id": str(account_id)})).fetchone() is not None
+
+
+async def settle(
+    db: AsyncSession,
+    uetr: str,
+    source_sap_bic: Optional[str] = None,
+    source_currency: Optional[str] = None,
+    source_amount=None,
+    fxp_id=None,
+) -> list:
+    """
+    Settle both legs of the payment in one statement (SETTLE_SQL).
+
+    Returns the settled reservations, empty if none was ACTIVE (nothing is
+    written). credited_account_id on each row is the source account
+    credited, or None when the source leg was not given or has no account.
+    """
+    uetr = str(uetr)
+    source_leg = bool(source_sap_bic and source_currency and source_amount and fxp_id)
+    shard_count = settings.account_shard_count
+    return (await db.execute(SETTLE_SQL, {
+        "uetr": uetr,
+        "debit_reference": f"Settlement debit for UETR {uetr[:8]}",
+        "credit_reference": f"Settlement credit for UETR {uetr[:8]}",
+        "source_sap_bic": source_sap_bic.upper() if source_leg else None,
+        "source_currency": source_currency.upper() if source_leg else None,
+        "source_amount": str(source_amount) if source_leg else None,
+        "fxp_id": str(fxp_id) if source_leg else None,
+        "source_shard": shard_for(uetr, shard_count) if shard_count > 1 else -1,
+    })).fetchall()
+
+
+async def cancel(db: AsyncSession, uetr: str) -> list:
+    """ACTIVE -> CANCELLED for the UETR, releasing the reserved amounts."""
+    return (await db.execute(CANCEL_BY_UETR_SQL, {"uetr": str(uetr)})).fetchall()
+
+
+async def cancel_by_id(db: AsyncSession, reservation_id: str, sap_id) -> list:
+    """Cancel one ACTIVE reservation held at the SAP."""
+    return (await db.execute(CANCEL_BY_ID_SQL, {
+        "reservation_id": str(reservation_id),
+        "sap_id": str(sap_id),
+    })).fetchall()
+
+
+async def expire_account(db: AsyncSession, account_id, limit: int = 1000) -> list:
+    """Release the account's ACTIVE reservations past expires_at."""
+    return (await db.execute(EXPIRE_ACCOUNT_SQL, {
+        "account_id": str(account_id),
+        "batch_size": limit,
+    })).fetchall()
+
+
+async def expire_due(db: AsyncSession, limit: int) -> list:
+    """Release up to limit lapsed ACTIVE reservations, oldest first."""
+    return (await db.execute(EXPIRE_DUE_SQL, {"batch_size": limit})).fetchall()
@@ -11,7 +11,8 @@ This module provides endpoints for SAPs to:
 """
 
 import logging
-from datetime import datetime, timezone, timedelta
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Optional, List
 from uuid import UUID, uuid4
@@ -22,6 +23,11 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import get_db
+from . import reservations
+from .account_shards import SHARD_TOTALS_JOIN, TOTAL_BALANCE
+from .daily_positions import POSITION_COLUMNS, POSITION_JOIN, position_params, report_position
+from .reference_data import get_reference_data
+from .reservation_expiry import get_reservation_expiry
 
 logger = logging.getLogger(__name__)
 
@@ -154,17 +160,13 @@ async def create_nostro_account(
     Reference: https://docs.nexusglobalpayments.org/settlement-access-provision/liquidity
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id, name, bic FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id, name, fxp_code FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": request.fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(request.fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {request.fxp_bic} not found")
@@ -236,9 +238,7 @@ async def list_nostro_accounts(
     List all nostro accounts at this SAP.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id, name, bic FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
@@ -261,10 +261,11 @@ async def list_nostro_accounts(
         SELECT 
             a.account_id, a.sap_id, s.name as sap_name, s.bic as sap_bic,
             a.fxp_id, f.name as fxp_name, f.fxp_code as fxp_bic,
-            a.currency_code, a.balance, a.account_number, a.created_at
+            a.currency_code, {TOTAL_BALANCE} AS balance, a.account_number, a.created_at
         FROM fxp_sap_accounts a
         JOIN saps s ON a.sap_id = s.sap_id
         JOIN fxps f ON a.fxp_id = f.fxp_id
+        {SHARD_TOTALS_JOIN}
         WHERE {where_clause}
         ORDER BY f.name, a.currency_code
     """)
@@ -301,21 +302,20 @@ async def get_nostro_account(
     Get details of a specific nostro account.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
-    account_query = text("""
+    account_query = text(f"""
         SELECT 
             a.account_id, a.sap_id, s.name as sap_name, s.bic as sap_bic,
             a.fxp_id, f.name as fxp_name, f.fxp_code as fxp_bic,
-            a.currency_code, a.balance, a.account_number, a.created_at
+            a.currency_code, {TOTAL_BALANCE} AS balance, a.account_number, a.created_at
         FROM fxp_sap_accounts a
         JOIN saps s ON a.sap_id = s.sap_id
         JOIN fxps f ON a.fxp_id = f.fxp_id
+        {SHARD_TOTALS_JOIN}
         WHERE a.account_id = :account_id AND a.sap_id = :sap_id
     """)
     
@@ -357,94 +357,70 @@ async def create_reservation(
     Reference: https://docs.nexusglobalpayments.org/settlement-access-provision/liquidity
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id, fxp_code FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": request.fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(request.fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {request.fxp_bic} not found")
     
-    # Get account
-    account_query = text("""
-        SELECT account_id, balance FROM fxp_sap_accounts
-        WHERE sap_id = :sap_id AND fxp_id = :fxp_id AND currency_code = :currency AND status = 'ACTIVE'
-    """)
-    result = await db.execute(account_query, {
-        "sap_id": sap.sap_id,
-        "fxp_id": fxp.fxp_id,
-        "currency": request.currency.upper()
-    })
-    account = result.fetchone()
+    # Conditional reserve against the account's running reserved total
+    reservation = await reservations.reserve(
+        db,
+        sap_id=sap.sap_id,
+        fxp_id=fxp.fxp_id,
+        currency=request.currency,
+        amount=request.amount,
+        uetr=request.uetr,
+        expires_in_seconds=request.expires_in_seconds,
+    )
     
-    if not account:
+    if reservation.account_id is None:
         raise HTTPException(
             status_code=404, 
             detail=f"No active account found for FXP {request.fxp_bic} in {request.currency}"
         )
     
-    # Check available balance
-    reserved_query = text("""
-        SELECT COALESCE(SUM(amount), 0) as reserved
-        FROM sap_reservations
-        WHERE account_id = :account_id AND status = 'ACTIVE' AND expires_at > NOW()
-    """)
-    result = await db.execute(reserved_query, {"account_id": account.account_id})
-    reserved_row = result.fetchone()
-    reserved_amount = Decimal(reserved_row.reserved) if reserved_row else Decimal("0")
-    
-    available_balance = Decimal(account.balance) - reserved_amount
-    
-    if available_balance < request.amount:
+    if reservation.reservation_id is None:
+        await db.commit()  # keep any lapsed reservations released while checking
         raise HTTPException(
             status_code=422,
-            detail=f"Insufficient available balance. Available: {available_balance}, Requested: {request.amount}"
-        )
-    
-    # Create reservation
-    reservation_id = str(uuid4())
-    expires_at = datetime.now(timezone.utc) + timedelta(seconds=request.expires_in_seconds)
-    
-    insert_query = text("""
-        INSERT INTO sap_reservations (
-            reservation_id, account_id, amount, uetr, status, reserved_at, expires_at
-        ) VALUES (
-            :reservation_id, :account_id, :amount, :uetr, 'ACTIVE', NOW(), :expires_at
+            detail=f"Insufficient available balance. Available: {reservation.available}, Requested: {request.amount}"
         )
-        RETURNING reserved_at
-    """)
     
-    result = await db.execute(insert_query, {
-        "reservation_id": reservation_id,
-        "account_id": account.account_id,
-        "amount": str(request.amount),
-        "uetr": request.uetr,
-        "expires_at": expires_at
-    })
-    row = result.fetchone()
     await db.commit()
+    get_reservation_expiry().schedule(reservation.expires_at)
     
     return ReservationResponse(
-        reservation_id=reservation_id,
-        account_id=account.account_id,
+        reservation_id=reservation.reservation_id,
+        account_id=reservation.account_id,
         sap_bic=sap_bic.upper(),
         fxp_bic=fxp.fxp_code,
         currency=request.currency.upper(),
         amount=str(request.amount),
         uetr=request.uetr,
         status="ACTIVE",
-        reserved_at=row.reserved_at.isoformat() if isinstance(row.reserved_at, datetime) else str(row.reserved_at),
-        expires_at=expires_at.isoformat()
+        reserved_at=reservation.reserved_at.isoformat() if isinstance(reservation.reserved_at, datetime) else str(reservation.reserved_at),
+        expires_at=reservation.expires_at.isoformat() if isinstance(reservation.expires_at, datetime) else str(reservation.expires_at)
     )
 
 
+def _payment_write_scope(db: AsyncSession, commit: bool):
+    """
+    Transaction scope for the *_for_payment helpers.
+    
+    With commit=True the helper commits its own writes (standalone use).
+    With commit=False it runs inside a SAVEPOINT of the caller's unit of
+    work: a failed step is rolled back on its own without aborting the
+    payment transaction, and the caller issues the single commit.
+    """
+    return nullcontext() if commit else db.begin_nested()
+
+
 async def create_reservation_for_payment(
     db: AsyncSession,
     fxp_id: str,
@@ -453,6 +429,7 @@ async def create_reservation_for_payment(
     amount,
     uetr: str,
     expires_in_seconds: int = 300,
+    commit: bool = True,
 ) -> Optional[str]:
     """
     Create an SAP reservation as part of the payment flow.
@@ -463,97 +440,72 @@ async def create_reservation_for_payment(
     
     Returns the reservation_id on success, or None if no matching account
     is found (sandbox graceful fallback).
+    
+    With commit=False the writes join the caller's unit of work (see
+    _payment_write_scope).
     """
     try:
-        # Validate required parameters
-        missing = []
-        if not dest_sap_bic:
-            missing.append("dest_sap_bic")
-        if not currency:
-            missing.append("currency")
-        if not fxp_id:
-            missing.append("fxp_id")
-        if missing:
-            logger.warning(
-                f"Reservation skipped for UETR {uetr}: "
-                f"missing parameters: {', '.join(missing)} "
-                f"(dest_sap_bic={dest_sap_bic!r}, currency={currency!r}, fxp_id={fxp_id!r})"
-            )
-            return None
-        
-        # Find the SAP
-        sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-        result = await db.execute(sap_query, {"bic": dest_sap_bic.upper()})
-        sap = result.fetchone()
-        if not sap:
-            logger.warning(f"Reservation skipped: SAP {dest_sap_bic} not found")
-            return None
-        
-        # Find the FXP's nostro account at this SAP
-        # Note: fxp_sap_accounts has no status column — all seeded accounts are active
-        account_query = text("""
-            SELECT account_id, balance FROM fxp_sap_accounts
-            WHERE sap_id = :sap_id AND fxp_id = :fxp_id
-              AND currency_code = :currency
-        """)
-        result = await db.execute(account_query, {
-            "sap_id": sap.sap_id,
-            "fxp_id": fxp_id,
-            "currency": currency.upper()
-        })
-        account = result.fetchone()
-        if not account:
-            logger.warning(
-                f"Reservation skipped: no active {currency} account "
-                f"for FXP {fxp_id} at SAP {dest_sap_bic}"
-            )
-            return None
-        
-        # Check available balance
-        reserved_query = text("""
-            SELECT COALESCE(SUM(amount), 0) as reserved
-            FROM sap_reservations
-            WHERE account_id = :account_id AND status = 'ACTIVE' AND expires_at > NOW()
-        """)
-        result = await db.execute(reserved_query, {"account_id": account.account_id})
-        reserved_row = result.fetchone()
-        reserved_amount = Decimal(str(reserved_row.reserved)) if reserved_row else Decimal("0")
-        available = Decimal(str(account.balance)) - reserved_amount
-        
-        payment_amount = Decimal(str(amount))
-        if available < payment_amount:
-            logger.warning(
-                f"Reservation skipped: insufficient balance. "
-                f"Available: {available}, Requested: {payment_amount}"
+        async with _payment_write_scope(db, commit):
+            # Validate required parameters
+            missing = []
+            if not dest_sap_bic:
+                missing.append("dest_sap_bic")
+            if not currency:
+                missing.append("currency")
+            if not fxp_id:
+                missing.append("fxp_id")
+            if missing:
+                logger.warning(
+                    f"Reservation skipped for UETR {uetr}: "
+                    f"missing parameters: {', '.join(missing)} "
+                    f"(dest_sap_bic={dest_sap_bic!r}, currency={currency!r}, fxp_id={fxp_id!r})"
+                )
+                return None
+            
+            # Find the SAP
+            sap = (await get_reference_data().get(db)).sap_by_bic(dest_sap_bic)
+            if not sap:
+                logger.warning(f"Reservation skipped: SAP {dest_sap_bic} not found")
+                return None
+            
+            # Single conditional write against the account's reserved total
+            payment_amount = Decimal(str(amount))
+            reservation = await reservations.reserve(
+                db,
+                sap_id=sap.sap_id,
+                fxp_id=fxp_id,
+                currency=currency,
+                amount=payment_amount,
+                uetr=uetr,
+                expires_in_seconds=expires_in_seconds,
             )
-            return None
-        
-        # Create the reservation
-        reservation_id = str(uuid4())
-        expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in_seconds)
-        
-        insert_query = text("""
-            INSERT INTO sap_reservations (
-                reservation_id, account_id, amount, uetr, status, reserved_at, expires_at
-            ) VALUES (
-                :reservation_id, :account_id, :amount, :uetr, 'ACTIVE', NOW(), :expires_at
+            if reservation.account_id is None:
+                logger.warning(
+                    f"Reservation skipped: no active {currency} account "
+                    f"for FXP {fxp_id} at SAP {dest_sap_bic}"
+                )
+                return None
+            if reservation.reservation_id is None:
+                if commit:
+                    await db.commit()
+                logger.warning(
+                    f"Reservation skipped: insufficient balance. "
+                    f"Available: {reservation.available}, Requested: {payment_amount}"
+                )
+                return None
+            if commit:
+                await db.commit()
+                # Only now is the reservation visible and ACTIVE; a caller's
+                # unit of work settles it before committing (periodic scan
+                # covers any it leaves behind)
+                get_reservation_expiry().schedule(reservation.expires_at)
+            
+            logger.info(
+                f"Reservation {reservation.reservation_id} created for UETR {uetr}: "
+                f"{payment_amount} {currency} at SAP {dest_sap_bic}"
             )
-        """)
-        await db.execute(insert_query, {
-            "reservation_id": reservation_id,
-            "account_id": account.account_id,
-            "amount": str(payment_amount),
-            "uetr": uetr,
-            "expires_at": expires_at
-        })
-        await db.commit()
-        
-        logger.info(
-            f"Reservation {reservation_id} created for UETR {uetr}: "
-            f"{payment_amount} {currency} at SAP {dest_sap_bic}"
-        )
-        return reservation_id
-        
+            return reservation.reservation_id
+            
     except Exception as e:
         logger.error(f"Reservation creation failed for UETR {uetr}: {e}")
         return None
@@ -567,6 +519,7 @@ async def settle_reservation_for_payment(
     source_currency: str = None,
     source_amount = None,
     fxp_id: str = None,
+    commit: bool = True,
 ) -> bool:
     """
     Settle a reservation: bilateral FXP nostro reconciliation.
@@ -576,100 +529,43 @@ async def settle_reservation_for_payment(
     
     The FXP receives source currency (e.g. SGD) and pays out destination
     currency (e.g. IDR). Both legs must be reflected for correct reconciliation.
-    
+
+    Both legs and their DEBIT / CREDIT sap_transactions records are one
+    statement (reservations.SETTLE_SQL): a single round trip, all or nothing.
+
     Returns True if settlement succeeded, False otherwise.
+    
+    With commit=False the writes join the caller's unit of work (see
+    _payment_write_scope).
     """
     try:
-        # 1. Destination leg: Mark reservation as UTILIZED and debit
-        query = text("""
-            UPDATE sap_reservations
-            SET status = 'UTILIZED', utilized_at = NOW()
-            WHERE uetr = :uetr AND status = 'ACTIVE'
-            RETURNING reservation_id, account_id, amount
-        """)
-        result = await db.execute(query, {"uetr": uetr})
-        row = result.fetchone()
-        
-        if not row:
-            logger.debug(f"No active reservation found to settle for UETR {uetr}")
-            await db.commit()
-            return False
-        
-        # Debit destination-currency nostro (e.g. IDR out)
-        debit_query = text("""
-            UPDATE fxp_sap_accounts
-            SET balance = balance - :amount
-            WHERE account_id = :account_id
-        """)
-        await db.execute(debit_query, {
-            "amount": row.amount,
-            "account_id": row.account_id
-        })
-        
-        # Record DEBIT transaction for reconciliation
-        debit_txn = text("""
-            INSERT INTO sap_transactions (account_id, amount, type, reference, uetr, status)
-            VALUES (:account_id, :amount, 'DEBIT', :reference, :uetr, 'COMPLETED')
-        """)
-        await db.execute(debit_txn, {
-            "account_id": row.account_id,
-            "amount": row.amount,
-            "reference": f"Settlement debit for UETR {uetr[:8]}",
-            "uetr": uetr
-        })
-        
-        logger.info(
-            f"Reservation {row.reservation_id} settled (UTILIZED) for UETR {uetr}: "
-            f"debited {row.amount} from dest account {row.account_id}"
-        )
-        
-        # 2. Source leg: Credit source-currency nostro (e.g. SGD in)
-        if source_sap_bic and source_currency and source_amount and fxp_id:
-            # Find source SAP and its account
-            source_acc_query = text("""
-                SELECT a.account_id, s.sap_id
-                FROM fxp_sap_accounts a
-                JOIN saps s ON a.sap_id = s.sap_id
-                WHERE s.bic = :bic AND a.fxp_id = CAST(:fxp_id AS uuid)
-                  AND a.currency_code = :currency
-            """)
-            source_result = await db.execute(source_acc_query, {
-                "bic": source_sap_bic.upper(),
-                "fxp_id": fxp_id,
-                "currency": source_currency.upper()
-            })
-            source_acc = source_result.fetchone()
+        async with _payment_write_scope(db, commit):
+            # Both legs and their sap_transactions records in one statement
+            settled = await reservations.settle(
+                db, uetr, source_sap_bic, source_currency, source_amount, fxp_id,
+            )
+            
+            if not settled:
+                logger.debug(f"No active reservation found to settle for UETR {uetr}")
+                if commit:
+                    await db.commit()
+                return False
+            
+            for row in settled:
+                logger.info(
+                    f"Reservation {row.reservation_id} settled (UTILIZED) for UETR {uetr}: "
+                    f"debited {row.amount} from dest account {row.account_id}"
+                )
             
-            if source_acc:
-                credit_query = text("""
-                    UPDATE fxp_sap_accounts
-                    SET balance = balance + :amount
-                    WHERE account_id = :account_id
-                """)
-                await db.execute(credit_query, {
-                    "amount": str(source_amount),
-                    "account_id": source_acc.account_id
-                })
-                
-                # Record CREDIT transaction for reconciliation
-                credit_txn = text("""
-                    INSERT INTO sap_transactions (account_id, amount, type, reference, uetr, status)
-                    VALUES (:account_id, :amount, 'CREDIT', :reference, :uetr, 'COMPLETED')
-                """)
-                await db.execute(credit_txn, {
-                    "account_id": source_acc.account_id,
-                    "amount": str(source_amount),
-                    "reference": f"Settlement credit for UETR {uetr[:8]}",
-                    "uetr": uetr
-                })
-                
+            if settled[0].credited_account_id is not None:
                 logger.info(
                     f"Source leg settled for UETR {uetr}: "
                     f"credited {source_amount} {source_currency} at {source_sap_bic}"
                 )
-        
-        await db.commit()
-        return True
+            
+            if commit:
+                await db.commit()
+            return True
     except Exception as e:
         logger.error(f"Reservation settlement failed for UETR {uetr}: {e}")
         return False
@@ -678,6 +574,7 @@ async def settle_reservation_for_payment(
 async def cancel_reservation_for_payment(
     db: AsyncSession,
     uetr: str,
+    commit: bool = True,
 ) -> bool:
     """
     Cancel a reservation: ACTIVE → CANCELLED.
@@ -687,24 +584,23 @@ async def cancel_reservation_for_payment(
     available for other payments.
     
     Returns True if a reservation was cancelled, False otherwise.
+    
+    With commit=False the writes join the caller's unit of work (see
+    _payment_write_scope).
     """
     try:
-        query = text("""
-            UPDATE sap_reservations
-            SET status = 'CANCELLED', cancelled_at = NOW()
-            WHERE uetr = :uetr AND status = 'ACTIVE'
-            RETURNING reservation_id
-        """)
-        result = await db.execute(query, {"uetr": uetr})
-        row = result.fetchone()
-        await db.commit()
-        
-        if row:
-            logger.info(f"Reservation {row.reservation_id} cancelled for UETR {uetr}")
-            return True
-        else:
-            logger.debug(f"No active reservation found to cancel for UETR {uetr}")
-            return False
+        async with _payment_write_scope(db, commit):
+            cancelled = await reservations.cancel(db, uetr)
+            if commit:
+                await db.commit()
+            
+            if cancelled:
+                for row in cancelled:
+                    logger.info(f"Reservation {row.reservation_id} cancelled for UETR {uetr}")
+                return True
+            else:
+                logger.debug(f"No active reservation found to cancel for UETR {uetr}")
+                return False
     except Exception as e:
         logger.error(f"Reservation cancellation failed for UETR {uetr}: {e}")
         return False
@@ -719,33 +615,15 @@ async def list_reservations(
     """
     List liquidity reservations at this SAP.
     
-    Includes sweep-on-read auto-expiry: ACTIVE reservations past 
-    expires_at are automatically transitioned to EXPIRED.
+    A pure read: the reservation expiry worker (api/reservation_expiry.py)
+    moves ACTIVE reservations past expires_at to EXPIRED as they lapse.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
-    # Auto-expire stale ACTIVE reservations (sweep-on-read pattern)
-    expire_query = text("""
-        UPDATE sap_reservations
-        SET status = 'EXPIRED', cancelled_at = NOW()
-        WHERE status = 'ACTIVE' AND expires_at < NOW()
-          AND account_id IN (
-              SELECT account_id FROM fxp_sap_accounts WHERE sap_id = CAST(:sap_id AS uuid)
-          )
-        RETURNING reservation_id
-    """)
-    expire_result = await db.execute(expire_query, {"sap_id": str(sap.sap_id)})
-    expired_rows = expire_result.fetchall()
-    if expired_rows:
-        await db.commit()
-        logger.info(f"Auto-expired {len(expired_rows)} stale reservations for SAP {sap_bic}")
-    
     # Build query
     filters = ["a.sap_id = :sap_id"]
     params = {"sap_id": sap.sap_id}
@@ -802,29 +680,15 @@ async def cancel_reservation(
     Cancel an active reservation.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
-    # Cancel reservation
-    update_query = text("""
-        UPDATE sap_reservations
-        SET status = 'CANCELLED', cancelled_at = NOW()
-        WHERE reservation_id = :reservation_id
-        AND account_id IN (SELECT account_id FROM fxp_sap_accounts WHERE sap_id = :sap_id)
-        AND status = 'ACTIVE'
-        RETURNING reservation_id
-    """)
-    
-    result = await db.execute(update_query, {
-        "reservation_id": reservation_id,
-        "sap_id": sap.sap_id
-    })
+    # Cancel reservation, releasing its amount on the account
+    cancelled = await reservations.cancel_by_id(db, reservation_id, sap.sap_id)
     
-    if not result.fetchone():
+    if not cancelled:
         raise HTTPException(status_code=404, detail="Reservation not found or already processed")
     
     await db.commit()
@@ -852,9 +716,7 @@ async def list_transactions(
     List settlement transactions at this SAP.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
@@ -919,13 +781,14 @@ async def get_reconciliation_reports(
 ) -> List[ReconciliationReport]:
     """
     Get daily reconciliation report.
-    
+
+    Figures are per UTC day (api/daily_positions.py), so past dates report
+    the opening and closing balances of that day, not today's.
+
     Reference: https://docs.nexusglobalpayments.org/settlement-access-provision/reconciliation
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id, name FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
@@ -935,38 +798,35 @@ async def get_reconciliation_reports(
     from datetime import date as date_type
     report_date_obj = datetime.strptime(report_date, "%Y-%m-%d").date()
     
-    # Get reconciliation data per currency
-    reconciliation_query = text("""
+    # Closed days are read from sap_daily_positions by primary key; open
+    # days after an account's latest closed one are summed from its
+    # sap_transactions (api/daily_positions.py).
+    reconciliation_query = text(f"""
         SELECT 
             a.currency_code,
-            a.balance as closing_balance,
+            {TOTAL_BALANCE} as current_balance,
             s.bic as sap_bic,
             s.name as sap_name_full,
             COALESCE(f.fxp_code, 'N/A') as fxp_code,
-            COALESCE(SUM(CASE WHEN t.type = 'CREDIT' AND DATE(t.created_at) = :report_date THEN t.amount ELSE 0 END), 0) as total_credits,
-            COALESCE(SUM(CASE WHEN t.type = 'DEBIT' AND DATE(t.created_at) = :report_date THEN t.amount ELSE 0 END), 0) as total_debits,
-            COUNT(CASE WHEN DATE(t.created_at) = :report_date THEN t.transaction_id END) as transaction_count
+            {POSITION_COLUMNS}
         FROM fxp_sap_accounts a
         JOIN saps s ON a.sap_id = s.sap_id
         LEFT JOIN fxps f ON a.fxp_id = f.fxp_id
-        LEFT JOIN sap_transactions t ON a.account_id = t.account_id
+        {POSITION_JOIN}
+        {SHARD_TOTALS_JOIN}
         WHERE a.sap_id = CAST(:sap_id AS uuid)
-        GROUP BY a.account_id, a.currency_code, a.balance, s.bic, s.name, f.fxp_code
         ORDER BY a.currency_code
     """)
     
     result = await db.execute(reconciliation_query, {
         "sap_id": str(sap.sap_id),
-        "report_date": report_date_obj
+        **position_params(report_date_obj),
     })
     rows = result.fetchall()
     
     reports = []
     for r in rows:
-        closing = Decimal(r.closing_balance)
-        credits = Decimal(r.total_credits)
-        debits = Decimal(r.total_debits)
-        opening = closing - credits + debits
+        position = report_position(r, report_date_obj, Decimal(r.current_balance))
         
         reports.append(ReconciliationReport(
             date=report_date,
@@ -975,11 +835,11 @@ async def get_reconciliation_reports(
             sap_bic=r.sap_bic or '',
             fxp_code=r.fxp_code or '',
             currency=r.currency_code,
-            opening_balance=str(opening),
-            total_credits=str(credits),
-            total_debits=str(debits),
-            closing_balance=str(closing),
-            transaction_count=r.transaction_count
+            opening_balance=str(position.opening),
+            total_credits=str(position.credits),
+            total_debits=str(position.debits),
+            closing_balance=str(position.closing),
+            transaction_count=position.transactions
         ))
     
     return reports
@@ -1003,17 +863,13 @@ async def configure_liquidity_alerts(
     Alerts are triggered when available balance falls below the threshold.
     """
     # Verify SAP exists
-    sap_query = text("SELECT sap_id FROM saps WHERE bic = :bic")
-    result = await db.execute(sap_query, {"bic": sap_bic.upper()})
-    sap = result.fetchone()
+    sap = (await get_reference_data().get(db)).sap_by_bic(sap_bic)
     
     if not sap:
         raise HTTPException(status_code=404, detail=f"SAP with BIC {sap_bic} not found")
     
     # Verify FXP exists
-    fxp_query = text("SELECT fxp_id FROM fxps WHERE fxp_code = :fxp_code")
-    result = await db.execute(fxp_query, {"fxp_code": fxp_bic.upper()})
-    fxp = result.fetchone()
+    fxp = (await get_reference_data().get(db)).fxp_by_code(fxp_bic)
     
     if not fxp:
         raise HTTPException(status_code=404, detail=f"FXP with BIC {fxp_bic} not found")
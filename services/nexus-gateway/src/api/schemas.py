@@ -7,6 +7,7 @@ models, ensuring consistency across discovery, transactional, and ISO 20022 endp
 Reference: ADR-005 - API Design Principles
 """
 
+from decimal import Decimal
 from pydantic import BaseModel, Field
 from typing import Optional, Any
 from uuid import UUID
@@ -159,6 +160,53 @@ class QuotesResponse(BaseModel):
     """Response from GET /quotes."""
     quotes: list[QuoteInfo]
 
+# Corridors priced per POST /quotes/batch request
+MAX_BATCH_QUOTE_ITEMS = 100
+
+class BatchQuoteItem(BaseModel):
+    """One corridor and amount of a batch quote request."""
+    source_country: str = Field(alias="sourceCountry", min_length=2, max_length=2)
+    destination_country: str = Field(alias="destCountry", min_length=2, max_length=2)
+    amount: Decimal = Field(gt=0)
+    amount_type: str = Field(alias="amountType", pattern="^(SOURCE|DESTINATION)$")
+
+    class Config:
+        populate_by_name = True
+
+class BatchQuoteRequest(BaseModel):
+    """Request body of POST /quotes/batch."""
+    source_psp_bic: Optional[str] = Field(None, alias="sourcePspBic")
+    items: list[BatchQuoteItem] = Field(min_length=1, max_length=MAX_BATCH_QUOTE_ITEMS)
+
+    class Config:
+        populate_by_name = True
+
+class BatchQuoteError(BaseModel):
+    """Why an item of a batch quote request has no quotes (status as GET /quotes would return)."""
+    status: int
+    detail: str
+
+class BatchQuoteResult(BaseModel):
+    """Quotes, or the error, for one item of a batch quote request."""
+    index: int
+    source_country: str = Field(alias="sourceCountry")
+    destination_country: str = Field(alias="destCountry")
+    amount: str
+    amount_type: str = Field(alias="amountType")
+    quotes: Optional[list[QuoteInfo]] = None
+    error: Optional[BatchQuoteError] = None
+
+    class Config:
+        populate_by_name = True
+
+class BatchQuotesResponse(BaseModel):
+    """Response from POST /quotes/batch, one result per item in request order."""
+    results: list[BatchQuoteResult]
+
+class QuoteSubscription(BatchQuoteItem):
+    """Corridor and amount of a live quote stream (GET /quotes/stream, WS /quotes/live)."""
+    source_psp_bic: Optional[str] = Field(None, alias="sourcePspBic")
+
 class IntermediaryAgentInfo(BaseModel):
     """SAP account details for payment routing."""
     agent_role: str = Field(alias="agentRole")
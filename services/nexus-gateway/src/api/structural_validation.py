@@ -0,0 +1,351 @@
+"""
+Nexus Structural Validation (fast path)
+
+Full XSD validation of every inbound pacs.008/pacs.002 is the most expensive
+step on the payment path. This module validates the subset of the schema
+that Nexus actually depends on (message root, group header, identifiers,
+amounts, codes and the Nexus-mandatory fields) in a single pass over the
+parsed tree.
+
+Rules are declared per message type as "Parent/Element" paths:
+
+    Rule("GrpHdr/NbOfTxs", allowed=("1",), reason="Nexus supports single payments only")
+
+and compiled once into a lookup keyed by element local name, so the tree
+is walked exactly once regardless of how many rules a message has. Local
+names are used, so namespaced documents, AppHdr envelopes and bare sandbox
+XML are all handled.
+
+Validation modes (Settings / environment XSD_VALIDATION_MODE):
+    full     XSD on every message (default, previous behaviour)
+    sampled  fast path on every message, plus XSD on XSD_VALIDATION_SAMPLE_RATE
+             of them; the XSD result wins when both ran
+    fast     fast path only
+
+Message types without a structural spec always use full XSD. Counters per
+message type and mode are exported on /health/metrics ("validationModes").
+"""
+
+from typing import Optional
+from lxml import etree
+import logging
+import random
+import re
+import threading
+
+from ..config import settings
+from .validation import ValidationResult, parse_secure, validate_document, validate_xml_async
+from .xml_executor import get_xml_executor
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_MODES = ("full", "sampled", "fast")
+
+# Patterns mirroring the XSD simple types used by the rules below
+UUID_V4 = r"[a-f0-9]{8}-[a-f0-9]{4}-4[a-f0-9]{3}-[89ab][a-f0-9]{3}-[a-f0-9]{12}"
+ISO_DATE_TIME = r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})?"
+AMOUNT = r"\d{1,18}(\.\d{1,5})?"
+CURRENCY = r"[A-Z]{3}"
+BIC = r"[A-Z0-9]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?"
+STATUS_CODE = r"[A-Z0-9]{1,4}"
+
+
+# =============================================================================
+# Rule Declaration
+# =============================================================================
+
+class Rule:
+    """
+    Constraint on one element, addressed as "Parent/Element" (local names).
+
+    Args:
+        path: Parent and element local names, e.g. "SttlmInf/ClrSys"
+        required: Element must occur at least once
+        max_occurs: Maximum number of occurrences (None = unbounded)
+        allowed: Permitted text values (code lists)
+        pattern: Regex the text must fully match
+        max_length: Maximum text length
+        attributes: Required attributes and the regex their value must match
+        reason: Why Nexus needs the element (appended to "missing" errors)
+    """
+
+    __slots__ = ("path", "parent", "name", "required", "max_occurs", "allowed",
+                 "pattern", "max_length", "attributes", "reason")
+
+    def __init__(
+        self,
+        path: str,
+        required: bool = True,
+        max_occurs: Optional[int] = 1,
+        allowed: Optional[tuple[str, ...]] = None,
+        pattern: Optional[str] = None,
+        max_length: Optional[int] = None,
+        attributes: Optional[dict[str, str]] = None,
+        reason: Optional[str] = None,
+    ):
+        self.path = path
+        self.parent, _, self.name = path.rpartition("/")
+        self.required = required
+        self.max_occurs = max_occurs
+        self.allowed = frozenset(allowed) if allowed else None
+        self.pattern = re.compile(pattern) if pattern else None
+        self.max_length = max_length
+        self.attributes = {k: re.compile(v) for k, v in (attributes or {}).items()}
+        self.reason = reason
+
+    @property
+    def checks_text(self) -> bool:
+        return bool(self.allowed or self.pattern or self.max_length)
+
+
+class StructuralSpec:
+    """
+    Compiled single-pass validator for one message type.
+    """
+
+    def __init__(self, msg_type: str, rules: tuple[Rule, ...]):
+        self.msg_type = msg_type
+        self.rules = rules
+        # local name -> ((parent local name, rule index), ...)
+        self._index: dict[str, tuple[tuple[str, int], ...]] = {}
+        for i, rule in enumerate(rules):
+            self._index[rule.name] = self._index.get(rule.name, ()) + ((rule.parent, i),)
+
+    def validate(self, root: etree._Element) -> ValidationResult:
+        """Walk the tree once and evaluate every rule."""
+        index = self._index
+        counts = [0] * len(self.rules)
+        matched: list[list[etree._Element]] = [[] for _ in self.rules]
+
+        for element in root.iter(etree.Element):
+            name = element.tag.rpartition("}")[2]
+            candidates = index.get(name)
+            if candidates is None:
+                continue
+            parent = element.getparent()
+            parent_name = parent.tag.rpartition("}")[2] if parent is not None else ""
+            for rule_parent, i in candidates:
+                if rule_parent == parent_name:
+                    counts[i] += 1
+                    matched[i].append(element)
+
+        errors = []
+        for rule, count, elements in zip(self.rules, counts, matched):
+            if count == 0:
+                if rule.required:
+                    suffix = f" - {rule.reason}" if rule.reason else ""
+                    errors.append(f"Missing mandatory element {rule.path}{suffix}")
+                continue
+            if rule.max_occurs is not None and count > rule.max_occurs:
+                suffix = f" - {rule.reason}" if rule.reason else ""
+                errors.append(f"{rule.path} occurs {count} times (max {rule.max_occurs}){suffix}")
+            for element in elements:
+                errors.extend(self._check_element(rule, element))
+
+        if errors:
+            return ValidationResult(valid=False, message_type=self.msg_type, errors=errors[:10])
+        return ValidationResult(valid=True, message_type=self.msg_type)
+
+    @staticmethod
+    def _check_element(rule: Rule, element: etree._Element) -> list[str]:
+        errors = []
+        if rule.checks_text:
+            value = (element.text or "").strip()
+            if rule.allowed is not None and value not in rule.allowed:
+                suffix = f" - {rule.reason}" if rule.reason else ""
+                errors.append(f"{rule.path} value '{value}' not allowed (expected {', '.join(sorted(rule.allowed))}){suffix}")
+            elif rule.pattern is not None and not rule.pattern.fullmatch(value):
+                errors.append(f"{rule.path} value '{value}' has invalid format")
+            elif rule.max_length is not None and not 0 < len(value) <= rule.max_length:
+                errors.append(f"{rule.path} must be 1-{rule.max_length} characters")
+        elif len(element) == 0 and not (element.text or "").strip():
+            errors.append(f"{rule.path} is empty")
+        for attr, pattern in rule.attributes.items():
+            value = element.get(attr)
+            if value is None:
+                errors.append(f"{rule.path} is missing attribute {attr}")
+            elif not pattern.fullmatch(value):
+                errors.append(f"{rule.path}/@{attr} value '{value}' has invalid format")
+        return errors
+
+
+# =============================================================================
+# Message Specs
+# =============================================================================
+
+# Nexus-mandated subset of pacs.008.001.13
+# Reference: https://docs.nexusglobalpayments.org/messaging-and-translation/message-pacs.008-fi-to-fi-customer-credit-transfer
+PACS008_SPEC = StructuralSpec("pacs.008", (
+    Rule("Document/FIToFICstmrCdtTrf"),
+    Rule("GrpHdr/MsgId", max_length=35),
+    Rule("GrpHdr/CreDtTm", pattern=ISO_DATE_TIME),
+    Rule("GrpHdr/NbOfTxs", allowed=("1",), reason="Nexus supports single payments only"),
+    Rule("GrpHdr/SttlmInf"),
+    Rule("SttlmInf/SttlmMtd", allowed=("INDA", "INGA", "COVE", "CLRG")),
+    Rule("SttlmInf/ClrSys", reason="required to identify IPS operator"),
+    Rule("FIToFICstmrCdtTrf/CdtTrfTxInf", reason="Nexus supports single payments only"),
+    Rule("PmtId/EndToEndId", max_length=35),
+    Rule("PmtId/UETR", pattern=UUID_V4),
+    Rule("CdtTrfTxInf/IntrBkSttlmAmt", pattern=AMOUNT, attributes={"Ccy": CURRENCY}),
+    Rule("CdtTrfTxInf/InstdAmt", required=False, pattern=AMOUNT, attributes={"Ccy": CURRENCY}),
+    Rule("CdtTrfTxInf/AccptncDtTm", pattern=ISO_DATE_TIME, reason="required for timeout management"),
+    Rule("CdtTrfTxInf/ChrgBr", allowed=("SHAR",), reason="Charge Bearer must be SHAR for Nexus payments"),
+    Rule("CdtTrfTxInf/Dbtr"),
+    Rule("CdtTrfTxInf/DbtrAcct", reason="required for sanctions screening (FATF R16)"),
+    Rule("CdtTrfTxInf/DbtrAgt"),
+    Rule("CdtTrfTxInf/Cdtr"),
+    Rule("CdtTrfTxInf/CdtrAcct", reason="required for beneficiary credit"),
+    Rule("CdtTrfTxInf/CdtrAgt"),
+    Rule("FinInstnId/BICFI", required=False, max_occurs=None, pattern=BIC),
+))
+
+# Nexus-mandated subset of pacs.002.001.15
+PACS002_SPEC = StructuralSpec("pacs.002", (
+    Rule("Document/FIToFIPmtStsRpt"),
+    Rule("GrpHdr/MsgId", max_length=35),
+    Rule("GrpHdr/CreDtTm", pattern=ISO_DATE_TIME),
+    Rule("FIToFIPmtStsRpt/TxInfAndSts", reason="Nexus reports on single payments only"),
+    Rule("TxInfAndSts/OrgnlUETR", pattern=UUID_V4, reason="required to match the original payment"),
+    Rule("TxInfAndSts/TxSts", pattern=STATUS_CODE),
+    Rule("StsRsnInf/Rsn", required=False, max_occurs=None),
+    Rule("Rsn/Cd", required=False, max_occurs=None, pattern=STATUS_CODE),
+    Rule("TxInfAndSts/AccptncDtTm", required=False, pattern=ISO_DATE_TIME),
+))
+
+STRUCTURAL_SPECS: dict[str, StructuralSpec] = {
+    "pacs.008": PACS008_SPEC,
+    "pacs.002": PACS002_SPEC,
+}
+
+
+def validate_structure(doc: etree._Element, msg_type: str) -> ValidationResult:
+    """
+    Fast-path structural validation of a parsed document.
+
+    Raises:
+        KeyError: If msg_type has no structural spec
+    """
+    return STRUCTURAL_SPECS[msg_type].validate(doc)
+
+
+# =============================================================================
+# Validation Policy (full / sampled / fast)
+# =============================================================================
+
+class ValidationPolicy:
+    """
+    Chooses fast path and/or full XSD per message and counts the outcome.
+    """
+
+    def __init__(self, mode: str = "full", sample_rate: float = 0.1):
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode '{mode}' (expected one of {', '.join(VALIDATION_MODES)})")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def full_only(self, msg_type: str) -> bool:
+        """True if msg_type is always validated by XSD alone."""
+        return msg_type not in STRUCTURAL_SPECS or self.mode == "full"
+
+    def plan(self, msg_type: str) -> tuple[bool, bool]:
+        """(run fast path, run full XSD) for one message."""
+        if self.full_only(msg_type):
+            return False, True
+        if self.mode == "fast":
+            return True, False
+        return True, random.random() < self.sample_rate
+
+    def record(
+        self,
+        msg_type: str,
+        fast: Optional[ValidationResult],
+        full: Optional[ValidationResult],
+    ) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(msg_type, {
+                "full": 0, "fast": 0, "sampledFull": 0,
+                "fullFailures": 0, "fastFailures": 0, "disagreements": 0,
+            })
+            if fast is not None:
+                counters["fast"] += 1
+                counters["fastFailures"] += not fast.valid
+            if full is not None:
+                counters["sampledFull" if fast is not None else "full"] += 1
+                counters["fullFailures"] += not full.valid
+            if fast is not None and full is not None and fast.valid != full.valid:
+                counters["disagreements"] += 1
+
+    def stats(self) -> dict:
+        """Mode, sample rate and per-message-type counters."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "sampleRate": self.sample_rate,
+                "messageTypes": {t: dict(c) for t, c in sorted(self._counters.items())},
+            }
+
+
+# Singleton policy
+_policy: Optional[ValidationPolicy] = None
+
+
+def get_validation_policy() -> ValidationPolicy:
+    """Get the process-wide validation policy."""
+    global _policy
+    if _policy is None:
+        _policy = ValidationPolicy(
+            mode=settings.xsd_validation_mode,
+            sample_rate=settings.xsd_validation_sample_rate,
+        )
+    return _policy
+
+
+# =============================================================================
+# Inbound Message Validation
+# =============================================================================
+
+def validate_inbound_document(doc: etree._Element, msg_type: str) -> ValidationResult:
+    """
+    Validate an inbound message according to the configured mode.
+
+    When both ran (sampled mode) the full XSD result is returned; a fast-path
+    pass that XSD rejects is counted as a disagreement.
+    """
+    policy = get_validation_policy()
+    run_fast, run_full = policy.plan(msg_type)
+    fast = validate_structure(doc, msg_type) if run_fast else None
+    full = validate_document(doc, msg_type) if run_full else None
+    policy.record(msg_type, fast, full)
+    if fast is not None and full is not None and fast.valid and not full.valid:
+        logger.warning(f"{msg_type} passed fast-path validation but failed XSD: {full.errors[:2]}")
+    return full if full is not None else fast
+
+
+def validate_inbound_xml(xml_content: str | bytes, msg_type: str) -> ValidationResult:
+    """validate_inbound_document() for raw XML."""
+    try:
+        doc = parse_secure(xml_content)
+    except etree.XMLSyntaxError as e:
+        return ValidationResult(
+            valid=False,
+            message_type=msg_type,
+            errors=[f"XML syntax error: {str(e)}"]
+        )
+    return validate_inbound_document(doc, msg_type)
+
+
+async def validate_inbound_xml_async(xml_content: str | bytes, msg_type: str) -> ValidationResult:
+    """
+    validate_inbound_xml() on the XML executor.
+
+    In full mode this is validate_xml_async() (process pool capable); the
+    fast path runs on the thread pool so its counters stay in this process.
+    """
+    policy = get_validation_policy()
+    if policy.full_only(msg_type):
+        result = await validate_xml_async(xml_content, msg_type)
+        policy.record(msg_type, None, result)
+        return result
+    return await get_xml_executor().run(msg_type, validate_inbound_xml, xml_content, msg_type)
@@ -10,13 +10,16 @@ Schemas loaded from: specs/iso20022/xsd/
 """
 
 import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 from lxml import etree
 from functools import lru_cache
 import logging
+import asyncio
 import re
-from typing import Optional
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +28,41 @@ logger = logging.getLogger(__name__)
 # Schema Registry
 # =============================================================================
 
+# NOTE: XSD files exist both at root and in subdirectories
+# Using root-level paths for simpler configuration
+# See: specs/iso20022/xsd structure
+SCHEMA_FILES = {
+    # Release 1 - Mandatory
+    "pacs.008": "pacs.008.001.13.xsd",         # ✅ Exists at root
+    "pacs.002": "pacs.002.001.15.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
+    "acmt.023": "acmt.023.001.04.xsd",         # ✅ Exists at root (also in acmt_2024/)
+    "acmt.024": "acmt.024.001.04.xsd",         # ✅ Exists at root (also in acmt_2024/)
+    "camt.054": "camt.054.001.13.xsd",         # ✅ Exists at root (also in camt_2025/)
+    # Optional - SAP Integration
+    "camt.103": "camt.103.001.03.xsd",         # ✅ Exists at root (also in camt_2025/)
+    "pain.001": "pain.001.001.12.xsd",         # ✅ Exists at root
+    # Sandbox-active (pacs.004/camt.056 functional when NEXUS_RELEASE_1_STRICT=false)
+    "pacs.004": "pacs.004.001.14.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
+    "pacs.028": "pacs.028.001.06.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
+    "camt.056": "camt.056.001.11.xsd",         # ✅ Exists at root (also in camt_2025/)
+    "camt.029": "camt.029.001.13.xsd",         # ✅ Exists at root (also in camt_2025/)
+}
+
+# Release 1 mandatory messages: /health/ready is not ready until these compile
+REQUIRED_SCHEMAS = ("pacs.008", "pacs.002", "acmt.023", "acmt.024", "camt.054")
+
+
 class SchemaRegistry:
     """
     Manages ISO 20022 XSD schemas for message validation.
     
-    Loads schemas at startup and caches compiled validators.
+    Schemas are compiled by warm_up() during application startup, in
+    parallel on the XML executor. A schema requested before warm-up has
+    reached it is compiled on demand (once, under a per-type lock), so
+    early requests never see a spurious "schema not loaded".
     """
     
-    def __init__(self, schema_dir: Optional[str] = None):
+    def __init__(self, schema_dir: Optional[str] = None, eager: bool = True):
         """
         Initialize schema registry.
         
@@ -43,6 +73,8 @@ class SchemaRegistry:
                        2. SCHEMA_DIR environment variable
                        3. /app/specs/iso20022/xsd (Docker WORKDIR)
                        4. Relative path from source file
+            eager: Compile every schema now (sequentially). The global
+                   registry uses eager=False and is warmed up in parallel.
         """
         if schema_dir is None:
             # Check environment variable first (for Docker/production)
@@ -61,55 +93,122 @@ class SchemaRegistry:
         
         self.schema_dir = Path(schema_dir)
         self._schemas: dict[str, etree.XMLSchema] = {}
+        self._schema_paths: dict[str, Path] = {}
         self._load_errors: dict[str, str] = {}
+        self._compile_ms: dict[str, float] = {}
+        self._attempted: set[str] = set()
+        self._type_locks = {msg_type: threading.Lock() for msg_type in SCHEMA_FILES}
+        # Idle validator instances per type (see lease())
+        self._spares: dict[str, list[etree.XMLSchema]] = {}
+        self._spares_lock = threading.Lock()
+        # Warm-up state (see warm_up())
+        self.warm_up_complete = False
+        self.warm_up_ms: Optional[float] = None
         
-        # Load all available schemas
-        self._load_schemas()
-    
-    def _load_schemas(self):
-        """Load all XSD schemas from the schema directory."""
         if not self.schema_dir.exists():
             logger.warning(f"Schema directory not found: {self.schema_dir}")
-            return
         
-        # NOTE: XSD files exist both at root and in subdirectories
-        # Using root-level paths for simpler configuration
-        # See: specs/iso20022/xsd structure
-        schema_files = {
-            # Release 1 - Mandatory
-            "pacs.008": "pacs.008.001.13.xsd",         # ✅ Exists at root
-            "pacs.002": "pacs.002.001.15.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
-            "acmt.023": "acmt.023.001.04.xsd",         # ✅ Exists at root (also in acmt_2024/)
-            "acmt.024": "acmt.024.001.04.xsd",         # ✅ Exists at root (also in acmt_2024/)
-            "camt.054": "camt.054.001.13.xsd",         # ✅ Exists at root (also in camt_2025/)
-            # Optional - SAP Integration
-            "camt.103": "camt.103.001.03.xsd",         # ✅ Exists at root (also in camt_2025/)
-            "pain.001": "pain.001.001.12.xsd",         # ✅ Exists at root
-            # Sandbox-active (pacs.004/camt.056 functional when NEXUS_RELEASE_1_STRICT=false)
-            "pacs.004": "pacs.004.001.14.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
-            "pacs.028": "pacs.028.001.06.xsd",         # ✅ Exists at root (also in pacs_2024_2025/)
-            "camt.056": "camt.056.001.11.xsd",         # ✅ Exists at root (also in camt_2025/)
-            "camt.029": "camt.029.001.13.xsd",         # ✅ Exists at root (also in camt_2025/)
-        }
+        if eager:
+            self.load_all()
+    
+    def _load_schema(self, msg_type: str) -> None:
+        """Parse and compile one XSD, recording its compile time."""
+        filename = SCHEMA_FILES[msg_type]
+        schema_path = self.schema_dir / filename
+        if schema_path.exists():
+            started = time.perf_counter()
+            try:
+                schema_doc = etree.parse(str(schema_path))
+                schema = etree.XMLSchema(schema_doc)
+                self._compile_ms[msg_type] = round((time.perf_counter() - started) * 1000, 1)
+                self._schema_paths[msg_type] = schema_path
+                self._spares[msg_type] = [schema]
+                self._schemas[msg_type] = schema
+                logger.info(f"Loaded schema: {msg_type} from {filename} in {self._compile_ms[msg_type]}ms")
+            except Exception as e:
+                self._load_errors[msg_type] = str(e)
+                logger.error(f"Failed to load schema {msg_type}: {e}")
+        else:
+            self._load_errors[msg_type] = f"File not found: {schema_path}"
+            logger.warning(f"Schema not found: {schema_path}")
+    
+    def ensure_loaded(self, msg_type: str) -> bool:
+        """
+        Compile the schema for msg_type if nobody has yet.
         
-        for msg_type, filename in schema_files.items():
-            schema_path = self.schema_dir / filename
-            if schema_path.exists():
-                try:
-                    schema_doc = etree.parse(str(schema_path))
-                    self._schemas[msg_type] = etree.XMLSchema(schema_doc)
-                    logger.info(f"Loaded schema: {msg_type} from {filename}")
-                except Exception as e:
-                    self._load_errors[msg_type] = str(e)
-                    logger.error(f"Failed to load schema {msg_type}: {e}")
-            else:
-                self._load_errors[msg_type] = f"File not found: {schema_path}"
-                logger.warning(f"Schema not found: {schema_path}")
+        Returns True if a compiled schema is available.
+        """
+        if msg_type not in self._attempted and msg_type in self._type_locks:
+            with self._type_locks[msg_type]:
+                if msg_type not in self._attempted:
+                    self._load_schema(msg_type)
+                    self._attempted.add(msg_type)
+        return msg_type in self._schemas
+    
+    def load_all(self) -> None:
+        """Compile every schema sequentially in the calling thread."""
+        for msg_type in SCHEMA_FILES:
+            self.ensure_loaded(msg_type)
+    
+    async def warm_up(self) -> None:
+        """
+        Compile all schemas concurrently on the XML executor.
+        
+        lxml releases the GIL while compiling, so independent schemas build
+        in parallel; total time approaches the slowest single schema.
+        """
+        from .xml_executor import get_xml_executor
+        
+        started = time.perf_counter()
+        executor = get_xml_executor()
+        await asyncio.gather(*(
+            executor.run(msg_type, self.ensure_loaded, msg_type)
+            for msg_type in SCHEMA_FILES
+        ))
+        self.warm_up_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.warm_up_complete = True
+        logger.info(
+            f"Schema warm-up complete: {len(self._schemas)}/{len(SCHEMA_FILES)} "
+            f"schemas in {self.warm_up_ms}ms"
+        )
+    
+    def missing_required(self) -> list[str]:
+        """Required (Release 1) schemas that are not compiled."""
+        return [t for t in REQUIRED_SCHEMAS if t not in self._schemas]
+    
+    def was_attempted(self, msg_type: str) -> bool:
+        """Check if compiling a schema has been tried (successfully or not)."""
+        return msg_type in self._attempted
+    
+    def get_compile_times(self) -> dict[str, float]:
+        """Per-schema compile time in milliseconds."""
+        return dict(self._compile_ms)
     
     def get_schema(self, msg_type: str) -> Optional[etree.XMLSchema]:
         """Get compiled XML schema for a message type."""
         return self._schemas.get(msg_type)
     
+    @contextmanager
+    def lease(self, msg_type: str) -> Iterator[etree.XMLSchema]:
+        """
+        Borrow a compiled validator for exclusive use by the calling thread.
+        
+        XMLSchema keeps its error_log on the instance, so one instance must
+        not validate on two threads at once (see xml_executor). Idle
+        instances are pooled; when all are in use another one is compiled,
+        so the pool grows to the executor's per-type concurrency limit.
+        """
+        with self._spares_lock:
+            spares = self._spares[msg_type]
+            schema = spares.pop() if spares else None
+        if schema is None:
+            schema = etree.XMLSchema(etree.parse(str(self._schema_paths[msg_type])))
+        try:
+            yield schema
+        finally:
+            with self._spares_lock:
+                self._spares[msg_type].append(schema)
+    
     def is_loaded(self, msg_type: str) -> bool:
         """Check if a schema is loaded."""
         return msg_type in self._schemas
@@ -129,16 +228,25 @@ class SchemaRegistry:
 
 # Lazy initialization to avoid import-time errors
 _registry: Optional[SchemaRegistry] = None
+_registry_lock = threading.Lock()
 
 
 def get_registry() -> SchemaRegistry:
-    """Get or create the global schema registry."""
+    """Get or create the global schema registry (safe from executor threads)."""
     global _registry
     if _registry is None:
-        _registry = SchemaRegistry()
+        with _registry_lock:
+            if _registry is None:
+                # Compiled in parallel by warm_up() from main.lifespan
+                _registry = SchemaRegistry(eager=False)
     return _registry
 
 
+async def warm_up_schemas() -> None:
+    """Compile all XSD schemas concurrently (called from main.lifespan)."""
+    await get_registry().warm_up()
+
+
 # =============================================================================
 # Validation Functions
 # =============================================================================
@@ -168,12 +276,48 @@ class ValidationResult:
         }
 
 
-def validate_xml(xml_content: str | bytes, msg_type: str) -> ValidationResult:
+def _schema_not_loaded(registry: SchemaRegistry, msg_type: str) -> ValidationResult:
+    """Build the result returned when no compiled schema exists for msg_type."""
+    return ValidationResult(
+        valid=False,
+        message_type=msg_type,
+        errors=[f"Schema not loaded for {msg_type}"],
+        warnings=[f"Schema load error: {registry.get_load_errors().get(msg_type, 'Unknown')}"]
+    )
+
+
+def parse_secure(xml_content: str | bytes) -> etree._Element:
     """
-    Validate XML content against XSD schema.
+    Parse XML content with secure parser settings.
+    
+    SECURITY: Disables entity resolution to prevent XXE and Billion Laughs attacks.
+    
+    Raises:
+        etree.XMLSyntaxError: If the content is not well-formed XML
+    """
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf-8')
+    
+    # Create a secure parser that prevents XXE attacks
+    parser = etree.XMLParser(
+        resolve_entities=False,  # Prevent external entity resolution (XXE)
+        no_network=True,         # Disable network access for external DTDs
+        dtd_validation=False,    # Skip DTD validation (can be malicious)
+        load_dtd=False,          # Don't load external DTDs
+        huge_tree=False,         # Prevent denial of service via huge documents
+    )
+    return etree.fromstring(xml_content, parser=parser)
+
+
+def validate_document(doc: etree._Element, msg_type: str) -> ValidationResult:
+    """
+    Validate an already-parsed XML document against its XSD schema.
+    
+    Lets callers that need the tree for extraction or transformation
+    reuse a single parse instead of re-parsing the raw message.
     
     Args:
-        xml_content: XML string or bytes
+        doc: Root element returned by parse_secure()
         msg_type: Message type (e.g., "pacs.008", "acmt.023")
     
     Returns:
@@ -181,32 +325,48 @@ def validate_xml(xml_content: str | bytes, msg_type: str) -> ValidationResult:
     """
     registry = get_registry()
     
-    # Check if schema is loaded
-    if not registry.is_loaded(msg_type):
+    # Compiles on demand if warm-up has not reached this schema yet
+    if not registry.ensure_loaded(msg_type):
+        return _schema_not_loaded(registry, msg_type)
+    
+    # Validate against schema
+    with registry.lease(msg_type) as schema:
+        is_valid = schema.validate(doc)
+        # Extract validation errors while the instance is still ours
+        errors = [] if is_valid else [str(error) for error in schema.error_log]
+    
+    if is_valid:
+        return ValidationResult(
+            valid=True,
+            message_type=msg_type
+        )
+    else:
         return ValidationResult(
             valid=False,
             message_type=msg_type,
-            errors=[f"Schema not loaded for {msg_type}"],
-            warnings=[f"Schema load error: {registry.get_load_errors().get(msg_type, 'Unknown')}"]
+            errors=errors[:10]  # Limit to first 10 errors
         )
+
+
+def validate_xml(xml_content: str | bytes, msg_type: str) -> ValidationResult:
+    """
+    Validate XML content against XSD schema.
+    
+    Args:
+        xml_content: XML string or bytes
+        msg_type: Message type (e.g., "pacs.008", "acmt.023")
+    
+    Returns:
+        ValidationResult with validation status and any errors
+    """
+    registry = get_registry()
     
-    schema = registry.get_schema(msg_type)
+    # Compiles on demand if warm-up has not reached this schema yet
+    if not registry.ensure_loaded(msg_type):
+        return _schema_not_loaded(registry, msg_type)
     
-    # Parse XML with secure parser settings
-    # SECURITY: Disable entity resolution to prevent XXE and Billion Laughs attacks
     try:
-        if isinstance(xml_content, str):
-            xml_content = xml_content.encode('utf-8')
-        
-        # Create a secure parser that prevents XXE attacks
-        parser = etree.XMLParser(
-            resolve_entities=False,  # Prevent external entity resolution (XXE)
-            no_network=True,         # Disable network access for external DTDs
-            dtd_validation=False,    # Skip DTD validation (can be malicious)
-            load_dtd=False,          # Don't load external DTDs
-            huge_tree=False,         # Prevent denial of service via huge documents
-        )
-        doc = etree.fromstring(xml_content, parser=parser)
+        doc = parse_secure(xml_content)
     except etree.XMLSyntaxError as e:
         return ValidationResult(
             valid=False,
@@ -214,22 +374,18 @@ def validate_xml(xml_content: str | bytes, msg_type: str) -> ValidationResult:
             errors=[f"XML syntax error: {str(e)}"]
         )
     
-    # Validate against schema
-    is_valid = schema.validate(doc)
+    return validate_document(doc, msg_type)
+
+
+async def validate_xml_async(xml_content: str | bytes, msg_type: str) -> ValidationResult:
+    """
+    validate_xml() on the XML executor, off the event loop.
     
-    if is_valid:
-        return ValidationResult(
-            valid=True,
-            message_type=msg_type
-        )
-    else:
-        # Extract validation errors
-        errors = [str(error) for error in schema.error_log]
-        return ValidationResult(
-            valid=False,
-            message_type=msg_type,
-            errors=errors[:10]  # Limit to first 10 errors
-        )
+    Used by the async message handlers; see xml_executor for pool modes
+    and per-message-type concurrency limits.
+    """
+    from .xml_executor import get_xml_executor
+    return await get_xml_executor().run_detached(msg_type, validate_xml, xml_content, msg_type)
 
 
 def validate_pacs008(xml_content: str | bytes) -> ValidationResult:
@@ -385,9 +541,31 @@ def get_validation_health() -> dict:
         "schemasTotal": len(loaded),
         "schemaLoadErrors": errors,
         "schemaDirectory": str(registry.schema_dir),
+        "compileTimesMs": registry.get_compile_times(),
+        "warmUpComplete": registry.warm_up_complete,
+        "warmUpMs": registry.warm_up_ms,
     }
 
 
+def get_schema_readiness() -> dict:
+    """
+    Readiness of the required (Release 1) schemas for /health/ready.
+    
+    "loading" until every required schema has been compiled or tried
+    (including before the startup warm-up task first runs), "fail" if a
+    required schema could not be compiled, otherwise "ok".
+    """
+    registry = get_registry()
+    missing = registry.missing_required()
+    if not missing:
+        status = "ok"
+    elif not all(registry.was_attempted(t) for t in missing):
+        status = "loading"
+    else:
+        status = "fail"
+    return {"status": status, "missing": missing}
+
+
 def safe_extract_uetr(xml_content: str | bytes) -> Optional[str]:
     """
     Safely extract UETR from ISO 20022 XML without strict parsing or schemas.
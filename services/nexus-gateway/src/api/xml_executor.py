@@ -0,0 +1,226 @@
+"""
+XML Work Executor
+
+Runs CPU-bound lxml work (parsing, XSD validation, extraction,
+serialization) off the asyncio event loop, so a large or deeply nested
+message does not stall quotes, status queries and other in-flight
+requests on the same worker.
+
+Two kinds of jobs:
+- run(): any callable, executed on a thread pool. Used for work on lxml
+  trees (MessagePipeline), which cannot cross process boundaries. lxml
+  releases the GIL while parsing and validating, so threads run in
+  parallel with the loop.
+- run_detached(): self-contained jobs taking and returning picklable values
+  (e.g. validate_xml(bytes, msg_type) -> ValidationResult). These go to a
+  process pool when XML_EXECUTOR_MODE=process, otherwise to the thread pool.
+
+Each message type has its own concurrency limit so a burst of one type
+(e.g. camt.054 reconciliation files) cannot occupy every worker. Jobs over
+the limit wait in a per-type queue whose depth is reported by stats().
+
+Configuration (Settings / environment):
+    XML_EXECUTOR_MODE         thread (default) | process | inline
+    XML_EXECUTOR_WORKERS      pool size (default 4)
+    XML_EXECUTOR_TYPE_LIMIT   default concurrent jobs per message type (default 4)
+    XML_EXECUTOR_TYPE_LIMITS  JSON overrides, e.g. {"pacs.008": 4, "camt.054": 1}
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import functools
+import logging
+import time
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_worker_process() -> None:
+    """Process pool initializer: compile the XSD registry once per worker."""
+    from .validation import get_registry
+    get_registry().load_all()
+
+
+class _TypeStats:
+    """Counters for one message type."""
+
+    __slots__ = ("waiting", "in_flight", "completed", "failed", "max_waiting", "wait_s", "run_s")
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_waiting = 0
+        self.wait_s = 0.0
+        self.run_s = 0.0
+
+    def to_dict(self) -> dict:
+        done = self.completed + self.failed
+        return {
+            "queueDepth": self.waiting,
+            "inFlight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "maxQueueDepth": self.max_waiting,
+            "avgWaitMs": round(self.wait_s / done * 1000, 3) if done else 0.0,
+            "avgRunMs": round(self.run_s / done * 1000, 3) if done else 0.0,
+        }
+
+
+class XmlExecutor:
+    """
+    Bounded executor for lxml work with per-message-type concurrency limits.
+    """
+
+    MODES = ("thread", "process", "inline")
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 4,
+        type_limit: int = 4,
+        type_limits: Optional[dict[str, int]] = None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown XML executor mode '{mode}' (expected one of {', '.join(self.MODES)})")
+        self.mode = mode
+        self.workers = workers
+        self.type_limit = type_limit
+        self.type_limits = dict(type_limits or {})
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stats: dict[str, _TypeStats] = {}
+
+    # -------------------------------------------------------------------------
+    # Pools
+    # -------------------------------------------------------------------------
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nexus-xml")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker_process)
+        return self._processes
+
+    def shutdown(self) -> None:
+        """Shut down worker pools (called from main.lifespan)."""
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+            self._processes = None
+
+    # -------------------------------------------------------------------------
+    # Execution
+    # -------------------------------------------------------------------------
+
+    def limit_for(self, msg_type: str) -> int:
+        """Concurrency limit for a message type."""
+        return self.type_limits.get(msg_type, self.type_limit)
+
+    def _semaphore(self, msg_type: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(msg_type)
+        if semaphore is None:
+            semaphore = self._semaphores[msg_type] = asyncio.Semaphore(self.limit_for(msg_type))
+        return semaphore
+
+    def _type_stats(self, msg_type: str) -> _TypeStats:
+        stats = self._stats.get(msg_type)
+        if stats is None:
+            stats = self._stats[msg_type] = _TypeStats()
+        return stats
+
+    async def _submit(self, pool: Optional[Executor], msg_type: str, fn: Callable, args: tuple) -> Any:
+        stats = self._type_stats(msg_type)
+        queued_at = time.perf_counter()
+        stats.waiting += 1
+        stats.max_waiting = max(stats.max_waiting, stats.waiting)
+        try:
+            await self._semaphore(msg_type).acquire()
+        finally:
+            stats.waiting -= 1
+        started = time.perf_counter()
+        stats.wait_s += started - queued_at
+        stats.in_flight += 1
+        try:
+            if pool is None:
+                result = fn(*args)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args))
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            return result
+        finally:
+            stats.in_flight -= 1
+            stats.run_s += time.perf_counter() - started
+            self._semaphore(msg_type).release()
+
+    async def run(self, msg_type: str, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the thread pool (or inline in inline mode)."""
+        pool = None if self.mode == "inline" else self._thread_pool()
+        return await self._submit(pool, msg_type, fn, args)
+
+    async def run_detached(self, msg_type: str, fn: Callable, *args) -> Any:
+        """
+        Run a self-contained job; uses the process pool in process mode.
+
+        fn must be a module-level function and args/result must be picklable.
+        """
+        if self.mode == "process":
+            return await self._submit(self._process_pool(), msg_type, fn, args)
+        return await self.run(msg_type, fn, *args)
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Pool configuration and per-message-type queue metrics."""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "messageTypes": {
+                msg_type: {"limit": self.limit_for(msg_type), **stats.to_dict()}
+                for msg_type, stats in sorted(self._stats.items())
+            },
+        }
+
+
+# Singleton executor
+_executor: Optional[XmlExecutor] = None
+
+
+def get_xml_executor() -> XmlExecutor:
+    """Get the process-wide XML executor."""
+    global _executor
+    if _executor is None:
+        _executor = XmlExecutor(
+            mode=settings.xml_executor_mode,
+            workers=settings.xml_executor_workers,
+            type_limit=settings.xml_executor_type_limit,
+            type_limits=settings.xml_executor_type_limits,
+        )
+    return _executor
+
+
+def shutdown_xml_executor() -> None:
+    """Shut down the executor's pools if it was created."""
+    if _executor is not None:
+        _executor.shutdown()
+
+
+async def run_xml(msg_type: str, fn: Callable, *args) -> Any:
+    """Shorthand for get_xml_executor().run(...)."""
+    return await get_xml_executor().run(msg_type, fn, *args)
@@ -46,18 +46,91 @@ class Settings(BaseSettings):
     # Quote settings
     # Reference: https://docs.nexusglobalpayments.org/fx-provision/quotes
     quote_validity_seconds: int = 600  # Scheme mandate: 10 minutes
+    # Where generated quotes live until used (see api/quote_store.py)
+    quote_store_backend: str = "redis"  # redis | memory | postgres
+    quote_store_expired_retention_seconds: int = 600  # expired quotes stay readable (rejected as expired)
+    # Quote expiry sweeper and retention (see api/quote_maintenance.py)
+    quote_maintenance_enabled: bool = True
+    quote_maintenance_interval_seconds: int = 60
+    quote_maintenance_batch_size: int = 1000
+    quote_maintenance_max_batches: int = 20  # per phase and run
+    quote_retention_hours: int = 168  # EXPIRED quotes older than this are deleted
+    # SAP reservation expiry worker (see api/reservation_expiry.py)
+    reservation_expiry_enabled: bool = True
+    reservation_expiry_interval_seconds: float = 30  # periodic scan; scheduled reservations wake it earlier
+    reservation_expiry_batch_size: int = 500
+    reservation_expiry_max_batches: int = 20  # per wake
+    reservation_expiry_max_scheduled: int = 100000  # deadlines held in memory
+    # Sharded FXP nostro balances (see api/account_shards.py)
+    account_shard_count: int = 1  # sub-balances per account; 1 = off
+    account_shard_consolidation_interval_seconds: int = 10
+    account_shard_skew_ratio: float = 0.5  # rebalance when a shard is below this share of an even split
+    # Daily position closer for reconciliation (see api/daily_positions.py)
+    daily_position_closer_enabled: bool = True
+    daily_position_close_interval_seconds: int = 300
+    # Live quote streams (see api/quote_stream.py)
+    quote_stream_keepalive_seconds: int = 15
+    quote_stream_max_streams: int = 1000  # per process
 
     
     # Payment SLA
     # Reference: https://docs.nexusglobalpayments.org/payment-setup/step-17-accept-the-confirmation-and-notify-sender
     payment_timeout_seconds: int = 60
     
-    # Rate refresh
+    # Rate refresh: full resync of the in-memory rate book (see api/rate_book.py)
     rate_refresh_interval_seconds: int = 60
+    rate_book_enabled: bool = True  # LISTEN for rate change notifications
+    # Reference data cache: maximum snapshot age (see api/reference_data.py)
+    reference_data_refresh_interval_seconds: int = 300
     
     # Retry settings
     max_retries: int = 3
 
+    # Payment event write-behind (see api/iso20022/event_writer.py)
+    event_writer_enabled: bool = True
+    event_writer_batch_size: int = 200
+    event_writer_flush_interval_ms: int = 50
+    event_writer_queue_size: int = 10000
+
+    # XML work executor (see api/xml_executor.py)
+    xml_executor_mode: str = "thread"  # thread | process | inline
+    xml_executor_workers: int = 4
+    xml_executor_type_limit: int = 4
+    xml_executor_type_limits: dict[str, int] = {}
+    
+    # Inbound pacs.008/pacs.002 validation: full | sampled | fast
+    xsd_validation_mode: str = "full"
+    xsd_validation_sample_rate: float = 0.1  # share of messages given full XSD in sampled mode
+    
+    # Duplicate detection (see api/iso20022/dedup.py)
+    dedup_window_seconds: int = 86400  # MsgId/EndToEndId duplicate window
+    dedup_buckets: int = 24
+    dedup_key_types: list[str] = ["UETR", "MSGID", "E2EID"]
+    
+    # Callback delivery (see api/delivery.py)
+    callback_timeout_seconds: float = float(os.environ.get("NEXUS_CALLBACK_TIMEOUT_SECONDS", "10"))
+    callback_max_connections_per_host: int = 20
+    callback_max_in_flight_per_host: int = 10
+    callback_http2: bool = False  # requires the h2 package (httpx[http2])
+    callback_retry_base_seconds: float = 1.0
+    callback_retry_max_seconds: float = 30.0
+    callback_breaker_failure_threshold: int = 5
+    callback_breaker_reset_seconds: float = 30.0
+    
+    # Callback outbox dispatchers (see api/outbox.py)
+    outbox_enabled: bool = True
+    outbox_workers: int = 2
+    outbox_batch_size: int = 50
+    outbox_poll_interval_ms: int = 250
+    outbox_lease_seconds: int = 60  # must exceed a batch's worst-case delivery time
+    outbox_max_attempts: int = 8
+    outbox_retry_base_seconds: float = 2.0
+    outbox_retry_max_seconds: float = 300.0
+    outbox_retention_hours: int = 72  # DELIVERED rows; FAILED rows are kept
+    outbox_purge_interval_seconds: int = 300
+    outbox_purge_batch_size: int = 1000
+    outbox_purge_max_batches: int = 20  # per run
+
     # Sandbox Demo Defaults
     # These are used when XML parsing returns None for required fields
     demo_debtor_name: str = "Demo Sender"
@@ -13,16 +13,31 @@ The gateway serves as the central hub for:
 Reference: https://docs.nexusglobalpayments.org/introduction/overview-of-nexus
 """
 
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import AsyncGenerator
+import asyncio
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
-from src.api import countries, quotes, rates, fees, health, currencies, fin_insts, fee_formulas, iso20022, address_types, relationships, intermediary_agents, reconciliation, liquidity, returns, qr, addressing, payments_explorer, actors, psp, ips, pdo, demo_data, sanctions, fxp, sap
+from src.api import countries, quote_stream, quotes, corridor_simulation, rates, fees, health, currencies, fin_insts, fee_formulas, iso20022, address_types, relationships, intermediary_agents, reconciliation, liquidity, returns, qr, addressing, payments_explorer, actors, psp, ips, pdo, demo_data, sanctions, fxp, sap
 from src.config import settings
 from src.db import database
+from src.api.account_shards import start_shard_consolidator, stop_shard_consolidator
+from src.api.daily_positions import start_daily_position_closer, stop_daily_position_closer
+from src.api.iso20022.event_writer import start_event_writer, stop_event_writer
+from src.api.delivery import close_delivery_engine
+from src.api.outbox import (
+    start_outbox_dispatcher, start_outbox_retention, stop_outbox_dispatcher, stop_outbox_retention,
+)
+from src.api.quote_maintenance import start_quote_maintenance, stop_quote_maintenance
+from src.api.quote_store import close_quote_store
+from src.api.rate_book import start_rate_book, stop_rate_book
+from src.api.reference_data import start_reference_data
+from src.api.reservation_expiry import start_reservation_expiry, stop_reservation_expiry
+from src.api.xml_executor import shutdown_xml_executor
+from src.api.validation import warm_up_schemas
 from src.middleware.rate_limiter import RateLimitMiddleware
 from src.observability import setup_tracing
 
@@ -35,18 +50,55 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     
     Startup:
     - Connect to PostgreSQL database
+    - Start the payment event writer
+    - Start callback outbox dispatchers and delivered-callback retention
+    - Load the reference data cache
+    - Load the corridor rate book and listen for rate and reference data changes
+    - Start the quote expiry sweeper and the reservation expiry worker
+    - Start the account shard consolidator when balances are sharded
+    - Start the daily position closer
+    - Compile XSD schemas in parallel (/health/ready waits for them)
     - Initialize Redis cache
     - Connect to Kafka for event publishing
     
     Shutdown:
+    - Drain queued payment events
+    - Finish in-progress outbox batches, quote maintenance and reservation expiry
+    - Close pooled callback connections
+    - Stop XML executor workers
     - Close all connections gracefully
     """
     # Startup
     await database.connect()
+    await start_event_writer()
+    await start_outbox_dispatcher()
+    await start_outbox_retention()
+    await start_reference_data()
+    await start_rate_book()
+    await start_quote_maintenance()
+    await start_reservation_expiry()
+    await start_shard_consolidator()
+    await start_daily_position_closer()
+    schema_warm_up = asyncio.create_task(warm_up_schemas(), name="schema-warm-up")
     
     yield
     
     # Shutdown
+    if not schema_warm_up.done():
+        schema_warm_up.cancel()
+        with suppress(asyncio.CancelledError):
+            await schema_warm_up
+    await stop_daily_position_closer()
+    await stop_shard_consolidator()
+    await stop_reservation_expiry()
+    await stop_quote_maintenance()
+    await stop_rate_book()
+    await stop_event_writer()
+    await stop_outbox_retention()
+    await stop_outbox_dispatcher()
+    await close_delivery_engine()
+    await close_quote_store()
+    shutdown_xml_executor()
     await database.disconnect()
 
 
@@ -241,12 +293,25 @@ app.include_router(
     tags=["Countries"],
 )
 
+# Before quotes.router: /quotes/stream would otherwise match /quotes/{quote_id}
+app.include_router(
+    quote_stream.router,
+    prefix="/v1",
+    tags=["Quotes"],
+)
+
 app.include_router(
     quotes.router,
     prefix="/v1",
     tags=["Quotes"],
 )
 
+app.include_router(
+    corridor_simulation.router,
+    prefix="/v1",
+    tags=["Quotes"],
+)
+
 app.include_router(
     rates.router,
     prefix="/v1",
@@ -0,0 +1,60 @@
+"""
+Unit tests for sharded account balances.
+
+Tests account_shards.py and sharded reservations.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestAccountShards:
+    """Sharded account balances (api/account_shards.py)."""
+
+    @pytest.mark.asyncio
+    async def test_sharded_reserve_starts_at_the_payment_shard(self, mock_db_session):
+        import zlib
+        from src.api import reservations
+
+        mock_db_session.execute.return_value.fetchone.return_value = MagicMock(account_id="acc-1")
+
+        with patch.object(reservations.settings, "account_shard_count", 4):
+            result = await reservations.reserve(mock_db_session, "sap-1", "fxp-1", "THB", "10", "uetr-1")
+
+        statement, params = mock_db_session.execute.await_args.args
+        assert mock_db_session.execute.await_count == 1 and statement is reservations.RESERVE_SHARD_SQL
+        assert params["shard"] == zlib.crc32(b"uetr-1") % 4 and params["shard_count"] == 4
+        assert result.reservation_id is not None
+
+    @pytest.mark.asyncio
+    async def test_consolidator_rebalances_skewed_accounts_and_skips_busy_ones(self, mock_db_session):
+        from src.api.account_shards import ENSURE_SHARDS_SQL, REBALANCE_SQL, SKEWED_ACCOUNTS_SQL, ShardConsolidator
+        from src.api.background import TRY_LOCK_SQL as LOCK_SQL
+
+        def execute(statement, params=None):
+            result = MagicMock()
+            result.scalar.return_value = True
+            result.fetchall.return_value = [MagicMock(account_id="a1"), MagicMock(account_id="a2")]
+            if statement is SKEWED_ACCOUNTS_SQL:
+                assert params == {"shard_count": 4, "skew_ratio": 0.5}
+            if statement is REBALANCE_SQL and params["account_id"] == "a2":
+                result.fetchone.return_value = None  # rows held by a payment: SKIP LOCKED
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        consolidator = ShardConsolidator(session_factory=session_factory, shard_count=4)
+        assert await consolidator.run_once() == 1
+
+        calls = mock_db_session.execute.await_args_list
+        assert [c.args[0] for c in calls] == [
+            LOCK_SQL, ENSURE_SHARDS_SQL, SKEWED_ACCOUNTS_SQL, LOCK_SQL, REBALANCE_SQL, LOCK_SQL, REBALANCE_SQL,
+        ]
+        assert calls[4].args[1] == {"account_id": "a1", "shard_count": 4}
+        assert mock_db_session.commit.await_count == 3
+        assert "FOR UPDATE SKIP LOCKED" in REBALANCE_SQL.text
+        stats = consolidator.stats()
+        assert stats["candidates"] == 2 and stats["accounts"] == 1 and stats["skippedBusy"] == 1
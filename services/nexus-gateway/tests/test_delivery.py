@@ -0,0 +1,114 @@
+"""
+Unit tests for the callback delivery engine.
+
+Tests delivery.py: pooled clients, circuit breakers and per-destination limits.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestCallbackDelivery:
+    """Pooled callback delivery engine (api/delivery.py)."""
+
+    @staticmethod
+    def _engine(handler, **kwargs):
+        import httpx
+        from src.api.delivery import DeliveryEngine
+
+        kwargs.setdefault("retry_base_seconds", 0.001)
+        kwargs.setdefault("retry_max_seconds", 0.001)
+        return DeliveryEngine(transport=httpx.MockTransport(handler), **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_retries_reuse_one_pooled_client_per_host(self):
+        import httpx
+        from src.api.delivery import CallbackRequest
+
+        calls = []
+
+        def handler(request):
+            calls.append(str(request.url))
+            return httpx.Response(503 if len(calls) == 1 else 200)
+
+        engine = self._engine(handler)
+        try:
+            result = await engine.deliver(CallbackRequest("http://ips.example/cb", content="<x/>", max_attempts=3))
+            await engine.deliver(CallbackRequest("http://ips.example/other", content="<y/>"))
+
+            assert result.success and result.attempts == 2 and result.status_code == 200
+            assert len(calls) == 3
+            stats = engine.stats()["destinations"]
+            assert list(stats) == ["http://ips.example"]
+            assert stats["http://ips.example"]["retries"] == 1
+            assert stats["http://ips.example"]["delivered"] == 2
+        finally:
+            await engine.close()
+
+    @pytest.mark.asyncio
+    async def test_breaker_opens_and_short_circuits_the_destination(self):
+        import httpx
+        from src.api.delivery import CallbackRequest
+
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.host)
+            return httpx.Response(500)
+
+        engine = self._engine(handler, breaker_failure_threshold=2, breaker_reset_seconds=60)
+        try:
+            result = await engine.deliver(CallbackRequest("http://slow.example/cb", content="x", max_attempts=2))
+            assert not result.success and result.status_code == 500
+
+            # Circuit is open: no request leaves the process
+            result = await engine.deliver(CallbackRequest("http://slow.example/cb", content="x", max_attempts=1))
+            assert result.error_type == "CircuitOpen"
+            assert len(calls) == 2
+
+            destination = engine.stats()["destinations"]["http://slow.example"]
+            assert destination["circuit"] == "open" and destination["shortCircuited"] == 1
+        finally:
+            await engine.close()
+
+    @pytest.mark.asyncio
+    async def test_in_flight_is_bounded_per_destination(self):
+        import asyncio
+        import httpx
+        from src.api.delivery import CallbackRequest
+
+        active = peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return httpx.Response(200)
+
+        engine = self._engine(handler, max_in_flight_per_host=2)
+        try:
+            results = await asyncio.gather(*(
+                engine.deliver(CallbackRequest("http://ips.example/cb", content=str(i)))
+                for i in range(6)
+            ))
+            assert all(r.success for r in results)
+            assert peak == 2
+        finally:
+            await engine.close()
+
+    @pytest.mark.asyncio
+    async def test_callback_endpoint_test_uses_engine(self):
+        from src.api import callbacks
+        from src.api.delivery import DeliveryResult
+
+        engine = MagicMock()
+        engine.deliver = AsyncMock(return_value=DeliveryResult(
+            success=False, attempts=1, error="refused", error_type="ConnectError",
+        ))
+        with patch.object(callbacks, "get_delivery_engine", return_value=engine):
+            result = await callbacks.test_callback_endpoint("http://psp.example/cb")
+
+        assert result == {"success": False, "error": "refused", "errorType": "ConnectError"}
+        assert engine.deliver.await_args.args[0].max_attempts == 1
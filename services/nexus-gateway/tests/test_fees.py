@@ -5,7 +5,7 @@ Tests fees.py and fee_formulas.py endpoints.
 """
 
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock
 from httpx import AsyncClient
 
 
@@ -75,3 +75,109 @@ class TestFeeFormulas:
                 assert "feeType" in data
         finally:
             app.dependency_overrides.clear()
+
+
+class TestCompiledFeeTables:
+    """Compiled fee tables evaluate the configured fee structures."""
+
+    def test_compiled_fees_match_structures(self):
+        from decimal import Decimal
+        from src.api import fee_config
+
+        amounts = [Decimal("0.01"), Decimal("250"), Decimal("1234.56"), Decimal("99999999.99")]
+        for struct in list(fee_config.DESTINATION_FEE_STRUCTURES.values()) + [fee_config.DEFAULT_DESTINATION_FEE]:
+            currency = struct["currency"]
+            expected = [
+                max(struct["min"], min(struct["max"], struct["fixed"] + a * struct["percent"])).quantize(Decimal("0.01"))
+                for a in amounts
+            ]
+            assert [fee_config.calculate_destination_psp_fee(a, currency.lower())[0] for a in amounts] == expected
+            assert fee_config.calculate_destination_psp_fees(amounts, currency) == (expected, currency)
+
+        assert fee_config.calculate_destination_psp_fee(Decimal("100"), "xyz") == (Decimal("1.10"), "xyz")
+        assert fee_config.calculate_source_psp_fees(amounts, "sgd") == [
+            fee_config.calculate_source_psp_fee(a, "SGD") for a in amounts
+        ]
+        assert fee_config.calculate_scheme_fees([Decimal("1"), Decimal("100000")]) == [Decimal("0.10"), Decimal("5.00")]
+
+    def test_recompiling_picks_up_changed_structures(self, monkeypatch):
+        from decimal import Decimal
+        from src.api import fee_config
+
+        monkeypatch.setitem(fee_config.SOURCE_FEE_STRUCTURES, "EUR", {
+            "fixed": Decimal("0.20"), "percent": Decimal("0"), "min": Decimal("0.20"), "max": Decimal("0.20"),
+        })
+        try:
+            fee_config.compile_fee_tables()
+            assert fee_config.corridor_fees("eur", "THB").source.fee(Decimal("500")) == Decimal("0.20")
+            assert fee_config.corridor_fees("EUR", "THB").destination_currency == "THB"
+        finally:
+            monkeypatch.undo()
+            fee_config.compile_fee_tables()
+        assert fee_config.calculate_source_psp_fee(Decimal("500"), "EUR") == Decimal("1.50")
+
+
+class TestCorridorSimulation:
+    """The vectorized corridor simulation reproduces scalar quote pricing exactly."""
+
+    from hypothesis import given, settings, strategies as st
+
+    @staticmethod
+    def _rate(base_e8: int, spread: int, tiers: list, psp_bps: int):
+        from datetime import datetime, timezone
+        from decimal import Decimal
+        from src.api.rate_book import BookRate
+
+        return BookRate(
+            "r", "7f1c2a9e-0000-4000-8000-000000000001", "FXP", "FXP", Decimal(base_e8).scaleb(-8),
+            datetime.now(timezone.utc), spread,
+            tuple(sorted(((Decimal(m).scaleb(-3), bps) for m, bps in tiers), reverse=True)),
+            {"DBSSSGSG": psp_bps},
+        )
+
+    @given(
+        rates=st.lists(
+            st.tuples(
+                # Short rates and round amounts make half-cent ties common
+                st.one_of(st.integers(1000, 2 * 10 ** 12), st.integers(1, 200000).map(lambda n: n * 10 ** 7)),
+                st.one_of(st.integers(0, 300), st.sampled_from([0, 50, 100])),
+                st.lists(st.tuples(st.integers(0, 10 ** 9), st.integers(0, 50)), max_size=3),
+                st.integers(0, 20),
+            ),
+            min_size=1, max_size=3,
+        ),
+        amounts=st.lists(
+            st.one_of(st.integers(1, 10 ** 10), st.integers(1, 10 ** 5).map(lambda n: n * 50)),
+            min_size=1, max_size=20,
+        ),
+        amount_type=st.sampled_from(["SOURCE", "DESTINATION"]),
+        currencies=st.sampled_from([("SGD", "THB"), ("SGD", "IDR"), ("IDR", "PHP"), ("INR", "MYR"), ("EUR", "XXX")]),
+        source_max=st.integers(1, 10 ** 11),
+        dest_max=st.integers(1, 10 ** 12),
+        psp_bic=st.sampled_from([None, "DBSSSGSG", "OTHERXXX"]),
+    )
+    @settings(max_examples=300, deadline=None)
+    def test_matches_price_quote(self, rates, amounts, amount_type, currencies, source_max, dest_max, psp_bic):
+        from decimal import Decimal
+        import numpy as np
+        from src.api.corridor_simulation import simulate_corridor
+        from src.api.fee_config import corridor_fees
+        from src.api.quote_pricing import price_quote
+
+        book = [self._rate(*r) for r in rates]
+        fees = corridor_fees(*currencies)
+        source_max, dest_max = Decimal(source_max).scaleb(-2), Decimal(dest_max).scaleb(-2)
+        sim = simulate_corridor(book, np.array(amounts), amount_type, fees, source_max, dest_max, psp_bic)
+
+        for i, rate in enumerate(book):
+            for j, amount in enumerate(amounts):
+                pricing = price_quote(rate, Decimal(amount).scaleb(-2), amount_type, fees, source_max, dest_max, psp_bic)
+                assert sim.available[i, j] == (pricing is not None)
+                if pricing is None:
+                    continue
+                assert Decimal(int(sim.customer_rate[i, j])).scaleb(-12) == pricing.customer_rate
+                assert sim.tier_improvement_bps[i, j] == pricing.tier_improvement_bps
+                assert sim.capped_to_max_amount[i, j] == pricing.capped_to_max_amount
+                for field in ("source_interbank_amount", "destination_interbank_amount", "creditor_account_amount",
+                              "source_psp_fee", "destination_psp_fee"):
+                    assert Decimal(int(getattr(sim, field)[i, j])).scaleb(-2) == getattr(pricing, field), field
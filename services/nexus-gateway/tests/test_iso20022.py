@@ -234,3 +234,620 @@ class TestPacs028StatusRequest:
                 assert "advice" in data
         finally:
             app.dependency_overrides.clear()
+
+
+class TestPacs008Pipeline:
+    """Test the parse-once pacs.008 pipeline."""
+
+    @staticmethod
+    def _sample_body() -> bytes:
+        from src.api.iso20022.templates import TEMPLATES
+        return TEMPLATES["pacs.008"].sample_xml.encode("utf-8")
+
+    def test_parses_body_once(self):
+        """Validation, extraction and transform share a single parse."""
+        from src.api import validation
+        from src.api.iso20022.pipeline import MessagePipeline
+        from src.api.iso20022.pacs008 import parse_pacs008, apply_pacs008_transform
+
+        with patch.object(validation, "parse_secure", wraps=validation.parse_secure) as parse_spy:
+            message = MessagePipeline(self._sample_body(), "pacs.008")
+            message.validate()
+            parsed = message.extract(parse_pacs008)
+            message.transform(apply_pacs008_transform, {
+                "dest_sap_bic": "SAPTHBKX",
+                "dest_psp_bic": "KASITHBK",
+                "dest_amount": "25000.00",
+                "dest_currency": "THB",
+            })
+            forwarded = message.forwarded_xml
+
+        assert parse_spy.call_count == 1
+        assert parsed["uetr"] == "91398cbd-0838-453f-b2c7-536e829f2b8e"
+        assert parsed["debtorName"] == "John Doe"
+        assert "SAPTHBKX" in forwarded
+        assert 'Ccy="THB"' in forwarded
+        # Serialized once and cached
+        assert message.forwarded_xml is forwarded
+
+    def test_untransformed_message_forwards_original(self):
+        """Without a transform no serialization happens."""
+        from src.api.iso20022.pipeline import MessagePipeline
+
+        with patch("src.api.iso20022.pipeline.etree.tostring") as tostring:
+            message = MessagePipeline(self._sample_body(), "pacs.008")
+            assert message.forwarded_xml == message.xml_content
+            tostring.assert_not_called()
+
+    def test_malformed_body(self):
+        """Syntax errors surface through validate() and extract()."""
+        from src.api.iso20022.pipeline import MessagePipeline
+        from src.api.iso20022.pacs008 import parse_pacs008
+
+        message = MessagePipeline(b"<Document><Unclosed></Document>", "pacs.008")
+        assert not message.is_well_formed
+        result = message.validate()
+        assert not result.valid
+        assert "XML syntax error" in result.errors[0]
+        with pytest.raises(ValueError):
+            message.extract(parse_pacs008)
+
+
+class TestCompiledExtraction:
+    """Test the declarative ISO 20022 field extraction engine."""
+
+    def test_namespaced_and_bare_documents_extract_identically(self):
+        """A single field map serves namespaced and namespace-less XML."""
+        from lxml import etree
+        from src.api.iso20022.templates import TEMPLATES
+        from src.api.iso20022.pacs008 import PACS008_EXTRACTOR
+
+        xml = TEMPLATES["pacs.008"].sample_xml
+        bare = xml.replace(' xmlns="urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13"', "")
+
+        namespaced = PACS008_EXTRACTOR.extract(etree.fromstring(xml.encode()))
+        plain = PACS008_EXTRACTOR.extract(etree.fromstring(bare.encode()))
+
+        assert namespaced == plain
+        assert namespaced.uetr == "91398cbd-0838-453f-b2c7-536e829f2b8e"
+        assert namespaced["settlementCurrency"] == "SGD"
+        # Alternatives are tried in order: no AgrdRate/QtId, so InstrId wins
+        assert namespaced["quoteId"] == "INSTR-001"
+        assert namespaced["clearingSystem"] == "NEXUS"
+
+    def test_record_behaves_like_extraction_dict(self):
+        """Records keep dict-style access for existing handlers."""
+        from lxml import etree
+        from src.api.iso20022.extraction import MessageExtractor
+
+        extractor = MessageExtractor("SampleRecord", {
+            "amount": (".//Amt", ".//IntrBkSttlmAmt"),
+            "currency": (".//Amt/@Ccy", ".//IntrBkSttlmAmt/@Ccy"),
+            "missing": ".//DoesNotExist",
+        })
+        record = extractor(etree.fromstring(
+            b'<Document xmlns="urn:example"><IntrBkSttlmAmt Ccy="THB">500</IntrBkSttlmAmt></Document>'
+        ))
+
+        assert not hasattr(record, "__dict__")
+        assert record.get("amount") == "500"
+        assert record["currency"] == "THB"
+        # Declared-but-missing fields are present with None (dict semantics)
+        assert record.get("missing", "default") is None
+        assert record.get("undeclared", "default") == "default"
+        assert record.to_dict(drop_empty=True) == {"amount": "500", "currency": "THB"}
+        with pytest.raises(KeyError):
+            record["undeclared"]
+
+
+class TestPacs008UnitOfWork:
+    """Test the single-commit pacs.008 happy path."""
+
+    @pytest.mark.asyncio
+    async def test_happy_path_commits_once(
+        self,
+        async_client: AsyncClient,
+        mock_db_session: AsyncMock,
+        override_get_db,
+    ):
+        """Payment row, events and SAP writes share one commit."""
+        from src.main import app
+        from src.db import get_db
+        from src.api.iso20022 import PaymentValidationResult
+        from src.api.iso20022.templates import TEMPLATES
+        from src.api.validation import ValidationResult
+
+        validation = PaymentValidationResult(
+            valid=True,
+            uetr="91398cbd-0838-453f-b2c7-536e829f2b8e",
+            quoteId="INSTR-001",
+            errors=[],
+            statusCode="ACCC",
+            statusReasonCode=None,
+            quote_data={
+                "fxp_id": "7f1c2a9e-0000-4000-8000-000000000001",
+                "source_sap_bic": "SAPSGSGX",
+                "dest_sap_bic": "SAPTHBKX",
+                "dest_psp_bic": "KASITHBK",
+                "dest_amount": "25000.00",
+                "dest_currency": "THB",
+                "source_currency": "SGD",
+                "dest_ips_code": "THBRT",
+            },
+        )
+        # SAVEPOINT scopes for the reservation and settlement steps
+        mock_db_session.begin_nested = MagicMock()
+        app.dependency_overrides[get_db] = override_get_db
+
+        try:
+            with patch(
+                "src.api.iso20022.pacs008.MessagePipeline.validate",
+                return_value=ValidationResult(valid=True, message_type="pacs.008"),
+            ), patch(
+                "src.api.iso20022.pacs008.validate_pacs008",
+                new=AsyncMock(return_value=validation),
+            ):
+                response = await async_client.post(
+                    "/v1/iso20022/pacs008",
+                    params={"pacs002Endpoint": "http://psp.test/callback"},
+                    content=TEMPLATES["pacs.008"].sample_xml,
+                    headers={"Content-Type": "application/xml"},
+                )
+            assert response.status_code == 200
+            assert mock_db_session.commit.await_count == 1
+            assert mock_db_session.begin_nested.call_count == 2
+            # The pacs.002 callback is an outbox row in the same commit
+            from src.api.outbox import INSERT_SQL
+            outbox_calls = [c for c in mock_db_session.execute.await_args_list if c.args[0] is INSERT_SQL]
+            assert len(outbox_calls) == 1
+            assert outbox_calls[0].args[1]["target_url"] == "http://psp.test/callback"
+        finally:
+            app.dependency_overrides.clear()
+
+
+class TestPaymentEventWriter:
+    """Test the write-behind payment_events writer."""
+
+    @staticmethod
+    def _session_factory(executed: list):
+        """Session factory recording the column-wise params of each batch INSERT."""
+        class _Session:
+            async def __aenter__(self):
+                session = AsyncMock()
+                session.execute.side_effect = lambda query, params: executed.append(params)
+                return session
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Session
+
+    @pytest.mark.asyncio
+    async def test_batches_preserve_order_and_drain_on_stop(self):
+        """Events are written in enqueue order, in batches, and drained on stop."""
+        from src.api.iso20022.event_writer import PaymentEventWriter
+
+        executed = []
+        writer = PaymentEventWriter(
+            session_factory=self._session_factory(executed),
+            batch_size=3,
+            flush_interval_ms=1000,
+            queue_size=100,
+        )
+        await writer.start()
+        for step in range(7):
+            await writer.enqueue(
+                "91398cbd-0838-453f-b2c7-536e829f2b8e",
+                f"STEP_{step}",
+                "NEXUS",
+                {"step": step},
+                {"pacs008_message": "<Document/>"} if step == 0 else {},
+            )
+        await writer.stop()
+
+        assert [len(batch["uetr"]) for batch in executed] == [3, 3, 1]
+        event_types = [t for batch in executed for t in batch["event_type"]]
+        assert event_types == [f"STEP_{step}" for step in range(7)]
+        occurred = [ts for batch in executed for ts in batch["occurred_at"]]
+        assert occurred == sorted(occurred) and len(set(occurred)) == 7
+        assert executed[0]["pacs008_message"][0] == "<Document/>"
+        assert executed[0]["data"][0] == '{"step":0}'
+        stats = writer.stats()
+        assert stats["written"] == 7 and stats["dropped"] == 0
+        assert not stats["running"]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_only_drops_bad_rows(self):
+        """A row the database rejects does not take the rest of its batch with it."""
+        from src.api.iso20022.event_writer import PaymentEventWriter
+
+        executed = []
+
+        class _Session:
+            async def __aenter__(self):
+                session = AsyncMock()
+
+                def _execute(query, params):
+                    if "UNKNOWN-1" in params["uetr"]:
+                        raise ValueError("invalid input syntax for type uuid")
+                    executed.append(params)
+                session.execute.side_effect = _execute
+                return session
+
+            async def __aexit__(self, *exc):
+                return False
+
+        writer = PaymentEventWriter(session_factory=_Session, batch_size=10, flush_interval_ms=1000)
+        await writer.start()
+        for uetr in ("91398cbd-0838-453f-b2c7-536e829f2b8e", "UNKNOWN-1", "a7c2f3e1-0000-4000-8000-000000000002"):
+            await writer.enqueue(uetr, "SCHEMA_VALIDATION_FAILED", "NEXUS", {}, {})
+        with patch("src.api.iso20022.event_writer.asyncio.sleep", new=AsyncMock()):
+            await writer.stop()
+
+        assert [batch["uetr"][0] for batch in executed] == [
+            "91398cbd-0838-453f-b2c7-536e829f2b8e",
+            "a7c2f3e1-0000-4000-8000-000000000002",
+        ]
+        assert writer.stats()["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_events_join_the_session(self, mock_db_session):
+        """Only stand-alone events are write-behind; commit=False events share the transaction."""
+        from src.api.iso20022 import utils
+
+        writer = MagicMock(accepting=True, enqueue=AsyncMock())
+        uetr = "91398cbd-0838-453f-b2c7-536e829f2b8e"
+        with patch.object(utils, "get_event_writer", return_value=writer):
+            await utils.store_payment_event(mock_db_session, uetr, "PAYMENT_ACCEPTED", "NEXUS", {}, commit=False)
+            writer.enqueue.assert_not_awaited()
+            statement, params = mock_db_session.execute.await_args.args
+            assert ":occurred_at" in statement.text and params["occurred_at"].tzinfo is not None
+            mock_db_session.commit.assert_not_awaited()
+
+            await utils.store_payment_event(mock_db_session, uetr, "STATUS_QUERIED", "NEXUS", {})
+            writer.enqueue.assert_awaited_once()
+            assert mock_db_session.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_and_write_behind_share_one_clock(self, mock_db_session):
+        """A unit-of-work event stamped after a queued event sorts after it."""
+        from src.api.iso20022 import utils
+        from src.api.iso20022.event_writer import PaymentEventWriter
+
+        executed = []
+        writer = PaymentEventWriter(session_factory=self._session_factory(executed), flush_interval_ms=1000)
+        await writer.start()
+        uetr = "91398cbd-0838-453f-b2c7-536e829f2b8e"
+        with patch.object(utils, "get_event_writer", return_value=writer):
+            await utils.store_payment_event(mock_db_session, uetr, "PAYMENT_RECEIVED", "NEXUS", {})
+            await utils.store_payment_event(mock_db_session, uetr, "PAYMENT_ACCEPTED", "NEXUS", {}, commit=False)
+        await writer.stop()
+
+        queued = executed[0]["occurred_at"][0]
+        in_transaction = mock_db_session.execute.await_args.args[1]["occurred_at"]
+        assert queued < in_transaction
+
+
+class TestXmlExecutor:
+    """Test the lxml offload executor."""
+
+    @pytest.mark.asyncio
+    async def test_per_type_limit_and_queue_metrics(self):
+        """Jobs over a message type's limit queue without blocking other types."""
+        import asyncio
+        import threading
+        import time
+        from src.api.xml_executor import XmlExecutor
+
+        executor = XmlExecutor(mode="thread", workers=4, type_limit=4, type_limits={"camt.054": 1})
+        active = {"camt.054": 0}
+        peak = {"camt.054": 0}
+        lock = threading.Lock()
+
+        def heavy(msg_type):
+            with lock:
+                active[msg_type] += 1
+                peak[msg_type] = max(peak[msg_type], active[msg_type])
+            time.sleep(0.02)
+            with lock:
+                active[msg_type] -= 1
+            return threading.current_thread().name
+
+        try:
+            results = await asyncio.gather(
+                *(executor.run("camt.054", heavy, "camt.054") for _ in range(3)),
+                executor.run("pacs.002", lambda: "status"),
+            )
+        finally:
+            executor.shutdown()
+
+        assert all(name.startswith("nexus-xml") for name in results[:3])
+        assert results[3] == "status"
+        assert peak["camt.054"] == 1
+        stats = executor.stats()["messageTypes"]
+        assert stats["camt.054"]["limit"] == 1
+        assert stats["camt.054"]["completed"] == 3
+        assert stats["camt.054"]["maxQueueDepth"] >= 2
+        assert stats["camt.054"]["queueDepth"] == 0
+        assert stats["pacs.002"]["completed"] == 1
+
+    def test_schema_lease_is_exclusive(self):
+        """Concurrent validations of one type never share an XMLSchema instance."""
+        from pathlib import Path
+        from src.api.validation import SchemaRegistry
+
+        registry = SchemaRegistry(schema_dir=str(Path(__file__).parent.parent / "specs" / "iso20022" / "xsd"))
+        assert registry.is_loaded("pacs.002")
+
+        with registry.lease("pacs.002") as first:
+            with registry.lease("pacs.002") as second:
+                assert first is not second
+        # Both instances are returned to the pool for reuse
+        with registry.lease("pacs.002") as again:
+            assert again in (first, second)
+
+
+class TestSchemaWarmUp:
+    """Parallel XSD warm-up and readiness gating."""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_records_compile_times(self, monkeypatch):
+        from pathlib import Path
+        from src.api import validation
+        from src.api.validation import REQUIRED_SCHEMAS, SCHEMA_FILES, SchemaRegistry
+
+        registry = SchemaRegistry(
+            schema_dir=str(Path(__file__).parent.parent / "specs" / "iso20022" / "xsd"),
+            eager=False,
+        )
+        monkeypatch.setattr(validation, "_registry", registry)
+        assert registry.get_loaded_schemas() == []
+        assert validation.get_schema_readiness() == {"status": "loading", "missing": list(REQUIRED_SCHEMAS)}
+
+        await validation.warm_up_schemas()
+
+        assert sorted(registry.get_loaded_schemas()) == sorted(SCHEMA_FILES)
+        assert set(registry.get_compile_times()) == set(SCHEMA_FILES)
+        assert registry.warm_up_complete and registry.warm_up_ms > 0
+        assert validation.get_schema_readiness()["status"] == "ok"
+        assert validation.get_validation_health()["compileTimesMs"]["pacs.008"] > 0
+
+    @pytest.mark.asyncio
+    async def test_readiness_fails_once_a_required_schema_cannot_compile(self, monkeypatch, tmp_path):
+        from src.api import validation
+        from src.api.validation import SchemaRegistry
+
+        registry = SchemaRegistry(schema_dir=str(tmp_path), eager=False)
+        monkeypatch.setattr(validation, "_registry", registry)
+        assert validation.get_schema_readiness()["status"] == "loading"
+
+        await validation.warm_up_schemas()
+
+        assert validation.get_schema_readiness()["status"] == "fail"
+
+    def test_validation_compiles_on_demand_before_warm_up(self):
+        from pathlib import Path
+        from src.api.validation import SchemaRegistry
+
+        registry = SchemaRegistry(
+            schema_dir=str(Path(__file__).parent.parent / "specs" / "iso20022" / "xsd"),
+            eager=False,
+        )
+        assert registry.ensure_loaded("pacs.002")
+        assert registry.get_loaded_schemas() == ["pacs.002"]
+        assert not registry.ensure_loaded("pacs.999")
+
+
+class TestStructuralValidation:
+    """Nexus fast-path validator and validation modes."""
+
+    @staticmethod
+    def _pacs008(**replacements) -> str:
+        from src.api.iso20022.templates import TEMPLATES
+        xml = TEMPLATES["pacs.008"].sample_xml.replace(
+            "<Dbtr>", "<DbtrAgt><FinInstnId><BICFI>DBSSSGSG</BICFI></FinInstnId></DbtrAgt><Dbtr>"
+        ).replace(
+            "<Cdtr>", "<CdtrAgt><FinInstnId><BICFI>KASITHBK</BICFI></FinInstnId></CdtrAgt><Cdtr>"
+        )
+        for old, new in replacements.items():
+            xml = xml.replace(old, new)
+        return xml
+
+    def test_single_pass_checks_nexus_subset(self):
+        from src.api.structural_validation import validate_structure
+        from src.api.validation import parse_secure
+
+        assert validate_structure(parse_secure(self._pacs008()), "pacs.008").valid
+
+        result = validate_structure(parse_secure(self._pacs008(**{
+            "<NbOfTxs>1</NbOfTxs>": "<NbOfTxs>2</NbOfTxs>",
+            "<ChrgBr>SHAR</ChrgBr>": "<ChrgBr>DEBT</ChrgBr>",
+            "<ClrSys>": "<ClrSysX>",
+            "</ClrSys>": "</ClrSysX>",
+            "91398cbd-0838-453f": "not-a-uuid",
+        })), "pacs.008")
+        assert not result.valid
+        assert any("NbOfTxs" in e for e in result.errors)
+        assert any("ChrgBr" in e for e in result.errors)
+        assert any("SttlmInf/ClrSys" in e and "IPS operator" in e for e in result.errors)
+        assert any("UETR" in e for e in result.errors)
+
+    def test_pacs002_and_bare_sandbox_xml(self):
+        from src.api.iso20022.templates import TEMPLATES
+        from src.api.structural_validation import validate_structure
+        from src.api.validation import parse_secure
+
+        assert validate_structure(parse_secure(TEMPLATES["pacs.002.RJCT"].sample_xml), "pacs.002").valid
+        bare = self._pacs008(**{' xmlns="urn:iso:std:iso:20022:tech:xsd:pacs.008.001.13"': ""})
+        assert validate_structure(parse_secure(bare), "pacs.008").valid
+
+    def test_modes_and_counters(self, monkeypatch):
+        from src.api import structural_validation
+        from src.api.structural_validation import ValidationPolicy, validate_inbound_xml
+        from src.api.validation import ValidationResult
+
+        xsd_calls = []
+
+        def fake_xsd(doc, msg_type):
+            xsd_calls.append(msg_type)
+            return ValidationResult(valid=False, message_type=msg_type, errors=["xsd"])
+
+        monkeypatch.setattr(structural_validation, "validate_document", fake_xsd)
+
+        monkeypatch.setattr(structural_validation, "_policy", ValidationPolicy(mode="fast"))
+        assert validate_inbound_xml(self._pacs008(), "pacs.008").valid
+        assert xsd_calls == []
+        # Types without a spec always get full XSD
+        assert not validate_inbound_xml("<Document/>", "camt.054").valid
+        assert xsd_calls == ["camt.054"]
+
+        policy = ValidationPolicy(mode="sampled", sample_rate=1.0)
+        monkeypatch.setattr(structural_validation, "_policy", policy)
+        result = validate_inbound_xml(self._pacs008(), "pacs.008")
+        assert result.errors == ["xsd"]  # XSD wins when both ran
+        counters = policy.stats()["messageTypes"]["pacs.008"]
+        assert counters["fast"] == 1
+        assert counters["sampledFull"] == 1
+        assert counters["disagreements"] == 1
+
+        with pytest.raises(ValueError):
+            ValidationPolicy(mode="lenient")
+
+
+class TestDuplicateDetection:
+    """UETR/MsgId/EndToEndId duplicate detection."""
+
+    PARSED = {"messageId": "MSG-1", "endToEndId": "E2E-1", "debtorAgentBic": "DBSSSGSG"}
+    UETR = "91398cbd-0838-453f-b2c7-536e829f2b8e"
+
+    def test_filter_buckets_expire_with_window(self):
+        from src.api.iso20022.dedup import RecentKeyFilter
+
+        recent = RecentKeyFilter(window_seconds=60, buckets=6)
+        recent.add(["UETR:a"], "a", now=0.0)
+        recent.add(["UETR:b"], "b", now=30.0)
+        assert recent.seen(["UETR:a", "UETR:b", "UETR:c"], now=35.0) == ["UETR:a", "UETR:b"]
+        # First bucket [0, 10) has left the 60s window
+        assert recent.seen(["UETR:a", "UETR:b"], now=75.0) == ["UETR:b"]
+        recent.forget_uetr("b")
+        assert len(recent) == 0
+
+    @pytest.mark.asyncio
+    async def test_claim_and_confirmed_filter_hit(self, mock_db_session):
+        from src.api.iso20022.dedup import DuplicateDetector
+
+        detector = DuplicateDetector()
+        keys = detector.keys_for(self.PARSED, self.UETR)
+        assert keys == {"UETR": self.UETR, "MSGID": "DBSSSGSG:MSG-1", "E2EID": "DBSSSGSG:E2E-1"}
+
+        claimed = MagicMock()
+        claimed.fetchall.return_value = [("UETR",), ("MSGID",), ("E2EID",)]
+        mock_db_session.execute = AsyncMock(return_value=claimed)
+        assert await detector.claim(mock_db_session, self.UETR, keys) == []
+        assert mock_db_session.execute.await_count == 1
+
+        # Once committed and remembered, a resubmission is confirmed with a
+        # read-only probe instead of a claim
+        from src.api.iso20022.dedup import CHECK_KEYS_SQL
+        detector.remember(self.UETR, keys)
+        assert await detector.claim(mock_db_session, self.UETR, keys) == ["UETR", "MSGID", "E2EID"]
+        assert mock_db_session.execute.await_count == 2
+        assert mock_db_session.execute.await_args.args[0] is CHECK_KEYS_SQL
+        stats = detector.stats()
+        assert stats["filterHits"] == 1 and stats["dbLookups"] == 2
+
+    @pytest.mark.asyncio
+    async def test_key_released_on_another_replica_can_be_claimed_again(self, mock_db_session):
+        from src.api.iso20022.dedup import CHECK_KEYS_SQL, CLAIM_KEYS_SQL, DuplicateDetector
+
+        detector = DuplicateDetector()
+        keys = detector.keys_for(self.PARSED, self.UETR)
+        detector.remember(self.UETR, keys)
+
+        # The payment was rejected elsewhere: its keys are gone from the table
+        released, claimed = MagicMock(), MagicMock()
+        released.fetchall.return_value = []
+        claimed.fetchall.return_value = [("UETR",), ("MSGID",), ("E2EID",)]
+        mock_db_session.execute = AsyncMock(side_effect=[released, claimed])
+
+        assert await detector.claim(mock_db_session, self.UETR, keys) == []
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [CHECK_KEYS_SQL, CLAIM_KEYS_SQL]
+        assert len(detector.filter) == 0 and detector.stats()["filterStale"] == 1
+
+    @pytest.mark.asyncio
+    async def test_partial_claim_is_given_back(self, mock_db_session):
+        from src.api.iso20022.dedup import DuplicateDetector, UNCLAIM_KEYS_SQL
+
+        detector = DuplicateDetector()
+        keys = detector.keys_for(self.PARSED, self.UETR)
+        claimed = MagicMock()
+        claimed.fetchall.return_value = [("UETR",), ("E2EID",)]
+        mock_db_session.execute = AsyncMock(return_value=claimed)
+
+        assert await detector.claim(mock_db_session, self.UETR, keys) == ["MSGID"]
+        statement, params = mock_db_session.execute.await_args.args
+        assert statement is UNCLAIM_KEYS_SQL
+        assert params["key_types"] == ["UETR", "E2EID"]
+
+
+class TestQuoteRouting:
+    """Quote routing snapshot lookup and TTL cache."""
+
+    @staticmethod
+    def _row(quote_id: str, expires_in: int = 600):
+        from datetime import datetime, timedelta, timezone
+        from decimal import Decimal
+
+        return MagicMock(
+            quote_id=quote_id,
+            exchange_rate=Decimal("25.5"),
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+            fxp_id="fxp-1",
+            source_currency="SGD",
+            destination_currency="THB",
+            source_sap_bic="DBSSSGSG",
+            dest_sap_bic="SAPTHBKX",
+            dest_ips_code="TH-PROMPTPAY",
+        )
+
+    @pytest.mark.asyncio
+    async def test_primary_key_lookup_then_cached(self, mock_db_session, monkeypatch):
+        from src.api import quote_routing
+        from src.api.quote_routing import QUOTE_ROUTING_SQL, QuoteRoutingCache, get_quote_routing
+
+        monkeypatch.setattr(quote_routing, "_cache", QuoteRoutingCache(ttl_seconds=600))
+        result = MagicMock()
+        result.fetchone.return_value = self._row("q-1")
+        mock_db_session.execute = AsyncMock(return_value=result)
+
+        first = await get_quote_routing(mock_db_session, "q-1")
+        second = await get_quote_routing(mock_db_session, "q-1")
+
+        assert first == second
+        assert first.dest_sap_bic == "SAPTHBKX" and first.dest_ips_code == "TH-PROMPTPAY"
+        assert mock_db_session.execute.await_count == 1
+        assert mock_db_session.execute.await_args.args[0] is QUOTE_ROUTING_SQL
+        assert quote_routing.get_quote_routing_cache().stats()["hits"] == 1
+
+    def test_entries_expire_with_the_quote(self, monkeypatch):
+        from src.api import quote_routing
+        from src.api.quote_routing import QuoteRouting, QuoteRoutingCache
+
+        cache = QuoteRoutingCache(ttl_seconds=600, max_entries=2)
+        row = self._row("q-1", expires_in=30)
+        cache.put(QuoteRouting(*(getattr(row, f) for f in QuoteRouting._fields)))
+        assert cache.get("q-1") is not None
+
+        clock = quote_routing.time.monotonic() + 31
+        monkeypatch.setattr(quote_routing.time, "monotonic", lambda: clock)
+        assert cache.get("q-1") is None
+
+        # Already-expired quotes are not cached; a full cache evicts the oldest
+        expired = self._row("q-0", expires_in=-1)
+        cache.put(QuoteRouting(*(getattr(expired, f) for f in QuoteRouting._fields)))
+        assert cache.stats()["size"] == 0
+        for quote_id in ("q-2", "q-3", "q-4"):
+            row = self._row(quote_id)
+            cache.put(QuoteRouting(*(getattr(row, f) for f in QuoteRouting._fields)))
+        assert cache.get("q-2") is None and cache.get("q-4") is not None
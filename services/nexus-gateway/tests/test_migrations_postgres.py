@@ -0,0 +1,76 @@
+"""
+Migration tests against Postgres.
+
+Applies migrations from /migrations to a database that already holds
+data and checks the backfills they perform. Each migration runs in a
+scratch schema placed first on the search path, inside a transaction
+that is rolled back, so the database is left as it was.
+
+Skipped unless NEXUS_TEST_DATABASE_URL is set (see test_ledger_postgres.py).
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+import os
+
+import pytest
+
+DATABASE_URL = os.environ.get("NEXUS_TEST_DATABASE_URL")
+
+MIGRATIONS = Path(__file__).resolve().parents[3] / "migrations"
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="NEXUS_TEST_DATABASE_URL not set")
+
+
+class TestPaymentDedupKeysMigration:
+    """005 backfills the UETR keys of payments made before it."""
+
+    @staticmethod
+    async def _insert_payment(conn, uetr: str, status: str, initiated_at: datetime) -> None:
+        await conn.execute("""
+            INSERT INTO payments (
+                uetr, source_psp_bic, destination_psp_bic, debtor_name, debtor_account,
+                creditor_name, creditor_account, source_currency, destination_currency,
+                interbank_settlement_amount, status, initiated_at
+            )
+            VALUES ($1::uuid, 'DBSSSGSG', 'KASITHBK', 'Test Debtor', 'SG0001', 'Test Creditor',
+                    'TH0001', 'SGD', 'THB', 100.00, $2, $3)
+        """, uetr, status, initiated_at)
+
+    @pytest.mark.asyncio
+    async def test_existing_payments_get_their_uetr_keys(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(DATABASE_URL)
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            schema = f"migration_test_{uuid4().hex[:8]}"
+            await conn.execute(f"CREATE SCHEMA {schema}")
+            await conn.execute(f"SET LOCAL search_path = {schema}, public")
+
+            first = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+            accepted, retried, rejected = str(uuid4()), str(uuid4()), str(uuid4())
+            await self._insert_payment(conn, accepted, "ACCC", first)
+            await self._insert_payment(conn, retried, "ACSP", first + timedelta(days=1))
+            await self._insert_payment(conn, retried, "ACCC", first)
+            await self._insert_payment(conn, rejected, "RJCT", first)
+
+            await conn.execute((MIGRATIONS / "005_payment_dedup_keys.sql").read_text())
+
+            rows = await conn.fetch(f"""
+                SELECT key_type, key_value, uetr::text AS uetr, first_seen_at
+                FROM {schema}.payment_dedup_keys
+                WHERE uetr = ANY($1::uuid[])
+                ORDER BY key_value
+            """, [accepted, retried, rejected])
+        finally:
+            await transaction.rollback()
+            await conn.close()
+
+        # One key per UETR, first seen at its earliest payment; rejected payments are not keys
+        assert sorted((r["key_type"], r["key_value"], r["uetr"], r["first_seen_at"]) for r in rows) == sorted([
+            ("UETR", accepted, accepted, first),
+            ("UETR", retried, retried, first),
+        ])
@@ -0,0 +1,100 @@
+"""
+Unit tests for the pacs.002 callback outbox.
+
+Tests outbox.py: enqueue inside the unit of work, batch dispatch and retention.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+class TestCallbackOutbox:
+    """Transactional callback outbox and dispatcher (api/outbox.py)."""
+
+    @staticmethod
+    def _row(outbox_id, attempts=1, max_attempts=3):
+        row = MagicMock()
+        row.outbox_id = outbox_id
+        row.kind = "PACS002"
+        row.target_url = f"http://psp{outbox_id}.example/cb"
+        row.payload = '{"uetr": "91398cbd-0838-453f-b2c7-536e829f2b8e", "status": "ACCC"}'
+        row.attempts = attempts
+        row.max_attempts = max_attempts
+        row.lag_ms = 12.5
+        return row
+
+    @pytest.mark.asyncio
+    async def test_enqueue_defers_commit_to_the_unit_of_work(self, mock_db_session):
+        import orjson
+        from src.api.outbox import INSERT_SQL, enqueue_pacs002_callback
+
+        await enqueue_pacs002_callback(
+            mock_db_session, "http://psp.example/cb", "91398cbd-0838-453f-b2c7-536e829f2b8e",
+            "RJCT", reason_code="AB04", commit=False,
+        )
+
+        sql, params = mock_db_session.execute.await_args.args
+        assert sql is INSERT_SQL and params["kind"] == "PACS002"
+        assert orjson.loads(params["payload"])["reason_code"] == "AB04"
+        mock_db_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_batch_is_claimed_delivered_and_completed(self, mock_db_session):
+        from src.api.delivery import DeliveryResult
+        from src.api.outbox import CLAIM_SQL, DELIVERED_SQL, RETRY_SQL, OutboxDispatcher
+
+        rows = [self._row(1), self._row(2, attempts=3, max_attempts=3)]
+        claim_result = MagicMock()
+        claim_result.fetchall.return_value = rows
+        mock_db_session.execute.return_value = claim_result
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        engine = MagicMock()
+        engine.deliver = AsyncMock(side_effect=lambda request: DeliveryResult(
+            success="psp1" in request.url, attempts=1,
+            status_code=200 if "psp1" in request.url else 503,
+        ))
+        dispatcher = OutboxDispatcher(session_factory=session_factory, engine=engine, batch_size=10)
+
+        assert await dispatcher.run_once("w-1") == 2
+
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [CLAIM_SQL, DELIVERED_SQL, RETRY_SQL]
+        assert mock_db_session.execute.await_args_list[1].args[1]["ids"] == [1]
+        retry = mock_db_session.execute.await_args_list[2].args[1]
+        assert retry["ids"] == [2] and retry["errors"] == ["HTTP 503"]
+        assert all(request.args[0].max_attempts == 1 for request in engine.deliver.await_args_list)
+        stats = dispatcher.stats()
+        assert stats["delivered"] == 1 and stats["failed"] == 1 and stats["lastLagMs"] == 12.5
+
+    @pytest.mark.asyncio
+    async def test_retention_purges_delivered_rows_in_batches(self, mock_db_session):
+        from src.api.background import TRY_LOCK_SQL
+        from src.api.outbox import BACKLOG_SQL, PURGE_SQL, OutboxRetention
+
+        batches = [[MagicMock()] * 2, [MagicMock()]]
+
+        def execute(statement, params=None):
+            result = MagicMock()
+            result.scalar.return_value = True
+            if statement is PURGE_SQL:
+                assert params == {"batch_size": 2, "retention_hours": 24}
+                result.fetchall.return_value = batches.pop(0)
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        retention = OutboxRetention(session_factory=session_factory, batch_size=2, retention_hours=24)
+        assert await retention.run_once() == 3
+
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [TRY_LOCK_SQL, PURGE_SQL, TRY_LOCK_SQL, PURGE_SQL]
+        assert "status = 'DELIVERED'" in PURGE_SQL.text
+        # The backlog never scans delivered rows (partial index, migration 014)
+        assert "WHERE status IN ('PENDING', 'FAILED')" in BACKLOG_SQL.text
+        assert retention.stats()["purged"] == 3
@@ -0,0 +1,143 @@
+"""
+Unit tests for the quote store and its maintenance.
+
+Tests quote_store.py and quote_maintenance.py.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestQuoteStore:
+    """Quotes stay in the ephemeral store and reach Postgres only when used."""
+
+    @staticmethod
+    def _quote(quote_id: str = "3b0f7a52-6c1e-4d7a-9d55-6a1f5c2e8b01"):
+        from datetime import datetime, timedelta, timezone
+        from decimal import Decimal
+        from src.api.quote_store import StoredQuote
+
+        return StoredQuote(
+            quote_id=quote_id, requesting_psp_bic="DBSSSGSG", source_country="SG", destination_country="TH",
+            source_currency="SGD", destination_currency="THB", amount_type="SOURCE",
+            requested_amount=Decimal("1000"), fxp_id="7f1c2a9e-0000-4000-8000-000000000001",
+            base_rate=Decimal("26.45"), final_rate=Decimal("26.3178"), tier_improvement_bps=0,
+            psp_improvement_bps=0, source_interbank_amount=Decimal("1000.00"),
+            destination_interbank_amount=Decimal("26317.80"), creditor_account_amount=Decimal("26287.80"),
+            destination_psp_fee=Decimal("30.00"), capped_to_max_amount=False,
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=10),
+            source_sap_bic="SAPSGSGX", dest_sap_bic="SAPTHBKX", dest_ips_code="THBRT",
+            status="ACTIVE", fxp_code="FXP-1", fxp_name="FXP 1", base_spread_bps=50,
+        )
+
+    @pytest.mark.asyncio
+    async def test_stored_quote_is_read_without_query_and_persisted_once(self, mock_db_session: AsyncMock):
+        from src.api import quote_store
+
+        store = quote_store.MemoryQuoteStore()
+        quote = self._quote()
+        with patch.object(quote_store, "get_quote_store", return_value=store):
+            await store.save(mock_db_session, [quote])
+            assert mock_db_session.execute.await_count == 0
+
+            assert await quote_store.get_quote(mock_db_session, quote.quote_id) == quote
+            assert mock_db_session.execute.await_count == 0
+
+            assert await quote_store.persist_quote(mock_db_session, quote.quote_id) == quote
+            statement, params = mock_db_session.execute.await_args.args
+            assert statement is quote_store.BATCH_INSERT_QUOTES_SQL
+            assert "ON CONFLICT (quote_id) DO NOTHING" in statement.text
+            assert params["quote_id"] == [quote.quote_id]
+            assert store.stats()["persisted"] == 1
+
+            # Unknown to the store: nothing to persist, read falls through to the table
+            assert await quote_store.persist_quote(mock_db_session, "unknown") is None
+            assert await quote_store.get_quote(mock_db_session, "not-a-uuid") is None
+            assert mock_db_session.execute.await_count == 1
+
+            # Not in the store and no quotes row: the payment must not reference it
+            missing = "9c1d5e3a-0000-4000-8000-000000000009"
+            assert await quote_store.persist_quote(mock_db_session, missing) is None
+            statement, params = mock_db_session.execute.await_args.args
+            assert statement is quote_store.QUOTE_SELECT_SQL and params == {"quote_id": missing}
+            assert store.stats()["persisted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_quote_stays_readable_for_the_retention(self, mock_db_session: AsyncMock):
+        from datetime import datetime, timedelta, timezone
+        from src.api import quote_store
+
+        expired = self._quote()._replace(expires_at=datetime.now(timezone.utc) - timedelta(seconds=30))
+        kept = quote_store.MemoryQuoteStore(expired_retention_seconds=600)
+        dropped = quote_store.MemoryQuoteStore()
+        await kept.save(mock_db_session, [expired])
+        await dropped.save(mock_db_session, [expired])
+
+        assert await kept.get(expired.quote_id) == expired
+        assert await dropped.get(expired.quote_id) is None
+
+    def test_encoded_quote_round_trips(self):
+        from src.api.quote_store import decode_quote, encode_quote
+
+        quote = self._quote()
+        assert decode_quote(encode_quote(quote)) == quote
+
+
+class TestQuoteMaintenance:
+    """Quote expiry sweeper and retention purge (api/quote_maintenance.py)."""
+
+    @staticmethod
+    def _session_factory(mock_db_session, lock_acquired, expire_batches, purge_batches):
+        from src.api.background import TRY_LOCK_SQL as LOCK_SQL
+        from src.api.quote_maintenance import EXPIRE_SQL, PURGE_SQL
+
+        batches = {EXPIRE_SQL: list(expire_batches), PURGE_SQL: list(purge_batches)}
+
+        async def execute(statement, params=None):
+            result = MagicMock()
+            if statement is LOCK_SQL:
+                result.scalar.return_value = lock_acquired
+            else:
+                assert params["batch_size"] == 2
+                result.fetchall.return_value = batches[statement].pop(0)
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return session_factory
+
+    @pytest.mark.asyncio
+    async def test_batches_until_a_partial_batch(self, mock_db_session):
+        from src.api.background import TRY_LOCK_SQL as LOCK_SQL
+        from src.api.quote_maintenance import EXPIRE_SQL, PURGE_SQL, QuoteMaintenance
+
+        session_factory = self._session_factory(
+            mock_db_session, True,
+            expire_batches=[[("EXPIRED",), ("USED",)], [("EXPIRED",)]],
+            purge_batches=[[("q-1",)]],
+        )
+        maintenance = QuoteMaintenance(session_factory=session_factory, batch_size=2, retention_hours=24)
+
+        assert await maintenance.run_once() == {"expired": 2, "purged": 1}
+
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [LOCK_SQL, EXPIRE_SQL, LOCK_SQL, EXPIRE_SQL, LOCK_SQL, PURGE_SQL]
+        assert mock_db_session.execute.await_args_list[-1].args[1]["retention_hours"] == 24
+        assert mock_db_session.commit.await_count == 3
+        stats = maintenance.stats()
+        assert stats["batches"] == 3 and stats["used"] == 1 and stats["lastPurged"] == 1
+
+    @pytest.mark.asyncio
+    async def test_run_is_skipped_while_another_replica_holds_the_lock(self, mock_db_session):
+        from src.api.background import TRY_LOCK_SQL as LOCK_SQL
+        from src.api.quote_maintenance import QuoteMaintenance
+
+        session_factory = self._session_factory(mock_db_session, False, [], [])
+        maintenance = QuoteMaintenance(session_factory=session_factory, batch_size=2)
+
+        assert await maintenance.run_once() == {"expired": 0, "purged": 0}
+        assert [c.args[0] for c in mock_db_session.execute.await_args_list] == [LOCK_SQL]
+        mock_db_session.commit.assert_not_awaited()
+        assert maintenance.stats()["lockNotAcquired"] == 1
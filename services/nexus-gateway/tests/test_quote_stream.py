@@ -0,0 +1,70 @@
+"""
+Unit tests for live quote streams.
+
+Tests quote_stream.py.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestLiveQuotes:
+    """Live quote streams re-price on rate book changes and send only changed prices."""
+
+    @pytest.mark.asyncio
+    async def test_updates_only_when_the_subscribed_price_changes(self, mock_db_session):
+        import asyncio
+        from decimal import Decimal
+        from src.api import quote_stream, quotes
+        from src.api.quote_stream import LiveQuoteStream
+        from src.api.rate_book import RateBook
+        from src.api.reference_data import ReferenceData, ReferenceDataCache
+        from src.api.schemas import QuoteSubscription
+        from test_rate_book import TestRateBook
+
+        countries = [
+            MagicMock(country_code="SG", currency_code="SGD", max_amount=Decimal("200000")),
+            MagicMock(country_code="TH", currency_code="THB", max_amount=Decimal("5000000")),
+        ]
+        reference = ReferenceDataCache()
+        reference.install(ReferenceData(reference.version, countries=countries, country_currencies=countries))
+        result = TestRateBook._result
+        book = RateBook()
+        mock_db_session.execute.side_effect = [
+            result([TestRateBook._rate("r1", "26.1"), TestRateBook._rate("m1", "3.4", dst="MYR")]),
+            result([]), result([]),
+        ]
+        await book.load(mock_db_session)
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(quote_stream, "get_rate_book", return_value=book), \
+                patch.object(quotes, "get_reference_data", return_value=reference):
+            stream = LiveQuoteStream(
+                QuoteSubscription(sourceCountry="SG", destCountry="TH", amount="500", amountType="SOURCE"),
+                session_factory=session_factory,
+            )
+            first = await stream.update()
+            assert first["sequence"] == 1 and first["indicative"] is True
+            assert [p["fxpId"] for p in first["prices"]] == ["FXP-fxp-1"]
+            assert "quoteId" not in first["prices"][0]
+
+            # Another corridor, then a tier the amount does not reach: re-priced, nothing sent
+            mock_db_session.execute.side_effect = [result([TestRateBook._rate("m2", "3.5", dst="MYR")])]
+            await book.reload_corridor(mock_db_session, "SGD", "MYR")
+            assert await stream.next_update(0.05) is None
+            retiered = TestRateBook._rate("r2", "26.1")
+            retiered.tier_improvements = '[{"minAmount": 2000, "improvementBps": 20}]'
+            mock_db_session.execute.side_effect = [result([retiered])]
+            await book.reload_corridor(mock_db_session, "SGD", "THB")
+            assert await stream.next_update(0.05) is None
+
+            # The subscribed FXP's rate moves: a waiting stream wakes with the new price
+            waiting = asyncio.create_task(stream.next_update(5))
+            await asyncio.sleep(0)
+            mock_db_session.execute.side_effect = [result([TestRateBook._rate("r3", "26.3")])]
+            await book.reload_corridor(mock_db_session, "SGD", "THB")
+            update = await asyncio.wait_for(waiting, 1)
+            assert update["sequence"] == 2
+            assert update["prices"][0]["baseRate"] == "26.30000000"
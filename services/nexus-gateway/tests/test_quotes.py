@@ -0,0 +1,140 @@
+"""
+Unit tests for quote endpoints.
+
+Tests quotes.py: quote persistence and batch quotes.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient
+
+
+class TestQuotePersistence:
+    """With the postgres quote store, GET /quotes persists every candidate quote in one statement."""
+
+    @pytest.mark.asyncio
+    async def test_quotes_for_many_fxps_use_one_insert(
+        self,
+        async_client: AsyncClient,
+        mock_db_session: AsyncMock,
+        override_get_db,
+    ):
+        from datetime import datetime, timedelta, timezone
+        from decimal import Decimal
+        from src.main import app
+        from src.db import get_db
+        from src.api import quotes, quote_store
+        from src.api.rate_book import BookRate, CorridorRate
+        from src.api.reference_data import ReferenceData, ReferenceDataCache
+
+        countries = [
+            MagicMock(country_code="SG", currency_code="SGD", max_amount=Decimal("200000")),
+            MagicMock(country_code="TH", currency_code="THB", max_amount=Decimal("5000000")),
+        ]
+        reference = ReferenceDataCache()
+        reference.install(ReferenceData(reference.version, countries=countries, country_currencies=countries))
+        valid_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+        corridor = [
+            CorridorRate(
+                BookRate(f"r{i}", f"7f1c2a9e-0000-4000-8000-00000000000{i}", f"FXP-{i}", f"FXP {i}",
+                         Decimal("26.4") - i, valid_until, 50, (), {}),
+                "SAPSGSGX", "SAPTHBKX", "THBRT",
+            )
+            for i in range(5)
+        ]
+        book = MagicMock()
+        book.ensure_loaded = AsyncMock()
+        book.corridor_rates.return_value = corridor
+        app.dependency_overrides[get_db] = override_get_db
+
+        try:
+            with patch.object(quotes, "get_rate_book", return_value=book), \
+                    patch.object(quotes, "get_reference_data", return_value=reference), \
+                    patch.object(quotes, "get_quote_store", return_value=quote_store.QuoteStore()):
+                response = await async_client.get("/v1/quotes", params={
+                    "sourceCountry": "SG", "destCountry": "TH", "amount": "1000", "amountType": "SOURCE",
+                })
+            assert response.status_code == 200
+            assert len(response.json()["quotes"]) == 5
+
+            inserts = [c for c in mock_db_session.execute.await_args_list if c.args[0] is quote_store.BATCH_INSERT_QUOTES_SQL]
+            assert len(inserts) == 1
+            params = inserts[0].args[1]
+            assert {len(v) for v in params.values()} == {5}
+            assert params["quote_id"][0] != params["quote_id"][1]
+            assert mock_db_session.commit.await_count == 1
+        finally:
+            app.dependency_overrides.clear()
+
+
+class TestBatchQuotes:
+    """POST /quotes/batch reads reference data once and saves every item's quotes in one write."""
+
+    @pytest.mark.asyncio
+    async def test_batch_quotes_share_lookups_and_report_item_errors(
+        self,
+        async_client: AsyncClient,
+        mock_db_session: AsyncMock,
+        override_get_db,
+    ):
+        from datetime import datetime, timedelta, timezone
+        from decimal import Decimal
+        from src.main import app
+        from src.db import get_db
+        from src.api import quotes, quote_store
+        from src.api.rate_book import BookRate, CorridorRate
+        from src.api.reference_data import ReferenceData, ReferenceDataCache
+
+        countries = [
+            MagicMock(country_code="SG", currency_code="SGD", max_amount=Decimal("200000")),
+            MagicMock(country_code="TH", currency_code="THB", max_amount=Decimal("5000000")),
+            MagicMock(country_code="MY", currency_code="MYR", max_amount=Decimal("1000000")),
+        ]
+        reference = ReferenceDataCache()
+        reference.install(ReferenceData(reference.version, countries=countries, country_currencies=countries))
+        valid_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+        corridor = [
+            CorridorRate(
+                BookRate(f"r{i}", f"7f1c2a9e-0000-4000-8000-00000000000{i}", f"FXP-{i}", f"FXP {i}",
+                         Decimal("26.4") - i, valid_until, 50, (), {}),
+                "SAPSGSGX", "SAPTHBKX", "THBRT",
+            )
+            for i in range(3)
+        ]
+        book = MagicMock()
+        book.ensure_loaded = AsyncMock()
+        book.corridor_rates.side_effect = lambda src, dst, country: corridor if dst == "THB" else []
+        app.dependency_overrides[get_db] = override_get_db
+
+        try:
+            with patch.object(quotes, "get_rate_book", return_value=book), \
+                    patch.object(quotes, "get_reference_data", return_value=reference), \
+                    patch.object(quotes, "get_quote_store", return_value=quote_store.QuoteStore()):
+                response = await async_client.post("/v1/quotes/batch", json={
+                    "sourcePspBic": "DBSSSGSG",
+                    "items": [
+                        {"sourceCountry": "SG", "destCountry": "TH", "amount": "1000", "amountType": "SOURCE"},
+                        {"sourceCountry": "sg", "destCountry": "th", "amount": "5000", "amountType": "DESTINATION"},
+                        {"sourceCountry": "SG", "destCountry": "XX", "amount": "1000", "amountType": "SOURCE"},
+                        {"sourceCountry": "SG", "destCountry": "MY", "amount": "1000", "amountType": "SOURCE"},
+                    ],
+                })
+            assert response.status_code == 200
+            results = response.json()["results"]
+            assert [r["index"] for r in results] == [0, 1, 2, 3]
+            assert len(results[0]["quotes"]) == 3 and results[0]["error"] is None
+            assert len(results[1]["quotes"]) == 3
+            assert results[1]["quotes"][0]["creditorAccountAmount"] == "5000.00"
+            assert results[2]["error"]["status"] == 400 and results[2]["quotes"] is None
+            assert results[3]["error"]["status"] == 404
+
+            assert reference.stats()["hits"] == 1
+            assert book.ensure_loaded.await_count == 1
+            assert book.corridor_rates.call_count == 2
+
+            inserts = [c for c in mock_db_session.execute.await_args_list if c.args[0] is quote_store.BATCH_INSERT_QUOTES_SQL]
+            assert len(inserts) == 1
+            assert {len(v) for v in inserts[0].args[1].values()} == {6}
+            assert mock_db_session.commit.await_count == 1
+        finally:
+            app.dependency_overrides.clear()
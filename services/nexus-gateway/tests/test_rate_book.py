@@ -0,0 +1,89 @@
+"""
+Unit tests for the in-memory corridor rate book.
+
+Tests rate_book.py: loading and notification-driven reloads.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+
+class TestRateBook:
+    """In-memory corridor rate book (api/rate_book.py)."""
+
+    @staticmethod
+    def _rate(rate_id, base_rate, valid_for=300, fxp_id="fxp-1", src="SGD", dst="THB"):
+        from datetime import datetime, timedelta, timezone
+
+        row = MagicMock()
+        row.rate_id = rate_id
+        row.fxp_id = fxp_id
+        row.fxp_code = f"FXP-{fxp_id}"
+        row.fxp_name = f"FXP {fxp_id}"
+        row.source_currency = src
+        row.destination_currency = dst
+        row.base_rate = base_rate
+        row.valid_until = datetime.now(timezone.utc) + timedelta(seconds=valid_for)
+        row.base_spread_bps = 50
+        row.tier_improvements = '[{"minAmount": 1000, "improvementBps": 5}, {"minAmount": 10000, "improvementBps": 10}]'
+        row.psp_improvements = {"dbsssgsg": 3}
+        return row
+
+    @staticmethod
+    def _result(rows):
+        result = MagicMock()
+        result.fetchall.return_value = rows
+        return result
+
+    def _sap(self, fxp_id, currency, bic):
+        row = MagicMock()
+        row.fxp_id, row.currency_code, row.bic = fxp_id, currency, bic
+        return row
+
+    @pytest.mark.asyncio
+    async def test_load_once_then_serve_from_memory(self, mock_db_session):
+        from decimal import Decimal
+        from src.api.rate_book import RateBook
+
+        ips = MagicMock()
+        ips.country_code, ips.clearing_system_id = "TH", "THBRT"
+        mock_db_session.execute.side_effect = [
+            self._result([self._rate("r1", "26.1"), self._rate("r2", "26.4", fxp_id="fxp-2"),
+                          self._rate("old", "27.0", valid_for=-1)]),
+            self._result([self._sap("fxp-1", "SGD", "SAPSGSGX"), self._sap("fxp-1", "SGD", "LATERSGX"),
+                          self._sap("fxp-1", "THB", "SAPTHBKX")]),
+            self._result([ips]),
+        ]
+        book = RateBook(refresh_interval_seconds=60)
+        await book.ensure_loaded(mock_db_session)
+        await book.ensure_loaded(mock_db_session)
+
+        rates = book.corridor_rates("SGD", "THB", "TH")
+        assert mock_db_session.execute.await_count == 3
+        assert [r.rate.rate_id for r in rates] == ["r2", "r1"]
+        first = rates[1]
+        assert first.source_sap_bic == "SAPSGSGX" and first.dest_sap_bic == "SAPTHBKX"
+        assert first.dest_ips_code == "THBRT"
+        assert first.rate.tier_improvements == ((Decimal("10000"), 10), (Decimal("1000"), 5))
+        assert first.rate.psp_improvements == {"DBSSSGSG": 3}
+        assert book.rates("THB", "SGD") == []
+
+    @pytest.mark.asyncio
+    async def test_notifications_reload_only_the_changed_corridor(self, mock_db_session):
+        from src.api.rate_book import CORRIDOR_RATES_SQL, RateBook
+
+        book = RateBook()
+        mock_db_session.execute.side_effect = [self._result([]), self._result([]), self._result([])]
+        await book.load(mock_db_session)
+
+        mock_db_session.execute.side_effect = [self._result([self._rate("r3", "26.2")])]
+        mock_db_session.execute.reset_mock()
+        await book.apply_changes(mock_db_session, [
+            '{"scope": "corridor", "source": "SGD", "destination": "THB"}',
+            '{"scope": "corridor", "source": "SGD", "destination": "THB"}',
+        ])
+
+        assert mock_db_session.execute.await_count == 1
+        assert mock_db_session.execute.await_args.args[0] is CORRIDOR_RATES_SQL
+        assert [r.rate_id for r in book.rates("SGD", "THB")] == ["r3"]
+        assert book.stats()["notifications"] == 2 and book.stats()["corridorReloads"] == 1
@@ -0,0 +1,89 @@
+"""
+Unit tests for the reference data cache.
+
+Tests reference_data.py: versioned snapshots and invalidation.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient
+
+
+class TestReferenceData:
+    """Reference data cache with versioned invalidation (api/reference_data.py)."""
+
+    @staticmethod
+    def _psp(name: str):
+        from decimal import Decimal
+
+        row = MagicMock()
+        row.psp_id, row.bic, row.country_code = "5d1f0c3e-0000-4000-8000-000000000001", "DBSSSGSG", "SG"
+        row.name, row.fee_percent, row.participant_status = name, Decimal("0.0050"), "ACTIVE"
+        return row
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_triggers_another_load(self, mock_db_session):
+        from src.api.reference_data import COUNTRIES_SQL, ReferenceDataCache
+
+        cache = ReferenceDataCache()
+        country = MagicMock(country_id=1, country_code="SG")
+
+        async def execute(query, params=None):
+            if query is COUNTRIES_SQL and cache.stats()["loads"] == 0:
+                cache.invalidate("write committed while loading")
+            result = MagicMock()
+            result.fetchall.return_value = [country] if query is COUNTRIES_SQL else []
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        first = await cache.get(mock_db_session)
+        assert first.country("sg").country_id == 1
+        second = await cache.get(mock_db_session)
+        assert second is not first
+        assert await cache.get(mock_db_session) is second
+
+        stats = cache.stats()
+        assert stats["loads"] == 2 and stats["misses"] == 2 and stats["hits"] == 1
+        assert stats["version"] == stats["snapshotVersion"] == 2
+        assert mock_db_session.execute.await_count == 18
+
+    @pytest.mark.asyncio
+    async def test_fin_inst_update_invalidates_cached_psp(
+        self,
+        async_client: AsyncClient,
+        mock_db_session: AsyncMock,
+        override_get_db,
+    ):
+        from src.main import app
+        from src.db import get_db
+        from src.api import reference_data
+
+        psps = [self._psp("Old Bank")]
+
+        async def execute(query, params=None):
+            result = MagicMock()
+            result.fetchall.return_value = psps if query is reference_data.PSPS_SQL else []
+            result.rowcount = 1
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        cache = reference_data.ReferenceDataCache()
+        app.dependency_overrides[get_db] = override_get_db
+
+        try:
+            with patch.object(reference_data, "_cache", cache):
+                assert (await async_client.get("/v1/psps/dbsssgsg")).json()["name"] == "Old Bank"
+                assert (await async_client.get("/v1/psps/DBSSSGSG")).json()["name"] == "Old Bank"
+                assert (await async_client.get("/v1/psps/NOPE0000")).status_code == 404
+                assert cache.stats()["loads"] == 1 and cache.stats()["hits"] == 2
+
+                psps[:] = [self._psp("New Bank")]
+                response = await async_client.put(
+                    "/v1/fin-insts/5d1f0c3e-0000-4000-8000-000000000001",
+                    json={"bic": "DBSSSGSG", "name": "New Bank", "countryCode": "SG", "role": "PSP"},
+                )
+                assert response.status_code == 200
+                assert (await async_client.get("/v1/psps/DBSSSGSG")).json()["name"] == "New Bank"
+                assert cache.stats()["loads"] == 2 and cache.stats()["invalidations"] == 1
+        finally:
+            app.dependency_overrides.clear()
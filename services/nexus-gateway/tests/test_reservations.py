@@ -0,0 +1,161 @@
+"""
+Unit tests for SAP liquidity reservations.
+
+Tests reservations.py and reservation_expiry.py.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+class TestReservationEngine:
+    """Reservations are conditional writes against fxp_sap_accounts.reserved (api/reservations.py)."""
+
+    @pytest.mark.asyncio
+    async def test_reserve_is_one_statement_when_funds_are_available(self, mock_db_session):
+        from src.api import reservations
+
+        reserved = MagicMock(account_id="acc-1", reserved_at="t0", expires_at="t1")
+        mock_db_session.execute.return_value.fetchone.return_value = reserved
+
+        result = await reservations.reserve(
+            mock_db_session, "sap-1", "fxp-1", "thb", "1000.00", "uetr-1", expires_in_seconds=120
+        )
+
+        assert result.reservation_id and result.account_id == "acc-1"
+        statement, params = mock_db_session.execute.await_args.args
+        assert mock_db_session.execute.await_count == 1 and statement is reservations.RESERVE_SQL
+        assert "balance - reserved >=" in statement.text
+        assert params["currency"] == "THB" and params["expires_in_seconds"] == 120
+
+    @pytest.mark.asyncio
+    async def test_refusal_releases_lapsed_reservations_and_retries_once(self, mock_db_session):
+        from decimal import Decimal
+        from src.api import reservations
+
+        account = MagicMock(account_id="acc-1", balance=Decimal("5000"), reserved=Decimal("4500"), sharded=False)
+        refused, found, lapsed = MagicMock(), MagicMock(), MagicMock()
+        refused.fetchone.return_value = None
+        found.fetchone.return_value = account
+        lapsed.fetchall.return_value = [MagicMock(reservation_id="r-old")]
+        mock_db_session.execute.side_effect = [refused, found, lapsed, refused, found]
+
+        result = await reservations.reserve(mock_db_session, "sap-1", "fxp-1", "THB", "1000", "uetr-1")
+
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [
+            reservations.RESERVE_SQL, reservations.ACCOUNT_SQL, reservations.EXPIRE_ACCOUNT_SQL,
+            reservations.RESERVE_SQL, reservations.ACCOUNT_SQL,
+        ]
+        assert result.reservation_id is None and result.account_id == "acc-1"
+        assert result.available == Decimal("500")
+
+    @pytest.mark.asyncio
+    async def test_settlement_is_one_statement_for_both_legs(self, mock_db_session):
+        from src.api import reservations
+        from src.api.sap import settle_reservation_for_payment
+
+        mock_db_session.execute.return_value.fetchall.return_value = [
+            MagicMock(reservation_id="r-1", account_id="acc-idr", amount="1000", credited_account_id="acc-sgd")
+        ]
+
+        settled = await settle_reservation_for_payment(
+            mock_db_session, "uetr-1", source_sap_bic="dbsssgsg", source_currency="sgd",
+            source_amount="10.00", fxp_id="fxp-1",
+        )
+
+        statement, params = mock_db_session.execute.await_args.args
+        assert settled is True
+        assert mock_db_session.execute.await_count == 1 and statement is reservations.SETTLE_SQL
+        assert "INSERT INTO sap_transactions" in statement.text
+        assert params["source_sap_bic"] == "DBSSSGSG" and params["source_currency"] == "SGD"
+        mock_db_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_expiry_is_scheduled_only_for_reservations_committed_here(self, mock_db_session):
+        from unittest.mock import patch
+        from src.api import sap
+        from src.api.reservations import ReserveResult
+
+        reference = MagicMock()
+        reference.get = AsyncMock(return_value=MagicMock())
+        reserved = ReserveResult(reservation_id="r-1", account_id="acc-1", expires_at="t1")
+        expiry = MagicMock()
+
+        with patch.object(sap, "get_reference_data", return_value=reference), \
+                patch.object(sap.reservations, "reserve", AsyncMock(return_value=reserved)), \
+                patch.object(sap, "get_reservation_expiry", return_value=expiry):
+            # Inside a unit of work the caller settles the reservation before committing
+            await sap.create_reservation_for_payment(
+                mock_db_session, "fxp-1", "DBSSSGSG", "SGD", "10", "uetr-1", commit=False
+            )
+            expiry.schedule.assert_not_called()
+            await sap.create_reservation_for_payment(
+                mock_db_session, "fxp-1", "DBSSSGSG", "SGD", "10", "uetr-2"
+            )
+
+        expiry.schedule.assert_called_once_with("t1")
+        mock_db_session.commit.assert_awaited_once()
+
+
+class TestReservationExpiry:
+    """Lapsed reservations are released by a scheduled worker (api/reservation_expiry.py)."""
+
+    @staticmethod
+    def _session_factory(mock_db_session, batches):
+        from src.api.background import LOCK_SQL
+        from src.api.reservations import EXPIRE_DUE_SQL
+
+        batches = list(batches)
+
+        async def execute(statement, params=None):
+            result = MagicMock()
+            if statement is EXPIRE_DUE_SQL:
+                assert params["batch_size"] == 2
+                result.fetchall.return_value = batches.pop(0) if batches else []
+            else:
+                assert statement is LOCK_SQL
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return session_factory
+
+    @pytest.mark.asyncio
+    async def test_batches_until_a_partial_batch(self, mock_db_session):
+        from src.api.reservation_expiry import ReservationExpiry
+
+        row = MagicMock(reservation_id="r", uetr="u")
+        session_factory = self._session_factory(mock_db_session, [[row, row], [row]])
+        expiry = ReservationExpiry(session_factory=session_factory, batch_size=2)
+
+        assert await expiry.run_once() == 3
+        assert mock_db_session.commit.await_count == 2
+        assert expiry.stats()["batches"] == 2 and expiry.stats()["lastExpired"] == 3
+
+    @pytest.mark.asyncio
+    async def test_scheduled_reservation_wakes_the_worker_before_the_interval(self, mock_db_session):
+        import asyncio
+        from datetime import datetime, timedelta, timezone
+        from src.api.reservation_expiry import ReservationExpiry
+
+        row = MagicMock(reservation_id="r", uetr="u")
+        session_factory = self._session_factory(mock_db_session, [[], [row]])
+        expiry = ReservationExpiry(session_factory=session_factory, interval_seconds=60, batch_size=2)
+        await expiry.start()
+        try:
+            await asyncio.sleep(0.01)
+            assert expiry.stats()["runs"] == 1
+            expiry.schedule(datetime.now(timezone.utc) + timedelta(milliseconds=20))
+            for _ in range(100):
+                if expiry.stats()["runs"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await expiry.stop()
+
+        stats = expiry.stats()
+        assert stats["runs"] == 2 and stats["scheduledWakes"] == 1
+        assert stats["expired"] == 1 and stats["pendingDeadlines"] == 0
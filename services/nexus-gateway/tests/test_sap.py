@@ -0,0 +1,152 @@
+"""
+Unit tests for SAP endpoints.
+
+Tests sap.py reconciliation reports and the daily position closer
+(daily_positions.py).
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class TestReconciliationReports:
+    """Reconciliation reads closed days from sap_daily_positions and sums only open days."""
+
+    @staticmethod
+    def _reference():
+        reference = MagicMock()
+        sap = MagicMock(sap_id="sap-1")
+        sap.name = "DBS Singapore"
+        reference.sap_by_bic.return_value = sap
+        data = MagicMock()
+        data.get = AsyncMock(return_value=reference)
+        return data
+
+    @staticmethod
+    def _position(position_date, **values):
+        from decimal import Decimal
+
+        row = dict(
+            currency_code="SGD", current_balance=Decimal("999"), sap_bic="DBSSSGSG", sap_name_full="DBS",
+            fxp_code="FXP1", position_date=position_date, opening_balance=Decimal("1000"),
+            total_credits=Decimal("50"), total_debits=Decimal("20"), closing_balance=Decimal("1030"),
+            transaction_count=3, next_opening_balance=None, open_net_before=Decimal("0"),
+            open_credits=Decimal("0"), open_debits=Decimal("0"), open_transactions=0,
+        )
+        row.update(values)
+        return MagicMock(**row)
+
+    @pytest.mark.asyncio
+    async def test_report_date_position_is_read_by_primary_key(self, mock_db_session):
+        from datetime import date
+        from src.api import sap
+
+        mock_db_session.execute.return_value.fetchall.return_value = [self._position(date(2026, 3, 2))]
+
+        with patch.object(sap, "get_reference_data", return_value=self._reference()):
+            [report] = await sap.get_reconciliation_reports(sap_bic="DBSSSGSG", date="2026-03-02", db=mock_db_session)
+
+        statement, params = mock_db_session.execute.await_args.args
+        assert "sap_daily_positions" in statement.text
+        # Transactions are read only for open days, bounded by the latest closed row
+        assert "WHERE n.opening_balance IS NULL" in statement.text
+        assert "t.created_at >= (p.position_date + 1)" in statement.text
+        assert params["report_date"] == date(2026, 3, 2)
+        assert (params["day_start"].isoformat(), params["day_end"].isoformat()) == (
+            "2026-03-02T00:00:00+00:00", "2026-03-03T00:00:00+00:00"
+        )
+        assert (report.opening_balance, report.total_credits, report.total_debits, report.closing_balance) == (
+            "1000", "50", "20", "1030"
+        )
+        assert report.transaction_count == 3
+
+    @pytest.mark.asyncio
+    async def test_day_without_activity_carries_the_previous_closing(self, mock_db_session):
+        from datetime import date
+        from decimal import Decimal
+        from src.api import sap
+
+        mock_db_session.execute.return_value.fetchall.return_value = [
+            self._position(date(2026, 2, 27), next_opening_balance=Decimal("1030"))
+        ]
+
+        with patch.object(sap, "get_reference_data", return_value=self._reference()):
+            [report] = await sap.get_reconciliation_reports(sap_bic="DBSSSGSG", date="2026-03-02", db=mock_db_session)
+
+        assert report.opening_balance == report.closing_balance == "1030"
+        assert report.total_credits == report.total_debits == "0" and report.transaction_count == 0
+
+    @pytest.mark.asyncio
+    async def test_open_day_adds_transactions_since_the_latest_closed_day(self, mock_db_session):
+        from datetime import date
+        from decimal import Decimal
+        from src.api import sap
+
+        mock_db_session.execute.return_value.fetchall.return_value = [self._position(
+            date(2026, 2, 27), open_net_before=Decimal("-30"), open_credits=Decimal("100"),
+            open_debits=Decimal("25"), open_transactions=4,
+        )]
+
+        with patch.object(sap, "get_reference_data", return_value=self._reference()):
+            [report] = await sap.get_reconciliation_reports(sap_bic="DBSSSGSG", date="2026-03-02", db=mock_db_session)
+
+        # 1030 closed on 02-27, -30 on the open days before the report date
+        assert (report.opening_balance, report.total_credits, report.total_debits, report.closing_balance) == (
+            "1000", "100", "25", "1075"
+        )
+        assert report.transaction_count == 4
+
+
+class TestDailyPositionCloser:
+    """Finished UTC days are closed by one replica once no earlier transaction is running."""
+
+    @staticmethod
+    def _session_factory(mock_db_session, lock_acquired=True, in_flight=False, closed=2):
+        from datetime import datetime, timezone
+        from src.api.background import TRY_LOCK_SQL
+        from src.api.daily_positions import CLOSE_SQL, CUTOFF_SQL
+
+        def execute(statement, params=None):
+            result = MagicMock()
+            if statement is TRY_LOCK_SQL:
+                result.scalar.return_value = lock_acquired
+            elif statement is CUTOFF_SQL:
+                result.fetchone.return_value = MagicMock(
+                    close_before=datetime(2026, 3, 2, tzinfo=timezone.utc), in_flight=in_flight,
+                )
+            elif statement is CLOSE_SQL:
+                assert params["close_before"] == datetime(2026, 3, 2, tzinfo=timezone.utc)
+                result.fetchall.return_value = [MagicMock()] * closed
+            return result
+
+        mock_db_session.execute.side_effect = execute
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=mock_db_session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return session_factory
+
+    @pytest.mark.asyncio
+    async def test_closes_finished_days_without_touching_the_settlement_path(self, mock_db_session):
+        from src.api.background import TRY_LOCK_SQL
+        from src.api.daily_positions import CLOSE_SQL, CUTOFF_SQL, DailyPositionCloser
+
+        closer = DailyPositionCloser(session_factory=self._session_factory(mock_db_session))
+        assert await closer.run_once() == 2
+
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert statements == [TRY_LOCK_SQL, CUTOFF_SQL, CLOSE_SQL]
+        assert "ON CONFLICT DO NOTHING" in CLOSE_SQL.text and "DO UPDATE" not in CLOSE_SQL.text
+        mock_db_session.commit.assert_awaited_once()
+        assert closer.stats()["closed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_transactions_started_before_the_cutoff(self, mock_db_session):
+        from src.api.background import TRY_LOCK_SQL
+        from src.api.daily_positions import CUTOFF_SQL, DailyPositionCloser
+
+        closer = DailyPositionCloser(session_factory=self._session_factory(mock_db_session, in_flight=True))
+        assert await closer.run_once() == 0
+
+        assert [c.args[0] for c in mock_db_session.execute.await_args_list] == [TRY_LOCK_SQL, CUTOFF_SQL]
+        mock_db_session.commit.assert_not_awaited()
+        assert closer.stats()["postponed"] == 1